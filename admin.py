@@ -0,0 +1,1986 @@
+# -*- coding: utf-8 -*-
+"""
+Verwaltung: Benutzer, Protokolle mit Import und Export, Prüfer, Hashtags,
+E-Mail-Outbox, Cache-Statistik und Metriken
+"""
+
+import click
+import csv
+import gzip
+import io
+import json
+import secrets
+import sqlite3
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+
+from app import BUNDESLAENDER, EXPORT_BATCH, FTS_RANKING, LANGSAME_ABFRAGEN_MS, LANGSAME_ABFRAGEN_TABELLE, \
+    admin_required, antwort_cache, antwort_cache_statistik, befehle, berechtigungen_invalidieren, db_connect, \
+    email_worker_wecken, export_puffern, fragment_cache, fts_abfrageteile, fts_ausdruck, get_db, hashtag_bedingung, \
+    hashtag_katalog, hashtags_nachschlagen, hashtags_normalisieren, keyset_seite, langsame_abfragen_puffer, \
+    langsame_abfragen_zuruecksetzen, metriken, protokoll_hashtags_setzen, protokolle_von, pruefer_katalog, \
+    pruefer_katalog_invalidieren, send_email, sitzungen_beenden, statistik
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.route('/admin/cache')
+@admin_required
+def admin_cache_statistik():
+    """Treffer und Fehlschläge des Antwort-Caches in diesem Prozess"""
+    return jsonify(antwort_cache_statistik())
+
+
+@admin_bp.route('/admin/metrics')
+def admin_metriken():
+    """Metriken dieses Prozesses für Prometheus; Admin-Sitzung oder METRIKEN_TOKEN
+
+    Unter gunicorn antwortet der Worker, der die Anfrage annimmt, nur mit seinen
+    eigenen Werten (siehe gunicorn.conf.py).
+    """
+    token = current_app.config['METRIKEN_TOKEN']
+    if token and secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return _metriken_antwort()
+    return admin_required(_metriken_antwort)()
+
+
+def _metriken_antwort():
+    return current_app.response_class(metriken.prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+def langsame_abfragen_gruppieren(eintraege):
+    """Einträge je Fingerprint zusammenfassen, teuerste (Summe der Dauer) zuerst"""
+    gruppen = {}
+    for eintrag in eintraege:
+        gruppe = gruppen.setdefault(eintrag['fingerprint'], {
+            'fingerprint': eintrag['fingerprint'], 'sql': eintrag['sql'], 'plan': eintrag['plan'],
+            'anzahl': 0, 'summe_ms': 0.0, 'max_ms': 0.0, 'zuletzt': '', 'endpoints': {}, 'parameter': set(),
+        })
+        gruppe['anzahl'] += 1
+        gruppe['summe_ms'] += eintrag['dauer_ms']
+        gruppe['max_ms'] = max(gruppe['max_ms'], eintrag['dauer_ms'])
+        gruppe['zuletzt'] = max(gruppe['zuletzt'], eintrag['zeit'])
+        gruppe['endpoints'][eintrag['endpoint']] = gruppe['endpoints'].get(eintrag['endpoint'], 0) + 1
+        gruppe['parameter'].add(eintrag['parameter'])
+
+    for gruppe in gruppen.values():
+        gruppe['mittel_ms'] = gruppe['summe_ms'] / gruppe['anzahl']
+        # Tabellen ohne passenden Index und Sortierungen, für die SQLite einen Temp-B-Tree baut
+        gruppe['hinweise'] = [zeile.strip() for zeile in gruppe['plan'].splitlines()
+                              if (zeile.strip().startswith('SCAN') and ' USING ' not in zeile)
+                              or 'TEMP B-TREE' in zeile]
+    return sorted(gruppen.values(), key=lambda gruppe: gruppe['summe_ms'], reverse=True)
+
+
+@admin_bp.route('/admin/langsame-abfragen')
+@admin_required
+def admin_langsame_abfragen():
+    """Langsame Abfragen nach Fingerprint, aus dem Ringpuffer oder der Tabelle"""
+    quelle = request.args.get('quelle', 'puffer')  # puffer, tabelle
+
+    if quelle == 'tabelle' and LANGSAME_ABFRAGEN_TABELLE:
+        c = get_db().cursor()
+        c.execute('''
+                  SELECT zeit, fingerprint, sql, parameter, dauer_ms, endpoint, plan
+                  FROM langsame_abfragen
+                  ORDER BY id DESC LIMIT 10000
+                  ''')
+        spalten = [spalte[0] for spalte in c.description]
+        eintraege = [dict(zip(spalten, zeile)) for zeile in c.fetchall()]
+    else:
+        quelle = 'puffer'
+        eintraege = langsame_abfragen_puffer()
+
+    return render_template('admin/langsame_abfragen.html',
+                           gruppen=langsame_abfragen_gruppieren(eintraege),
+                           anzahl=len(eintraege),
+                           quelle=quelle,
+                           tabelle=LANGSAME_ABFRAGEN_TABELLE,
+                           schwelle=LANGSAME_ABFRAGEN_MS)
+
+
+@admin_bp.route('/admin/langsame-abfragen/leeren', methods=['POST'])
+@admin_required
+def langsame_abfragen_leeren():
+    """Ringpuffer und zwischengespeicherte Pläne dieses Prozesses verwerfen (z. B. nach neuem Index)"""
+    langsame_abfragen_zuruecksetzen()
+    flash('Langsame Abfragen dieses Prozesses wurden zurückgesetzt.', 'success')
+    return redirect(url_for('admin.admin_langsame_abfragen'))
+
+
+@admin_bp.route('/admin/benutzer')
+@admin_required
+def admin_benutzer():
+    """Benutzerverwaltung"""
+    # Filter-Parameter
+    status_filter = request.args.get('status', 'all')  # all, pending, approved, admin
+    search_query = request.args.get('search', '')
+    sort_by = request.args.get('sort', 'created_at')  # name, email, created_at, protokolle_count
+    sort_order = request.args.get('order', 'desc')  # asc, desc
+
+    conn = get_db()
+    c = conn.cursor()
+
+    # Basis-Query mit Protokoll-Zählung
+    base_query = '''
+                 SELECT u.id, \
+                        u.name, \
+                        u.email, \
+                        u.ausbildungsjahr, \
+                        u.created_at,
+                        u.is_verified, \
+                        u.is_approved, \
+                        u.is_admin,
+                        COUNT(p.id)       as protokolle_count,
+                        MAX(p.created_at) as letztes_protokoll
+                 FROM users u
+                          LEFT JOIN protokolle p ON u.id = p.user_id
+                 WHERE 1 = 1 \
+                 '''
+
+    params = []
+
+    # Status-Filter
+    if status_filter == 'pending':
+        base_query += ' AND u.is_verified = TRUE AND u.is_approved = FALSE'
+    elif status_filter == 'approved':
+        base_query += ' AND u.is_approved = TRUE AND u.is_admin = FALSE'
+    elif status_filter == 'admin':
+        base_query += ' AND u.is_admin = TRUE'
+
+    # Such-Filter
+    if search_query:
+        base_query += ' AND (u.name LIKE ? OR u.email LIKE ?)'
+        params.extend([f'%{search_query}%', f'%{search_query}%'])
+
+    # GROUP BY hinzufügen
+    base_query += ' GROUP BY u.id, u.name, u.email, u.ausbildungsjahr, u.created_at, u.is_verified, u.is_approved, u.is_admin'
+
+    # Sortierung
+    valid_sorts = {
+        'name': 'u.name',
+        'email': 'u.email',
+        'created_at': 'u.created_at',
+        'protokolle_count': 'protokolle_count'
+    }
+
+    if sort_by in valid_sorts:
+        order_direction = 'DESC' if sort_order == 'desc' else 'ASC'
+        base_query += f' ORDER BY {valid_sorts[sort_by]} {order_direction}'
+    else:
+        base_query += ' ORDER BY u.created_at DESC'
+
+    c.execute(base_query, params)
+    alle_benutzer = c.fetchall()
+
+    # Statistiken
+    zaehler = statistik(c)
+    wartende_benutzer = zaehler['users_wartend']
+    aktive_benutzer = zaehler['users_aktiv']
+    admin_benutzer = zaehler['users_admin']
+    gesamt_benutzer = zaehler['users']
+
+    return render_template('admin/benutzer.html',
+                           benutzer=alle_benutzer,
+                           status_filter=status_filter,
+                           search_query=search_query,
+                           sort_by=sort_by,
+                           sort_order=sort_order,
+                           wartende_benutzer=wartende_benutzer,
+                           aktive_benutzer=aktive_benutzer,
+                           admin_benutzer=admin_benutzer,
+                           gesamt_benutzer=gesamt_benutzer)
+
+
+@admin_bp.route('/admin/benutzer/<int:user_id>/admin-status', methods=['POST'])
+@admin_required
+def toggle_admin_status(user_id):
+    """Admin-Status eines Benutzers ändern"""
+    action = request.form.get('action')  # 'promote' oder 'demote'
+
+    # Nicht sich selbst degradieren
+    if user_id == session['user_id']:
+        flash('Sie können Ihren eigenen Admin-Status nicht ändern.', 'error')
+        return redirect(url_for('admin.admin_benutzer'))
+
+    conn = get_db()
+    c = conn.cursor()
+
+    # Benutzer-Informationen abrufen
+    c.execute('SELECT id, name, email, is_admin, is_approved FROM users WHERE id = ?', (user_id,))
+    user_data = c.fetchone()
+
+    if not user_data:
+        flash('Benutzer nicht gefunden.', 'error')
+        return redirect(url_for('admin.admin_benutzer'))
+
+    user_name = user_data[1]
+    user_email = user_data[2]
+    is_current_admin = user_data[3]
+    is_approved = user_data[4]
+
+    try:
+        if action == 'promote':
+            if is_current_admin:
+                flash(f'{user_name} ist bereits ein Administrator.', 'warning')
+            else:
+                # Benutzer muss approved sein
+                if not is_approved:
+                    flash('Benutzer muss erst freigeschaltet werden, bevor er zum Admin ernannt werden kann.', 'error')
+                else:
+                    c.execute('UPDATE users SET is_admin = TRUE WHERE id = ?', (user_id,))
+                    conn.commit()
+                    berechtigungen_invalidieren()
+
+                    # E-Mail-Benachrichtigung senden
+                    subject = "Sie wurden zum Administrator ernannt - Urologie Facharztprüfung"
+                    body = f"""
+                    <html>
+                    <body>
+                        <h2>🎉 Herzlichen Glückwunsch!</h2>
+                        <p>Hallo {user_name},</p>
+                        <p>Sie wurden zum Administrator der Urologie Facharztprüfung Plattform ernannt.</p>
+
+                        <h3>Ihre neuen Berechtigungen:</h3>
+                        <ul>
+                            <li>✅ Benutzer freischalten und verwalten</li>
+                            <li>👨‍⚕️ Prüfer hinzufügen und bearbeiten</li>
+                            <li>📊 Admin-Dashboard Zugriff</li>
+                            <li>🗑️ Protokolle moderieren</li>
+                            <li>👥 Andere Administratoren ernennen</li>
+                        </ul>
+
+                        <p>Sie können jetzt über den "Admin" Bereich auf erweiterte Funktionen zugreifen.</p>
+
+                        <p><a href="{url_for('admin.admin_dashboard', _external=True)}" 
+                           style="background-color: #3FA357; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">
+                           Zum Admin-Dashboard
+                        </a></p>
+
+                        <p>Vielen Dank für Ihr Engagement!</p>
+                    </body>
+                    </html>
+                    """
+
+                    if send_email(user_email, subject, body):
+                        flash(f'{user_name} wurde erfolgreich zum Administrator ernannt und per E-Mail benachrichtigt.',
+                              'success')
+                    else:
+                        flash(
+                            f'{user_name} wurde zum Administrator ernannt, aber E-Mail-Benachrichtigung fehlgeschlagen.',
+                            'warning')
+
+        elif action == 'demote':
+            if not is_current_admin:
+                flash(f'{user_name} ist kein Administrator.', 'warning')
+            else:
+                # Prüfen ob es noch andere Admins gibt
+                c.execute('SELECT COUNT(*) FROM users WHERE is_admin = TRUE AND id != ?', (user_id,))
+                andere_admins = c.fetchone()[0]
+
+                if andere_admins == 0:
+                    flash(
+                        'Sie können den letzten Administrator nicht degradieren. Es muss mindestens ein Administrator vorhanden sein.',
+                        'error')
+                else:
+                    c.execute('UPDATE users SET is_admin = FALSE WHERE id = ?', (user_id,))
+                    conn.commit()
+                    berechtigungen_invalidieren()
+
+                    # E-Mail-Benachrichtigung senden
+                    subject = "Administrator-Status entfernt - Urologie Facharztprüfung"
+                    body = f"""
+                    <html>
+                    <body>
+                        <h2>Administrator-Status geändert</h2>
+                        <p>Hallo {user_name},</p>
+                        <p>Ihr Administrator-Status für die Urologie Facharztprüfung Plattform wurde entfernt.</p>
+
+                        <p>Sie haben weiterhin Zugriff auf alle normalen Funktionen der Plattform:</p>
+                        <ul>
+                            <li>📝 Protokolle erstellen und einsehen</li>
+                            <li>🔍 In Protokollen suchen</li>
+                            <li>👤 Ihr Profil verwalten</li>
+                            <li>📧 Erinnerungen erhalten</li>
+                        </ul>
+
+                        <p>Bei Fragen wenden Sie sich an einen Administrator.</p>
+
+                        <p><a href="{url_for('protokolle.dashboard', _external=True)}" 
+                           style="background-color: #606AAC; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">
+                           Zum Dashboard
+                        </a></p>
+                    </body>
+                    </html>
+                    """
+
+                    if send_email(user_email, subject, body):
+                        flash(f'Administrator-Status von {user_name} wurde entfernt und per E-Mail benachrichtigt.',
+                              'success')
+                    else:
+                        flash(
+                            f'Administrator-Status von {user_name} wurde entfernt, aber E-Mail-Benachrichtigung fehlgeschlagen.',
+                            'warning')
+
+        else:
+            flash('Ungültige Aktion.', 'error')
+
+    except Exception as e:
+        conn.rollback()
+        flash('Fehler beim Ändern des Admin-Status.', 'error')
+        print(f"Admin-Status Änderung Fehler: {e}")
+
+    return redirect(url_for('admin.admin_benutzer'))
+
+
+@admin_bp.route('/admin/benutzer/<int:user_id>/details')
+@admin_required
+def benutzer_details(user_id):
+    """Benutzer-Details anzeigen"""
+    conn = get_db()
+    c = conn.cursor()
+
+    # Benutzer-Informationen
+    c.execute('''
+              SELECT id,
+                     name,
+                     email,
+                     ausbildungsjahr,
+                     created_at,
+                     is_verified,
+                     is_approved,
+                     is_admin,
+                     verification_token
+              FROM users
+              WHERE id = ?
+              ''', (user_id,))
+    user_data = c.fetchone()
+
+    if not user_data:
+        flash('Benutzer nicht gefunden.', 'error')
+        return redirect(url_for('admin.admin_benutzer'))
+
+    # Benutzer-Statistiken
+    anzahl_protokolle = protokolle_von(c, user_id)
+
+    c.execute('''
+              SELECT MIN(created_at), MAX(created_at)
+              FROM protokolle
+              WHERE user_id = ?
+              ''', (user_id,))
+    protokoll_zeitraum = c.fetchone()
+
+    # Letzte Protokolle
+    c.execute('''
+              SELECT p.datum, p.bundesland, pr.name, p.hashtags, p.created_at
+              FROM protokolle p
+                       JOIN pruefer pr ON p.pruefer1_id = pr.id
+              WHERE p.user_id = ?
+              ORDER BY p.created_at DESC LIMIT 10
+              ''', (user_id,))
+    letzte_protokolle = c.fetchall()
+
+    # Erinnerungen
+    c.execute('''
+              SELECT pruefungsdatum,
+                     naechste_erinnerung,
+                     anzahl_erinnerungen,
+                     protokoll_erstellt,
+                     created_at
+              FROM erinnerungen
+              WHERE user_id = ?
+              ORDER BY created_at DESC
+              ''', (user_id,))
+    erinnerungen = c.fetchall()
+
+    # Häufigste Hashtags
+    c.execute('''
+              SELECT h.name, COUNT(*) as anzahl
+              FROM protokolle p
+                       JOIN protokoll_hashtags ph ON ph.protokoll_id = p.id
+                       JOIN hashtags h ON h.id = ph.hashtag_id
+              WHERE p.user_id = ?
+              GROUP BY h.id
+              ORDER BY anzahl DESC, h.name LIMIT 10
+              ''', (user_id,))
+    top_hashtags = c.fetchall()
+
+    user_info = {
+        'id': user_data[0],
+        'name': user_data[1],
+        'email': user_data[2],
+        'ausbildungsjahr': user_data[3],
+        'created_at': user_data[4],
+        'is_verified': user_data[5],
+        'is_approved': user_data[6],
+        'is_admin': user_data[7],
+        'verification_token': user_data[8],
+        'anzahl_protokolle': anzahl_protokolle,
+        'protokoll_zeitraum': protokoll_zeitraum,
+        'letzte_protokolle': letzte_protokolle,
+        'erinnerungen': erinnerungen,
+        'top_hashtags': top_hashtags
+    }
+
+    return render_template('admin/benutzer_details.html', user=user_info)
+
+
+@admin_bp.route('/admin/benutzer/<int:user_id>/suspend', methods=['POST'])
+@admin_required
+def suspend_user(user_id):
+    """Benutzer sperren/entsperren"""
+    action = request.form.get('action')  # 'suspend' oder 'unsuspend'
+    reason = request.form.get('reason', '').strip()
+
+    # Nicht sich selbst sperren
+    if user_id == session['user_id']:
+        flash('Sie können sich nicht selbst sperren.', 'error')
+        return redirect(url_for('admin.admin_benutzer'))
+
+    conn = get_db()
+    c = conn.cursor()
+
+    # Benutzer-Informationen abrufen
+    c.execute('SELECT id, name, email, is_approved FROM users WHERE id = ?', (user_id,))
+    user_data = c.fetchone()
+
+    if not user_data:
+        flash('Benutzer nicht gefunden.', 'error')
+        return redirect(url_for('admin.admin_benutzer'))
+
+    user_name = user_data[1]
+    user_email = user_data[2]
+    is_approved = user_data[3]
+
+    try:
+        if action == 'suspend':
+            if not is_approved:
+                flash(f'{user_name} ist bereits gesperrt.', 'warning')
+            else:
+                c.execute('UPDATE users SET is_approved = FALSE WHERE id = ?', (user_id,))
+                sitzungen_beenden(c, user_id)
+                conn.commit()
+                berechtigungen_invalidieren()
+
+                # E-Mail-Benachrichtigung
+                subject = "Account gesperrt - Urologie Facharztprüfung"
+                body = f"""
+                <html>
+                <body>
+                    <h2>Account vorübergehend gesperrt</h2>
+                    <p>Hallo {user_name},</p>
+                    <p>Ihr Account wurde vorübergehend gesperrt.</p>
+
+                    {f'<p><strong>Grund:</strong> {reason}</p>' if reason else ''}
+
+                    <p>Bei Fragen wenden Sie sich an einen Administrator.</p>
+                </body>
+                </html>
+                """
+
+                send_email(user_email, subject, body)
+                flash(f'{user_name} wurde gesperrt.', 'success')
+
+        elif action == 'unsuspend':
+            if is_approved:
+                flash(f'{user_name} ist nicht gesperrt.', 'warning')
+            else:
+                c.execute('UPDATE users SET is_approved = TRUE WHERE id = ?', (user_id,))
+                conn.commit()
+                berechtigungen_invalidieren()
+
+                # E-Mail-Benachrichtigung
+                subject = "Account wieder freigeschaltet - Urologie Facharztprüfung"
+                body = f"""
+                <html>
+                <body>
+                    <h2>Account wieder freigeschaltet</h2>
+                    <p>Hallo {user_name},</p>
+                    <p>Ihr Account wurde wieder freigeschaltet. Sie können sich jetzt wieder anmelden.</p>
+
+                    <p><a href="{url_for('auth.login', _external=True)}" 
+                       style="background-color: #3FA357; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">
+                       Jetzt anmelden
+                    </a></p>
+                </body>
+                </html>
+                """
+
+                send_email(user_email, subject, body)
+                flash(f'{user_name} wurde entsperrt.', 'success')
+
+        else:
+            flash('Ungültige Aktion.', 'error')
+
+    except Exception as e:
+        conn.rollback()
+        flash('Fehler beim Ändern des Benutzer-Status.', 'error')
+        print(f"Benutzer-Status Änderung Fehler: {e}")
+
+    return redirect(url_for('admin.admin_benutzer'))
+
+@admin_bp.route('/admin/benutzer/bulk-actions', methods=['POST'])
+@admin_required
+def benutzer_bulk_actions():
+    """Bulk-Aktionen für Benutzer"""
+    action = request.form.get('action')
+    user_ids = request.form.getlist('user_ids')
+
+    if not user_ids:
+        flash('Keine Benutzer ausgewählt.', 'error')
+        return redirect(url_for('admin.admin_benutzer'))
+
+    # Eigene ID aus der Liste entfernen
+    user_ids = [uid for uid in user_ids if int(uid) != session['user_id']]
+
+    if not user_ids:
+        flash('Sie können keine Bulk-Aktionen auf sich selbst anwenden.', 'error')
+        return redirect(url_for('admin.admin_benutzer'))
+
+    conn = get_db()
+    c = conn.cursor()
+
+    try:
+        if action == 'approve':
+            placeholders = ','.join(['?' for _ in user_ids])
+            c.execute(f'''
+                UPDATE users SET is_approved = TRUE 
+                WHERE id IN ({placeholders}) AND is_verified = TRUE
+            ''', user_ids)
+            conn.commit()
+            berechtigungen_invalidieren()
+            flash(f'{len(user_ids)} Benutzer wurden freigeschaltet.', 'success')
+
+        elif action == 'suspend':
+            placeholders = ','.join(['?' for _ in user_ids])
+            c.execute(f'UPDATE users SET is_approved = FALSE WHERE id IN ({placeholders})', user_ids)
+            for uid in user_ids:
+                sitzungen_beenden(c, int(uid))
+            conn.commit()
+            berechtigungen_invalidieren()
+            flash(f'{len(user_ids)} Benutzer wurden gesperrt.', 'success')
+
+        elif action == 'promote_admin':
+            placeholders = ','.join(['?' for _ in user_ids])
+            c.execute(f'''
+                UPDATE users SET is_admin = TRUE 
+                WHERE id IN ({placeholders}) AND is_approved = TRUE
+            ''', user_ids)
+            conn.commit()
+            berechtigungen_invalidieren()
+            flash(f'{len(user_ids)} Benutzer wurden zu Administratoren ernannt.', 'success')
+
+        elif action == 'demote_admin':
+            # Prüfen ob genug Admins übrig bleiben
+            c.execute('SELECT COUNT(*) FROM users WHERE is_admin = TRUE')
+            total_admins = c.fetchone()[0]
+
+            if total_admins - len(user_ids) < 1:
+                flash('Es muss mindestens ein Administrator übrig bleiben.', 'error')
+            else:
+                placeholders = ','.join(['?' for _ in user_ids])
+                c.execute(f'UPDATE users SET is_admin = FALSE WHERE id IN ({placeholders})', user_ids)
+                conn.commit()
+                berechtigungen_invalidieren()
+                flash(f'{len(user_ids)} Administratoren wurden degradiert.', 'success')
+
+        else:
+            flash('Ungültige Aktion ausgewählt.', 'error')
+
+    except Exception as e:
+        conn.rollback()
+        flash('Fehler bei der Bulk-Aktion.', 'error')
+        print(f"Bulk-Action Fehler: {e}")
+
+    return redirect(url_for('admin.admin_benutzer'))
+
+
+@admin_bp.route('/admin/protokoll/<int:protokoll_id>')
+@admin_required
+def admin_protokoll_details(protokoll_id):
+    """Admin-Ansicht für Protokoll-Details"""
+    conn = get_db()
+    c = conn.cursor()
+
+    # Protokoll-Informationen mit allen Details
+    c.execute('''
+              SELECT p.id,
+                     p.datum,
+                     p.bundesland,
+                     p.inhalt,
+                     p.hashtags,
+                     p.kommentar,
+                     p.created_at,
+                     u.id,
+                     u.name,
+                     u.email,
+                     pr1.id,
+                     pr1.name,
+                     pr1.bundesland,
+                     pr2.id,
+                     pr2.name,
+                     pr2.bundesland,
+                     pr3.id,
+                     pr3.name,
+                     pr3.bundesland
+              FROM protokolle p
+                       JOIN users u ON p.user_id = u.id
+                       JOIN pruefer pr1 ON p.pruefer1_id = pr1.id
+                       JOIN pruefer pr2 ON p.pruefer2_id = pr2.id
+                       JOIN pruefer pr3 ON p.pruefer3_id = pr3.id
+              WHERE p.id = ?
+              ''', (protokoll_id,))
+
+    protokoll_data = c.fetchone()
+
+    if not protokoll_data:
+        flash('Protokoll nicht gefunden.', 'error')
+        return redirect(url_for('protokolle.protokolle'))
+
+    protokoll_info = {
+        'id': protokoll_data[0],
+        'datum': protokoll_data[1],
+        'bundesland': protokoll_data[2],
+        'inhalt': protokoll_data[3],
+        'hashtags': protokoll_data[4],
+        'kommentar': protokoll_data[5],
+        'created_at': protokoll_data[6],
+        'user': {
+            'id': protokoll_data[7],
+            'name': protokoll_data[8],
+            'email': protokoll_data[9]
+        },
+        'pruefer1': {
+            'id': protokoll_data[10],
+            'name': protokoll_data[11],
+            'bundesland': protokoll_data[12]
+        },
+        'pruefer2': {
+            'id': protokoll_data[13],
+            'name': protokoll_data[14],
+            'bundesland': protokoll_data[15]
+        },
+        'pruefer3': {
+            'id': protokoll_data[16],
+            'name': protokoll_data[17],
+            'bundesland': protokoll_data[18]
+        }
+    }
+
+    return render_template('admin/protokoll_details.html',
+                           protokoll=protokoll_info,
+                           bundeslaender=BUNDESLAENDER,
+                           predefined_hashtags=hashtag_katalog(c))
+
+
+@admin_bp.route('/admin/protokoll/<int:protokoll_id>/bearbeiten', methods=['GET', 'POST'])
+@admin_required
+def admin_protokoll_bearbeiten(protokoll_id):
+    """Protokoll als Admin bearbeiten"""
+    conn = get_db()
+    c = conn.cursor()
+
+    if request.method == 'GET':
+        # Protokoll-Daten für Bearbeitung laden
+        c.execute('''
+                  SELECT p.id,
+                         p.datum,
+                         p.bundesland,
+                         p.pruefer1_id,
+                         p.pruefer2_id,
+                         p.pruefer3_id,
+                         p.inhalt,
+                         p.hashtags,
+                         p.kommentar,
+                         p.created_at,
+                         u.name
+                  FROM protokolle p
+                           JOIN users u ON p.user_id = u.id
+                  WHERE p.id = ?
+                  ''', (protokoll_id,))
+
+        protokoll_data = c.fetchone()
+
+        if not protokoll_data:
+            flash('Protokoll nicht gefunden.', 'error')
+            return redirect(url_for('protokolle.protokolle'))
+
+        protokoll_info = {
+            'id': protokoll_data[0],
+            'datum': protokoll_data[1],
+            'bundesland': protokoll_data[2],
+            'pruefer1_id': protokoll_data[3],
+            'pruefer2_id': protokoll_data[4],
+            'pruefer3_id': protokoll_data[5],
+            'inhalt': protokoll_data[6],
+            'hashtags': protokoll_data[7],
+            'kommentar': protokoll_data[8],
+            'created_at': protokoll_data[9],
+            'user_name': protokoll_data[10]
+        }
+
+        return render_template('admin/protokoll_bearbeiten.html',
+                               protokoll=protokoll_info,
+                               bundeslaender=BUNDESLAENDER,
+                               pruefer_version=pruefer_katalog()[0],
+                               predefined_hashtags=hashtag_katalog(c))
+
+    # POST Request - Protokoll aktualisieren
+    datum = request.form.get('datum', '').strip()
+    bundesland = request.form.get('bundesland', '').strip()
+    pruefer1_id = request.form.get('pruefer1', '').strip()
+    pruefer2_id = request.form.get('pruefer2', '').strip()
+    pruefer3_id = request.form.get('pruefer3', '').strip()
+    inhalt = request.form.get('inhalt', '').strip()
+    hashtags = request.form.get('hashtags', '').strip()
+    kommentar = request.form.get('kommentar', '').strip()
+    admin_notiz = request.form.get('admin_notiz', '').strip()
+
+    # Validierung
+    errors = []
+
+    if not datum:
+        errors.append('Datum ist erforderlich.')
+
+    if not bundesland or bundesland not in BUNDESLAENDER:
+        errors.append('Gültiges Bundesland ist erforderlich.')
+
+    if not pruefer1_id or not pruefer2_id or not pruefer3_id:
+        errors.append('Alle drei Prüfer müssen ausgewählt werden.')
+
+    if not inhalt:
+        errors.append('Prüfungsinhalt ist erforderlich.')
+    elif len(inhalt) < 10:
+        errors.append('Prüfungsinhalt muss mindestens 10 Zeichen lang sein.')
+
+    # Prüfer-IDs validieren
+    try:
+        pruefer_ids = [int(pruefer1_id), int(pruefer2_id), int(pruefer3_id)]
+        if len(set(pruefer_ids)) != 3:
+            errors.append('Alle drei Prüfer müssen unterschiedlich sein.')
+
+        # Prüfen ob Prüfer existieren
+        for pruefer_id in pruefer_ids:
+            c.execute('SELECT COUNT(*) FROM pruefer WHERE id = ?', (pruefer_id,))
+            if c.fetchone()[0] == 0:
+                errors.append(f'Prüfer mit ID {pruefer_id} existiert nicht.')
+    except ValueError:
+        errors.append('Ungültige Prüfer-IDs.')
+
+    if errors:
+        for error in errors:
+            flash(error, 'error')
+        return redirect(url_for('admin.admin_protokoll_bearbeiten', protokoll_id=protokoll_id))
+
+    # Protokoll aktualisieren - KORRIGIERT
+    try:
+        hashtag_liste = hashtags_nachschlagen(c, hashtags_normalisieren(hashtags))
+        hashtags = ' '.join(name for _, name in hashtag_liste)
+
+        c.execute('''
+                  UPDATE protokolle
+                  SET datum       = ?,
+                      bundesland  = ?,
+                      pruefer1_id = ?,
+                      pruefer2_id = ?,
+                      pruefer3_id = ?,
+                      inhalt      = ?,
+                      hashtags    = ?,
+                      kommentar   = ?
+                  WHERE id = ?
+                  ''', (datum, bundesland, int(pruefer1_id), int(pruefer2_id), int(pruefer3_id),
+                        inhalt, hashtags, kommentar, protokoll_id))
+        protokoll_hashtags_setzen(c, protokoll_id, hashtag_liste)
+
+        # Admin-Bearbeitung protokollieren
+        log_description = f"Protokoll #{protokoll_id} bearbeitet"
+        c.execute('''
+                  INSERT INTO admin_logs (admin_user_id, action_type, target_type, target_id, description, admin_notiz)
+                  VALUES (?, ?, ?, ?, ?, ?)
+                  ''', (session['user_id'], 'edit', 'protokoll', protokoll_id, log_description, admin_notiz))
+
+        conn.commit()
+        fragment_cache.entfernen(protokoll_id)
+
+        # Benachrichtigung an ursprünglichen Autor
+        if admin_notiz:
+            c.execute('''
+                      SELECT u.email, u.name
+                      FROM protokolle p
+                               JOIN users u ON p.user_id = u.id
+                      WHERE p.id = ?
+                      ''', (protokoll_id,))
+
+            user_data = c.fetchone()
+            if user_data:
+                subject = "Ihr Protokoll wurde von einem Administrator bearbeitet"
+                body = f"""
+                <html>
+                <body>
+                    <h2>Protokoll bearbeitet</h2>
+                    <p>Hallo {user_data[1]},</p>
+                    <p>Ihr Protokoll vom {datum} wurde von einem Administrator bearbeitet.</p>
+
+                    {f'<p><strong>Administratoren-Notiz:</strong><br>{admin_notiz}</p>' if admin_notiz else ''}
+
+                    <p>Sie können das aktualisierte Protokoll in Ihrem Dashboard einsehen.</p>
+
+                    <p><a href="{url_for('protokolle.protokolle', _external=True)}" 
+                       style="background-color: #3FA357; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">
+                       Protokoll ansehen
+                    </a></p>
+                </body>
+                </html>
+                """
+
+                send_email(user_data[0], subject, body)
+
+        flash('Protokoll wurde erfolgreich aktualisiert.', 'success')
+
+    except Exception as e:
+        conn.rollback()
+        flash('Fehler beim Aktualisieren des Protokolls.', 'error')
+        print(f"Protokoll-Update Fehler: {e}")
+
+    return redirect(url_for('admin.admin_protokoll_details', protokoll_id=protokoll_id))
+@admin_bp.route('/admin/protokoll/<int:protokoll_id>/loeschen', methods=['POST'])
+@admin_required
+def admin_protokoll_loeschen(protokoll_id):
+    """Protokoll als Admin löschen"""
+    admin_grund = request.form.get('grund', '').strip()
+
+    conn = get_db()
+    c = conn.cursor()
+
+    # Protokoll-Informationen für Benachrichtigung abrufen
+    c.execute('''
+              SELECT p.datum, u.email, u.name
+              FROM protokolle p
+                       JOIN users u ON p.user_id = u.id
+              WHERE p.id = ?
+              ''', (protokoll_id,))
+
+    protokoll_info = c.fetchone()
+
+    if not protokoll_info:
+        flash('Protokoll nicht gefunden.', 'error')
+        return redirect(url_for('protokolle.protokolle'))
+
+    datum, user_email, user_name = protokoll_info
+
+    try:
+        # Admin-Log erstellen bevor gelöscht wird
+        log_description = f"Protokoll #{protokoll_id} vom {datum} gelöscht"
+        c.execute('''
+                  INSERT INTO admin_logs (admin_user_id, action_type, target_type, target_id, description, admin_notiz)
+                  VALUES (?, ?, ?, ?, ?, ?)
+                  ''', (session['user_id'], 'delete', 'protokoll', protokoll_id, log_description, admin_grund))
+
+        # Protokoll löschen
+        c.execute('DELETE FROM protokolle WHERE id = ?', (protokoll_id,))
+
+        conn.commit()
+        fragment_cache.entfernen(protokoll_id)
+
+        # Benachrichtigung an ursprünglichen Autor
+        if admin_grund:
+            subject = "Ihr Protokoll wurde von einem Administrator entfernt"
+            body = f"""
+            <html>
+            <body>
+                <h2>Protokoll entfernt</h2>
+                <p>Hallo {user_name},</p>
+                <p>Ihr Protokoll vom {datum} wurde von einem Administrator entfernt.</p>
+
+                <p><strong>Grund:</strong><br>{admin_grund}</p>
+
+                <p>Bei Fragen wenden Sie sich an einen Administrator.</p>
+            </body>
+            </html>
+            """
+
+            send_email(user_email, subject, body)
+
+        flash('Protokoll wurde gelöscht.', 'success')
+
+    except Exception as e:
+        conn.rollback()
+        flash('Fehler beim Löschen des Protokolls.', 'error')
+        print(f"Protokoll-Löschung Fehler: {e}")
+
+    return redirect(url_for('protokolle.protokolle'))
+
+
+ADMIN_PROTOKOLL_FILTER = ('bundesland', 'pruefer', 'hashtag', 'hashtag_modus', 'user', 'datum_von', 'datum_bis', 'q')
+
+
+def admin_protokoll_filter(suche, fts_join):
+    """FROM/WHERE-Teil der Admin-Protokollliste mit allen Filtern aus request.args"""
+    bundesland_filter = request.args.get('bundesland', '')
+    pruefer_filter = request.args.get('pruefer', '')
+    hashtag_filter = request.args.get('hashtag', '')
+    hashtag_modus = request.args.get('hashtag_modus', 'alle')
+    user_filter = request.args.get('user', '')
+    datum_von = request.args.get('datum_von', '')
+    datum_bis = request.args.get('datum_bis', '')
+
+    query = f'''
+            FROM protokolle p
+                     JOIN pruefer pr1 ON p.pruefer1_id = pr1.id
+                     JOIN pruefer pr2 ON p.pruefer2_id = pr2.id
+                     JOIN pruefer pr3 ON p.pruefer3_id = pr3.id
+                     JOIN users u ON p.user_id = u.id
+                     {fts_join}
+            WHERE 1 = 1 \
+            '''
+
+    params = []
+
+    # Filter anwenden
+    if suche:
+        query += ' AND protokolle_fts MATCH ?'
+        params.append(suche)
+
+    if bundesland_filter:
+        query += ' AND p.bundesland = ?'
+        params.append(bundesland_filter)
+
+    if pruefer_filter:
+        query += ' AND (pr1.name LIKE ? OR pr2.name LIKE ? OR pr3.name LIKE ?)'
+        params.extend([f'%{pruefer_filter}%'] * 3)
+
+    if hashtag_filter:
+        bedingung, hashtag_params = hashtag_bedingung(hashtags_normalisieren(hashtag_filter), hashtag_modus)
+        query += bedingung
+        params.extend(hashtag_params)
+
+    if user_filter:
+        query += ' AND u.name LIKE ?'
+        params.append(f'%{user_filter}%')
+
+    if datum_von:
+        query += ' AND p.datum >= ?'
+        params.append(datum_von)
+
+    if datum_bis:
+        query += ' AND p.datum <= ?'
+        params.append(datum_bis)
+
+    return query, params
+
+
+@admin_bp.route('/admin/protokolle')
+@admin_required
+@antwort_cache
+def admin_protokolle():
+    """Admin-Übersicht aller Protokolle"""
+    # Filter-Parameter
+    bundesland_filter = request.args.get('bundesland', '')
+    pruefer_filter = request.args.get('pruefer', '')
+    hashtag_filter = request.args.get('hashtag', '')
+    hashtag_modus = request.args.get('hashtag_modus', 'alle')  # alle, eines
+    user_filter = request.args.get('user', '')
+    datum_von = request.args.get('datum_von', '')
+    datum_bis = request.args.get('datum_bis', '')
+    suchbegriff = request.args.get('q', '').strip()
+    suche = fts_ausdruck(suchbegriff)
+    sort_by = request.args.get('sort') or ('relevanz' if suche else 'created_at')
+    sort_order = request.args.get('order', 'desc')
+
+    conn = get_db()
+    c = conn.cursor()
+
+    treffer_spalte, fts_join, treffer_params = fts_abfrageteile(suche)
+
+    # Erweiterte Query für Admin-Ansicht
+    select = f'''
+            SELECT p.id, \
+                   p.datum, \
+                   p.bundesland, \
+                   pr1.name as pruefer1, \
+                   pr2.name as pruefer2,
+                   pr3.name as pruefer3, \
+                   p.hashtags, \
+                   p.inhalt_vorschau, \
+                   p.kommentar_vorschau, \
+                   u.name   as user_name,
+                   p.created_at, \
+                   u.id     as user_id,
+                   {treffer_spalte} as treffer,
+                   p.inhalt_laenge, \
+                   p.kommentar_laenge, \
+                   p.version \
+            '''
+
+    query, params = admin_protokoll_filter(suche, fts_join)
+
+    # Sortierung
+    valid_sorts = {
+        'created_at': 'p.created_at',
+        'datum': 'p.datum',
+        'bundesland': 'p.bundesland',
+        'user_name': 'u.name'
+    }
+
+    if suche and sort_by == 'relevanz':
+        seite = keyset_seite(c, select, treffer_params, query, params, FTS_RANKING, absteigend=False)
+    elif sort_by in valid_sorts:
+        seite = keyset_seite(c, select, treffer_params, query, params, valid_sorts[sort_by],
+                             absteigend=sort_order == 'desc')
+    else:
+        seite = keyset_seite(c, select, treffer_params, query, params, 'p.created_at', absteigend=True)
+
+    # Statistiken
+    zaehler = statistik(c)
+    gesamt_protokolle = zaehler['protokolle']
+    aktive_autoren = zaehler['autoren']
+    bundeslaender_mit_protokollen = zaehler['bundeslaender']
+
+    # Prüfer und Benutzer für Filter
+    c.execute('SELECT DISTINCT name FROM pruefer ORDER BY name')
+    alle_pruefer_namen = [row[0] for row in c.fetchall()]
+
+    c.execute('SELECT DISTINCT name FROM users WHERE is_approved = TRUE ORDER BY name')
+    alle_benutzer_namen = [row[0] for row in c.fetchall()]
+
+    return render_template('admin/protokolle.html',
+                           protokolle=seite['eintraege'],
+                           seite=seite,
+                           bundeslaender=BUNDESLAENDER,
+                           alle_pruefer_namen=alle_pruefer_namen,
+                           alle_benutzer_namen=alle_benutzer_namen,
+                           predefined_hashtags=hashtag_katalog(c),
+                           bundesland_filter=bundesland_filter,
+                           pruefer_filter=pruefer_filter,
+                           hashtag_filter=hashtag_filter,
+                           hashtag_modus=hashtag_modus,
+                           user_filter=user_filter,
+                           datum_von=datum_von,
+                           datum_bis=datum_bis,
+                           suchbegriff=suchbegriff,
+                           sort_by=sort_by,
+                           sort_order=sort_order,
+                           gesamt_protokolle=gesamt_protokolle,
+                           aktive_autoren=aktive_autoren,
+                           bundeslaender_mit_protokollen=bundeslaender_mit_protokollen,
+                           export_filter={k: v for k, v in request.args.items()
+                                          if k in ADMIN_PROTOKOLL_FILTER and v})
+
+
+ADMIN_EXPORT_SPALTEN = ('id', 'datum', 'bundesland', 'pruefer1', 'pruefer2', 'pruefer3', 'hashtags',
+                        'inhalt', 'kommentar', 'autor', 'autor_id', 'erstellt_am', 'version')
+ADMIN_EXPORT_FORMATE = {
+    'csv': ('text/csv', 'csv', False),
+    'csv.gz': ('application/gzip', 'csv.gz', True),
+    'ndjson': ('application/x-ndjson', 'ndjson', False),
+}
+
+
+def admin_export_bloecke(datenbank, from_where, params):
+    """Protokolle blockweise per Keyset auf p.id lesen
+
+    Jeder Block ist eine eigene kurze Abfrage. Zwischen den Blöcken, während
+    der Client die Daten abholt, bleibt keine Lesetransaktion offen, die
+    WAL-Checkpoints aufhalten würde. Der Generator läuft erst nach der Anfrage,
+    daher wird der Datenbank-Pfad übergeben.
+    """
+    conn = db_connect(datenbank)
+    try:
+        c = conn.cursor()
+        letzte_id = 0
+        while True:
+            c.execute(f'''
+                      SELECT p.id, p.datum, p.bundesland, pr1.name, pr2.name, pr3.name, p.hashtags,
+                             p.inhalt, p.kommentar, u.name, u.id, p.created_at, p.version
+                      {from_where} AND p.id > ?
+                      ORDER BY p.id LIMIT ?
+                      ''', list(params) + [letzte_id, EXPORT_BATCH])
+            zeilen = c.fetchall()  # durch LIMIT begrenzt; die Abfrage ist danach abgeschlossen
+            if not zeilen:
+                return
+            yield zeilen
+            letzte_id = zeilen[-1][0]
+    finally:
+        conn.close()
+
+
+def export_als_csv(bloecke):
+    puffer = io.StringIO()
+    writer = csv.writer(puffer)
+    writer.writerow(ADMIN_EXPORT_SPALTEN)
+    for zeilen in bloecke:
+        writer.writerows(zeilen)
+        yield puffer.getvalue()
+        puffer.seek(0)
+        puffer.truncate()
+    yield puffer.getvalue()
+
+
+def export_zeilenweise(bloecke):
+    for zeilen in bloecke:
+        yield ''.join(json.dumps(dict(zip(ADMIN_EXPORT_SPALTEN, zeile)), ensure_ascii=False) + '\n'
+                      for zeile in zeilen)
+
+
+@admin_bp.route('/admin/protokolle/export')
+@admin_required
+def admin_protokolle_export():
+    """Alle Protokolle (mit den Filtern der Admin-Liste) als CSV, CSV.gz oder NDJSON streamen"""
+    format_ = request.args.get('format', 'csv')
+    if format_ not in ADMIN_EXPORT_FORMATE:
+        format_ = 'csv'
+    mimetype, endung, komprimieren = ADMIN_EXPORT_FORMATE[format_]
+
+    suche = fts_ausdruck(request.args.get('q', '').strip())
+    _, fts_join, _ = fts_abfrageteile(suche)
+    from_where, params = admin_protokoll_filter(suche, fts_join)
+
+    # Export protokollieren (enthält personenbezogene Daten)
+    filter_text = urlencode([(k, v) for k, v in request.args.items() if k in ADMIN_PROTOKOLL_FILTER and v])
+    conn = get_db()
+    conn.execute('''
+                 INSERT INTO admin_logs (admin_user_id, action_type, target_type, target_id, description, admin_notiz)
+                 VALUES (?, ?, ?, ?, ?, ?)
+                 ''', (session['user_id'], 'export', 'protokoll', 0,
+                       f"Protokolle exportiert ({format_})", filter_text or None))
+    conn.commit()
+
+    bloecke = admin_export_bloecke(current_app.config['DATABASE'], from_where, params)
+    teile = export_zeilenweise(bloecke) if format_ == 'ndjson' else export_als_csv(bloecke)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    response = current_app.response_class(export_puffern(teile, komprimieren), status=200, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=protokolle_export_{timestamp}.{endung}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+IMPORT_BATCH = 1000  # Zeilen pro Transaktion
+IMPORT_MAX_FEHLER = 200  # so viele Fehlerzeilen werden im Ergebnis aufgeführt
+IMPORT_SPALTEN = ('datum', 'bundesland', 'pruefer1', 'pruefer2', 'pruefer3', 'inhalt', 'hashtags', 'kommentar')
+
+
+class ImportLesefehler(ValueError):
+    """Die Datei ist ab einer Zeile nicht lesbar (Kodierung, CSV-Syntax, gzip); der Import endet dort"""
+
+
+def import_datensaetze(datei, format_):
+    """(Zeilennummer, Dict) aus einer CSV- oder NDJSON-Textdatei lesen
+
+    Lesefehler mitten in der Datei werden als letzter Eintrag (ImportLesefehler)
+    geliefert statt ausgelöst: bis dahin geschriebene Blöcke bleiben im Ergebnis.
+    """
+    zeile = 0
+    try:
+        for zeile, datensatz in _import_zeilen(datei, format_):
+            yield zeile, datensatz
+    except (UnicodeDecodeError, OSError, EOFError, csv.Error) as e:
+        yield zeile + 1, ImportLesefehler(f'Datei ab hier nicht lesbar, Import abgebrochen: {e}')
+
+
+def _import_zeilen(datei, format_):
+    if format_ == 'ndjson':
+        for nummer, zeile in enumerate(datei, start=1):
+            if not zeile.strip():
+                continue
+            try:
+                datensatz = json.loads(zeile)
+            except ValueError as e:
+                yield nummer, ValueError(f'Ungültiges JSON: {e}')
+                continue
+            yield nummer, datensatz if isinstance(datensatz, dict) else ValueError('Kein JSON-Objekt')
+        return
+
+    # Tabellenkalkulationen exportieren CSV oft mit Semikolon
+    kopf = datei.readline()
+    trennzeichen = ';' if kopf.count(';') > kopf.count(',') else ','
+    spalten = [spalte.strip().lower() for spalte in next(csv.reader([kopf], delimiter=trennzeichen))]
+    reader = csv.reader(datei, delimiter=trennzeichen)
+    for zeile in reader:
+        if any(feld.strip() for feld in zeile):
+            # Zeile 1 ist der Kopf
+            yield reader.line_num + 1, dict(zip(spalten, zeile))
+
+
+class ProtokollImport:
+    """Protokolle blockweise importieren
+
+    Prüfer werden über eine Map (Bundesland, Name) -> ID aufgelöst, die einmal
+    geladen wird. Jeder Block aus IMPORT_BATCH Zeilen wird erst ohne Sperre
+    geprüft und dann in einer Transaktion eingefügt (im Trockenlauf gar nicht);
+    FTS-Index, Vorschauen und Zähler pflegen die Trigger, die Hashtag-Zuordnung
+    wird je Block gesammelt geschrieben.
+    """
+
+    def __init__(self, conn, user_id, pruefer_anlegen=False, trockenlauf=False):
+        self.conn = conn
+        self.user_id = user_id
+        self.pruefer_anlegen = pruefer_anlegen
+        self.trockenlauf = trockenlauf
+        self.gelesen = 0
+        self.importiert = 0
+        self.fehler = []
+        self.fehler_anzahl = 0
+        self.neue_pruefer = []
+        self.abgebrochen = None
+
+        c = conn.cursor()
+        c.execute('SELECT id, name, bundesland FROM pruefer')
+        self.pruefer = {(bundesland, name.strip().casefold()): pruefer_id
+                        for pruefer_id, name, bundesland in c.fetchall()}
+
+    def fehler_melden(self, zeile, meldung):
+        self.fehler_anzahl += 1
+        if len(self.fehler) < IMPORT_MAX_FEHLER:
+            self.fehler.append((zeile, meldung))
+
+    def pruefer_aufloesen(self, bundesland, name):
+        """ID des Prüfers; ein neu anzulegender steht bis zum Schreiben als (Name, Bundesland) da"""
+        schluessel = (bundesland, name.strip().casefold())
+        pruefer_id = self.pruefer.get(schluessel)
+        if pruefer_id is None and self.pruefer_anlegen:
+            pruefer_id = (name.strip(), bundesland)
+            self.neue_pruefer.append(pruefer_id)
+            self.pruefer[schluessel] = pruefer_id
+        return pruefer_id
+
+    def pruefen(self, zeile, datensatz):
+        """Datensatz validieren; liefert die Werte für das INSERT oder None"""
+        if isinstance(datensatz, Exception):
+            self.fehler_melden(zeile, str(datensatz))
+            return None
+        werte = {spalte: str(datensatz.get(spalte) or '').strip() for spalte in IMPORT_SPALTEN}
+
+        fehlend = [spalte for spalte in IMPORT_SPALTEN[:6] if not werte[spalte]]
+        if fehlend:
+            self.fehler_melden(zeile, 'Pflichtfelder fehlen: ' + ', '.join(fehlend))
+            return None
+        try:
+            werte['datum'] = datetime.strptime(werte['datum'][:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            self.fehler_melden(zeile, f"Ungültiges Datum: {werte['datum']}")
+            return None
+        if werte['bundesland'] not in BUNDESLAENDER:
+            self.fehler_melden(zeile, f"Unbekanntes Bundesland: {werte['bundesland']}")
+            return None
+
+        pruefer_ids = []
+        for spalte in ('pruefer1', 'pruefer2', 'pruefer3'):
+            pruefer_id = self.pruefer_aufloesen(werte['bundesland'], werte[spalte])
+            if pruefer_id is None:
+                self.fehler_melden(zeile, f"Prüfer nicht gefunden: {werte[spalte]} ({werte['bundesland']})")
+                return None
+            pruefer_ids.append(pruefer_id)
+
+        return (werte['datum'], werte['bundesland'], *pruefer_ids, werte['inhalt'],
+                hashtags_normalisieren(werte['hashtags']), werte['kommentar'])
+
+    def block_schreiben(self, block):
+        """Block prüfen und die gültigen Zeilen in einer Transaktion einfügen"""
+        conn = self.conn
+        c = conn.cursor()
+        zeilen = [zeile for zeile, _ in block]
+        neue_pruefer_vorher = len(self.neue_pruefer)
+
+        # Prüfen braucht nur die Map im Speicher; die Schreibsperre gibt es erst für die INSERTs
+        gueltig = []
+        for zeile, datensatz in block:
+            werte = self.pruefen(zeile, datensatz)
+            if werte is not None:
+                gueltig.append(werte)
+        if self.trockenlauf or not gueltig:
+            self.importiert += len(gueltig)
+            return
+
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+
+            # Neue Prüfer dieses Blocks anlegen (oder übernehmen, falls inzwischen vorhanden)
+            angelegt = {}
+            for name, bundesland in self.neue_pruefer[neue_pruefer_vorher:]:
+                c.execute('''
+                          INSERT INTO pruefer (name, bundesland) VALUES (?, ?)
+                          ON CONFLICT (bundesland, name) DO NOTHING
+                          ''', (name, bundesland))
+                c.execute('SELECT id FROM pruefer WHERE bundesland = ? AND name = ?', (bundesland, name))
+                angelegt[(name, bundesland)] = c.fetchone()[0]
+            if angelegt:
+                gueltig = [(datum, bundesland, *(angelegt.get(p, p) for p in (p1, p2, p3)), inhalt, hashtags, kommentar)
+                           for datum, bundesland, p1, p2, p3, inhalt, hashtags, kommentar in gueltig]
+
+            # Hashtags des ganzen Blocks auf einmal im Katalog auflösen
+            namen = {name.casefold(): name for *_, hashtags, _ in gueltig for name in hashtags}
+            c.executemany('INSERT OR IGNORE INTO hashtags (name) VALUES (?)', [(name,) for name in namen.values()])
+            katalog = {}
+            for start in range(0, len(namen), 500):
+                teil = list(namen.values())[start:start + 500]
+                c.execute(f"SELECT id, name FROM hashtags WHERE name IN ({','.join('?' * len(teil))})", teil)
+                katalog.update({name.casefold(): (hashtag_id, name) for hashtag_id, name in c.fetchall()})
+
+            # Tatsächliche IDs per RETURNING, die Hashtag-Zuordnung folgt gesammelt
+            zuordnungen = []
+            for datum, bundesland, p1, p2, p3, inhalt, hashtags, kommentar in gueltig:
+                c.execute('''
+                          INSERT INTO protokolle (user_id, datum, bundesland, pruefer1_id, pruefer2_id,
+                                                  pruefer3_id, inhalt, hashtags, kommentar)
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                          RETURNING id
+                          ''', (self.user_id, datum, bundesland, p1, p2, p3, inhalt,
+                                ' '.join(katalog[name.casefold()][1] for name in hashtags), kommentar))
+                protokoll_id = c.fetchone()[0]
+                zuordnungen.extend((protokoll_id, katalog[name.casefold()][0]) for name in hashtags)
+            c.executemany('INSERT OR IGNORE INTO protokoll_hashtags (protokoll_id, hashtag_id) VALUES (?, ?)',
+                          zuordnungen)
+            conn.commit()
+            self.importiert += len(gueltig)
+            for (name, bundesland), pruefer_id in angelegt.items():
+                self.pruefer[(bundesland, name.casefold())] = pruefer_id
+        except sqlite3.Error as e:
+            conn.rollback()
+            # In diesem Block angelegte Prüfer gibt es nach dem Rollback nicht mehr
+            for name, bundesland in self.neue_pruefer[neue_pruefer_vorher:]:
+                self.pruefer.pop((bundesland, name.casefold()), None)
+            del self.neue_pruefer[neue_pruefer_vorher:]
+            print(f"Import-Fehler in Zeilen {zeilen[0]}-{zeilen[-1]}: {e}")
+            self.fehler_melden(zeilen[0], f'Block bis Zeile {zeilen[-1]} nicht importiert: {e}')
+
+    def ausfuehren(self, datensaetze):
+        start = time.perf_counter()
+        block = []
+        for zeile, datensatz in datensaetze:
+            if isinstance(datensatz, ImportLesefehler):
+                self.abgebrochen = (zeile, str(datensatz))
+                self.fehler_melden(zeile, str(datensatz))
+                break
+            self.gelesen += 1
+            block.append((zeile, datensatz))
+            if len(block) >= IMPORT_BATCH:
+                self.block_schreiben(block)
+                block = []
+        if block:
+            self.block_schreiben(block)
+
+        if self.neue_pruefer and not self.trockenlauf:
+            pruefer_katalog_invalidieren()
+
+        dauer = time.perf_counter() - start
+        return {
+            'gelesen': self.gelesen,
+            'importiert': self.importiert,
+            'fehler': self.fehler,
+            'fehler_anzahl': self.fehler_anzahl,
+            'neue_pruefer': self.neue_pruefer,
+            'abgebrochen': self.abgebrochen,
+            'trockenlauf': self.trockenlauf,
+            'dauer': dauer,
+            'zeilen_pro_sekunde': self.gelesen / dauer if dauer else 0,
+        }
+
+
+def import_datei_oeffnen(pfad_oder_datei, name):
+    """Textstrom und Format (csv/ndjson) anhand des Dateinamens; .gz wird entpackt"""
+    if name.endswith('.gz'):
+        pfad_oder_datei = gzip.open(pfad_oder_datei, 'rb')
+        name = name[:-3]
+    elif isinstance(pfad_oder_datei, str):
+        pfad_oder_datei = open(pfad_oder_datei, 'rb')
+    format_ = 'ndjson' if name.endswith(('.ndjson', '.jsonl')) else 'csv'
+    return io.TextIOWrapper(pfad_oder_datei, encoding='utf-8-sig', newline=''), format_
+
+
+@befehle.command('protokolle-importieren')
+@click.argument('datei')
+@click.option('--autor', required=True, help='E-Mail des Benutzers, dem die Protokolle zugeordnet werden')
+@click.option('--pruefer-anlegen', is_flag=True, help='Unbekannte Prüfer im jeweiligen Bundesland anlegen')
+@click.option('--trockenlauf', is_flag=True, help='Nur prüfen, nichts schreiben')
+def protokolle_importieren(datei, autor, pruefer_anlegen, trockenlauf):
+    """Protokolle aus CSV, NDJSON (auch .gz) importieren"""
+    conn = db_connect()
+    try:
+        row = conn.execute('SELECT id FROM users WHERE email = ?', (autor,)).fetchone()
+        if not row:
+            raise click.ClickException(f'Benutzer {autor} nicht gefunden')
+        text, format_ = import_datei_oeffnen(datei, datei)
+        with text:
+            ergebnis = ProtokollImport(conn, row[0], pruefer_anlegen, trockenlauf).ausfuehren(
+                import_datensaetze(text, format_))
+    finally:
+        conn.close()
+
+    for zeile, meldung in ergebnis['fehler']:
+        print(f"Zeile {zeile}: {meldung}")
+    for name, bundesland in ergebnis['neue_pruefer']:
+        print(f"Neuer Prüfer: {name} ({bundesland})")
+    print(f"{ergebnis['importiert']} von {ergebnis['gelesen']} Zeilen "
+          f"{'gültig (Trockenlauf)' if trockenlauf else 'importiert'}, {ergebnis['fehler_anzahl']} fehlerhaft, "
+          f"{ergebnis['zeilen_pro_sekunde']:.0f} Zeilen/s")
+    if ergebnis['abgebrochen']:
+        zeile, meldung = ergebnis['abgebrochen']
+        raise click.ClickException(f'Zeile {zeile}: {meldung}')
+
+
+@admin_bp.route('/admin/protokolle/import', methods=['GET', 'POST'])
+@admin_required
+def admin_protokolle_import():
+    """Protokolle aus einer hochgeladenen CSV- oder NDJSON-Datei importieren"""
+    ergebnis = None
+    if request.method == 'POST':
+        datei = request.files.get('datei')
+        if not datei or not datei.filename:
+            flash('Bitte eine Datei auswählen.', 'error')
+            return redirect(url_for('admin.admin_protokolle_import'))
+
+        trockenlauf = bool(request.form.get('trockenlauf'))
+        conn = get_db()
+        # Lesefehler beenden den Import mit Ergebnis (abgebrochen); bereits
+        # geschriebene Blöcke werden so immer protokolliert
+        text, format_ = import_datei_oeffnen(datei.stream, datei.filename.lower())
+        ergebnis = ProtokollImport(conn, session['user_id'], bool(request.form.get('pruefer_anlegen')),
+                                   trockenlauf).ausfuehren(import_datensaetze(text, format_))
+        if ergebnis['abgebrochen']:
+            flash(f"Datei konnte ab Zeile {ergebnis['abgebrochen'][0]} nicht gelesen werden, "
+                  f"der Import wurde dort abgebrochen.", 'error')
+
+        if not trockenlauf and ergebnis['importiert']:
+            beschreibung = f"{ergebnis['importiert']} Protokolle aus {datei.filename} importiert"
+            if ergebnis['abgebrochen']:
+                beschreibung += f" (abgebrochen ab Zeile {ergebnis['abgebrochen'][0]})"
+            conn.execute('''
+                         INSERT INTO admin_logs (admin_user_id, action_type, target_type, target_id, description)
+                         VALUES (?, ?, ?, ?, ?)
+                         ''', (session['user_id'], 'import', 'protokoll', 0, beschreibung))
+            conn.commit()
+
+    return render_template('admin/protokolle_import.html', ergebnis=ergebnis, spalten=IMPORT_SPALTEN)
+
+
+@admin_bp.route('/admin/logs')
+@admin_required
+def admin_logs():
+    """Admin-Aktivitätslogs anzeigen"""
+    page = request.args.get('page', 1, type=int)
+    per_page = 50
+
+    conn = get_db()
+    c = conn.cursor()
+
+    # Logs mit Admin-Namen abrufen
+    c.execute('''
+              SELECT l.id,
+                     l.action_type,
+                     l.target_type,
+                     l.target_id,
+                     l.description,
+                     l.admin_notiz,
+                     l.created_at,
+                     u.name as admin_name
+              FROM admin_logs l
+                       JOIN users u ON l.admin_user_id = u.id
+              ORDER BY l.created_at DESC LIMIT ?
+              OFFSET ?
+              ''', (per_page, (page - 1) * per_page))
+
+    logs = c.fetchall()
+
+    # Gesamt-Anzahl für Pagination
+    c.execute('SELECT COUNT(*) FROM admin_logs')
+    total_logs = c.fetchone()[0]
+
+    return render_template('admin/logs.html',
+                           logs=logs,
+                           page=page,
+                           per_page=per_page,
+                           total_logs=total_logs)
+
+
+# Admin-Bereich
+@admin_bp.route('/admin')
+@admin_required
+def admin_dashboard():
+    """Erweitertes Admin-Dashboard"""
+    conn = get_db()
+    c = conn.cursor()
+
+    # Nicht freigeschaltete Benutzer (wie bisher)
+    c.execute('''
+        SELECT id, name, email, ausbildungsjahr, created_at 
+        FROM users 
+        WHERE is_verified = TRUE AND is_approved = FALSE
+        ORDER BY created_at DESC
+        LIMIT 5
+    ''')
+    pending_users = c.fetchall()
+
+    # Statistiken
+    zaehler = statistik(c)
+    aktive_benutzer = zaehler['users_freigeschaltet']
+    gesamt_protokolle = zaehler['protokolle']
+    gesamt_pruefer = zaehler['pruefer']
+    admin_count = zaehler['users_admin']
+
+    # Neueste Aktivitäten
+    c.execute('''
+        SELECT 'protokoll' as typ, u.name, p.datum, p.created_at
+        FROM protokolle p
+        JOIN users u ON p.user_id = u.id
+        ORDER BY p.created_at DESC
+        LIMIT 5
+    ''')
+    neueste_aktivitaeten = c.fetchall()
+
+    return render_template('admin/dashboard.html',
+                         pending_users=pending_users,
+                         aktive_benutzer=aktive_benutzer,
+                         gesamt_protokolle=gesamt_protokolle,
+                         gesamt_pruefer=gesamt_pruefer,
+                         admin_count=admin_count,
+                         neueste_aktivitaeten=neueste_aktivitaeten)
+
+@admin_bp.route('/admin/user/<int:user_id>/approve')
+@admin_required
+def approve_user(user_id):
+    """Benutzer freischalten"""
+    conn = get_db()
+    c = conn.cursor()
+
+    c.execute('SELECT name, email FROM users WHERE id = ?', (user_id,))
+    user = c.fetchone()
+
+    if user:
+        c.execute('UPDATE users SET is_approved = TRUE WHERE id = ?', (user_id,))
+        conn.commit()
+        berechtigungen_invalidieren()
+
+        # Willkommens-E-Mail senden
+        subject = "Account freigeschaltet - Urologie Facharztprüfung"
+        body = f"""
+        <html>
+        <body>
+            <h2>Account freigeschaltet!</h2>
+            <p>Hallo {user[0]},</p>
+            <p>Ihr Account wurde erfolgreich freigeschaltet. Sie können sich jetzt anmelden und die Plattform nutzen.</p>
+            <p><a href="{url_for('auth.login', _external=True)}" style="background-color: #007AFF; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Jetzt anmelden</a></p>
+            <p>Viel Erfolg bei der Prüfungsvorbereitung!</p>
+        </body>
+        </html>
+        """
+
+        send_email(user[1], subject, body)
+        flash(f'Benutzer {user[0]} wurde freigeschaltet.', 'success')
+    else:
+        flash('Benutzer nicht gefunden.', 'error')
+
+    return redirect(url_for('admin.admin_dashboard'))
+
+
+@admin_bp.route('/admin/pruefer')
+@admin_required
+def admin_pruefer():
+    """Prüfer-Verwaltung"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('SELECT id, name, bundesland FROM pruefer ORDER BY bundesland, name')
+    alle_pruefer = c.fetchall()
+
+    return render_template('admin/pruefer.html',
+                           pruefer=alle_pruefer,
+                           bundeslaender=BUNDESLAENDER)
+
+
+@admin_bp.route('/admin/pruefer/neu', methods=['POST'])
+@admin_required
+def neuer_pruefer():
+    """Neuen Prüfer hinzufügen"""
+    name = (request.form.get('name') or '').strip()
+    bundesland = request.form.get('bundesland')
+
+    if not name or not bundesland:
+        flash('Name und Bundesland sind erforderlich.', 'error')
+        return redirect(url_for('admin.admin_pruefer'))
+
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('INSERT INTO pruefer (name, bundesland) VALUES (?, ?) ON CONFLICT (bundesland, name) DO NOTHING',
+              (name, bundesland))
+    conn.commit()
+
+    if c.rowcount == 0:
+        flash(f'Prüfer {name} ist in {bundesland} bereits vorhanden.', 'info')
+    else:
+        pruefer_katalog_invalidieren()
+        flash(f'Prüfer {name} wurde hinzugefügt.', 'success')
+    return redirect(url_for('admin.admin_pruefer'))
+
+
+@admin_bp.route('/admin/pruefer/<int:pruefer_id>/delete')
+@admin_required
+def delete_pruefer(pruefer_id):
+    """Prüfer löschen"""
+    conn = get_db()
+    c = conn.cursor()
+
+    # Prüfen ob Prüfer in Protokollen verwendet wird
+    c.execute('''
+              SELECT COUNT(*)
+              FROM protokolle
+              WHERE pruefer1_id = ?
+                 OR pruefer2_id = ?
+                 OR pruefer3_id = ?
+              ''', (pruefer_id, pruefer_id, pruefer_id))
+
+    if c.fetchone()[0] > 0:
+        flash('Prüfer kann nicht gelöscht werden, da er in Protokollen verwendet wird.', 'error')
+    else:
+        c.execute('DELETE FROM pruefer WHERE id = ?', (pruefer_id,))
+        conn.commit()
+        pruefer_katalog_invalidieren()
+        flash('Prüfer wurde gelöscht.', 'success')
+
+    return redirect(url_for('admin.admin_pruefer'))
+
+
+def pruefer_abgleichen(conn, datensaetze, bundesland_vorgabe=None, loeschen=True, trockenlauf=False):
+    """Prüferliste mit der Tabelle pruefer abgleichen (eine Transaktion)
+
+    Spalten: name, bundesland, optional id oder alter_name für Umbenennungen.
+    Abgeglichen werden nur die Bundesländer, die in der Liste vorkommen: Neue
+    Prüfer werden angelegt, umbenannte aktualisiert, fehlende gelöscht, sofern
+    sie in keinem Protokoll vorkommen (sonst stehen sie im Bericht unter 'behalten').
+    """
+    bericht = {'neu': [], 'umbenannt': [], 'geloescht': [], 'behalten': [], 'unveraendert': 0,
+               'fehler': [], 'trockenlauf': trockenlauf}
+
+    # Liste prüfen
+    liste = []
+    gesehen = set()
+    for zeile, datensatz in datensaetze:
+        if isinstance(datensatz, Exception):
+            bericht['fehler'].append((zeile, str(datensatz)))
+            continue
+        name = str(datensatz.get('name') or '').strip()
+        bundesland = str(datensatz.get('bundesland') or bundesland_vorgabe or '').strip()
+        if not name:
+            bericht['fehler'].append((zeile, 'Name fehlt'))
+        elif bundesland not in BUNDESLAENDER:
+            bericht['fehler'].append((zeile, f'Unbekanntes Bundesland: {bundesland}'))
+        elif (bundesland, name) in gesehen:
+            bericht['fehler'].append((zeile, f'Doppelt in der Liste: {name} ({bundesland})'))
+        else:
+            gesehen.add((bundesland, name))
+            liste.append((zeile, name, bundesland, str(datensatz.get('id') or '').strip(),
+                          str(datensatz.get('alter_name') or '').strip()))
+    if not liste:
+        return bericht
+
+    c = conn.cursor()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        bundeslaender = sorted({bundesland for _, _, bundesland, _, _ in liste})
+        c.execute(f"SELECT id, name, bundesland FROM pruefer WHERE bundesland IN ({','.join('?' * len(bundeslaender))})",
+                  bundeslaender)
+        nach_id = {pruefer_id: (name, bundesland) for pruefer_id, name, bundesland in c.fetchall()}
+        nach_name = {(bundesland, name): pruefer_id for pruefer_id, (name, bundesland) in nach_id.items()}
+
+        behalten = set()
+        neue = []
+        for zeile, name, bundesland, alte_id, alter_name in liste:
+            pruefer_id = nach_name.get((bundesland, name))
+            if pruefer_id is not None:
+                behalten.add(pruefer_id)
+                bericht['unveraendert'] += 1
+                continue
+
+            # Umbenennung über die ID oder den bisherigen Namen
+            if alte_id.isdigit() and nach_id.get(int(alte_id), ('', ''))[1] == bundesland:
+                pruefer_id = int(alte_id)
+            else:
+                pruefer_id = nach_name.get((bundesland, alter_name))
+            if pruefer_id is None or pruefer_id in behalten:
+                neue.append((name, bundesland))
+                continue
+
+            try:
+                c.execute('UPDATE pruefer SET name = ? WHERE id = ?', (name, pruefer_id))
+            except sqlite3.IntegrityError:
+                bericht['fehler'].append((zeile, f'Umbenennung nicht möglich, {name} existiert bereits'))
+                continue
+            # Gecachte Listenfragmente der betroffenen Protokolle neu rendern lassen
+            c.execute('''
+                      UPDATE protokolle
+                      SET version = version + 1
+                      WHERE pruefer1_id = ?
+                         OR pruefer2_id = ?
+                         OR pruefer3_id = ?
+                      ''', (pruefer_id, pruefer_id, pruefer_id))
+            behalten.add(pruefer_id)
+            bericht['umbenannt'].append((nach_id[pruefer_id][0], name, bundesland))
+
+        c.executemany('INSERT INTO pruefer (name, bundesland) VALUES (?, ?) ON CONFLICT (bundesland, name) DO NOTHING',
+                      neue)
+        bericht['neu'] = neue
+
+        if loeschen:
+            fehlend = [pruefer_id for pruefer_id in nach_id if pruefer_id not in behalten]
+            verwendet = {}
+            for start in range(0, len(fehlend), 300):
+                teil = fehlend[start:start + 300]
+                platzhalter = ','.join('?' * len(teil))
+                c.execute(f'''
+                          SELECT pruefer_id, COUNT(*)
+                          FROM (SELECT pruefer1_id AS pruefer_id, id FROM protokolle WHERE pruefer1_id IN ({platzhalter})
+                                UNION
+                                SELECT pruefer2_id, id FROM protokolle WHERE pruefer2_id IN ({platzhalter})
+                                UNION
+                                SELECT pruefer3_id, id FROM protokolle WHERE pruefer3_id IN ({platzhalter}))
+                          GROUP BY pruefer_id
+                          ''', teil * 3)
+                verwendet.update(c.fetchall())
+            for pruefer_id in fehlend:
+                name, bundesland = nach_id[pruefer_id]
+                if pruefer_id in verwendet:
+                    bericht['behalten'].append((name, bundesland, verwendet[pruefer_id]))
+                else:
+                    bericht['geloescht'].append((name, bundesland))
+            c.executemany('DELETE FROM pruefer WHERE id = ?',
+                          [(pruefer_id,) for pruefer_id in fehlend if pruefer_id not in verwendet])
+
+        if trockenlauf:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    if not trockenlauf and (bericht['neu'] or bericht['umbenannt'] or bericht['geloescht']):
+        pruefer_katalog_invalidieren()
+    return bericht
+
+
+@befehle.command('pruefer-abgleichen')
+@click.argument('datei')
+@click.option('--bundesland', help='Bundesland für Zeilen ohne Spalte bundesland')
+@click.option('--ohne-loeschen', is_flag=True, help='Fehlende Prüfer nicht löschen')
+@click.option('--trockenlauf', is_flag=True, help='Nur anzeigen, was sich ändern würde')
+def pruefer_abgleichen_befehl(datei, bundesland, ohne_loeschen, trockenlauf):
+    """Prüferliste (CSV oder NDJSON) mit der Datenbank abgleichen"""
+    conn = db_connect()
+    try:
+        text, format_ = import_datei_oeffnen(datei, datei)
+        with text:
+            bericht = pruefer_abgleichen(conn, import_datensaetze(text, format_), bundesland,
+                                         not ohne_loeschen, trockenlauf)
+    finally:
+        conn.close()
+
+    for zeile, meldung in bericht['fehler']:
+        print(f"Zeile {zeile}: {meldung}")
+    for name, bundesland in bericht['neu']:
+        print(f"+ {name} ({bundesland})")
+    for alt, neu, bundesland in bericht['umbenannt']:
+        print(f"~ {alt} -> {neu} ({bundesland})")
+    for name, bundesland in bericht['geloescht']:
+        print(f"- {name} ({bundesland})")
+    for name, bundesland, anzahl in bericht['behalten']:
+        print(f"! {name} ({bundesland}) nicht gelöscht, in {anzahl} Protokollen verwendet")
+    print(f"{len(bericht['neu'])} neu, {len(bericht['umbenannt'])} umbenannt, {len(bericht['geloescht'])} gelöscht, "
+          f"{len(bericht['behalten'])} behalten, {bericht['unveraendert']} unverändert"
+          f"{' (Trockenlauf)' if trockenlauf else ''}")
+
+
+@admin_bp.route('/admin/pruefer/abgleich', methods=['POST'])
+@admin_required
+def admin_pruefer_abgleich():
+    """Prüferliste hochladen und abgleichen"""
+    datei = request.files.get('datei')
+    if not datei or not datei.filename:
+        flash('Bitte eine Datei auswählen.', 'error')
+        return redirect(url_for('admin.admin_pruefer'))
+
+    trockenlauf = bool(request.form.get('trockenlauf'))
+    conn = get_db()
+    try:
+        text, format_ = import_datei_oeffnen(datei.stream, datei.filename.lower())
+        bericht = pruefer_abgleichen(conn, import_datensaetze(text, format_), request.form.get('bundesland') or None,
+                                     not request.form.get('ohne_loeschen'), trockenlauf)
+    except (UnicodeDecodeError, OSError, csv.Error) as e:
+        flash(f'Datei konnte nicht gelesen werden: {e}', 'error')
+        return redirect(url_for('admin.admin_pruefer'))
+
+    if not trockenlauf:
+        conn.execute('''
+                     INSERT INTO admin_logs (admin_user_id, action_type, target_type, target_id, description)
+                     VALUES (?, ?, ?, ?, ?)
+                     ''', (session['user_id'], 'sync', 'pruefer', 0,
+                           f"Prüferabgleich {datei.filename}: {len(bericht['neu'])} neu, "
+                           f"{len(bericht['umbenannt'])} umbenannt, {len(bericht['geloescht'])} gelöscht"))
+        conn.commit()
+
+    c = conn.cursor()
+    c.execute('SELECT id, name, bundesland FROM pruefer ORDER BY bundesland, name')
+    return render_template('admin/pruefer.html',
+                           pruefer=c.fetchall(),
+                           bundeslaender=BUNDESLAENDER,
+                           bericht=bericht)
+
+
+@admin_bp.route('/admin/pruefer/export')
+@admin_required
+def admin_pruefer_export():
+    """Prüferliste als CSV (mit ID, für Umbenennungen im Abgleich)"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('SELECT id, name, bundesland FROM pruefer ORDER BY bundesland, name')
+    puffer = io.StringIO()
+    writer = csv.writer(puffer)
+    writer.writerow(('id', 'name', 'bundesland'))
+    writer.writerows(c.fetchall())
+
+    response = current_app.response_class(puffer.getvalue(), status=200, mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=pruefer.csv'
+    return response
+
+
+@admin_bp.route('/admin/hashtags')
+@admin_required
+def admin_hashtags():
+    """Hashtag-Katalog mit Nutzungszahlen"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('''
+              SELECT h.id, h.name, h.vordefiniert, COUNT(ph.protokoll_id) as anzahl
+              FROM hashtags h
+                       LEFT JOIN protokoll_hashtags ph ON ph.hashtag_id = h.id
+              GROUP BY h.id
+              ORDER BY h.vordefiniert DESC, anzahl DESC, h.name
+              ''')
+    alle_hashtags = c.fetchall()
+
+    return render_template('admin/hashtags.html', hashtags=alle_hashtags)
+
+
+@admin_bp.route('/admin/hashtags/neu', methods=['POST'])
+@admin_required
+def neuer_hashtag():
+    """Hashtag zum Katalog hinzufügen"""
+    namen = hashtags_normalisieren(request.form.get('name', ''))
+
+    if len(namen) != 1:
+        flash('Bitte genau einen Hashtag angeben.', 'error')
+        return redirect(url_for('admin.admin_hashtags'))
+
+    conn = get_db()
+    c = conn.cursor()
+    hashtag_id, name = hashtags_nachschlagen(c, namen)[0]
+    c.execute('UPDATE hashtags SET vordefiniert = TRUE WHERE id = ?', (hashtag_id,))
+    conn.commit()
+
+    flash(f'Hashtag {name} ist jetzt im Katalog.', 'success')
+    return redirect(url_for('admin.admin_hashtags'))
+
+
+@admin_bp.route('/admin/hashtags/<int:hashtag_id>/katalog', methods=['POST'])
+@admin_required
+def hashtag_katalog_umschalten(hashtag_id):
+    """Hashtag in die Vorschlagsliste aufnehmen oder daraus entfernen"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('UPDATE hashtags SET vordefiniert = NOT vordefiniert WHERE id = ?', (hashtag_id,))
+    conn.commit()
+
+    if c.rowcount:
+        flash('Katalog wurde aktualisiert.', 'success')
+    else:
+        flash('Hashtag nicht gefunden.', 'error')
+    return redirect(url_for('admin.admin_hashtags'))
+
+
+@admin_bp.route('/admin/hashtags/<int:hashtag_id>/loeschen', methods=['POST'])
+@admin_required
+def hashtag_loeschen(hashtag_id):
+    """Unbenutzten Hashtag löschen"""
+    conn = get_db()
+    c = conn.cursor()
+
+    c.execute('SELECT COUNT(*) FROM protokoll_hashtags WHERE hashtag_id = ?', (hashtag_id,))
+    if c.fetchone()[0] > 0:
+        flash('Hashtag kann nicht gelöscht werden, da er in Protokollen verwendet wird.', 'error')
+    else:
+        c.execute('DELETE FROM hashtags WHERE id = ?', (hashtag_id,))
+        conn.commit()
+        flash('Hashtag wurde gelöscht.', 'success')
+
+    return redirect(url_for('admin.admin_hashtags'))
+
+
+@admin_bp.route('/admin/email-outbox')
+@admin_required
+def admin_email_outbox():
+    """E-Mail-Warteschlange mit Zustellstatus"""
+    status_filter = request.args.get('status', 'offen')  # offen, wartend, gesendet, fehlgeschlagen, alle
+
+    conn = get_db()
+    c = conn.cursor()
+
+    c.execute('SELECT status, COUNT(*) FROM email_outbox GROUP BY status')
+    anzahl = {'wartend': 0, 'gesendet': 0, 'fehlgeschlagen': 0}
+    anzahl.update(c.fetchall())
+
+    query = '''
+            SELECT id, empfaenger, betreff, status, versuche, naechster_versuch,
+                   letzter_fehler, created_at, gesendet_at
+            FROM email_outbox
+            '''
+    params = []
+    if status_filter == 'offen':
+        query += " WHERE status != 'gesendet'"
+    elif status_filter in anzahl:
+        query += ' WHERE status = ?'
+        params.append(status_filter)
+
+    query += ' ORDER BY id DESC LIMIT 100'
+    c.execute(query, params)
+    mails = c.fetchall()
+
+    return render_template('admin/email_outbox.html',
+                           mails=mails,
+                           anzahl=anzahl,
+                           status_filter=status_filter)
+
+
+@admin_bp.route('/admin/email-outbox/<int:mail_id>/erneut', methods=['POST'])
+@admin_required
+def email_erneut_senden(mail_id):
+    """Fehlgeschlagene oder wartende E-Mail sofort erneut zustellen"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('''
+              UPDATE email_outbox
+              SET status = 'wartend', versuche = 0, naechster_versuch = ?
+              WHERE id = ? AND status != 'gesendet'
+              ''', (datetime.now(), mail_id))
+    conn.commit()
+
+    if c.rowcount:
+        email_worker_wecken()
+        flash('E-Mail wird erneut zugestellt.', 'success')
+    else:
+        flash('E-Mail nicht gefunden oder bereits gesendet.', 'error')
+
+    return redirect(url_for('admin.admin_email_outbox', status=request.args.get('status', 'offen')))
+
+
+@admin_bp.route('/admin/email-outbox/<int:mail_id>/loeschen', methods=['POST'])
+@admin_required
+def email_loeschen(mail_id):
+    """E-Mail aus der Outbox entfernen"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('DELETE FROM email_outbox WHERE id = ?', (mail_id,))
+    conn.commit()
+    flash('E-Mail wurde aus der Warteschlange entfernt.', 'success')
+
+    return redirect(url_for('admin.admin_email_outbox', status=request.args.get('status', 'offen')))
@@ -3,6 +3,9 @@
 """
 Urologische Facharztprüfung Protokoll-Sammlung
 Flask Web Application
+
+Hier liegen Konfiguration, Datenbank, Caches, E-Mail und Hintergrund-Dienste sowie
+create_app(); die Routen stehen in seiten.py, auth.py, protokolle.py, admin.py und profil.py.
 """
 
 import os
@@ -10,33 +13,83 @@ import sqlite3
 import secrets
 from datetime import datetime, timedelta
 from functools import wraps
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import threading
 import time
 import re
-
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory
+import socket
+import queue
+import json
+import base64
+import binascii
+import heapq
+import bisect
+import hashlib
+import gzip
+import zlib
+import mimetypes
+from urllib.parse import urlencode, urlparse
+
+from flask import Flask, request, redirect, url_for, flash, session, send_from_directory, g, has_request_context, \
+    current_app
+from flask.cli import AppGroup
+from flask.sessions import SessionInterface, SecureCookieSession, session_json_serializer
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask_mail import Mail, Message
-import schedule
-
-app = Flask(__name__)
-app.secret_key = secrets.token_hex(32)
-
-# Konfiguration der Mail
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = 'facharztprotokolle@gesru.de'  # Hier Ihre E-Mail eintragen
-app.config['MAIL_PASSWORD'] = 'dsnfqeqetnfgxelw'  # Hier Ihr App-Passwort eintragen
-app.config['MAIL_DEFAULT_SENDER'] = 'facharztprotokolle@gesru.de'
-
-mail = Mail(app)
-
-# Datenbank-Pfad
-DATABASE = 'urologie_pruefung.db'
+from markupsafe import Markup, escape
+import click
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# smtplib und email.mime werden erst im E-Mail-Worker importiert, brotli erst in
+# `flask assets-bauen`: Web-Worker, die nie selbst senden, laden sie gar nicht.
+
+# Standard-Konfiguration; create_app(konfiguration) überschreibt einzelne Werte
+STANDARD_KONFIGURATION = {
+    # Schlüssel für signierte Cookies; ohne SECRET_KEY wird er einmal erzeugt und in
+    # SECRET_KEY_DATEI (Standard: instance/secret_key) abgelegt, gleich für alle Worker
+    'SECRET_KEY': os.environ.get('SECRET_KEY'),
+    'SECRET_KEY_DATEI': os.environ.get('SECRET_KEY_DATEI'),
+
+    # Sitzungen: 'cookie' = signiertes Cookie, 'sqlite' = Tabelle sitzungen (serverseitig widerrufbar)
+    'SITZUNGEN': os.environ.get('SITZUNGEN', 'cookie'),
+    'SESSION_COOKIE_SAMESITE': 'Lax',
+    'SESSION_COOKIE_SECURE': os.environ.get('SESSION_COOKIE_SECURE') == '1',  # hinter HTTPS einschalten
+
+    # Anzahl vorgeschalteter Proxys (nginx), deren X-Forwarded-For/-Proto übernommen werden
+    'PROXY_ANZAHL': int(os.environ.get('PROXY_ANZAHL', 0)),
+
+    # Datenbank-Pfad; db_connect() liest ihn aus der Konfiguration der laufenden App
+    'DATABASE': os.environ.get('DATABASE', 'urologie_pruefung.db'),
+
+    # Konfiguration der Mail
+    'MAIL_SERVER': 'smtp.gmail.com',
+    'MAIL_PORT': 587,
+    'MAIL_USE_TLS': True,
+    'MAIL_USERNAME': 'facharztprotokolle@gesru.de',  # Hier Ihre E-Mail eintragen
+    'MAIL_PASSWORD': 'dsnfqeqetnfgxelw',  # Hier Ihr App-Passwort eintragen
+    'MAIL_DEFAULT_SENDER': 'facharztprotokolle@gesru.de',
+
+    # Wo Erinnerungen und E-Mail-Zustellung laufen: 'web' = in jedem Web-Prozess,
+    # 'extern' = nur in einem eigenen Prozess (flask reminders run)
+    'HINTERGRUND_DIENSTE': os.environ.get('HINTERGRUND_DIENSTE', 'web'),
+
+    # Token, mit dem Prometheus /admin/metrics ohne Admin-Sitzung abrufen darf (Authorization: Bearer ...)
+    'METRIKEN_TOKEN': os.environ.get('METRIKEN_TOKEN'),
+
+    # Basis-URL für Links in E-Mails, die außerhalb einer Anfrage entstehen (Erinnerungen)
+    'BASIS_URL': os.environ.get('BASIS_URL', 'http://localhost:5000'),
+
+    # Verzeichnis für übersetzte Templates (Standard: instance/jinja_cache)
+    'TEMPLATE_CACHE_VERZEICHNIS': os.environ.get('TEMPLATE_CACHE_VERZEICHNIS'),
+
+    # Beim Start PRAGMA user_version prüfen und nur bei veraltetem Schema init_db() ausführen
+    'SCHEMA_PRUEFEN': True,
+}
+
+# CLI-Befehle (flask ...), in create_app() an app.cli angehängt
+befehle = AppGroup('befehle')
 
 # Vordefinierte Hashtags für Urologie
 PREDEFINED_HASHTAGS = [
@@ -44,7 +97,7 @@ PREDEFINED_HASHTAGS = [
     '#Neurourologie', '#Transplantation', '#Endourologie', '#Infektiologie', '#Traumatologie',
     '#rekonstruktive-Urologie', '#Labordiagnostik', '#Bildgebung', '#Notfälle',
     '#Prostata', '#Hoden', '#Niere', '#Blase', '#Urethra', '#Anatomie', '#Physiologie',
-    '#Prostatakarzinom','#Nierenzelkarzinom','#Urothelkarzinom','Hodentumor','#Peniskarzinom'
+    '#Prostatakarzinom','#Nierenzelkarzinom','#Urothelkarzinom','#Hodentumor','#Peniskarzinom'
 ]
 
 # Bundesländer
@@ -55,10 +108,941 @@ BUNDESLAENDER = [
     'Sachsen-Anhalt', 'Schleswig-Holstein', 'Thüringen'
 ]
 
+# Verbindungs-Pool (0 = jede Anfrage öffnet eine eigene Verbindung)
+DB_POOL_SIZE = 8
+
+# Pragmas, die einmal pro Verbindung gesetzt werden
+DB_PRAGMAS = [
+    ('journal_mode', 'WAL'),  # Leser blockieren nicht hinter Schreibern
+    ('synchronous', 'NORMAL'),  # im WAL-Modus ausreichend sicher
+    ('busy_timeout', 5000),  # Millisekunden
+    ('cache_size', -16000),  # negativ = KiB, also ca. 16 MB Page-Cache
+    ('mmap_size', 134217728),  # 128 MB
+]
+
+# Ein Pool je Datenbank-Pfad (im Betrieb genau einer, in Tests einer pro App)
+_db_pools = {}
+_db_pools_lock = threading.Lock()
+
+
+def db_connect(datenbank=None):
+    """Neue Datenbankverbindung mit gesetzten Pragmas öffnen (Standard: DATABASE der App)"""
+    # Verbindungen wandern zwischen den Threads des Servers, werden aber
+    # immer nur von einer Anfrage gleichzeitig benutzt.
+    conn = sqlite3.connect(datenbank or current_app.config['DATABASE'], timeout=5.0, check_same_thread=False,
+                           factory=MessVerbindung)
+    for pragma, value in DB_PRAGMAS:
+        conn.execute(f'PRAGMA {pragma} = {value}')
+    return conn
+
+
+def _db_pool():
+    datenbank = current_app.config['DATABASE']
+    pool = _db_pools.get(datenbank)
+    if pool is None:
+        with _db_pools_lock:
+            pool = _db_pools.setdefault(datenbank, queue.LifoQueue(maxsize=DB_POOL_SIZE))
+    return pool
+
+
+def db_pool_leeren():
+    """Verbindungen in allen Pools schließen (vor einem Fork)"""
+    with _db_pools_lock:
+        pools = list(_db_pools.values())
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def get_db():
+    """Verbindung der aktuellen Anfrage (eine pro Anfrage, aus dem Pool)"""
+    if 'db' not in g:
+        try:
+            g.db = _db_pool().get_nowait()
+        except queue.Empty:
+            g.db = db_connect()
+    return g.db
+
+
+def release_db(exception=None):
+    """Verbindung nach der Anfrage in den Pool zurückgeben"""
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+
+    # Nicht abgeschlossene Transaktionen nicht an die nächste Anfrage vererben
+    if conn.in_transaction:
+        conn.rollback()
+
+    if DB_POOL_SIZE <= 0:
+        conn.close()
+        return
+
+    try:
+        _db_pool().put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+# Metriken für /admin/metrics im Prometheus-Textformat (pro Prozess)
+METRIK_LATENZ_GRENZEN = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Sekunden
+METRIK_GROESSE_GRENZEN = (512, 2048, 8192, 32768, 131072, 524288, 2097152)  # Bytes
+METRIK_VERZOEGERUNG_GRENZEN = (0.01, 0.1, 1, 5, 30, 60, 300, 900)  # Sekunden
+
+
+class Histogramm:
+    """Kumulative Eimer wie bei Prometheus; Zugriff nur unter dem Lock von Metriken"""
+
+    def __init__(self, grenzen):
+        self.grenzen = grenzen
+        self.eimer = [0] * (len(grenzen) + 1)
+        self.summe = 0.0
+        self.anzahl = 0
+
+    def beobachten(self, wert):
+        self.eimer[bisect.bisect_left(self.grenzen, wert)] += 1
+        self.summe += wert
+        self.anzahl += 1
+
+    def zeilen(self, name, labels):
+        kumuliert = 0
+        for grenze, anzahl in zip(self.grenzen + ('+Inf',), self.eimer):
+            kumuliert += anzahl
+            yield f'{name}_bucket{{{labels}le="{grenze}"}} {kumuliert}'
+        yield f'{name}_sum{{{labels.rstrip(",")}}} {self.summe:.6f}'
+        yield f'{name}_count{{{labels.rstrip(",")}}} {self.anzahl}'
+
+
+class Metriken:
+    """Zähler und Histogramme des Prozesses; ein Lock, kurze kritische Abschnitte"""
+
+    ZAEHLER = {
+        'smtp_eingereiht_total': 'In die Outbox eingereihte E-Mails',
+        'smtp_einreihen_fehler_total': 'E-Mails, die nicht eingereiht werden konnten',
+        'smtp_gesendet_total': 'Per SMTP zugestellte E-Mails',
+        'smtp_fehler_total': 'Fehlgeschlagene SMTP-Zustellversuche',
+        'sql_langsam_total': 'Abfragen über LANGSAME_ABFRAGEN_MS',
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start = time.time()
+        self.laufend = 0
+        self.latenz = {}  # endpoint -> Histogramm
+        self.groesse = {}  # endpoint -> Histogramm
+        self.antworten = {}  # (endpoint, status) -> Anzahl
+        self.sql_anweisungen = {}  # endpoint -> Anzahl
+        self.sql_dauer = {}  # endpoint -> Sekunden
+        self.zaehler = dict.fromkeys(self.ZAEHLER, 0)
+        self.erinnerung_verzoegerung = Histogramm(METRIK_VERZOEGERUNG_GRENZEN)
+
+    def anfrage_beginnen(self):
+        with self.lock:
+            self.laufend += 1
+
+    def anfrage_beenden(self, endpoint, status, dauer, groesse, sql_anweisungen, sql_dauer):
+        with self.lock:
+            self.laufend -= 1
+            if endpoint not in self.latenz:
+                self.latenz[endpoint] = Histogramm(METRIK_LATENZ_GRENZEN)
+                self.groesse[endpoint] = Histogramm(METRIK_GROESSE_GRENZEN)
+                self.sql_anweisungen[endpoint] = 0
+                self.sql_dauer[endpoint] = 0.0
+            self.latenz[endpoint].beobachten(dauer)
+            if groesse is not None:
+                self.groesse[endpoint].beobachten(groesse)
+            self.antworten[endpoint, status] = self.antworten.get((endpoint, status), 0) + 1
+            self.sql_anweisungen[endpoint] += sql_anweisungen
+            self.sql_dauer[endpoint] += sql_dauer
+
+    def zaehlen(self, name, anzahl=1):
+        with self.lock:
+            self.zaehler[name] += anzahl
+
+    def verzoegerung_beobachten(self, sekunden):
+        with self.lock:
+            self.erinnerung_verzoegerung.beobachten(max(0.0, sekunden))
+
+    def prometheus(self):
+        """Alle Werte im Textformat 0.0.4"""
+        zeilen = []
+
+        def metrik(name, typ, hilfe):
+            zeilen.append(f'# HELP facharzt_{name} {hilfe}')
+            zeilen.append(f'# TYPE facharzt_{name} {typ}')
+
+        with self.lock:
+            metrik('http_anfrage_dauer_sekunden', 'histogram', 'Bearbeitungszeit je Endpoint')
+            for endpoint, histogramm in sorted(self.latenz.items()):
+                zeilen.extend(histogramm.zeilen('facharzt_http_anfrage_dauer_sekunden', f'endpoint="{endpoint}",'))
+            metrik('http_antwort_bytes', 'histogram', 'Größe der Antworten (nach Komprimierung, ohne Streams)')
+            for endpoint, histogramm in sorted(self.groesse.items()):
+                zeilen.extend(histogramm.zeilen('facharzt_http_antwort_bytes', f'endpoint="{endpoint}",'))
+            metrik('http_antworten_total', 'counter', 'Antworten je Endpoint und Status')
+            for (endpoint, status), anzahl in sorted(self.antworten.items()):
+                zeilen.append(f'facharzt_http_antworten_total{{endpoint="{endpoint}",status="{status}"}} {anzahl}')
+            metrik('http_anfragen_laufend', 'gauge', 'Gerade bearbeitete Anfragen')
+            zeilen.append(f'facharzt_http_anfragen_laufend {self.laufend}')
+
+            metrik('sql_anweisungen_total', 'counter', 'SQL-Anweisungen je Endpoint')
+            for endpoint, anzahl in sorted(self.sql_anweisungen.items()):
+                zeilen.append(f'facharzt_sql_anweisungen_total{{endpoint="{endpoint}"}} {anzahl}')
+            metrik('sql_dauer_sekunden_total', 'counter', 'Zeit in execute und fetch je Endpoint')
+            for endpoint, dauer in sorted(self.sql_dauer.items()):
+                zeilen.append(f'facharzt_sql_dauer_sekunden_total{{endpoint="{endpoint}"}} {dauer:.6f}')
+
+            for name, hilfe in self.ZAEHLER.items():
+                metrik(name, 'counter', hilfe)
+                zeilen.append(f'facharzt_{name} {self.zaehler[name]}')
+            metrik('erinnerung_verzoegerung_sekunden', 'histogram',
+                   'Abstand zwischen Fälligkeit und Bearbeitung im Erinnerungs-Service')
+            zeilen.extend(self.erinnerung_verzoegerung.zeilen('facharzt_erinnerung_verzoegerung_sekunden', ''))
+
+        metrik('antwort_cache_total', 'counter', 'Zugriffe auf den Antwort-Cache')
+        for art, anzahl in sorted(antwort_cache_zaehler.items()):
+            zeilen.append(f'facharzt_antwort_cache_total{{ergebnis="{art}"}} {anzahl}')
+        metrik('db_pool_frei', 'gauge', 'Freie Verbindungen im Pool')
+        zeilen.append(f'facharzt_db_pool_frei {sum(pool.qsize() for pool in list(_db_pools.values()))}')
+        metrik('prozess_start_sekunden', 'gauge', 'Startzeit des Prozesses (Unix-Zeit)')
+        zeilen.append(f'facharzt_prozess_start_sekunden{{pid="{os.getpid()}"}} {self.start:.0f}')
+        return '\n'.join(zeilen) + '\n'
+
+
+metriken = Metriken()
+
+
+class _SqlMessung(threading.local):
+    """Anweisungen und Zeit der laufenden Anfrage, je Thread"""
+    anzahl = 0
+    dauer = 0.0
+
+
+_sql_messung = _SqlMessung()
+
+
+# Langsame Abfragen: Schwelle in Millisekunden (0 = aus), Ringpuffer pro Prozess und
+# optional die Tabelle langsame_abfragen für alle Prozesse
+LANGSAME_ABFRAGEN_MS = float(os.environ.get('LANGSAME_ABFRAGEN_MS', 100))
+LANGSAME_ABFRAGEN_PUFFER = 500
+LANGSAME_ABFRAGEN_TABELLE = os.environ.get('LANGSAME_ABFRAGEN_TABELLE') == '1'
+LANGSAME_ABFRAGEN_AUFBEWAHRUNG = 7  # Tage in der Tabelle
+LANGSAME_ABFRAGEN_PLAENE = 1000  # zwischengespeicherte Abfragepläne
+
+_SQL_LITERALE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_LISTEN = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SQL_MIT_PLAN = re.compile(r'\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+_langsame_abfragen = deque(maxlen=LANGSAME_ABFRAGEN_PUFFER)
+_abfrage_plaene = {}  # Fingerprint -> Plan, einmal pro Prozess ermittelt
+_langsame_abfragen_lock = threading.Lock()
+_langsame_warteschlange = queue.Queue(maxsize=1000)
+_langsame_schreiber_pid = None
+
+
+def sql_normalisieren(sql):
+    """Literale und IN-Listen durch Platzhalter ersetzen, Leerraum vereinheitlichen"""
+    sql = ' '.join(_SQL_LITERALE.sub('?', sql).split())
+    return _SQL_LISTEN.sub('(?, ...)', sql)
+
+
+def parameter_form(parameter):
+    """Typen der gebundenen Parameter, Wiederholungen zusammengefasst (z. B. 'str, int×300')"""
+    if isinstance(parameter, dict):
+        return ', '.join(f':{name}={type(wert).__name__}' for name, wert in sorted(parameter.items()))
+    gruppen = []
+    for wert in parameter:
+        typ = type(wert).__name__
+        if gruppen and gruppen[-1][0] == typ:
+            gruppen[-1][1] += 1
+        else:
+            gruppen.append([typ, 1])
+    return ', '.join(typ if anzahl == 1 else f'{typ}×{anzahl}' for typ, anzahl in gruppen)
+
+
+def abfrageplan(conn, sql, parameter):
+    """EXPLAIN QUERY PLAN als eingerückter Text (über die unbeobachtete Basisklasse)"""
+    if parameter is None or not _SQL_MIT_PLAN.match(sql):
+        return ''
+    try:
+        zeilen = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, parameter).fetchall()
+    except sqlite3.Error as e:
+        return f'(kein Plan: {e})'
+    tiefe = {0: -1}
+    plan = []
+    for knoten, eltern, _, detail in zeilen:
+        tiefe[knoten] = tiefe.get(eltern, -1) + 1
+        plan.append('  ' * tiefe[knoten] + detail)
+    return '\n'.join(plan)
+
+
+def langsame_abfrage_erfassen(conn, sql, parameter, dauer):
+    """Abfrage über der Schwelle im Ringpuffer (und ggf. in der Tabelle) festhalten
+
+    parameter ist None bei executemany; dafür wird kein Plan ermittelt.
+    """
+    normalisiert = sql_normalisieren(sql)
+    fingerprint = hashlib.sha1(normalisiert.encode()).hexdigest()[:12]
+
+    with _langsame_abfragen_lock:
+        plan = _abfrage_plaene.get(fingerprint)
+    if plan is None:
+        plan = abfrageplan(conn, sql, parameter)
+        with _langsame_abfragen_lock:
+            if len(_abfrage_plaene) >= LANGSAME_ABFRAGEN_PLAENE:
+                _abfrage_plaene.clear()
+            _abfrage_plaene[fingerprint] = plan
+
+    eintrag = {
+        'zeit': datetime.now().isoformat(sep=' ', timespec='seconds'),
+        'fingerprint': fingerprint,
+        'sql': normalisiert,
+        'parameter': 'executemany' if parameter is None else parameter_form(parameter),
+        'dauer_ms': round(dauer * 1000, 2),
+        'endpoint': request.endpoint if has_request_context() else threading.current_thread().name,
+        'plan': plan,
+    }
+    with _langsame_abfragen_lock:
+        _langsame_abfragen.append(eintrag)
+    metriken.zaehlen('sql_langsam_total')
+
+    if LANGSAME_ABFRAGEN_TABELLE:
+        langsame_abfragen_schreiber_starten(conn.datenbank)
+        try:
+            _langsame_warteschlange.put_nowait(eintrag)
+        except queue.Full:
+            pass
+
+
+def langsame_abfragen_schreiber(datenbank):
+    """Einträge gesammelt in die Tabelle schreiben, getrennt von den Transaktionen der Anfragen"""
+    conn = sqlite3.connect(datenbank, timeout=5.0)  # ohne MessVerbindung, sonst misst er sich selbst
+    aufgeraeumt = 0
+    while True:
+        eintraege = [_langsame_warteschlange.get()]
+        while len(eintraege) < 100:
+            try:
+                eintraege.append(_langsame_warteschlange.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            conn.executemany('''
+                             INSERT INTO langsame_abfragen (zeit, fingerprint, sql, parameter, dauer_ms,
+                                                            endpoint, plan)
+                             VALUES (:zeit, :fingerprint, :sql, :parameter, :dauer_ms, :endpoint, :plan)
+                             ''', eintraege)
+            if time.monotonic() - aufgeraeumt > 3600:
+                grenze = datetime.now() - timedelta(days=LANGSAME_ABFRAGEN_AUFBEWAHRUNG)
+                conn.execute('DELETE FROM langsame_abfragen WHERE zeit < ?', (grenze.isoformat(sep=' '),))
+                aufgeraeumt = time.monotonic()
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Langsame Abfragen: Schreiben fehlgeschlagen: {e}")
+
+
+def langsame_abfragen_schreiber_starten(datenbank):
+    """Schreib-Thread einmal pro Prozess starten (auch nach einem Fork)"""
+    global _langsame_schreiber_pid
+    with _langsame_abfragen_lock:
+        if _langsame_schreiber_pid == os.getpid():
+            return
+        _langsame_schreiber_pid = os.getpid()
+    threading.Thread(target=langsame_abfragen_schreiber, args=(datenbank,), name='langsame-abfragen',
+                     daemon=True).start()
+
+
+def langsame_abfragen_puffer():
+    """Kopie des Ringpuffers dieses Prozesses"""
+    with _langsame_abfragen_lock:
+        return list(_langsame_abfragen)
+
+
+def langsame_abfragen_zuruecksetzen():
+    """Ringpuffer und zwischengespeicherte Pläne dieses Prozesses verwerfen"""
+    with _langsame_abfragen_lock:
+        _langsame_abfragen.clear()
+        _abfrage_plaene.clear()
+
+
+class MessCursor(sqlite3.Cursor):
+    """Cursor, der Anweisungen und die Zeit in execute/fetch für die Metriken mitzählt
+
+    Braucht eine Anweisung (execute plus die bisherigen fetch-Aufrufe) länger als
+    LANGSAME_ABFRAGEN_MS, wird sie einmal als langsame Abfrage erfasst.
+    """
+
+    offen = None  # (sql, parameter, bisherige Dauer) der letzten noch nicht erfassten Anweisung
+
+    def _gemessen(self, dauer, sql=None, parameter=None):
+        _sql_messung.dauer += dauer
+        if sql is not None:
+            _sql_messung.anzahl += 1
+            self.offen = (sql, parameter, 0.0) if LANGSAME_ABFRAGEN_MS else None
+        if self.offen is not None:
+            sql, parameter, bisher = self.offen
+            bisher += dauer
+            if bisher * 1000 >= LANGSAME_ABFRAGEN_MS:
+                self.offen = None
+                langsame_abfrage_erfassen(self.connection, sql, parameter, bisher)
+            else:
+                self.offen = (sql, parameter, bisher)
+
+    def execute(self, sql, parameter=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameter)
+        finally:
+            self._gemessen(time.perf_counter() - start, sql, parameter)
+
+    def executemany(self, sql, parameter):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, parameter)
+        finally:
+            self._gemessen(time.perf_counter() - start, sql, None)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._gemessen(time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._gemessen(time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._gemessen(time.perf_counter() - start)
+
+
+class MessVerbindung(sqlite3.Connection):
+    """Verbindung, deren Cursor (auch bei conn.execute) MessCursor sind"""
+
+    def __init__(self, datenbank, *args, **kwargs):
+        super().__init__(datenbank, *args, **kwargs)
+        self.datenbank = datenbank
+
+    def cursor(self, factory=MessCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameter=()):
+        return self.cursor().execute(sql, parameter)
+
+    def executemany(self, sql, parameter):
+        return self.cursor().executemany(sql, parameter)
+
+
+def anfrage_messung_starten():
+    g.messung_start = time.perf_counter()
+    _sql_messung.anzahl = 0
+    _sql_messung.dauer = 0.0
+    metriken.anfrage_beginnen()
+
+
+def antwort_messen(antwort):
+    """Läuft als letzte after_request-Funktion, sieht also die komprimierte Antwort"""
+    g.messung_antwort = (antwort.status_code, None if antwort.is_streamed else antwort.content_length)
+    return antwort
+
+
+def anfrage_messung_beenden(exception=None):
+    start = g.pop('messung_start', None)
+    if start is None:
+        return
+    status, groesse = g.pop('messung_antwort', (500, None))
+    metriken.anfrage_beenden(request.endpoint or 'unbekannt', status, time.perf_counter() - start, groesse,
+                             _sql_messung.anzahl, _sql_messung.dauer)
+
+
+def hashtags_normalisieren(text):
+    """Hashtag-Eingabe in eine Liste eindeutiger '#Tag'-Namen zerlegen"""
+    hashtags = []
+    gesehen = set()
+    for teil in re.split(r'[\s,;]+', text or ''):
+        name = teil.strip().lstrip('#')
+        if not name:
+            continue
+        if name.lower() not in gesehen:
+            gesehen.add(name.lower())
+            hashtags.append(f'#{name}')
+    return hashtags
+
+
+def hashtags_nachschlagen(c, hashtags):
+    """Hashtags im Katalog anlegen (falls neu); liefert [(id, name)] in Katalog-Schreibweise"""
+    ergebnis = []
+    for name in hashtags:
+        c.execute('INSERT OR IGNORE INTO hashtags (name) VALUES (?)', (name,))
+        c.execute('SELECT id, name FROM hashtags WHERE name = ?', (name,))
+        ergebnis.append(c.fetchone())
+    return ergebnis
+
+
+def protokoll_hashtags_setzen(c, protokoll_id, hashtags):
+    """Zuordnung Protokoll -> Hashtags ersetzen (hashtags aus hashtags_nachschlagen)"""
+    c.execute('DELETE FROM protokoll_hashtags WHERE protokoll_id = ?', (protokoll_id,))
+    c.executemany('INSERT OR IGNORE INTO protokoll_hashtags (protokoll_id, hashtag_id) VALUES (?, ?)',
+                  [(protokoll_id, hashtag_id) for hashtag_id, _ in hashtags])
+
+
+def _hashtags_uebernehmen(conn):
+    """Migration: Katalog anlegen und bestehende Hashtag-Strings übernehmen"""
+    c = conn.cursor()
+    c.executemany('INSERT OR IGNORE INTO hashtags (name, vordefiniert) VALUES (?, TRUE)',
+                  [(name,) for name in hashtags_normalisieren(' '.join(PREDEFINED_HASHTAGS))])
+
+    c.execute("SELECT id, hashtags FROM protokolle WHERE hashtags IS NOT NULL AND hashtags != ''")
+    for protokoll_id, text in c.fetchall():
+        hashtags = hashtags_nachschlagen(c, hashtags_normalisieren(text))
+        protokoll_hashtags_setzen(c, protokoll_id, hashtags)
+        c.execute('UPDATE protokolle SET hashtags = ? WHERE id = ?',
+                  (' '.join(name for _, name in hashtags), protokoll_id))
+
+
+def _pruefer_duplikate_zusammenfuehren(conn):
+    """Migration: doppelte Prüfer (gleicher Name im selben Bundesland) auf den ältesten Eintrag zusammenlegen"""
+    c = conn.cursor()
+    c.execute('''
+              SELECT p.id, e.erste_id
+              FROM pruefer p
+                       JOIN (SELECT bundesland, name, MIN(id) AS erste_id
+                             FROM pruefer
+                             GROUP BY bundesland, name
+                             HAVING COUNT(*) > 1) e ON e.bundesland = p.bundesland AND e.name = p.name
+              WHERE p.id != e.erste_id
+              ''')
+    duplikate = c.fetchall()
+    for spalte in ('pruefer1_id', 'pruefer2_id', 'pruefer3_id'):
+        c.executemany(f'UPDATE protokolle SET {spalte} = ? WHERE {spalte} = ?',
+                      [(erste_id, pruefer_id) for pruefer_id, erste_id in duplikate])
+    c.executemany('DELETE FROM pruefer WHERE id = ?', [(pruefer_id,) for pruefer_id, _ in duplikate])
+
+
+# Statistik-Zähler: Name -> Bedingung für einen Benutzer (alias {p}).
+# Die Zähler in stats_counters werden per Trigger gepflegt.
+BENUTZER_ZAEHLER = {
+    'users': '1',
+    'users_wartend': '({p}.is_verified IS TRUE AND {p}.is_approved IS NOT TRUE)',
+    'users_freigeschaltet': '({p}.is_approved IS TRUE)',
+    'users_aktiv': '({p}.is_approved IS TRUE AND {p}.is_admin IS NOT TRUE)',
+    'users_admin': '({p}.is_admin IS TRUE)',
+}
+
+
+def statistik_sollwerte(c):
+    """Alle Statistik-Zähler direkt aus den Tabellen berechnen (langsam, für Prüfung/Neuaufbau)"""
+    zaehler = {}
+    for name, bedingung in BENUTZER_ZAEHLER.items():
+        c.execute(f'SELECT COALESCE(SUM({bedingung.format(p="u")}), 0) FROM users u')
+        zaehler[name] = c.fetchone()[0]
+
+    c.execute('SELECT COUNT(*), COUNT(DISTINCT user_id), COUNT(DISTINCT bundesland) FROM protokolle')
+    zaehler['protokolle'], zaehler['autoren'], zaehler['bundeslaender'] = c.fetchone()
+
+    c.execute('SELECT COUNT(*) FROM pruefer')
+    zaehler['pruefer'] = c.fetchone()[0]
+
+    c.execute('SELECT user_id, COUNT(*) FROM protokolle GROUP BY user_id')
+    autoren = dict(c.fetchall())
+
+    c.execute('SELECT bundesland, COUNT(*) FROM protokolle GROUP BY bundesland')
+    bundeslaender = dict(c.fetchall())
+
+    return zaehler, autoren, bundeslaender
+
+
+def statistik_neu_aufbauen(conn):
+    """Statistik-Tabellen aus den Quelltabellen neu berechnen"""
+    c = conn.cursor()
+    zaehler, autoren, bundeslaender = statistik_sollwerte(c)
+    c.execute('DELETE FROM stats_counters')
+    c.executemany('INSERT INTO stats_counters (name, wert) VALUES (?, ?)', zaehler.items())
+    c.execute('DELETE FROM stats_autoren')
+    c.executemany('INSERT INTO stats_autoren (user_id, protokolle) VALUES (?, ?)', autoren.items())
+    c.execute('DELETE FROM stats_bundeslaender')
+    c.executemany('INSERT INTO stats_bundeslaender (bundesland, protokolle) VALUES (?, ?)', bundeslaender.items())
+
+
+def _benutzer_zaehler_sql(*teile):
+    """UPDATE auf stats_counters für Benutzer-Trigger; teile = (Vorzeichen, Alias)"""
+    faelle = '\n'.join(
+        f"WHEN '{name}' THEN " + ' '.join(f"{vorzeichen} {bedingung.format(p=alias)}" for vorzeichen, alias in teile)
+        for name, bedingung in BENUTZER_ZAEHLER.items()
+    )
+    namen = ', '.join(f"'{name}'" for name in BENUTZER_ZAEHLER)
+    return f"UPDATE stats_counters SET wert = wert + CASE name {faelle} END WHERE name IN ({namen});"
+
+
+def _protokoll_zaehler_sql(vorzeichen, alias):
+    """Zähler für ein eingefügtes (+1, new) oder entferntes (-1, old) Protokoll anpassen"""
+    if vorzeichen > 0:
+        return f'''
+            UPDATE stats_counters SET wert = wert + 1 WHERE name = 'protokolle';
+            INSERT INTO stats_autoren (user_id, protokolle) VALUES ({alias}.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET protokolle = protokolle + 1;
+            UPDATE stats_counters SET wert = wert + 1 WHERE name = 'autoren'
+                AND (SELECT protokolle FROM stats_autoren WHERE user_id = {alias}.user_id) = 1;
+            INSERT INTO stats_bundeslaender (bundesland, protokolle) VALUES ({alias}.bundesland, 1)
+                ON CONFLICT (bundesland) DO UPDATE SET protokolle = protokolle + 1;
+            UPDATE stats_counters SET wert = wert + 1 WHERE name = 'bundeslaender'
+                AND (SELECT protokolle FROM stats_bundeslaender WHERE bundesland = {alias}.bundesland) = 1;
+        '''
+    return f'''
+            UPDATE stats_counters SET wert = wert - 1 WHERE name = 'protokolle';
+            UPDATE stats_autoren SET protokolle = protokolle - 1 WHERE user_id = {alias}.user_id;
+            UPDATE stats_counters SET wert = wert - 1 WHERE name = 'autoren'
+                AND (SELECT protokolle FROM stats_autoren WHERE user_id = {alias}.user_id) = 0;
+            DELETE FROM stats_autoren WHERE user_id = {alias}.user_id AND protokolle <= 0;
+            UPDATE stats_bundeslaender SET protokolle = protokolle - 1 WHERE bundesland = {alias}.bundesland;
+            UPDATE stats_counters SET wert = wert - 1 WHERE name = 'bundeslaender'
+                AND (SELECT protokolle FROM stats_bundeslaender WHERE bundesland = {alias}.bundesland) = 0;
+            DELETE FROM stats_bundeslaender WHERE bundesland = {alias}.bundesland AND protokolle <= 0;
+        '''
+
+
+# Schema-Migrationen, nummeriert ab 1. Die aktuelle Version steht in
+# PRAGMA user_version; beim Start werden nur neuere Migrationen ausgeführt.
+# Ein Schritt ist entweder ein SQL-Statement oder eine Funktion(conn).
+# Bestehende Migrationen nie ändern, sondern neue anhängen.
+MIGRATIONS = [
+    # 1: Admin-Logs (bisher bei jeder Bearbeitung/Löschung angelegt)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS admin_logs
+        (
+            id            INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_user_id INTEGER NOT NULL,
+            action_type   TEXT    NOT NULL,
+            target_type   TEXT    NOT NULL,
+            target_id     INTEGER NOT NULL,
+            description   TEXT,
+            admin_notiz   TEXT,
+            created_at    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (admin_user_id) REFERENCES users (id)
+        )
+        ''',
+    ],
+    # 2: Sekundärindizes für die häufigen Abfragen
+    [
+        'CREATE INDEX IF NOT EXISTS idx_protokolle_user_id ON protokolle (user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_protokolle_created_at ON protokolle (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_protokolle_bundesland_datum ON protokolle (bundesland, datum)',
+        'CREATE INDEX IF NOT EXISTS idx_protokolle_pruefer1 ON protokolle (pruefer1_id)',
+        'CREATE INDEX IF NOT EXISTS idx_protokolle_pruefer2 ON protokolle (pruefer2_id)',
+        'CREATE INDEX IF NOT EXISTS idx_protokolle_pruefer3 ON protokolle (pruefer3_id)',
+        'CREATE INDEX IF NOT EXISTS idx_pruefer_bundesland_name ON pruefer (bundesland, name)',
+        'CREATE INDEX IF NOT EXISTS idx_users_verification_token ON users (verification_token)',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_erinnerungen_faellig
+            ON erinnerungen (naechste_erinnerung)
+            WHERE protokoll_erstellt = FALSE
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_admin_logs_created_at ON admin_logs (created_at)',
+    ],
+    # 3: Volltextsuche über Inhalt und Kommentar (FTS5, per Trigger synchron)
+    [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS protokolle_fts USING fts5
+        (
+            inhalt,
+            kommentar,
+            content = 'protokolle',
+            content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '3'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS protokolle_fts_insert AFTER INSERT ON protokolle
+        BEGIN
+            INSERT INTO protokolle_fts (rowid, inhalt, kommentar)
+            VALUES (new.id, new.inhalt, new.kommentar);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS protokolle_fts_delete AFTER DELETE ON protokolle
+        BEGIN
+            INSERT INTO protokolle_fts (protokolle_fts, rowid, inhalt, kommentar)
+            VALUES ('delete', old.id, old.inhalt, old.kommentar);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS protokolle_fts_update AFTER UPDATE OF inhalt, kommentar ON protokolle
+        BEGIN
+            INSERT INTO protokolle_fts (protokolle_fts, rowid, inhalt, kommentar)
+            VALUES ('delete', old.id, old.inhalt, old.kommentar);
+            INSERT INTO protokolle_fts (rowid, inhalt, kommentar)
+            VALUES (new.id, new.inhalt, new.kommentar);
+        END
+        ''',
+        "INSERT INTO protokolle_fts (protokolle_fts) VALUES ('rebuild')",
+    ],
+    # 4: Normalisierte Hashtags mit Katalog
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS hashtags
+        (
+            id           INTEGER PRIMARY KEY AUTOINCREMENT,
+            name         TEXT    NOT NULL UNIQUE COLLATE NOCASE,
+            vordefiniert BOOLEAN DEFAULT FALSE,
+            created_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS protokoll_hashtags
+        (
+            protokoll_id INTEGER NOT NULL,
+            hashtag_id   INTEGER NOT NULL,
+            PRIMARY KEY (protokoll_id, hashtag_id),
+            FOREIGN KEY (protokoll_id) REFERENCES protokolle (id),
+            FOREIGN KEY (hashtag_id) REFERENCES hashtags (id)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_protokoll_hashtags_hashtag ON protokoll_hashtags (hashtag_id, protokoll_id)',
+        '''
+        CREATE TRIGGER IF NOT EXISTS protokoll_hashtags_delete AFTER DELETE ON protokolle
+        BEGIN
+            DELETE FROM protokoll_hashtags WHERE protokoll_id = old.id;
+        END
+        ''',
+        _hashtags_uebernehmen,
+    ],
+    # 5: Indizes für die Keyset-Pagination nach Prüfungsdatum, Bundesland und Autor
+    [
+        'CREATE INDEX IF NOT EXISTS idx_protokolle_datum ON protokolle (datum)',
+        'CREATE INDEX IF NOT EXISTS idx_protokolle_bundesland ON protokolle (bundesland)',
+        'CREATE INDEX IF NOT EXISTS idx_users_name ON users (name)',
+    ],
+    # 6: Gespeicherte Vorschau für die Listen (200 bzw. 100 Zeichen) und Längen,
+    # damit die Listen den vollständigen Inhalt nicht laden müssen
+    [
+        'ALTER TABLE protokolle ADD COLUMN inhalt_vorschau TEXT',
+        'ALTER TABLE protokolle ADD COLUMN inhalt_laenge INTEGER',
+        'ALTER TABLE protokolle ADD COLUMN kommentar_vorschau TEXT',
+        'ALTER TABLE protokolle ADD COLUMN kommentar_laenge INTEGER',
+        '''
+        CREATE TRIGGER IF NOT EXISTS protokolle_vorschau_insert AFTER INSERT ON protokolle
+        BEGIN
+            UPDATE protokolle
+            SET inhalt_vorschau    = substr(new.inhalt, 1, 200),
+                inhalt_laenge      = length(new.inhalt),
+                kommentar_vorschau = substr(new.kommentar, 1, 100),
+                kommentar_laenge   = coalesce(length(new.kommentar), 0)
+            WHERE id = new.id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS protokolle_vorschau_update AFTER UPDATE OF inhalt, kommentar ON protokolle
+        BEGIN
+            UPDATE protokolle
+            SET inhalt_vorschau    = substr(new.inhalt, 1, 200),
+                inhalt_laenge      = length(new.inhalt),
+                kommentar_vorschau = substr(new.kommentar, 1, 100),
+                kommentar_laenge   = coalesce(length(new.kommentar), 0)
+            WHERE id = new.id;
+        END
+        ''',
+        '''
+        UPDATE protokolle
+        SET inhalt_vorschau    = substr(inhalt, 1, 200),
+            inhalt_laenge      = length(inhalt),
+            kommentar_vorschau = substr(kommentar, 1, 100),
+            kommentar_laenge   = coalesce(length(kommentar), 0)
+        ''',
+    ],
+    # 7: Per Trigger gepflegte Statistik-Zähler für die Dashboards
+    [
+        'CREATE TABLE IF NOT EXISTS stats_counters (name TEXT PRIMARY KEY, wert INTEGER NOT NULL) WITHOUT ROWID',
+        'CREATE TABLE IF NOT EXISTS stats_autoren (user_id INTEGER PRIMARY KEY, protokolle INTEGER NOT NULL)',
+        '''
+        CREATE TABLE IF NOT EXISTS stats_bundeslaender
+        (
+            bundesland TEXT PRIMARY KEY,
+            protokolle INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        f'CREATE TRIGGER IF NOT EXISTS stats_users_insert AFTER INSERT ON users BEGIN '
+        f'{_benutzer_zaehler_sql(("+", "new"))} END',
+        f'CREATE TRIGGER IF NOT EXISTS stats_users_delete AFTER DELETE ON users BEGIN '
+        f'{_benutzer_zaehler_sql(("-", "old"))} END',
+        f'CREATE TRIGGER IF NOT EXISTS stats_users_update AFTER UPDATE OF is_verified, is_approved, is_admin ON users '
+        f'BEGIN {_benutzer_zaehler_sql(("+", "new"), ("-", "old"))} END',
+        '''
+        CREATE TRIGGER IF NOT EXISTS stats_pruefer_insert AFTER INSERT ON pruefer
+        BEGIN
+            UPDATE stats_counters SET wert = wert + 1 WHERE name = 'pruefer';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS stats_pruefer_delete AFTER DELETE ON pruefer
+        BEGIN
+            UPDATE stats_counters SET wert = wert - 1 WHERE name = 'pruefer';
+        END
+        ''',
+        f'CREATE TRIGGER IF NOT EXISTS stats_protokolle_insert AFTER INSERT ON protokolle BEGIN '
+        f'{_protokoll_zaehler_sql(+1, "new")} END',
+        f'CREATE TRIGGER IF NOT EXISTS stats_protokolle_delete AFTER DELETE ON protokolle BEGIN '
+        f'{_protokoll_zaehler_sql(-1, "old")} END',
+        f'CREATE TRIGGER IF NOT EXISTS stats_protokolle_update AFTER UPDATE OF user_id, bundesland ON protokolle BEGIN '
+        f'{_protokoll_zaehler_sql(-1, "old")} {_protokoll_zaehler_sql(+1, "new")} END',
+        statistik_neu_aufbauen,
+    ],
+    # 8: E-Mail-Outbox, wird von Hintergrund-Workern zugestellt
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS email_outbox
+        (
+            id                INTEGER PRIMARY KEY AUTOINCREMENT,
+            empfaenger        TEXT      NOT NULL,
+            betreff           TEXT      NOT NULL,
+            inhalt            TEXT      NOT NULL,
+            status            TEXT      NOT NULL DEFAULT 'wartend', -- wartend, gesendet, fehlgeschlagen
+            versuche          INTEGER   NOT NULL DEFAULT 0,
+            naechster_versuch TIMESTAMP NOT NULL,
+            letzter_fehler    TEXT,
+            created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            gesendet_at       TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_faellig
+            ON email_outbox (naechster_versuch)
+            WHERE status = 'wartend'
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_email_outbox_status ON email_outbox (status, id)',
+    ],
+    # 9: Leases, damit mehrere Prozesse Erinnerungen und E-Mails ohne Doppelversand abarbeiten
+    [
+        'ALTER TABLE erinnerungen ADD COLUMN leased_by TEXT',
+        'ALTER TABLE erinnerungen ADD COLUMN lease_until TIMESTAMP',
+        'ALTER TABLE email_outbox ADD COLUMN leased_by TEXT',
+        'ALTER TABLE email_outbox ADD COLUMN lease_until TIMESTAMP',
+    ],
+    # 10: Versionsnummer je Protokoll für den Fragment-Cache der Listen
+    [
+        'ALTER TABLE protokolle ADD COLUMN version INTEGER NOT NULL DEFAULT 1',
+        '''
+        CREATE TRIGGER IF NOT EXISTS protokolle_version
+            AFTER UPDATE OF datum, bundesland, pruefer1_id, pruefer2_id, pruefer3_id, inhalt, hashtags, kommentar
+            ON protokolle
+        BEGIN
+            UPDATE protokolle SET version = old.version + 1 WHERE id = new.id;
+        END
+        ''',
+    ],
+    # 11: Datengeneration für den Antwort-Cache, bei jedem Schreibzugriff hochgezählt
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS daten_generation
+        (
+            id   INTEGER PRIMARY KEY CHECK (id = 1),
+            wert INTEGER NOT NULL
+        )
+        ''',
+        'INSERT OR IGNORE INTO daten_generation (id, wert) VALUES (1, 0)',
+        *[f'CREATE TRIGGER IF NOT EXISTS daten_generation_{tabelle}_{ereignis.lower()} '
+          f'AFTER {ereignis} ON {tabelle} '
+          f'BEGIN UPDATE daten_generation SET wert = wert + 1 WHERE id = 1; END'
+          for tabelle in ('protokolle', 'pruefer', 'users', 'hashtags')
+          for ereignis in ('INSERT', 'UPDATE', 'DELETE')],
+    ],
+    # 12: Prüfer eindeutig je Bundesland, damit Abgleich und Startdaten per ON CONFLICT arbeiten
+    [
+        _pruefer_duplikate_zusammenfuehren,
+        'DROP INDEX IF EXISTS idx_pruefer_bundesland_name',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_pruefer_bundesland_name ON pruefer (bundesland, name)',
+    ],
+    # 13: Token-Buckets der Anmelde-Drosselung (ANMELDE_DROSSEL=sqlite)
+    [
+        '''CREATE TABLE IF NOT EXISTS anmelde_drossel (
+            schluessel TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            stand REAL NOT NULL,
+            voll_ab REAL NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_anmelde_drossel_voll_ab ON anmelde_drossel (voll_ab)',
+    ],
+    # 14: Langsame Abfragen aller Prozesse (LANGSAME_ABFRAGEN_TABELLE=1)
+    [
+        '''CREATE TABLE IF NOT EXISTS langsame_abfragen (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            zeit TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            sql TEXT NOT NULL,
+            parameter TEXT NOT NULL,
+            dauer_ms REAL NOT NULL,
+            endpoint TEXT,
+            plan TEXT
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_langsame_abfragen_zeit ON langsame_abfragen (zeit)',
+    ],
+    # 15: Serverseitige Sitzungen (SITZUNGEN=sqlite); gespeichert wird nur ein Hash der Sitzungs-ID
+    [
+        '''CREATE TABLE IF NOT EXISTS sitzungen (
+            schluessel TEXT PRIMARY KEY,
+            user_id INTEGER,
+            daten TEXT NOT NULL,
+            laeuft_ab REAL NOT NULL
+        ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_sitzungen_user_id ON sitzungen (user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_sitzungen_laeuft_ab ON sitzungen (laeuft_ab)',
+    ],
+    # 16: Stand des Prüfer-Katalogs, per Trigger erhöht; alle Prozesse laden danach neu
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS pruefer_stand
+        (
+            id   INTEGER PRIMARY KEY CHECK (id = 1),
+            wert INTEGER NOT NULL
+        )
+        ''',
+        'INSERT OR IGNORE INTO pruefer_stand (id, wert) VALUES (1, 0)',
+        *[f'CREATE TRIGGER IF NOT EXISTS pruefer_stand_{ereignis.lower()} '
+          f'AFTER {ereignis} ON pruefer '
+          f'BEGIN UPDATE pruefer_stand SET wert = wert + 1 WHERE id = 1; END'
+          for ereignis in ('INSERT', 'UPDATE', 'DELETE')],
+    ],
+]
+
+
+def migrate_db(conn):
+    """Ausstehende Migrationen anwenden, jede in einer eigenen Transaktion"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+
+    for nummer, statements in enumerate(MIGRATIONS, start=1):
+        if nummer <= version:
+            continue
+
+        try:
+            conn.execute('BEGIN')
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {nummer}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        print(f"Migration {nummer} angewendet")
+
 
 def init_db():
     """Datenbank initialisieren"""
-    conn = sqlite3.connect(DATABASE)
+    conn = db_connect()
     c = conn.cursor()
 
     # Benutzer-Tabelle
@@ -252,11 +1236,15 @@ def init_db():
               )
                   )
               ''')
+    conn.commit()
+
+    # Indizes und neuere Tabellen
+    migrate_db(conn)
 
     # Admin-Benutzer erstellen (falls nicht vorhanden)
     c.execute('SELECT COUNT(*) FROM users WHERE is_admin = TRUE')
     if c.fetchone()[0] == 0:
-        admin_hash = generate_password_hash('admin123')
+        admin_hash = generate_password_hash('admin123', PASSWORT_HASH_METHODE)
         c.execute('''
                   INSERT INTO users (name, email, password_hash, ausbildungsjahr, is_verified, is_approved, is_admin)
                   VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -271,2126 +1259,1676 @@ def init_db():
         ('Prof. Dr. Meyer', 'Hamburg')
     ]
 
-    for name, bundesland in beispiel_pruefer:
-        c.execute('SELECT COUNT(*) FROM pruefer WHERE name = ? AND bundesland = ?', (name, bundesland))
-        if c.fetchone()[0] == 0:
-            c.execute('INSERT INTO pruefer (name, bundesland) VALUES (?, ?)', (name, bundesland))
+    c.executemany('INSERT INTO pruefer (name, bundesland) VALUES (?, ?) ON CONFLICT (bundesland, name) DO NOTHING',
+                  beispiel_pruefer)
 
     conn.commit()
     conn.close()
 
 
-def login_required(f):
-    """Decorator für Login-Pflicht"""
-
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-
-    return decorated_function
-
-
-def admin_required(f):
-    """Decorator für Admin-Rechte"""
-
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return redirect(url_for('login'))
-
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-        c.execute('SELECT is_admin FROM users WHERE id = ?', (session['user_id'],))
-        user = c.fetchone()
-        conn.close()
-
-        if not user or not user[0]:
-            flash('Keine Berechtigung für diese Seite.', 'error')
-            return redirect(url_for('dashboard'))
-
-        return f(*args, **kwargs)
-
-    return decorated_function
-
-
-@app.route('/admin/benutzer')
-@admin_required
-def admin_benutzer():
-    """Benutzerverwaltung"""
-    # Filter-Parameter
-    status_filter = request.args.get('status', 'all')  # all, pending, approved, admin
-    search_query = request.args.get('search', '')
-    sort_by = request.args.get('sort', 'created_at')  # name, email, created_at, protokolle_count
-    sort_order = request.args.get('order', 'desc')  # asc, desc
-
-    conn = sqlite3.connect(DATABASE)
+@befehle.command('statistik-pruefen')
+@click.option('--reparieren', is_flag=True, help='Abweichende Zähler neu berechnen.')
+def statistik_pruefen(reparieren):
+    """Statistik-Zähler mit den Tabellen vergleichen (und ggf. neu aufbauen)"""
+    conn = db_connect()
     c = conn.cursor()
-
-    # Basis-Query mit Protokoll-Zählung
-    base_query = '''
-                 SELECT u.id, \
-                        u.name, \
-                        u.email, \
-                        u.ausbildungsjahr, \
-                        u.created_at,
-                        u.is_verified, \
-                        u.is_approved, \
-                        u.is_admin,
-                        COUNT(p.id)       as protokolle_count,
-                        MAX(p.created_at) as letztes_protokoll
-                 FROM users u
-                          LEFT JOIN protokolle p ON u.id = p.user_id
-                 WHERE 1 = 1 \
-                 '''
-
-    params = []
-
-    # Status-Filter
-    if status_filter == 'pending':
-        base_query += ' AND u.is_verified = TRUE AND u.is_approved = FALSE'
-    elif status_filter == 'approved':
-        base_query += ' AND u.is_approved = TRUE AND u.is_admin = FALSE'
-    elif status_filter == 'admin':
-        base_query += ' AND u.is_admin = TRUE'
-
-    # Such-Filter
-    if search_query:
-        base_query += ' AND (u.name LIKE ? OR u.email LIKE ?)'
-        params.extend([f'%{search_query}%', f'%{search_query}%'])
-
-    # GROUP BY hinzufügen
-    base_query += ' GROUP BY u.id, u.name, u.email, u.ausbildungsjahr, u.created_at, u.is_verified, u.is_approved, u.is_admin'
-
-    # Sortierung
-    valid_sorts = {
-        'name': 'u.name',
-        'email': 'u.email',
-        'created_at': 'u.created_at',
-        'protokolle_count': 'protokolle_count'
-    }
-
-    if sort_by in valid_sorts:
-        order_direction = 'DESC' if sort_order == 'desc' else 'ASC'
-        base_query += f' ORDER BY {valid_sorts[sort_by]} {order_direction}'
-    else:
-        base_query += ' ORDER BY u.created_at DESC'
-
-    c.execute(base_query, params)
-    alle_benutzer = c.fetchall()
-
-    # Statistiken
-    c.execute('SELECT COUNT(*) FROM users WHERE is_verified = TRUE AND is_approved = FALSE')
-    wartende_benutzer = c.fetchone()[0]
-
-    c.execute('SELECT COUNT(*) FROM users WHERE is_approved = TRUE AND is_admin = FALSE')
-    aktive_benutzer = c.fetchone()[0]
-
-    c.execute('SELECT COUNT(*) FROM users WHERE is_admin = TRUE')
-    admin_benutzer = c.fetchone()[0]
-
-    c.execute('SELECT COUNT(*) FROM users')
-    gesamt_benutzer = c.fetchone()[0]
+    zaehler, autoren, bundeslaender = statistik_sollwerte(c)
+
+    abweichungen = []
+    c.execute('SELECT name, wert FROM stats_counters')
+    gespeichert = dict(c.fetchall())
+    for name, wert in zaehler.items():
+        if gespeichert.get(name) != wert:
+            abweichungen.append(f'{name}: gespeichert {gespeichert.get(name)}, tatsächlich {wert}')
+
+    c.execute('SELECT user_id, protokolle FROM stats_autoren')
+    if dict(c.fetchall()) != autoren:
+        abweichungen.append('Protokolle pro Benutzer weichen ab')
+
+    c.execute('SELECT bundesland, protokolle FROM stats_bundeslaender')
+    if dict(c.fetchall()) != bundeslaender:
+        abweichungen.append('Protokolle pro Bundesland weichen ab')
+
+    for abweichung in abweichungen:
+        print(abweichung)
+
+    if not abweichungen:
+        print('Statistik ist konsistent')
+    elif reparieren:
+        statistik_neu_aufbauen(conn)
+        conn.commit()
+        print('Statistik wurde neu aufgebaut')
 
     conn.close()
 
-    return render_template('admin/benutzer.html',
-                           benutzer=alle_benutzer,
-                           status_filter=status_filter,
-                           search_query=search_query,
-                           sort_by=sort_by,
-                           sort_order=sort_order,
-                           wartende_benutzer=wartende_benutzer,
-                           aktive_benutzer=aktive_benutzer,
-                           admin_benutzer=admin_benutzer,
-                           gesamt_benutzer=gesamt_benutzer)
-
-
-@app.route('/admin/benutzer/<int:user_id>/admin-status', methods=['POST'])
-@admin_required
-def toggle_admin_status(user_id):
-    """Admin-Status eines Benutzers ändern"""
-    action = request.form.get('action')  # 'promote' oder 'demote'
-
-    # Nicht sich selbst degradieren
-    if user_id == session['user_id']:
-        flash('Sie können Ihren eigenen Admin-Status nicht ändern.', 'error')
-        return redirect(url_for('admin_benutzer'))
-
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-
-    # Benutzer-Informationen abrufen
-    c.execute('SELECT id, name, email, is_admin, is_approved FROM users WHERE id = ?', (user_id,))
-    user_data = c.fetchone()
 
-    if not user_data:
-        flash('Benutzer nicht gefunden.', 'error')
-        conn.close()
-        return redirect(url_for('admin_benutzer'))
+@befehle.command('suchindex-aufbauen')
+def suchindex_aufbauen():
+    """Volltext-Suchindex aus allen Protokollen neu aufbauen"""
+    conn = db_connect()
+    conn.execute("INSERT INTO protokolle_fts (protokolle_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO protokolle_fts (protokolle_fts) VALUES ('optimize')")
+    conn.commit()
+    anzahl = conn.execute('SELECT COUNT(*) FROM protokolle').fetchone()[0]
+    conn.close()
+    print(f"Suchindex für {anzahl} Protokolle neu aufgebaut")
 
-    user_name = user_data[1]
-    user_email = user_data[2]
-    is_current_admin = user_data[3]
-    is_approved = user_data[4]
 
-    try:
-        if action == 'promote':
-            if is_current_admin:
-                flash(f'{user_name} ist bereits ein Administrator.', 'warning')
-            else:
-                # Benutzer muss approved sein
-                if not is_approved:
-                    flash('Benutzer muss erst freigeschaltet werden, bevor er zum Admin ernannt werden kann.', 'error')
-                else:
-                    c.execute('UPDATE users SET is_admin = TRUE WHERE id = ?', (user_id,))
-                    conn.commit()
-
-                    # E-Mail-Benachrichtigung senden
-                    subject = "Sie wurden zum Administrator ernannt - Urologie Facharztprüfung"
-                    body = f"""
-                    <html>
-                    <body>
-                        <h2>🎉 Herzlichen Glückwunsch!</h2>
-                        <p>Hallo {user_name},</p>
-                        <p>Sie wurden zum Administrator der Urologie Facharztprüfung Plattform ernannt.</p>
-
-                        <h3>Ihre neuen Berechtigungen:</h3>
-                        <ul>
-                            <li>✅ Benutzer freischalten und verwalten</li>
-                            <li>👨‍⚕️ Prüfer hinzufügen und bearbeiten</li>
-                            <li>📊 Admin-Dashboard Zugriff</li>
-                            <li>🗑️ Protokolle moderieren</li>
-                            <li>👥 Andere Administratoren ernennen</li>
-                        </ul>
-
-                        <p>Sie können jetzt über den "Admin" Bereich auf erweiterte Funktionen zugreifen.</p>
-
-                        <p><a href="{url_for('admin_dashboard', _external=True)}" 
-                           style="background-color: #3FA357; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">
-                           Zum Admin-Dashboard
-                        </a></p>
-
-                        <p>Vielen Dank für Ihr Engagement!</p>
-                    </body>
-                    </html>
-                    """
-
-                    if send_email(user_email, subject, body):
-                        flash(f'{user_name} wurde erfolgreich zum Administrator ernannt und per E-Mail benachrichtigt.',
-                              'success')
-                    else:
-                        flash(
-                            f'{user_name} wurde zum Administrator ernannt, aber E-Mail-Benachrichtigung fehlgeschlagen.',
-                            'warning')
-
-        elif action == 'demote':
-            if not is_current_admin:
-                flash(f'{user_name} ist kein Administrator.', 'warning')
-            else:
-                # Prüfen ob es noch andere Admins gibt
-                c.execute('SELECT COUNT(*) FROM users WHERE is_admin = TRUE AND id != ?', (user_id,))
-                andere_admins = c.fetchone()[0]
-
-                if andere_admins == 0:
-                    flash(
-                        'Sie können den letzten Administrator nicht degradieren. Es muss mindestens ein Administrator vorhanden sein.',
-                        'error')
-                else:
-                    c.execute('UPDATE users SET is_admin = FALSE WHERE id = ?', (user_id,))
-                    conn.commit()
-
-                    # E-Mail-Benachrichtigung senden
-                    subject = "Administrator-Status entfernt - Urologie Facharztprüfung"
-                    body = f"""
-                    <html>
-                    <body>
-                        <h2>Administrator-Status geändert</h2>
-                        <p>Hallo {user_name},</p>
-                        <p>Ihr Administrator-Status für die Urologie Facharztprüfung Plattform wurde entfernt.</p>
-
-                        <p>Sie haben weiterhin Zugriff auf alle normalen Funktionen der Plattform:</p>
-                        <ul>
-                            <li>📝 Protokolle erstellen und einsehen</li>
-                            <li>🔍 In Protokollen suchen</li>
-                            <li>👤 Ihr Profil verwalten</li>
-                            <li>📧 Erinnerungen erhalten</li>
-                        </ul>
-
-                        <p>Bei Fragen wenden Sie sich an einen Administrator.</p>
-
-                        <p><a href="{url_for('dashboard', _external=True)}" 
-                           style="background-color: #606AAC; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">
-                           Zum Dashboard
-                        </a></p>
-                    </body>
-                    </html>
-                    """
-
-                    if send_email(user_email, subject, body):
-                        flash(f'Administrator-Status von {user_name} wurde entfernt und per E-Mail benachrichtigt.',
-                              'success')
-                    else:
-                        flash(
-                            f'Administrator-Status von {user_name} wurde entfernt, aber E-Mail-Benachrichtigung fehlgeschlagen.',
-                            'warning')
+# Markierungen für Suchtreffer in snippet(); werden erst beim Rendern
+# (nach dem Escapen des Protokolltextes) in <mark> umgewandelt
+TREFFER_START = '\x02'
+TREFFER_ENDE = '\x03'
 
-        else:
-            flash('Ungültige Aktion.', 'error')
+# Gewichtung für bm25(): Treffer im Inhalt zählen doppelt so viel wie im Kommentar
+FTS_RANKING = 'bm25(protokolle_fts, 2.0, 1.0)'
 
-    except Exception as e:
-        conn.rollback()
-        flash('Fehler beim Ändern des Admin-Status.', 'error')
-        print(f"Admin-Status Änderung Fehler: {e}")
-    finally:
-        conn.close()
 
-    return redirect(url_for('admin_benutzer'))
+def fts_ausdruck(suchbegriff):
+    """Freitext in eine FTS5-Abfrage übersetzen (alle Begriffe, Präfixsuche)"""
+    # Jeder Begriff wird als Phrase zitiert, damit Eingaben wie "PSA-Verlauf"
+    # keine FTS5-Syntax auslösen
+    begriffe = re.findall(r'\w[\w-]*', suchbegriff)
+    return ' '.join(f'"{begriff}"*' for begriff in begriffe)
 
 
-@app.route('/admin/benutzer/<int:user_id>/details')
-@admin_required
-def benutzer_details(user_id):
-    """Benutzer-Details anzeigen"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+def fts_abfrageteile(suche):
+    """Zusätzliche SELECT-Spalte, JOIN und Parameter für eine optionale Volltextsuche"""
+    if not suche:
+        return 'NULL', '', []
+    return ("snippet(protokolle_fts, -1, ?, ?, ' … ', 16)",
+            'JOIN protokolle_fts ON protokolle_fts.rowid = p.id',
+            [TREFFER_START, TREFFER_ENDE])
 
-    # Benutzer-Informationen
-    c.execute('''
-              SELECT id,
-                     name,
-                     email,
-                     ausbildungsjahr,
-                     created_at,
-                     is_verified,
-                     is_approved,
-                     is_admin,
-                     verification_token
-              FROM users
-              WHERE id = ?
-              ''', (user_id,))
-    user_data = c.fetchone()
 
-    if not user_data:
-        flash('Benutzer nicht gefunden.', 'error')
-        conn.close()
-        return redirect(url_for('admin_benutzer'))
+# Keyset-Pagination der Protokoll-Listen
+SEITENGROESSE = 25
+MAX_SEITENGROESSE = 100
 
-    # Benutzer-Statistiken
-    c.execute('SELECT COUNT(*) FROM protokolle WHERE user_id = ?', (user_id,))
-    anzahl_protokolle = c.fetchone()[0]
+# Gefilterte Trefferzahlen werden nur bis zu dieser Grenze gezählt
+ZAEHLGRENZE = 1000
 
-    c.execute('''
-              SELECT MIN(created_at), MAX(created_at)
-              FROM protokolle
-              WHERE user_id = ?
-              ''', (user_id,))
-    protokoll_zeitraum = c.fetchone()
 
-    # Letzte Protokolle
-    c.execute('''
-              SELECT p.datum, p.bundesland, pr.name, p.hashtags, p.created_at
-              FROM protokolle p
-                       JOIN pruefer pr ON p.pruefer1_id = pr.id
-              WHERE p.user_id = ?
-              ORDER BY p.created_at DESC LIMIT 10
-              ''', (user_id,))
-    letzte_protokolle = c.fetchall()
-
-    # Erinnerungen
-    c.execute('''
-              SELECT pruefungsdatum,
-                     naechste_erinnerung,
-                     anzahl_erinnerungen,
-                     protokoll_erstellt,
-                     created_at
-              FROM erinnerungen
-              WHERE user_id = ?
-              ORDER BY created_at DESC
-              ''', (user_id,))
-    erinnerungen = c.fetchall()
-
-    # Häufigste Hashtags
-    c.execute('''
-              SELECT hashtags
-              FROM protokolle
-              WHERE user_id = ?
-                AND hashtags IS NOT NULL
-                AND hashtags != ''
-              ''', (user_id,))
-
-    hashtag_results = c.fetchall()
-    hashtag_counter = {}
-    for result in hashtag_results:
-        if result[0]:
-            hashtags = result[0].split()
-            for hashtag in hashtags:
-                hashtag = hashtag.strip()
-                if hashtag:
-                    hashtag_counter[hashtag] = hashtag_counter.get(hashtag, 0) + 1
-
-    top_hashtags = sorted(hashtag_counter.items(), key=lambda x: x[1], reverse=True)[:10]
+def cursor_kodieren(werte):
+    """Cursor (Sortierwert, ID) als URL-Parameter kodieren"""
+    text = json.dumps(werte, separators=(',', ':'))
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
 
-    conn.close()
 
-    user_info = {
-        'id': user_data[0],
-        'name': user_data[1],
-        'email': user_data[2],
-        'ausbildungsjahr': user_data[3],
-        'created_at': user_data[4],
-        'is_verified': user_data[5],
-        'is_approved': user_data[6],
-        'is_admin': user_data[7],
-        'verification_token': user_data[8],
-        'anzahl_protokolle': anzahl_protokolle,
-        'protokoll_zeitraum': protokoll_zeitraum,
-        'letzte_protokolle': letzte_protokolle,
-        'erinnerungen': erinnerungen,
-        'top_hashtags': top_hashtags
+def cursor_dekodieren(text):
+    """Cursor aus dem URL-Parameter lesen; ungültige Cursor werden ignoriert"""
+    if not text:
+        return None
+    try:
+        werte = json.loads(base64.urlsafe_b64decode(text + '=' * (-len(text) % 4)))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(werte, list) or len(werte) != 2:
+        return None
+    # Nur Werte, die SQLite binden kann (bool ist in Python ein int, im Cursor aber nie gültig)
+    if any(isinstance(wert, bool) or not isinstance(wert, (str, int, float, type(None))) for wert in werte):
+        return None
+    return werte
+
+
+def seitengroesse_aus_anfrage():
+    """Seitengröße aus ?pro_seite=, begrenzt auf MAX_SEITENGROESSE"""
+    pro_seite = request.args.get('pro_seite', SEITENGROESSE, type=int)
+    return max(1, min(pro_seite, MAX_SEITENGROESSE))
+
+
+def seiten_url(**cursor):
+    """URL der aktuellen Liste mit allen Filtern, aber neuem Cursor"""
+    args = request.args.to_dict(flat=False)
+    args.pop('nach', None)
+    args.pop('vor', None)
+    args.update(cursor)
+    return url_for(request.endpoint, **args)
+
+
+def keyset_seite(c, select, select_params, from_where, params, sortierung, absteigend):
+    """Eine Seite per Keyset-Pagination auf (sortierung, p.id) laden.
+
+    select enthält die Spalten (p.id an erster Stelle), from_where den FROM-Teil
+    mit allen Filtern. Der Sortierwert wird als letzte Spalte mitgeladen, damit
+    die Cursor für die nächste und vorherige Seite gebildet werden können.
+    """
+    seitengroesse = seitengroesse_aus_anfrage()
+    nach = cursor_dekodieren(request.args.get('nach'))
+    vor = cursor_dekodieren(request.args.get('vor'))
+
+    # Rückwärts blättern: umgekehrt sortieren und das Ergebnis wieder drehen
+    rueckwaerts = vor is not None
+    cursor = vor if rueckwaerts else nach
+    abwaerts = absteigend != rueckwaerts
+    vergleich = '<' if abwaerts else '>'
+    richtung = 'DESC' if abwaerts else 'ASC'
+
+    query = f'{select}, {sortierung} as sortwert {from_where}'
+    query_params = list(select_params) + list(params)
+
+    if cursor is not None:
+        query += f' AND ({sortierung}, p.id) {vergleich} (?, ?)'
+        query_params.extend(cursor)
+
+    query += f' ORDER BY {sortierung} {richtung}, p.id {richtung} LIMIT ?'
+    query_params.append(seitengroesse + 1)
+
+    c.execute(query, query_params)
+    eintraege = c.fetchall()
+    weitere = len(eintraege) > seitengroesse
+    eintraege = eintraege[:seitengroesse]
+    if rueckwaerts:
+        eintraege.reverse()
+
+    naechste = vorherige = None
+    if eintraege:
+        if weitere or rueckwaerts:
+            naechste = seiten_url(nach=cursor_kodieren([eintraege[-1][-1], eintraege[-1][0]]))
+        if (weitere and rueckwaerts) or (cursor is not None and not rueckwaerts):
+            vorherige = seiten_url(vor=cursor_kodieren([eintraege[0][-1], eintraege[0][0]]))
+
+    # Ungefähre Trefferzahl: nur bis ZAEHLGRENZE zählen statt die ganze Liste
+    c.execute(f'SELECT COUNT(*) FROM (SELECT 1 {from_where} LIMIT ?)', list(params) + [ZAEHLGRENZE + 1])
+    anzahl = c.fetchone()[0]
+
+    return {
+        'eintraege': eintraege,
+        'naechste': naechste,
+        'vorherige': vorherige,
+        'anzahl': min(anzahl, ZAEHLGRENZE),
+        'anzahl_ungefaehr': anzahl > ZAEHLGRENZE,
+        'pro_seite': seitengroesse,
     }
 
-    return render_template('admin/benutzer_details.html', user=user_info)
 
+# Fragment-Cache für Template-Blöcke: {% cache 'name', protokoll_id, version %}...{% endcache %}
+FRAGMENT_CACHE_GROESSE = 5000  # Einträge pro Prozess
 
-@app.route('/admin/benutzer/<int:user_id>/suspend', methods=['POST'])
-@admin_required
-def suspend_user(user_id):
-    """Benutzer sperren/entsperren"""
-    action = request.form.get('action')  # 'suspend' oder 'unsuspend'
-    reason = request.form.get('reason', '').strip()
 
-    # Nicht sich selbst sperren
-    if user_id == session['user_id']:
-        flash('Sie können sich nicht selbst sperren.', 'error')
-        return redirect(url_for('admin_benutzer'))
+class FragmentCache:
+    """LRU-Speicher für gerendertes HTML, Schlüssel (Fragment, Protokoll-ID, Version)"""
 
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+    def __init__(self, groesse):
+        self.groesse = groesse
+        self.eintraege = OrderedDict()
+        self.lock = threading.Lock()
 
-    # Benutzer-Informationen abrufen
-    c.execute('SELECT id, name, email, is_approved FROM users WHERE id = ?', (user_id,))
-    user_data = c.fetchone()
+    def holen(self, schluessel):
+        with self.lock:
+            html = self.eintraege.get(schluessel)
+            if html is not None:
+                self.eintraege.move_to_end(schluessel)
+            return html
 
-    if not user_data:
-        flash('Benutzer nicht gefunden.', 'error')
-        conn.close()
-        return redirect(url_for('admin_benutzer'))
+    def speichern(self, schluessel, html):
+        with self.lock:
+            self.eintraege[schluessel] = html
+            self.eintraege.move_to_end(schluessel)
+            while len(self.eintraege) > self.groesse:
+                self.eintraege.popitem(last=False)
 
-    user_name = user_data[1]
-    user_email = user_data[2]
-    is_approved = user_data[3]
+    def entfernen(self, protokoll_id):
+        """Alle Fragmente eines Protokolls verwerfen"""
+        with self.lock:
+            for schluessel in [s for s in self.eintraege if s[1] == protokoll_id]:
+                del self.eintraege[schluessel]
 
-    try:
-        if action == 'suspend':
-            if not is_approved:
-                flash(f'{user_name} ist bereits gesperrt.', 'warning')
-            else:
-                c.execute('UPDATE users SET is_approved = FALSE WHERE id = ?', (user_id,))
-                conn.commit()
 
-                # E-Mail-Benachrichtigung
-                subject = "Account gesperrt - Urologie Facharztprüfung"
-                body = f"""
-                <html>
-                <body>
-                    <h2>Account vorübergehend gesperrt</h2>
-                    <p>Hallo {user_name},</p>
-                    <p>Ihr Account wurde vorübergehend gesperrt.</p>
+fragment_cache = FragmentCache(FRAGMENT_CACHE_GROESSE)
 
-                    {f'<p><strong>Grund:</strong> {reason}</p>' if reason else ''}
 
-                    <p>Bei Fragen wenden Sie sich an einen Administrator.</p>
-                </body>
-                </html>
-                """
+class FragmentCacheExtension(Extension):
+    """Jinja-Tag {% cache schluessel, ... %}: Block einmal rendern und wiederverwenden
 
-                send_email(user_email, subject, body)
-                flash(f'{user_name} wurde gesperrt.', 'success')
+    Der Schlüssel muss alles enthalten, wovon der Block abhängt (bei Protokollen
+    die ID und die Versionsnummer, die jede Änderung hochzählt).
+    """
+    tags = {'cache'}
 
-        elif action == 'unsuspend':
-            if is_approved:
-                flash(f'{user_name} ist nicht gesperrt.', 'warning')
-            else:
-                c.execute('UPDATE users SET is_approved = TRUE WHERE id = ?', (user_id,))
-                conn.commit()
-
-                # E-Mail-Benachrichtigung
-                subject = "Account wieder freigeschaltet - Urologie Facharztprüfung"
-                body = f"""
-                <html>
-                <body>
-                    <h2>Account wieder freigeschaltet</h2>
-                    <p>Hallo {user_name},</p>
-                    <p>Ihr Account wurde wieder freigeschaltet. Sie können sich jetzt wieder anmelden.</p>
-
-                    <p><a href="{url_for('login', _external=True)}" 
-                       style="background-color: #3FA357; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">
-                       Jetzt anmelden
-                    </a></p>
-                </body>
-                </html>
-                """
-
-                send_email(user_email, subject, body)
-                flash(f'{user_name} wurde entsperrt.', 'success')
-
-        else:
-            flash('Ungültige Aktion.', 'error')
-
-    except Exception as e:
-        conn.rollback()
-        flash('Fehler beim Ändern des Benutzer-Status.', 'error')
-        print(f"Benutzer-Status Änderung Fehler: {e}")
-    finally:
-        conn.close()
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        schluessel = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            schluessel.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_fragment', [nodes.Tuple(schluessel, 'load')]),
+                               [], [], body).set_lineno(lineno)
 
-    return redirect(url_for('admin_benutzer'))
+    def _fragment(self, schluessel, caller):
+        html = fragment_cache.holen(schluessel)
+        if html is None:
+            html = caller()
+            fragment_cache.speichern(schluessel, html)
+        return html
 
-@app.route('/admin/benutzer/bulk-actions', methods=['POST'])
-@admin_required
-def benutzer_bulk_actions():
-    """Bulk-Aktionen für Benutzer"""
-    action = request.form.get('action')
-    user_ids = request.form.getlist('user_ids')
 
-    if not user_ids:
-        flash('Keine Benutzer ausgewählt.', 'error')
-        return redirect(url_for('admin_benutzer'))
+# Statische Dateien: `flask assets-bauen` minifiziert CSS und JS, schreibt sie mit
+# Inhalts-Hash im Namen nach static/dist und legt .gz/.br daneben. url_for('static', ...)
+# liefert dann automatisch die gebaute Datei, ohne Build weiterhin die Quelldatei.
+ASSET_QUELLEN = ('styles', 'js')
+ASSET_ZIEL = 'dist'
+ASSET_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', ASSET_ZIEL, 'manifest.json')
+ASSET_CACHE_DAUER = 365 * 24 * 3600
+KOMPRIMIERUNG_MIN_BYTES = 500
+KOMPRIMIERUNG_TYPEN = ('text/html', 'text/plain', 'text/csv', 'application/json')
 
-    # Eigene ID aus der Liste entfernen
-    user_ids = [uid for uid in user_ids if int(uid) != session['user_id']]
-
-    if not user_ids:
-        flash('Sie können keine Bulk-Aktionen auf sich selbst anwenden.', 'error')
-        return redirect(url_for('admin_benutzer'))
-
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
 
+def brotli_laden():
+    """brotli ist optional (für vorkomprimierte .br-Dateien) und wird nur beim Bauen gebraucht"""
     try:
-        if action == 'approve':
-            placeholders = ','.join(['?' for _ in user_ids])
-            c.execute(f'''
-                UPDATE users SET is_approved = TRUE 
-                WHERE id IN ({placeholders}) AND is_verified = TRUE
-            ''', user_ids)
-            conn.commit()
-            flash(f'{len(user_ids)} Benutzer wurden freigeschaltet.', 'success')
-
-        elif action == 'suspend':
-            placeholders = ','.join(['?' for _ in user_ids])
-            c.execute(f'UPDATE users SET is_approved = FALSE WHERE id IN ({placeholders})', user_ids)
-            conn.commit()
-            flash(f'{len(user_ids)} Benutzer wurden gesperrt.', 'success')
-
-        elif action == 'promote_admin':
-            placeholders = ','.join(['?' for _ in user_ids])
-            c.execute(f'''
-                UPDATE users SET is_admin = TRUE 
-                WHERE id IN ({placeholders}) AND is_approved = TRUE
-            ''', user_ids)
-            conn.commit()
-            flash(f'{len(user_ids)} Benutzer wurden zu Administratoren ernannt.', 'success')
-
-        elif action == 'demote_admin':
-            # Prüfen ob genug Admins übrig bleiben
-            c.execute('SELECT COUNT(*) FROM users WHERE is_admin = TRUE')
-            total_admins = c.fetchone()[0]
-
-            if total_admins - len(user_ids) < 1:
-                flash('Es muss mindestens ein Administrator übrig bleiben.', 'error')
-            else:
-                placeholders = ','.join(['?' for _ in user_ids])
-                c.execute(f'UPDATE users SET is_admin = FALSE WHERE id IN ({placeholders})', user_ids)
-                conn.commit()
-                flash(f'{len(user_ids)} Administratoren wurden degradiert.', 'success')
-
-        else:
-            flash('Ungültige Aktion ausgewählt.', 'error')
+        import brotli
+    except ImportError:
+        return None
+    return brotli
 
-    except Exception as e:
-        conn.rollback()
-        flash('Fehler bei der Bulk-Aktion.', 'error')
-        print(f"Bulk-Action Fehler: {e}")
-    finally:
-        conn.close()
-
-    return redirect(url_for('admin_benutzer'))
 
-def send_email(to_email, subject, body):
-    """E-Mail senden"""
+def asset_manifest_laden():
     try:
-        msg = MIMEMultipart()
-        msg['From'] = app.config['MAIL_USERNAME']
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        msg.attach(MIMEText(body, 'html'))
-
-        server = smtplib.SMTP(app.config['MAIL_SERVER'], app.config['MAIL_PORT'])
-        server.starttls()
-        server.login(app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'])
-        text = msg.as_string()
-        server.sendmail(app.config['MAIL_USERNAME'], to_email, text)
-        server.quit()
-        return True
-    except Exception as e:
-        print(f"E-Mail-Fehler: {e}")
-        return False
-
-
-@app.route('/')
-def index():
-    """Startseite"""
-    return render_template('index.html')
+        with open(ASSET_MANIFEST, encoding='utf-8') as datei:
+            return json.load(datei)
+    except (OSError, ValueError):
+        return {}
+
+
+asset_manifest = asset_manifest_laden()
+
+
+def css_minifizieren(quelltext):
+    quelltext = re.sub(r'/\*.*?\*/', '', quelltext, flags=re.S)
+    quelltext = re.sub(r'\s+', ' ', quelltext)
+    quelltext = re.sub(r'\s*([{};,>])\s*', r'\1', quelltext)
+    quelltext = re.sub(r':\s+', ':', quelltext)
+    return quelltext.replace(';}', '}').strip() + '\n'
+
+
+JS_WORTZEICHEN = re.compile(r'[\w$]')
+
+
+def js_minifizieren(quelltext):
+    """Kommentare, Einrückung und überflüssige Leerzeichen entfernen
+
+    Zeilenumbrüche bleiben erhalten, damit die automatische Semikolon-Einfügung
+    wie im Original greift. Strings, Template-Literale und reguläre Ausdrücke
+    werden unverändert übernommen.
+    """
+    ausgabe = []
+    offene_literale = []  # je offenem ${ in einem Template-Literal: Tiefe der { }
+    i, n = 0, len(quelltext)
+
+    def anhaengen(teil):
+        # Leerzeichen nur zwischen zwei Wortzeichen (und bei + + / - -) behalten
+        if len(ausgabe) > 1 and ausgabe[-1] == ' ':
+            davor = ausgabe[-2][-1]
+            if not (JS_WORTZEICHEN.match(davor) and JS_WORTZEICHEN.match(teil[0])) and \
+                    not (davor == teil[0] and davor in '+-'):
+                ausgabe.pop()
+        ausgabe.append(teil)
+
+    def letztes_zeichen():
+        for teil in reversed(ausgabe):
+            if teil not in (' ', '\n'):
+                return teil[-1]
+        return ''
+
+    def template_literal(start):
+        # Von ` oder der } eines ${...} bis zum nächsten ` oder ${
+        ende = start + 1
+        while not quelltext.startswith(('`', '${'), ende):
+            ende += 2 if quelltext[ende] == '\\' else 1
+        if quelltext[ende] == '`':
+            return ende + 1, False
+        offene_literale.append(0)
+        return ende + 2, True
+
+    while i < n:
+        zeichen = quelltext[i]
+        if zeichen.isspace():
+            ende = i
+            while ende < n and quelltext[ende].isspace():
+                ende += 1
+            if ausgabe and ausgabe[-1] != '\n':
+                if '\n' in quelltext[i:ende]:
+                    if ausgabe[-1] == ' ':
+                        ausgabe.pop()
+                    ausgabe.append('\n')
+                elif ausgabe[-1] != ' ':
+                    ausgabe.append(' ')
+            i = ende
+        elif quelltext.startswith('//', i):
+            i = quelltext.find('\n', i)
+            i = n if i < 0 else i
+        elif quelltext.startswith('/*', i):
+            i = quelltext.index('*/', i) + 2
+            if ausgabe and ausgabe[-1] not in (' ', '\n'):
+                ausgabe.append(' ')
+        elif zeichen in '\'"':
+            ende = i + 1
+            while quelltext[ende] != zeichen:
+                ende += 2 if quelltext[ende] == '\\' else 1
+            anhaengen(quelltext[i:ende + 1])
+            i = ende + 1
+        elif zeichen == '`' or (zeichen == '}' and offene_literale and offene_literale[-1] == 0):
+            if zeichen == '}':
+                offene_literale.pop()
+            ende, _ = template_literal(i)
+            anhaengen(quelltext[i:ende])
+            i = ende
+        elif zeichen == '/' and (letztes_zeichen() in '(,=:[!&|?{};' or
+                                 re.search(r'\b(return|typeof)\s*$', ''.join(ausgabe[-2:]))):
+            # Regulärer Ausdruck
+            ende, klasse = i + 1, False
+            while quelltext[ende] != '/' or klasse:
+                if quelltext[ende] == '\\':
+                    ende += 1
+                elif quelltext[ende] in '[]':
+                    klasse = quelltext[ende] == '['
+                ende += 1
+            ende += 1
+            while ende < n and quelltext[ende].isalpha():
+                ende += 1
+            anhaengen(quelltext[i:ende])
+            i = ende
+        else:
+            if offene_literale and zeichen == '{':
+                offene_literale[-1] += 1
+            elif offene_literale and zeichen == '}':
+                offene_literale[-1] -= 1
+            ende = i + 1
+            if JS_WORTZEICHEN.match(zeichen):
+                while ende < n and JS_WORTZEICHEN.match(quelltext[ende]):
+                    ende += 1
+            anhaengen(quelltext[i:ende])
+            i = ende
+    return ''.join(ausgabe).strip() + '\n'
+
+
+def asset_bauen(quelle, minifizieren):
+    """Eine Datei minifizieren, mit Hash im Namen und komprimiert ablegen; gibt den Zielpfad zurück"""
+    with open(os.path.join(current_app.static_folder, quelle), encoding='utf-8') as datei:
+        daten = minifizieren(datei.read()).encode('utf-8')
+    stamm, endung = os.path.splitext(quelle)
+    ziel = f'{ASSET_ZIEL}/{stamm}.{hashlib.sha1(daten).hexdigest()[:12]}{endung}'
+    pfad = os.path.join(current_app.static_folder, ziel)
+    os.makedirs(os.path.dirname(pfad), exist_ok=True)
+    varianten = {'': daten, '.gz': gzip.compress(daten, 9, mtime=0)}
+    brotli = brotli_laden()
+    if brotli is not None:
+        varianten['.br'] = brotli.compress(daten, quality=11)
+    for zusatz, inhalt in varianten.items():
+        with open(pfad + zusatz, 'wb') as datei:
+            datei.write(inhalt)
+    return ziel
+
+
+@befehle.command('assets-bauen')
+def assets_bauen():
+    """CSS und JavaScript minifizieren, mit Inhalts-Hash versehen und vorkomprimieren"""
+    global asset_manifest
+    manifest = {}
+    for ordner in ASSET_QUELLEN:
+        for verzeichnis, _, dateien in os.walk(os.path.join(current_app.static_folder, ordner)):
+            for name in sorted(dateien):
+                quelle = os.path.relpath(os.path.join(verzeichnis, name), current_app.static_folder).replace(os.sep, '/')
+                if name.endswith('.css'):
+                    manifest[quelle] = asset_bauen(quelle, css_minifizieren)
+                elif name.endswith('.js'):
+                    manifest[quelle] = asset_bauen(quelle, js_minifizieren)
+
+    # Veraltete Builds entfernen, damit static/dist nicht wächst
+    aktuell = {os.path.normpath(os.path.join(current_app.static_folder, ziel)) for ziel in manifest.values()}
+    for verzeichnis, _, dateien in os.walk(os.path.join(current_app.static_folder, ASSET_ZIEL)):
+        for name in dateien:
+            pfad = os.path.normpath(os.path.join(verzeichnis, name))
+            if name != 'manifest.json' and re.sub(r'\.(gz|br)$', '', pfad) not in aktuell:
+                os.remove(pfad)
+
+    with open(ASSET_MANIFEST, 'w', encoding='utf-8') as datei:
+        json.dump(manifest, datei, indent=2, sort_keys=True)
+    asset_manifest = manifest
+    print(f"{len(manifest)} Dateien gebaut ({'gzip und brotli' if brotli_laden() is not None else 'nur gzip'})")
+
+
+def asset_fingerabdruck(endpoint, values):
+    """url_for('static', filename=...) auf die gebaute Datei mit Hash umlenken"""
+    if endpoint == 'static' and values.get('filename') in asset_manifest:
+        values['filename'] = asset_manifest[values['filename']]
+
+
+def statische_datei(filename):
+    """Gebaute Dateien vorkomprimiert und mit unbegrenzter Cache-Dauer ausliefern"""
+    if not filename.startswith(ASSET_ZIEL + '/'):
+        return current_app.send_static_file(filename)
+
+    antwort = None
+    for kodierung, zusatz in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[kodierung] and \
+                os.path.isfile(os.path.join(current_app.static_folder, filename + zusatz)):
+            antwort = send_from_directory(current_app.static_folder, filename + zusatz,
+                                          mimetype=mimetypes.guess_type(filename)[0])
+            antwort.content_encoding = kodierung
+            break
+    if antwort is None:
+        antwort = current_app.send_static_file(filename)
+
+    antwort.vary.add('Accept-Encoding')
+    antwort.cache_control.public = True
+    antwort.cache_control.max_age = ASSET_CACHE_DAUER
+    antwort.cache_control.immutable = True
+    return antwort
+
+
+def antwort_komprimieren(antwort):
+    """Dynamische HTML- und JSON-Antworten gzip-komprimieren, wenn der Client es annimmt"""
+    if antwort.status_code != 200 or antwort.direct_passthrough or antwort.is_streamed or \
+            antwort.content_encoding or antwort.mimetype not in KOMPRIMIERUNG_TYPEN:
+        return antwort
+
+    antwort.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return antwort
+    daten = antwort.get_data()
+    if len(daten) < KOMPRIMIERUNG_MIN_BYTES:
+        return antwort
+
+    antwort.set_data(gzip.compress(daten, 6))
+    antwort.content_encoding = 'gzip'
+    if antwort.get_etag()[0]:
+        # Komprimierte Darstellung darf nicht dieselbe starke ETag tragen
+        antwort.set_etag(antwort.get_etag()[0], weak=True)
+    return antwort
+
+
+@befehle.command('templates-kompilieren')
+def templates_kompilieren():
+    """Alle Templates übersetzen und im Bytecode-Cache ablegen (z. B. beim Deployment)"""
+    fehler = 0
+    for name in current_app.jinja_env.list_templates(extensions=['html']):
+        try:
+            current_app.jinja_env.get_template(name)
+        except Exception as e:
+            fehler += 1
+            print(f"{name}: {e}")
+    print(f"Templates kompiliert, {fehler} fehlerhaft (Cache: {current_app.jinja_env.bytecode_cache.directory})")
 
 
-@app.route('/register', methods=['GET', 'POST'])
-def register():
-    """Benutzerregistrierung"""
-    if request.method == 'POST':
-        name = request.form.get('name')
-        email = request.form.get('email')
-        password = request.form.get('password')
-        ausbildungsjahr = request.form.get('ausbildungsjahr')
+def suchtreffer(snippet):
+    """Snippet escapen und Treffer hervorheben"""
+    text = str(escape(snippet or ''))
+    return Markup(text.replace(TREFFER_START, '<mark>').replace(TREFFER_ENDE, '</mark>'))
 
-        # Validierung
-        if not all([name, email, password, ausbildungsjahr]):
-            flash('Alle Felder sind erforderlich.', 'error')
-            return render_template('register.html')
 
-        if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
-            flash('Ungültige E-Mail-Adresse.', 'error')
-            return render_template('register.html')
+def statistik(c):
+    """Per Trigger gepflegte Zähler (siehe BENUTZER_ZAEHLER und Migration 7)"""
+    c.execute('SELECT name, wert FROM stats_counters')
+    return dict(c.fetchall())
 
-        try:
-            ausbildungsjahr = int(ausbildungsjahr)
-            if ausbildungsjahr < 1 or ausbildungsjahr > 6:
-                raise ValueError
-        except ValueError:
-            flash('Ausbildungsjahr muss zwischen 1 und 6 liegen.', 'error')
-            return render_template('register.html')
-
-        # Prüfen ob E-Mail bereits existiert
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-        c.execute('SELECT COUNT(*) FROM users WHERE email = ?', (email,))
-        if c.fetchone()[0] > 0:
-            conn.close()
-            flash('E-Mail-Adresse bereits registriert.', 'error')
-            return render_template('register.html')
-
-        # Benutzer erstellen
-        password_hash = generate_password_hash(password)
-        verification_token = secrets.token_urlsafe(32)
 
-        c.execute('''
-                  INSERT INTO users (name, email, password_hash, ausbildungsjahr, verification_token)
-                  VALUES (?, ?, ?, ?, ?)
-                  ''', (name, email, password_hash, ausbildungsjahr, verification_token))
+def protokolle_von(c, user_id):
+    """Anzahl der Protokolle eines Benutzers aus stats_autoren"""
+    c.execute('SELECT protokolle FROM stats_autoren WHERE user_id = ?', (user_id,))
+    row = c.fetchone()
+    return row[0] if row else 0
 
-        conn.commit()
-        conn.close()
 
-        # Verifizierungs-E-Mail senden
-        verification_link = url_for('verify_email', token=verification_token, _external=True)
-        subject = "E-Mail-Verifizierung - Urologie Facharztprüfung"
-        body = f"""
-        <html>
-        <body>
-            <h2>Willkommen bei der Urologie Facharztprüfung Plattform!</h2>
-            <p>Hallo {name},</p>
-            <p>bitte klicken Sie auf den folgenden Link, um Ihre E-Mail-Adresse zu verifizieren:</p>
-            <p><a href="{verification_link}" style="background-color: #007AFF; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">E-Mail verifizieren</a></p>
-            <p>Nach der Verifizierung wird Ihr Account von einem Administrator geprüft und freigeschaltet.</p>
-            <p>Vielen Dank!</p>
-        </body>
-        </html>
-        """
+# Prüfer-Katalog im Speicher: (Stand in der DB, (Version, {bundesland: (prüfer, etag)}))
+_pruefer_katalog = None
+_pruefer_katalog_lock = threading.Lock()
 
-        if send_email(email, subject, body):
-            flash('Registrierung erfolgreich! Bitte prüfen Sie Ihre E-Mails zur Verifizierung.', 'success')
-        else:
-            flash('Registrierung erfolgreich, aber E-Mail konnte nicht gesendet werden.', 'warning')
 
-        return redirect(url_for('login'))
+def inhalts_etag(daten):
+    return hashlib.sha1(json.dumps(daten, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
 
-    return render_template('register.html')
 
+def pruefer_katalog():
+    """Prüfer nach Bundesland gruppiert, wird nur nach Änderungen neu geladen
 
-@app.route('/verify/<token>')
-def verify_email(token):
-    """E-Mail-Verifizierung"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT id, name FROM users WHERE verification_token = ? AND is_verified = FALSE', (token,))
-    user = c.fetchone()
+    Ob sich etwas geändert hat, steht in pruefer_stand (per Trigger gepflegt). So sehen
+    auch andere Worker und CLI-Befehle wie protokolle-importieren die neuen Prüfer.
+    """
+    global _pruefer_katalog
+    c = get_db().cursor()
+    c.execute('SELECT wert FROM pruefer_stand WHERE id = 1')
+    stand = c.fetchone()[0]
+    with _pruefer_katalog_lock:
+        if _pruefer_katalog is not None and _pruefer_katalog[0] == stand:
+            return _pruefer_katalog[1]
 
-    if user:
-        c.execute('UPDATE users SET is_verified = TRUE, verification_token = NULL WHERE id = ?', (user[0],))
-        conn.commit()
-        flash('E-Mail erfolgreich verifiziert! Ihr Account wird nun von einem Administrator geprüft.', 'success')
-    else:
-        flash('Ungültiger oder bereits verwendeter Verifizierungslink.', 'error')
+    # Stand vor den Prüfern gelesen: der Katalog ist höchstens neuer, nie älter als die Nummer
+    c.execute('SELECT id, name, bundesland FROM pruefer ORDER BY bundesland, name')
+    nach_bundesland = {}
+    for pruefer in c.fetchall():
+        nach_bundesland.setdefault(pruefer[2], []).append({'id': pruefer[0], 'name': pruefer[1]})
 
-    conn.close()
-    return redirect(url_for('login'))
+    # Die Version hängt nur vom Inhalt ab und ist damit in allen Prozessen gleich
+    katalog = (inhalts_etag(nach_bundesland),
+               {bundesland: (pruefer, inhalts_etag(pruefer))
+                for bundesland, pruefer in nach_bundesland.items()})
 
+    with _pruefer_katalog_lock:
+        if _pruefer_katalog is None or _pruefer_katalog[0] <= stand:
+            _pruefer_katalog = (stand, katalog)
+    return katalog
 
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    """Benutzeranmeldung"""
-    if request.method == 'POST':
-        email = request.form.get('email')
-        password = request.form.get('password')
 
-        if not email or not password:
-            flash('E-Mail und Passwort sind erforderlich.', 'error')
-            return render_template('login.html')
+def pruefer_katalog_invalidieren():
+    """Verwirft den Katalog dieses Prozesses; andere Prozesse merken die Änderung am Stand"""
+    global _pruefer_katalog
+    with _pruefer_katalog_lock:
+        _pruefer_katalog = None
 
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-        c.execute('''
-                  SELECT id, name, password_hash, is_verified, is_approved, is_admin
-                  FROM users
-                  WHERE email = ?
-                  ''', (email,))
-        user = c.fetchone()
-        conn.close()
 
-        if user and check_password_hash(user[2], password):
-            if not user[3]:  # is_verified
-                flash('Bitte verifizieren Sie zuerst Ihre E-Mail-Adresse.', 'error')
-                return render_template('login.html')
+def hashtag_katalog(c):
+    """Vordefinierte Hashtags für die Vorschlagslisten"""
+    c.execute('SELECT name FROM hashtags WHERE vordefiniert = TRUE ORDER BY name')
+    return [row[0] for row in c.fetchall()]
 
-            if not user[4]:  # is_approved
-                flash('Ihr Account wurde noch nicht von einem Administrator freigeschaltet.', 'error')
-                return render_template('login.html')
 
-            session['user_id'] = user[0]
-            session['user_name'] = user[1]
-            session['is_admin'] = user[5]
+def hashtag_bedingung(hashtags, modus):
+    """Exakter Hashtag-Filter über den Index: alle Hashtags (UND) oder eines (ODER)"""
+    platzhalter = ','.join('?' for _ in hashtags)
+    bedingung = f'''
+                 AND p.id IN (SELECT ph.protokoll_id
+                              FROM protokoll_hashtags ph
+                                       JOIN hashtags h ON ph.hashtag_id = h.id
+                              WHERE h.name IN ({platzhalter})'''
+    params = list(hashtags)
 
-            flash(f'Willkommen zurück, {user[1]}!', 'success')
-            return redirect(url_for('dashboard'))
-        else:
-            flash('Ungültige Anmeldedaten.', 'error')
+    if modus == 'alle' and len(hashtags) > 1:
+        bedingung += ' GROUP BY ph.protokoll_id HAVING COUNT(*) = ?'
+        params.append(len(hashtags))
 
-    return render_template('login.html')
+    return bedingung + ')', params
 
 
-@app.route('/logout')
-def logout():
-    """Benutzerabmeldung"""
-    session.clear()
-    flash('Sie wurden erfolgreich abgemeldet.', 'info')
-    return redirect(url_for('index'))
+# Berechtigungs-Cache: user_id -> (Generation, gültig bis, (is_admin, is_approved))
+BERECHTIGUNGEN_TTL = 30  # Sekunden; begrenzt die Verzögerung in anderen Prozessen
 
+_berechtigungen = {}
+_berechtigungen_generation = 0
+_berechtigungen_lock = threading.Lock()
 
-@app.route('/dashboard')
-@login_required
-def dashboard():
-    """Dashboard"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
 
-    # Statistiken abrufen
-    c.execute('SELECT COUNT(*) FROM protokolle WHERE user_id = ?', (session['user_id'],))
-    meine_protokolle = c.fetchone()[0]
+def berechtigungen(user_id):
+    """(is_admin, is_approved) eines Benutzers, None wenn er nicht mehr existiert"""
+    jetzt = time.monotonic()
+    with _berechtigungen_lock:
+        generation = _berechtigungen_generation
+        eintrag = _berechtigungen.get(user_id)
 
-    c.execute('SELECT COUNT(*) FROM protokolle')
-    gesamt_protokolle = c.fetchone()[0]
+    if eintrag and eintrag[0] == generation and eintrag[1] > jetzt:
+        return eintrag[2]
 
-    c.execute('SELECT COUNT(*) FROM pruefer')
-    anzahl_pruefer = c.fetchone()[0]
+    c = get_db().cursor()
+    c.execute('SELECT is_admin, is_approved FROM users WHERE id = ?', (user_id,))
+    user = c.fetchone()
+    rechte = (bool(user[0]), bool(user[1])) if user else None
 
-    # Neueste Protokolle
-    c.execute('''
-              SELECT p.datum, p.bundesland, pr1.name, p.hashtags, p.created_at
-              FROM protokolle p
-                       JOIN pruefer pr1 ON p.pruefer1_id = pr1.id
-              ORDER BY p.created_at DESC LIMIT 5
-              ''')
-    neueste_protokolle = c.fetchall()
+    with _berechtigungen_lock:
+        # Wurde während der Abfrage invalidiert, ist das Ergebnis evtl. schon veraltet
+        if generation == _berechtigungen_generation:
+            _berechtigungen[user_id] = (generation, jetzt + BERECHTIGUNGEN_TTL, rechte)
 
-    conn.close()
+    return rechte
 
-    return render_template('dashboard.html',
-                           meine_protokolle=meine_protokolle,
-                           gesamt_protokolle=gesamt_protokolle,
-                           anzahl_pruefer=anzahl_pruefer,
-                           neueste_protokolle=neueste_protokolle)
 
+def berechtigungen_invalidieren():
+    """Nach Änderungen an is_admin/is_approved oder gelöschten Benutzern aufrufen"""
+    global _berechtigungen_generation
+    with _berechtigungen_lock:
+        _berechtigungen_generation += 1
+        _berechtigungen.clear()
 
-@app.route('/protokolle')
-@login_required
-def protokolle():
-    """Protokoll-Übersicht mit Admin-Features"""
-    bundesland_filter = request.args.get('bundesland', '')
-    pruefer_filter = request.args.get('pruefer', '')
-    hashtag_filter = request.args.get('hashtag', '')
 
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+def login_required(f):
+    """Decorator für Login-Pflicht"""
 
-    # Basis-Query
-    query = '''
-            SELECT p.id, \
-                   p.datum, \
-                   p.bundesland, \
-                   pr1.name as pruefer1, \
-                   pr2.name as pruefer2,
-                   pr3.name as pruefer3, \
-                   p.hashtags, \
-                   p.inhalt, \
-                   p.kommentar, \
-                   u.name   as user_name,
-                   p.user_id
-            FROM protokolle p
-                     JOIN pruefer pr1 ON p.pruefer1_id = pr1.id
-                     JOIN pruefer pr2 ON p.pruefer2_id = pr2.id
-                     JOIN pruefer pr3 ON p.pruefer3_id = pr3.id
-                     JOIN users u ON p.user_id = u.id
-            WHERE 1 = 1 \
-            '''
-
-    params = []
-
-    if bundesland_filter:
-        query += ' AND p.bundesland = ?'
-        params.append(bundesland_filter)
-
-    if pruefer_filter:
-        query += ' AND (pr1.name LIKE ? OR pr2.name LIKE ? OR pr3.name LIKE ?)'
-        params.extend([f'%{pruefer_filter}%'] * 3)
-
-    if hashtag_filter:
-        query += ' AND p.hashtags LIKE ?'
-        params.append(f'%{hashtag_filter}%')
-
-    query += ' ORDER BY p.created_at DESC'
-
-    c.execute(query, params)
-    protokoll_liste = c.fetchall()
-
-    # Prüfer für Filter laden
-    c.execute('SELECT DISTINCT name FROM pruefer ORDER BY name')
-    alle_pruefer = [row[0] for row in c.fetchall()]
-
-    # Prüfen ob aktueller Benutzer Admin ist
-    is_admin = session.get('is_admin', False)
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('auth.login'))
 
-    conn.close()
+        rechte = berechtigungen(session['user_id'])
+        if not rechte or not rechte[1]:
+            session.clear()
+            flash('Ihr Account ist gesperrt oder existiert nicht mehr.', 'error')
+            return redirect(url_for('auth.login'))
 
-    return render_template('protokolle.html',
-                           protokolle=protokoll_liste,
-                           bundeslaender=BUNDESLAENDER,
-                           alle_pruefer=alle_pruefer,
-                           predefined_hashtags=PREDEFINED_HASHTAGS,
-                           bundesland_filter=bundesland_filter,
-                           pruefer_filter=pruefer_filter,
-                           hashtag_filter=hashtag_filter,
-                           is_admin=is_admin)
-
-
-@app.route('/protokoll/neu', methods=['GET', 'POST'])
-@login_required
-def neues_protokoll():
-    """Neues Protokoll erstellen"""
-    if request.method == 'POST':
-        datum = request.form.get('datum')
-        bundesland = request.form.get('bundesland')
-        pruefer1_id = request.form.get('pruefer1')
-        pruefer2_id = request.form.get('pruefer2')
-        pruefer3_id = request.form.get('pruefer3')
-        inhalt = request.form.get('inhalt')
-        hashtags = request.form.get('hashtags')
-        kommentar = request.form.get('kommentar', '')
-
-        # Validierung
-        if not all([datum, bundesland, pruefer1_id, pruefer2_id, pruefer3_id, inhalt]):
-            flash('Alle Pflichtfelder müssen ausgefüllt werden.', 'error')
-            return redirect(url_for('neues_protokoll'))
-
-        # Prüfen ob Prüfer existieren
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-
-        for pruefer_id in [pruefer1_id, pruefer2_id, pruefer3_id]:
-            c.execute('SELECT COUNT(*) FROM pruefer WHERE id = ?', (pruefer_id,))
-            if c.fetchone()[0] == 0:
-                flash('Ungültiger Prüfer ausgewählt.', 'error')
-                conn.close()
-                return redirect(url_for('neues_protokoll'))
-
-        # Protokoll speichern
-        c.execute('''
-                  INSERT INTO protokolle (user_id, datum, bundesland, pruefer1_id, pruefer2_id,
-                                          pruefer3_id, inhalt, hashtags, kommentar)
-                  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                  ''', (session['user_id'], datum, bundesland, pruefer1_id, pruefer2_id,
-                        pruefer3_id, inhalt, hashtags, kommentar))
+        if session.get('is_admin') != rechte[0]:
+            session['is_admin'] = rechte[0]
+        return f(*args, **kwargs)
 
-        # Erinnerung als erledigt markieren (falls vorhanden)
-        c.execute('''
-                  UPDATE erinnerungen
-                  SET protokoll_erstellt = TRUE
-                  WHERE user_id = ?
-                    AND protokoll_erstellt = FALSE
-                  ''', (session['user_id'],))
+    return decorated_function
 
-        conn.commit()
-        conn.close()
 
-        flash('Protokoll erfolgreich erstellt!', 'success')
-        return redirect(url_for('protokolle'))
+def admin_required(f):
+    """Decorator für Admin-Rechte"""
 
-    # Prüfer nach Bundesland laden
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT id, name, bundesland FROM pruefer ORDER BY bundesland, name')
-    alle_pruefer = c.fetchall()
-    conn.close()
+    @wraps(f)
+    @login_required
+    def decorated_function(*args, **kwargs):
+        if not session['is_admin']:
+            flash('Keine Berechtigung für diese Seite.', 'error')
+            return redirect(url_for('protokolle.dashboard'))
 
-    # Prüfer nach Bundesland gruppieren
-    pruefer_nach_bundesland = {}
-    for pruefer in alle_pruefer:
-        if pruefer[2] not in pruefer_nach_bundesland:
-            pruefer_nach_bundesland[pruefer[2]] = []
-        pruefer_nach_bundesland[pruefer[2]].append({'id': pruefer[0], 'name': pruefer[1]})
+        return f(*args, **kwargs)
 
-    return render_template('neues_protokoll.html',
-                           bundeslaender=BUNDESLAENDER,
-                           pruefer_nach_bundesland=pruefer_nach_bundesland,
-                           predefined_hashtags=PREDEFINED_HASHTAGS)
+    return decorated_function
 
 
-@app.route('/admin/protokoll/<int:protokoll_id>')
-@admin_required
-def admin_protokoll_details(protokoll_id):
-    """Admin-Ansicht für Protokoll-Details"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+# Antwort-Cache für die Listen: 'speicher' (LRU im Prozess), 'redis://host:port/db' oder 'aus'
+ANTWORT_CACHE = os.environ.get('ANTWORT_CACHE', 'speicher')
+ANTWORT_CACHE_BYTES = 32 * 1024 * 1024  # Budget des Speicher-Caches
+ANTWORT_CACHE_TTL = 600  # Sekunden; Redis-Einträge alter Generationen laufen so aus
+
+
+class SpeicherCache:
+    """LRU im Prozess, begrenzt durch die Gesamtgröße der gespeicherten Antworten"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.eintraege = OrderedDict()
+        self.lock = threading.Lock()
+
+    def holen(self, schluessel):
+        with self.lock:
+            daten = self.eintraege.get(schluessel)
+            if daten is not None:
+                self.eintraege.move_to_end(schluessel)
+            return daten
+
+    def speichern(self, schluessel, daten):
+        if len(daten) > self.max_bytes:
+            return
+        with self.lock:
+            alt = self.eintraege.pop(schluessel, None)
+            if alt is not None:
+                self.bytes -= len(alt)
+            self.eintraege[schluessel] = daten
+            self.bytes += len(daten)
+            while self.bytes > self.max_bytes:
+                _, entfernt = self.eintraege.popitem(last=False)
+                self.bytes -= len(entfernt)
+
+    def groesse(self):
+        return {'eintraege': len(self.eintraege), 'bytes': self.bytes}
+
+
+class RedisCache:
+    """Minimaler Client für das Redis-Protokoll (RESP), geteilt von mehreren Knoten
+
+    Fehler der Verbindung werden wie Fehlschläge behandelt; die Seite wird dann
+    normal gerendert.
+    """
+
+    def __init__(self, url, ttl):
+        teile = urlparse(url)
+        self.adresse = (teile.hostname or 'localhost', teile.port or 6379)
+        self.datenbank = int(teile.path.lstrip('/') or 0)
+        self.passwort = teile.password
+        self.ttl = ttl
+        self.lokal = threading.local()
+
+    def _verbindung(self):
+        verbindung = getattr(self.lokal, 'verbindung', None)
+        if verbindung is None:
+            sock = socket.create_connection(self.adresse, timeout=0.5)
+            verbindung = (sock, sock.makefile('rb'))
+            self.lokal.verbindung = verbindung
+            if self.passwort:
+                self._befehl('AUTH', self.passwort)
+            if self.datenbank:
+                self._befehl('SELECT', str(self.datenbank))
+        return verbindung
+
+    def _befehl(self, *teile):
+        sock, datei = self._verbindung()
+        befehl = [f'*{len(teile)}\r\n'.encode()]
+        for teil in teile:
+            teil = teil if isinstance(teil, bytes) else str(teil).encode()
+            befehl.append(f'${len(teil)}\r\n'.encode() + teil + b'\r\n')
+        sock.sendall(b''.join(befehl))
+        return self._antwort(datei)
+
+    def _antwort(self, datei):
+        zeile = datei.readline()
+        if not zeile:
+            raise ConnectionError('Redis-Verbindung geschlossen')
+        art, inhalt = zeile[:1], zeile[1:-2]
+        if art == b'-':
+            raise RuntimeError(inhalt.decode())
+        if art == b'$':
+            laenge = int(inhalt)
+            return None if laenge < 0 else datei.read(laenge + 2)[:-2]
+        return inhalt  # +OK, :Zahl
+
+    def _trennen(self):
+        verbindung = getattr(self.lokal, 'verbindung', None)
+        if verbindung is not None:
+            verbindung[0].close()
+            self.lokal.verbindung = None
+
+    def _sicher(self, *teile):
+        # Hat der Server eine gespeicherte Verbindung inzwischen geschlossen (Neustart,
+        # Leerlauf-Timeout), merkt das erst der nächste Befehl: einmal neu verbinden
+        for versuch in range(2):
+            wiederverwendet = getattr(self.lokal, 'verbindung', None) is not None
+            try:
+                return self._befehl(*teile)
+            except Exception as e:
+                self._trennen()
+                if versuch == 0 and wiederverwendet and isinstance(e, ConnectionError):
+                    continue
+                print(f"Redis-Fehler: {e}")
+                return None
+
+    def holen(self, schluessel):
+        return self._sicher('GET', schluessel)
+
+    def speichern(self, schluessel, daten):
+        self._sicher('SET', schluessel, daten, 'EX', self.ttl)
+
+    def groesse(self):
+        return {'adresse': '%s:%s' % self.adresse}
+
+
+def antwort_cache_erstellen(einstellung):
+    if einstellung == 'aus':
+        return None
+    if einstellung.startswith('redis://'):
+        return RedisCache(einstellung, ANTWORT_CACHE_TTL)
+    return SpeicherCache(ANTWORT_CACHE_BYTES)
+
+
+antwort_cache_speicher = antwort_cache_erstellen(ANTWORT_CACHE)
+antwort_cache_zaehler = {'treffer': 0, 'fehlschlaege': 0, 'umgangen': 0}
+_antwort_cache_lock = threading.Lock()
+
+
+def _antwort_cache_zaehlen(art):
+    with _antwort_cache_lock:
+        antwort_cache_zaehler[art] += 1
+
+
+def daten_generation():
+    """Wird per Trigger bei jeder Änderung an Protokollen, Prüfern, Benutzern und Hashtags erhöht"""
+    c = get_db().cursor()
+    c.execute('SELECT wert FROM daten_generation WHERE id = 1')
+    return c.fetchone()[0]
+
+
+def antwort_cache_statistik():
+    """Treffer, Fehlschläge und Größe des Antwort-Caches in diesem Prozess"""
+    groesse = antwort_cache_speicher.groesse() if antwort_cache_speicher is not None else {}
+    return dict(backend=ANTWORT_CACHE, generation=daten_generation(), **antwort_cache_zaehler, **groesse)
+
+
+def antwort_cache(f):
+    """Decorator: ganze HTML-Antwort je Route, Rolle und Filter zwischenspeichern
+
+    Der Schlüssel enthält die aktuelle Datengeneration, jede Änderung macht also
+    alle bisherigen Einträge ungültig. Nach login_required/admin_required verwenden.
+    """
 
-    # Protokoll-Informationen mit allen Details
-    c.execute('''
-              SELECT p.id,
-                     p.datum,
-                     p.bundesland,
-                     p.inhalt,
-                     p.hashtags,
-                     p.kommentar,
-                     p.created_at,
-                     u.id,
-                     u.name,
-                     u.email,
-                     pr1.id,
-                     pr1.name,
-                     pr1.bundesland,
-                     pr2.id,
-                     pr2.name,
-                     pr2.bundesland,
-                     pr3.id,
-                     pr3.name,
-                     pr3.bundesland
-              FROM protokolle p
-                       JOIN users u ON p.user_id = u.id
-                       JOIN pruefer pr1 ON p.pruefer1_id = pr1.id
-                       JOIN pruefer pr2 ON p.pruefer2_id = pr2.id
-                       JOIN pruefer pr3 ON p.pruefer3_id = pr3.id
-              WHERE p.id = ?
-              ''', (protokoll_id,))
-
-    protokoll_data = c.fetchone()
-
-    if not protokoll_data:
-        flash('Protokoll nicht gefunden.', 'error')
-        conn.close()
-        return redirect(url_for('protokolle'))
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Seiten mit Flash-Meldungen sind persönlich und werden nie gespeichert
+        if antwort_cache_speicher is None or '_flashes' in session:
+            _antwort_cache_zaehlen('umgangen')
+            return f(*args, **kwargs)
+
+        rolle = 'admin' if session.get('is_admin') else 'benutzer'
+        filter_ = urlencode(sorted((k, v) for k, v in request.args.items(multi=True) if v != ''))
+        schluessel = f'antwort:{daten_generation()}:{request.endpoint}:{rolle}:{filter_}'
+
+        daten = antwort_cache_speicher.holen(schluessel)
+        if daten is not None:
+            _antwort_cache_zaehlen('treffer')
+            antwort = current_app.response_class(daten, mimetype='text/html')
+            antwort.headers['X-Cache'] = 'HIT'
+            return antwort
+
+        _antwort_cache_zaehlen('fehlschlaege')
+        antwort = current_app.make_response(f(*args, **kwargs))
+        # Geänderte Session (z. B. gerade angezeigte Flash-Meldungen) = persönliche Seite
+        if antwort.status_code == 200 and not session.modified:
+            antwort_cache_speicher.speichern(schluessel, antwort.get_data())
+        antwort.headers['X-Cache'] = 'MISS'
+        return antwort
 
-    # Alle Prüfer für Bearbeitung laden
-    c.execute('SELECT id, name, bundesland FROM pruefer ORDER BY bundesland, name')
-    alle_pruefer = c.fetchall()
+    return decorated_function
 
-    conn.close()
 
-    protokoll_info = {
-        'id': protokoll_data[0],
-        'datum': protokoll_data[1],
-        'bundesland': protokoll_data[2],
-        'inhalt': protokoll_data[3],
-        'hashtags': protokoll_data[4],
-        'kommentar': protokoll_data[5],
-        'created_at': protokoll_data[6],
-        'user': {
-            'id': protokoll_data[7],
-            'name': protokoll_data[8],
-            'email': protokoll_data[9]
-        },
-        'pruefer1': {
-            'id': protokoll_data[10],
-            'name': protokoll_data[11],
-            'bundesland': protokoll_data[12]
-        },
-        'pruefer2': {
-            'id': protokoll_data[13],
-            'name': protokoll_data[14],
-            'bundesland': protokoll_data[15]
-        },
-        'pruefer3': {
-            'id': protokoll_data[16],
-            'name': protokoll_data[17],
-            'bundesland': protokoll_data[18]
-        }
-    }
+# E-Mail-Outbox: Anfragen reihen E-Mails nur ein, Worker-Threads stellen sie zu
+MAIL_WORKER = 2  # Threads pro Prozess, jeder mit eigener SMTP-Verbindung
+MAIL_BATCH = 20  # E-Mails, die ein Worker auf einmal übernimmt
+MAIL_MAX_VERSUCHE = 6  # danach Status 'fehlgeschlagen'
+MAIL_BACKOFF_BASIS = 60  # Sekunden bis zum 2. Versuch, verdoppelt sich danach
+MAIL_BACKOFF_MAX = 6 * 3600
+MAIL_LEASE = 120  # Sekunden; vor jedem Senden verlängert, nach einem Absturz wieder frei
+MAIL_ABFRAGE = 5  # Sekunden zwischen zwei Blicken in die Outbox, wenn kein Signal kommt
+MAIL_LEERLAUF = 60  # Sekunden ohne E-Mail, nach denen die SMTP-Verbindung geschlossen wird
+MAIL_AUFBEWAHRUNG = 30  # Tage, die zugestellte E-Mails in der Outbox bleiben
 
-    # Prüfer nach Bundesland gruppieren
-    pruefer_nach_bundesland = {}
-    for pruefer in alle_pruefer:
-        if pruefer[2] not in pruefer_nach_bundesland:
-            pruefer_nach_bundesland[pruefer[2]] = []
-        pruefer_nach_bundesland[pruefer[2]].append({'id': pruefer[0], 'name': pruefer[1]})
-
-    return render_template('admin/protokoll_details.html',
-                           protokoll=protokoll_info,
-                           bundeslaender=BUNDESLAENDER,
-                           pruefer_nach_bundesland=pruefer_nach_bundesland,
-                           predefined_hashtags=PREDEFINED_HASHTAGS)
-
-
-@app.route('/admin/protokoll/<int:protokoll_id>/bearbeiten', methods=['GET', 'POST'])
-@admin_required
-def admin_protokoll_bearbeiten(protokoll_id):
-    """Protokoll als Admin bearbeiten"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+_mail_signal = threading.Event()
+_mail_worker = []
+_mail_worker_pid = None
+_mail_worker_lock = threading.Lock()
 
-    if request.method == 'GET':
-        # Protokoll-Daten für Bearbeitung laden
-        c.execute('''
-                  SELECT p.id,
-                         p.datum,
-                         p.bundesland,
-                         p.pruefer1_id,
-                         p.pruefer2_id,
-                         p.pruefer3_id,
-                         p.inhalt,
-                         p.hashtags,
-                         p.kommentar,
-                         p.created_at,
-                         u.name
-                  FROM protokolle p
-                           JOIN users u ON p.user_id = u.id
-                  WHERE p.id = ?
-                  ''', (protokoll_id,))
-
-        protokoll_data = c.fetchone()
-
-        if not protokoll_data:
-            flash('Protokoll nicht gefunden.', 'error')
-            conn.close()
-            return redirect(url_for('protokolle'))
-
-        # Alle Prüfer laden
-        c.execute('SELECT id, name, bundesland FROM pruefer ORDER BY bundesland, name')
-        alle_pruefer = c.fetchall()
 
-        conn.close()
+def send_email(to_email, subject, body, conn=None):
+    """E-Mail in die Outbox einreihen
 
-        protokoll_info = {
-            'id': protokoll_data[0],
-            'datum': protokoll_data[1],
-            'bundesland': protokoll_data[2],
-            'pruefer1_id': protokoll_data[3],
-            'pruefer2_id': protokoll_data[4],
-            'pruefer3_id': protokoll_data[5],
-            'inhalt': protokoll_data[6],
-            'hashtags': protokoll_data[7],
-            'kommentar': protokoll_data[8],
-            'created_at': protokoll_data[9],
-            'user_name': protokoll_data[10]
-        }
-
-        # Prüfer nach Bundesland gruppieren
-        pruefer_nach_bundesland = {}
-        for pruefer in alle_pruefer:
-            if pruefer[2] not in pruefer_nach_bundesland:
-                pruefer_nach_bundesland[pruefer[2]] = []
-            pruefer_nach_bundesland[pruefer[2]].append({'id': pruefer[0], 'name': pruefer[1]})
-
-        return render_template('admin/protokoll_bearbeiten.html',
-                               protokoll=protokoll_info,
-                               bundeslaender=BUNDESLAENDER,
-                               pruefer_nach_bundesland=pruefer_nach_bundesland,
-                               predefined_hashtags=PREDEFINED_HASHTAGS)
-
-    # POST Request - Protokoll aktualisieren
-    datum = request.form.get('datum', '').strip()
-    bundesland = request.form.get('bundesland', '').strip()
-    pruefer1_id = request.form.get('pruefer1', '').strip()
-    pruefer2_id = request.form.get('pruefer2', '').strip()
-    pruefer3_id = request.form.get('pruefer3', '').strip()
-    inhalt = request.form.get('inhalt', '').strip()
-    hashtags = request.form.get('hashtags', '').strip()
-    kommentar = request.form.get('kommentar', '').strip()
-    admin_notiz = request.form.get('admin_notiz', '').strip()
-
-    # Validierung
-    errors = []
-
-    if not datum:
-        errors.append('Datum ist erforderlich.')
-
-    if not bundesland or bundesland not in BUNDESLAENDER:
-        errors.append('Gültiges Bundesland ist erforderlich.')
-
-    if not pruefer1_id or not pruefer2_id or not pruefer3_id:
-        errors.append('Alle drei Prüfer müssen ausgewählt werden.')
-
-    if not inhalt:
-        errors.append('Prüfungsinhalt ist erforderlich.')
-    elif len(inhalt) < 10:
-        errors.append('Prüfungsinhalt muss mindestens 10 Zeichen lang sein.')
-
-    # Prüfer-IDs validieren
-    try:
-        pruefer_ids = [int(pruefer1_id), int(pruefer2_id), int(pruefer3_id)]
-        if len(set(pruefer_ids)) != 3:
-            errors.append('Alle drei Prüfer müssen unterschiedlich sein.')
-
-        # Prüfen ob Prüfer existieren
-        for pruefer_id in pruefer_ids:
-            c.execute('SELECT COUNT(*) FROM pruefer WHERE id = ?', (pruefer_id,))
-            if c.fetchone()[0] == 0:
-                errors.append(f'Prüfer mit ID {pruefer_id} existiert nicht.')
-    except ValueError:
-        errors.append('Ungültige Prüfer-IDs.')
-
-    if errors:
-        for error in errors:
-            flash(error, 'error')
-        conn.close()
-        return redirect(url_for('admin_protokoll_bearbeiten', protokoll_id=protokoll_id))
+    Ohne conn wird über die Verbindung der Anfrage sofort committet, mit conn
+    wird die E-Mail Teil der laufenden Transaktion des Aufrufers, der nach dem
+    Commit email_worker_wecken() aufruft.
+    """
+    eigene_transaktion = conn is None
+    if eigene_transaktion:
+        conn = get_db()
 
-    # Protokoll aktualisieren - KORRIGIERT
     try:
-        c.execute('''
-                  UPDATE protokolle
-                  SET datum       = ?,
-                      bundesland  = ?,
-                      pruefer1_id = ?,
-                      pruefer2_id = ?,
-                      pruefer3_id = ?,
-                      inhalt      = ?,
-                      hashtags    = ?,
-                      kommentar   = ?
-                  WHERE id = ?
-                  ''', (datum, bundesland, int(pruefer1_id), int(pruefer2_id), int(pruefer3_id),
-                        inhalt, hashtags, kommentar, protokoll_id))
-
-        # Admin-Bearbeitung protokollieren
-        c.execute('''
-                  CREATE TABLE IF NOT EXISTS admin_logs
-                  (
-                      id
-                      INTEGER
-                      PRIMARY
-                      KEY
-                      AUTOINCREMENT,
-                      admin_user_id
-                      INTEGER
-                      NOT
-                      NULL,
-                      action_type
-                      TEXT
-                      NOT
-                      NULL,
-                      target_type
-                      TEXT
-                      NOT
-                      NULL,
-                      target_id
-                      INTEGER
-                      NOT
-                      NULL,
-                      description
-                      TEXT,
-                      admin_notiz
-                      TEXT,
-                      created_at
-                      TIMESTAMP
-                      DEFAULT
-                      CURRENT_TIMESTAMP,
-                      FOREIGN
-                      KEY
-                  (
-                      admin_user_id
-                  ) REFERENCES users
-                  (
-                      id
-                  )
-                      )
-                  ''')
-
-        # Log-Eintrag erstellen
-        log_description = f"Protokoll #{protokoll_id} bearbeitet"
-        c.execute('''
-                  INSERT INTO admin_logs (admin_user_id, action_type, target_type, target_id, description, admin_notiz)
-                  VALUES (?, ?, ?, ?, ?, ?)
-                  ''', (session['user_id'], 'edit', 'protokoll', protokoll_id, log_description, admin_notiz))
-
-        conn.commit()
-
-        # Benachrichtigung an ursprünglichen Autor
-        if admin_notiz:
-            c.execute('''
-                      SELECT u.email, u.name
-                      FROM protokolle p
-                               JOIN users u ON p.user_id = u.id
-                      WHERE p.id = ?
-                      ''', (protokoll_id,))
-
-            user_data = c.fetchone()
-            if user_data:
-                subject = "Ihr Protokoll wurde von einem Administrator bearbeitet"
-                body = f"""
-                <html>
-                <body>
-                    <h2>Protokoll bearbeitet</h2>
-                    <p>Hallo {user_data[1]},</p>
-                    <p>Ihr Protokoll vom {datum} wurde von einem Administrator bearbeitet.</p>
-
-                    {f'<p><strong>Administratoren-Notiz:</strong><br>{admin_notiz}</p>' if admin_notiz else ''}
-
-                    <p>Sie können das aktualisierte Protokoll in Ihrem Dashboard einsehen.</p>
-
-                    <p><a href="{url_for('protokolle', _external=True)}" 
-                       style="background-color: #3FA357; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">
-                       Protokoll ansehen
-                    </a></p>
-                </body>
-                </html>
-                """
-
-                send_email(user_data[0], subject, body)
-
-        flash('Protokoll wurde erfolgreich aktualisiert.', 'success')
-
+        conn.execute('''
+                     INSERT INTO email_outbox (empfaenger, betreff, inhalt, naechster_versuch)
+                     VALUES (?, ?, ?, ?)
+                     ''', (to_email, subject, body, datetime.now()))
+        if eigene_transaktion:
+            conn.commit()
     except Exception as e:
-        conn.rollback()
-        flash('Fehler beim Aktualisieren des Protokolls.', 'error')
-        print(f"Protokoll-Update Fehler: {e}")
-    finally:
-        conn.close()
-
-    return redirect(url_for('admin_protokoll_details', protokoll_id=protokoll_id))
-@app.route('/admin/protokoll/<int:protokoll_id>/loeschen', methods=['POST'])
-@admin_required
-def admin_protokoll_loeschen(protokoll_id):
-    """Protokoll als Admin löschen"""
-    admin_grund = request.form.get('grund', '').strip()
+        if eigene_transaktion:
+            conn.rollback()
+        print(f"E-Mail-Fehler: {e}")
+        metriken.zaehlen('smtp_einreihen_fehler_total')
+        return False
 
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+    metriken.zaehlen('smtp_eingereiht_total')
+    if eigene_transaktion:
+        email_worker_wecken()
+    return True
+
+
+class SmtpVerbindung:
+    """SMTP-Verbindung eines Workers, wird über mehrere E-Mails hinweg offen gehalten"""
+
+    def __init__(self, konfiguration):
+        self.konfiguration = konfiguration
+        self.server = None
+        self.zuletzt_benutzt = 0
+
+    def oeffnen(self):
+        import smtplib
+
+        server = smtplib.SMTP(self.konfiguration['MAIL_SERVER'], self.konfiguration['MAIL_PORT'], timeout=30)
+        if self.konfiguration['MAIL_USE_TLS']:
+            server.starttls()
+        if self.konfiguration['MAIL_PASSWORD']:
+            server.login(self.konfiguration['MAIL_USERNAME'], self.konfiguration['MAIL_PASSWORD'])
+        self.server = server
+
+    def schliessen(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+    def senden(self, empfaenger, betreff, inhalt):
+        import smtplib
+        from email.header import Header
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        from email.policy import compat32
 
-    # Protokoll-Informationen für Benachrichtigung abrufen
-    c.execute('''
-              SELECT p.datum, u.email, u.name
-              FROM protokolle p
-                       JOIN users u ON p.user_id = u.id
-              WHERE p.id = ?
-              ''', (protokoll_id,))
+        msg = MIMEMultipart()
+        msg['From'] = self.konfiguration['MAIL_USERNAME']
+        msg['To'] = empfaenger
+        msg['Subject'] = Header(betreff, 'utf-8')  # Betreffzeilen enthalten Umlaute
+        msg.attach(MIMEText(inhalt, 'html', 'utf-8'))
+        # SMTP verlangt CRLF; smtplib schickt Bytes unverändert, strenge Server weisen nacktes LF ab
+        text = msg.as_bytes(policy=compat32.clone(linesep='\r\n'))
+
+        # Eine vom Server geschlossene Verbindung wird einmal neu aufgebaut
+        for versuch in range(2):
+            if self.server is None:
+                self.oeffnen()
+            try:
+                self.server.sendmail(self.konfiguration['MAIL_USERNAME'], empfaenger, text)
+                self.zuletzt_benutzt = time.monotonic()
+                return
+            except smtplib.SMTPServerDisconnected:
+                self.server = None
+                if versuch:
+                    raise
+            except smtplib.SMTPRecipientsRefused:
+                raise
+            except Exception:
+                self.schliessen()
+                raise
+
+    def leerlauf_pruefen(self):
+        if self.server is not None and time.monotonic() - self.zuletzt_benutzt > MAIL_LEERLAUF:
+            self.schliessen()
+
+
+def lease_inhaber():
+    """Kennung für leased_by: Rechner, Prozess und Thread"""
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'
+
+
+def emails_uebernehmen(conn, inhaber, anzahl=MAIL_BATCH):
+    """Fällige E-Mails per Lease übernehmen
+
+    Das UPDATE ... RETURNING ist atomar, zwei Worker (auch in verschiedenen
+    Prozessen) erhalten also nie dieselbe E-Mail. Abgelaufene Leases eines
+    abgestürzten Workers werden dabei wieder übernommen.
+    """
+    jetzt = datetime.now()
+    mails = conn.execute('''
+                         UPDATE email_outbox
+                         SET leased_by   = ?,
+                             lease_until = ?,
+                             versuche    = versuche + 1
+                         WHERE id IN (SELECT id
+                                      FROM email_outbox
+                                      WHERE status = 'wartend'
+                                        AND naechster_versuch <= ?
+                                        AND (lease_until IS NULL OR lease_until < ?)
+                                      ORDER BY naechster_versuch
+                                      LIMIT ?)
+                         RETURNING id, empfaenger, betreff, inhalt, versuche
+                         ''', (inhaber, jetzt + timedelta(seconds=MAIL_LEASE), jetzt, jetzt, anzahl)).fetchall()
+    conn.commit()
+    return mails
 
-    protokoll_info = c.fetchone()
 
-    if not protokoll_info:
-        flash('Protokoll nicht gefunden.', 'error')
-        conn.close()
-        return redirect(url_for('protokolle'))
+def email_zustellen(conn, verbindung, mail, inhaber):
+    """Eine übernommene E-Mail senden und das Ergebnis in der Outbox vermerken"""
+    mail_id, empfaenger, betreff, inhalt, versuche = mail
 
-    datum, user_email, user_name = protokoll_info
+    # Lease verlängern; hat ein anderer Worker sie inzwischen übernommen, nicht senden
+    verlaengert = conn.execute('''
+                               UPDATE email_outbox
+                               SET lease_until = ?
+                               WHERE id = ? AND leased_by = ?
+                               ''', (datetime.now() + timedelta(seconds=MAIL_LEASE), mail_id, inhaber)).rowcount
+    conn.commit()
+    if not verlaengert:
+        return False
 
     try:
-        # Admin-Log erstellen bevor gelöscht wird
-        c.execute('''
-                  CREATE TABLE IF NOT EXISTS admin_logs
-                  (
-                      id
-                      INTEGER
-                      PRIMARY
-                      KEY
-                      AUTOINCREMENT,
-                      admin_user_id
-                      INTEGER
-                      NOT
-                      NULL,
-                      action_type
-                      TEXT
-                      NOT
-                      NULL,
-                      target_type
-                      TEXT
-                      NOT
-                      NULL,
-                      target_id
-                      INTEGER
-                      NOT
-                      NULL,
-                      description
-                      TEXT,
-                      admin_notiz
-                      TEXT,
-                      created_at
-                      TIMESTAMP
-                      DEFAULT
-                      CURRENT_TIMESTAMP,
-                      FOREIGN
-                      KEY
-                  (
-                      admin_user_id
-                  ) REFERENCES users
-                  (
-                      id
-                  )
-                      )
-                  ''')
-
-        log_description = f"Protokoll #{protokoll_id} vom {datum} gelöscht"
-        c.execute('''
-                  INSERT INTO admin_logs (admin_user_id, action_type, target_type, target_id, description, admin_notiz)
-                  VALUES (?, ?, ?, ?, ?, ?)
-                  ''', (session['user_id'], 'delete', 'protokoll', protokoll_id, log_description, admin_grund))
-
-        # Protokoll löschen
-        c.execute('DELETE FROM protokolle WHERE id = ?', (protokoll_id,))
-
-        conn.commit()
-
-        # Benachrichtigung an ursprünglichen Autor
-        if admin_grund:
-            subject = "Ihr Protokoll wurde von einem Administrator entfernt"
-            body = f"""
-            <html>
-            <body>
-                <h2>Protokoll entfernt</h2>
-                <p>Hallo {user_name},</p>
-                <p>Ihr Protokoll vom {datum} wurde von einem Administrator entfernt.</p>
-
-                <p><strong>Grund:</strong><br>{admin_grund}</p>
-
-                <p>Bei Fragen wenden Sie sich an einen Administrator.</p>
-            </body>
-            </html>
-            """
-
-            send_email(user_email, subject, body)
-
-        flash('Protokoll wurde gelöscht.', 'success')
-
+        verbindung.senden(empfaenger, betreff, inhalt)
     except Exception as e:
-        conn.rollback()
-        flash('Fehler beim Löschen des Protokolls.', 'error')
-        print(f"Protokoll-Löschung Fehler: {e}")
-    finally:
-        conn.close()
-
-    return redirect(url_for('protokolle'))
-
-
-@app.route('/admin/protokolle')
-@admin_required
-def admin_protokolle():
-    """Admin-Übersicht aller Protokolle"""
-    # Filter-Parameter
-    bundesland_filter = request.args.get('bundesland', '')
-    pruefer_filter = request.args.get('pruefer', '')
-    hashtag_filter = request.args.get('hashtag', '')
-    user_filter = request.args.get('user', '')
-    datum_von = request.args.get('datum_von', '')
-    datum_bis = request.args.get('datum_bis', '')
-    sort_by = request.args.get('sort', 'created_at')
-    sort_order = request.args.get('order', 'desc')
-
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+        print(f"E-Mail-Fehler ({empfaenger}, Versuch {versuche}): {e}")
+        metriken.zaehlen('smtp_fehler_total')
+        # Vom Server endgültig abgewiesene Empfänger (5xx) nicht erneut versuchen
+        import smtplib
+        abgewiesen = (isinstance(e, smtplib.SMTPRecipientsRefused)
+                      and all(code >= 500 for code, _ in e.recipients.values()))
+        if versuche >= MAIL_MAX_VERSUCHE or abgewiesen:
+            conn.execute('''
+                         UPDATE email_outbox
+                         SET status = 'fehlgeschlagen', letzter_fehler = ?, leased_by = NULL, lease_until = NULL
+                         WHERE id = ? AND leased_by = ?
+                         ''', (str(e), mail_id, inhaber))
+        else:
+            wartezeit = min(MAIL_BACKOFF_MAX, MAIL_BACKOFF_BASIS * 2 ** (versuche - 1))
+            conn.execute('''
+                         UPDATE email_outbox
+                         SET naechster_versuch = ?, letzter_fehler = ?, leased_by = NULL, lease_until = NULL
+                         WHERE id = ? AND leased_by = ?
+                         ''', (datetime.now() + timedelta(seconds=wartezeit), str(e), mail_id, inhaber))
+        conn.commit()
+        return False
 
-    # Erweiterte Query für Admin-Ansicht
-    query = '''
-            SELECT p.id, \
-                   p.datum, \
-                   p.bundesland, \
-                   pr1.name as pruefer1, \
-                   pr2.name as pruefer2,
-                   pr3.name as pruefer3, \
-                   p.hashtags, \
-                   p.inhalt, \
-                   p.kommentar, \
-                   u.name   as user_name,
-                   p.created_at, \
-                   u.id     as user_id
-            FROM protokolle p
-                     JOIN pruefer pr1 ON p.pruefer1_id = pr1.id
-                     JOIN pruefer pr2 ON p.pruefer2_id = pr2.id
-                     JOIN pruefer pr3 ON p.pruefer3_id = pr3.id
-                     JOIN users u ON p.user_id = u.id
-            WHERE 1 = 1 \
-            '''
-
-    params = []
-
-    # Filter anwenden
-    if bundesland_filter:
-        query += ' AND p.bundesland = ?'
-        params.append(bundesland_filter)
-
-    if pruefer_filter:
-        query += ' AND (pr1.name LIKE ? OR pr2.name LIKE ? OR pr3.name LIKE ?)'
-        params.extend([f'%{pruefer_filter}%'] * 3)
-
-    if hashtag_filter:
-        query += ' AND p.hashtags LIKE ?'
-        params.append(f'%{hashtag_filter}%')
-
-    if user_filter:
-        query += ' AND u.name LIKE ?'
-        params.append(f'%{user_filter}%')
-
-    if datum_von:
-        query += ' AND p.datum >= ?'
-        params.append(datum_von)
-
-    if datum_bis:
-        query += ' AND p.datum <= ?'
-        params.append(datum_bis)
-
-    # Sortierung
-    valid_sorts = {
-        'created_at': 'p.created_at',
-        'datum': 'p.datum',
-        'bundesland': 'p.bundesland',
-        'user_name': 'u.name'
-    }
+    conn.execute('''
+                 UPDATE email_outbox
+                 SET status = 'gesendet', gesendet_at = ?, letzter_fehler = NULL, leased_by = NULL, lease_until = NULL
+                 WHERE id = ? AND leased_by = ?
+                 ''', (datetime.now(), mail_id, inhaber))
+    conn.commit()
+    metriken.zaehlen('smtp_gesendet_total')
+    return True
+
+
+def _mail_wartezeit(conn):
+    """Sekunden bis zur nächsten fälligen E-Mail (höchstens MAIL_ABFRAGE)"""
+    naechste = conn.execute('''
+                            SELECT MIN(naechster_versuch)
+                            FROM email_outbox
+                            WHERE status = 'wartend'
+                              AND lease_until IS NULL
+                            ''').fetchone()[0]
+    if naechste is None:
+        return MAIL_ABFRAGE
+    sekunden = (datetime.fromisoformat(naechste) - datetime.now()).total_seconds()
+    return min(MAIL_ABFRAGE, max(0.1, sekunden))
+
+
+def email_worker():
+    """Outbox abarbeiten, solange der Prozess läuft (im App-Kontext)"""
+    conn = db_connect()
+    verbindung = SmtpVerbindung(current_app.config)
+    inhaber = lease_inhaber()
+    aufgeraeumt = 0
 
-    if sort_by in valid_sorts:
-        order_direction = 'DESC' if sort_order == 'desc' else 'ASC'
-        query += f' ORDER BY {valid_sorts[sort_by]} {order_direction}'
-    else:
-        query += ' ORDER BY p.created_at DESC'
+    while True:
+        try:
+            mails = emails_uebernehmen(conn, inhaber)
+            for mail in mails:
+                email_zustellen(conn, verbindung, mail, inhaber)
+            if mails:
+                continue
+
+            verbindung.leerlauf_pruefen()
+
+            # Zugestellte E-Mails nach Ablauf der Aufbewahrungsfrist entfernen
+            if time.monotonic() - aufgeraeumt > 3600:
+                conn.execute("DELETE FROM email_outbox WHERE status = 'gesendet' AND gesendet_at < ?",
+                             (datetime.now() - timedelta(days=MAIL_AUFBEWAHRUNG),))
+                conn.commit()
+                aufgeraeumt = time.monotonic()
 
-    c.execute(query, params)
-    protokoll_liste = c.fetchall()
+            wartezeit = _mail_wartezeit(conn)
+        except Exception as e:
+            conn.rollback()
+            print(f"E-Mail-Worker Fehler: {e}")
+            wartezeit = MAIL_ABFRAGE
+
+        _mail_signal.wait(wartezeit)
+        _mail_signal.clear()
+
+
+def email_worker_wecken():
+    """Worker nach neu eingereihten E-Mails sofort weiterarbeiten lassen"""
+    if current_app.config['HINTERGRUND_DIENSTE'] == 'web':
+        email_worker_starten(current_app._get_current_object())
+    _mail_signal.set()
+
+
+def im_app_kontext(app, funktion):
+    """Ziel für Hintergrund-Threads: funktion() mit current_app = app ausführen"""
+    with app.app_context():
+        funktion()
+
+
+def email_worker_starten(app):
+    """Worker-Threads einmal pro Prozess starten (auch nach einem Fork)"""
+    global _mail_worker_pid
+    with _mail_worker_lock:
+        if _mail_worker_pid == os.getpid():
+            return
+        _mail_worker_pid = os.getpid()
+        _mail_worker.clear()
+        for nummer in range(MAIL_WORKER):
+            worker = threading.Thread(target=im_app_kontext, args=(app, email_worker),
+                                      name=f'email-worker-{nummer + 1}', daemon=True)
+            worker.start()
+            _mail_worker.append(worker)
+
+
+# Passwort-Hashing: PBKDF2/scrypt laufen in einem kleinen Thread-Pool (hashlib gibt dabei
+# den GIL frei), damit eine Flut von Anmeldeversuchen nicht alle Anfrage-Threads belegt
+PASSWORT_HASH_METHODE = os.environ.get('PASSWORT_HASH_METHODE', 'pbkdf2:sha256:600000')
+PASSWORT_WORKER = int(os.environ.get('PASSWORT_WORKER', max(1, (os.cpu_count() or 2) // 2)))
+# Wartende Hash-Aufträge pro Prozess, darüber wird abgewiesen; Pool + Warteschlange sollte
+# deutlich kleiner sein als die Zahl der Anfrage-Threads, damit Seitenaufrufe frei bleiben
+PASSWORT_WARTESCHLANGE = int(os.environ.get('PASSWORT_WARTESCHLANGE', 4))
+
+
+class PasswortDienstUeberlastet(Exception):
+    """Zu viele Hash-Aufträge stehen bereits an"""
+
+
+class PasswortDienst:
+    """Begrenzter Pool für Hash-Berechnungen, eigene Threads pro Prozess (auch nach einem Fork)"""
+
+    def __init__(self, worker, warteschlange):
+        self.worker = worker
+        self.warteschlange = warteschlange
+        self.pool = None
+        self.pid = None
+        self.lock = threading.Lock()
+        self.dummy_hash = None
+
+    def _pool(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.pool = ThreadPoolExecutor(self.worker, thread_name_prefix='passwort')
+                self.plaetze = threading.BoundedSemaphore(self.worker + self.warteschlange)
+            return self.pool
+
+    def ausfuehren(self, funktion, *args):
+        pool = self._pool()
+        if not self.plaetze.acquire(blocking=False):
+            raise PasswortDienstUeberlastet()
+        try:
+            auftrag = pool.submit(funktion, *args)
+        except BaseException:
+            self.plaetze.release()
+            raise
+        auftrag.add_done_callback(lambda _: self.plaetze.release())
+        return auftrag.result()
 
-    # Statistiken
-    c.execute('SELECT COUNT(*) FROM protokolle')
-    gesamt_protokolle = c.fetchone()[0]
+    def hashen(self, passwort):
+        return self.ausfuehren(generate_password_hash, passwort, PASSWORT_HASH_METHODE)
 
-    c.execute('SELECT COUNT(DISTINCT user_id) FROM protokolle')
-    aktive_autoren = c.fetchone()[0]
+    def pruefen(self, passwort_hash, passwort):
+        """Bei unbekanntem Benutzer (passwort_hash None) gegen einen Dummy-Hash prüfen,
+        damit die Antwortzeit nicht verrät, ob die E-Mail-Adresse existiert"""
+        if passwort_hash is None:
+            if self.dummy_hash is None:
+                self.dummy_hash = self.hashen(secrets.token_urlsafe(16))
+            self.ausfuehren(check_password_hash, self.dummy_hash, passwort)
+            return False
+        return self.ausfuehren(check_password_hash, passwort_hash, passwort)
 
-    c.execute('SELECT COUNT(DISTINCT bundesland) FROM protokolle')
-    bundeslaender_mit_protokollen = c.fetchone()[0]
+    def veraltet(self, passwort_hash):
+        """True, wenn der Hash mit einer anderen Methode oder Rundenzahl erzeugt wurde"""
+        if self.dummy_hash is None:
+            self.dummy_hash = self.hashen(secrets.token_urlsafe(16))
+        return passwort_hash.split('$', 1)[0] != self.dummy_hash.split('$', 1)[0]
 
-    # Prüfer und Benutzer für Filter
-    c.execute('SELECT DISTINCT name FROM pruefer ORDER BY name')
-    alle_pruefer_namen = [row[0] for row in c.fetchall()]
 
-    c.execute('SELECT DISTINCT name FROM users WHERE is_approved = TRUE ORDER BY name')
-    alle_benutzer_namen = [row[0] for row in c.fetchall()]
+passwort_dienst = PasswortDienst(PASSWORT_WORKER, PASSWORT_WARTESCHLANGE)
 
-    conn.close()
 
-    return render_template('admin/protokolle.html',
-                           protokolle=protokoll_liste,
-                           bundeslaender=BUNDESLAENDER,
-                           alle_pruefer_namen=alle_pruefer_namen,
-                           alle_benutzer_namen=alle_benutzer_namen,
-                           predefined_hashtags=PREDEFINED_HASHTAGS,
-                           bundesland_filter=bundesland_filter,
-                           pruefer_filter=pruefer_filter,
-                           hashtag_filter=hashtag_filter,
-                           user_filter=user_filter,
-                           datum_von=datum_von,
-                           datum_bis=datum_bis,
-                           sort_by=sort_by,
-                           sort_order=sort_order,
-                           gesamt_protokolle=gesamt_protokolle,
-                           aktive_autoren=aktive_autoren,
-                           bundeslaender_mit_protokollen=bundeslaender_mit_protokollen)
-
-
-@app.route('/admin/logs')
-@admin_required
-def admin_logs():
-    """Admin-Aktivitätslogs anzeigen"""
-    page = request.args.get('page', 1, type=int)
-    per_page = 50
-
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+def passwort_dienst_ueberlastet(e):
+    """Überlast außerhalb des Logins (Registrierung, Profil): Formular erneut anbieten"""
+    flash('Der Dienst ist gerade ausgelastet. Bitte versuchen Sie es gleich noch einmal.', 'error')
+    return redirect(request.url)
 
-    # Logs mit Admin-Namen abrufen
-    c.execute('''
-              SELECT l.id,
-                     l.action_type,
-                     l.target_type,
-                     l.target_id,
-                     l.description,
-                     l.admin_notiz,
-                     l.created_at,
-                     u.name as admin_name
-              FROM admin_logs l
-                       JOIN users u ON l.admin_user_id = u.id
-              ORDER BY l.created_at DESC LIMIT ?
-              OFFSET ?
-              ''', (per_page, (page - 1) * per_page))
-
-    logs = c.fetchall()
-
-    # Gesamt-Anzahl für Pagination
-    c.execute('SELECT COUNT(*) FROM admin_logs')
-    total_logs = c.fetchone()[0]
 
-    conn.close()
+def geheimen_schluessel_laden(pfad):
+    """Schlüssel aus pfad lesen oder einmalig erzeugen
 
-    return render_template('admin/logs.html',
-                           logs=logs,
-                           page=page,
-                           per_page=per_page,
-                           total_logs=total_logs)
+    Alle Worker und Neustarts benutzen so denselben Schlüssel und damit gültige
+    Sitzungs-Cookies. Gleichzeitig startende Prozesse einigen sich über os.link,
+    das nur gelingt, solange die Datei noch nicht existiert.
+    """
+    try:
+        with open(pfad, encoding='utf-8') as datei:
+            return datei.read().strip()
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(pfad) or '.', exist_ok=True)
+    entwurf = f'{pfad}.{os.getpid()}'
+    with os.fdopen(os.open(entwurf, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as datei:
+        datei.write(secrets.token_hex(32))
+    try:
+        os.link(entwurf, pfad)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(entwurf)
+    with open(pfad, encoding='utf-8') as datei:
+        return datei.read().strip()
+
+
+# Serverseitige Sitzungen (SITZUNGEN=sqlite): das Cookie enthält nur eine zufällige ID,
+# die Daten liegen in der Tabelle sitzungen. Geschrieben wird nur bei Änderungen und wenn
+# weniger als SITZUNG_VERLAENGERN der Laufzeit übrig ist, nicht bei jedem Seitenaufruf.
+SITZUNG_VERLAENGERN = 0.5
+SITZUNG_AUFRAEUMEN = 600  # Sekunden zwischen zwei Läufen des Aufräumers
+SITZUNG_AUFRAEUMEN_PORTION = 500  # Zeilen pro Lösch-Transaktion
+
+
+def sitzungs_schluessel(sid):
+    """In der Tabelle steht nur der Hash der ID; ein Datenbank-Abzug öffnet keine Sitzungen"""
+    return hashlib.sha256(sid.encode('ascii')).hexdigest()
+
+
+class ServerSitzung(SecureCookieSession):
+    """Sitzung aus der Tabelle sitzungen (sid = ID aus dem Cookie, None bei neuen Sitzungen)"""
+
+    def __init__(self, initial=None, sid=None, laeuft_ab=0.0):
+        super().__init__(initial)
+        self.sid = sid
+        self.laeuft_ab = laeuft_ab
+        self.user_id_geladen = self.get('user_id')
+
+
+class SqliteSitzungen(SessionInterface):
+    """Sitzungen in SQLite, geteilt von allen Workern und serverseitig widerrufbar"""
+
+    def open_session(self, app, request):
+        sitzungs_aufraeumer_starten()
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            zeile = get_db().execute('SELECT daten, laeuft_ab FROM sitzungen WHERE schluessel = ? AND laeuft_ab > ?',
+                                     (sitzungs_schluessel(sid), time.time())).fetchone()
+            if zeile:
+                return ServerSitzung(session_json_serializer.loads(zeile[0]), sid, zeile[1])
+        return ServerSitzung()
+
+    def save_session(self, app, sitzung, antwort):
+        cookie = {'domain': self.get_cookie_domain(app), 'path': self.get_cookie_path(app),
+                  'secure': self.get_cookie_secure(app), 'samesite': self.get_cookie_samesite(app),
+                  'httponly': self.get_cookie_httponly(app)}
+        name = self.get_cookie_name(app)
+        if sitzung.accessed:
+            antwort.vary.add('Cookie')
+
+        conn = get_db()
+        # Was die Anfrage nicht selbst festgeschrieben hat, verwirft release_db ohnehin
+        if conn.in_transaction:
+            conn.rollback()
+
+        if not sitzung:
+            if sitzung.sid is not None and sitzung.modified:
+                # Abmeldung
+                conn.execute('DELETE FROM sitzungen WHERE schluessel = ?', (sitzungs_schluessel(sitzung.sid),))
+                conn.commit()
+                antwort.delete_cookie(name, **cookie)
+            return
+
+        jetzt = time.time()
+        lebensdauer = app.permanent_session_lifetime.total_seconds()
+        # Neue ID für neue Sitzungen und bei jeder An- oder Ummeldung (keine Session Fixation)
+        neue_id = sitzung.sid is None or sitzung.get('user_id') != sitzung.user_id_geladen
+        verlaengern = sitzung.laeuft_ab - jetzt < lebensdauer * SITZUNG_VERLAENGERN
+        if not (sitzung.modified or neue_id or verlaengern):
+            return
+
+        werte = (sitzung.get('user_id'), session_json_serializer.dumps(dict(sitzung)), jetzt + lebensdauer)
+        try:
+            if neue_id:
+                if sitzung.sid is not None:
+                    conn.execute('DELETE FROM sitzungen WHERE schluessel = ?', (sitzungs_schluessel(sitzung.sid),))
+                sitzung.sid = secrets.token_urlsafe(32)
+                conn.execute('INSERT INTO sitzungen (user_id, daten, laeuft_ab, schluessel) VALUES (?, ?, ?, ?)',
+                             (*werte, sitzungs_schluessel(sitzung.sid)))
+            elif not conn.execute('UPDATE sitzungen SET user_id = ?, daten = ?, laeuft_ab = ? WHERE schluessel = ?',
+                                  (*werte, sitzungs_schluessel(sitzung.sid))).rowcount:
+                # Während der Anfrage widerrufen: nicht wiederbeleben
+                conn.rollback()
+                antwort.delete_cookie(name, **cookie)
+                return
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Sitzungs-Fehler: {e}")
+            return
 
+        antwort.set_cookie(name, sitzung.sid, expires=self.get_expiration_time(app, sitzung), **cookie)
 
-@app.route('/api/pruefer/<bundesland>')
-@login_required
-def api_pruefer(bundesland):
-    """API: Prüfer nach Bundesland"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT id, name FROM pruefer WHERE bundesland = ? ORDER BY name', (bundesland,))
-    pruefer = [{'id': row[0], 'name': row[1]} for row in c.fetchall()]
-    conn.close()
 
-    return jsonify(pruefer)
+def sitzungen_beenden(c, user_id, ausser=None):
+    """Serverseitige Sitzungen eines Benutzers löschen (ausser: ID der eigenen Sitzung)
 
+    Im Cookie-Modus gibt es keine Zeilen; gesperrte Benutzer weist dort login_required ab.
+    """
+    c.execute('DELETE FROM sitzungen WHERE user_id = ? AND schluessel != ?',
+              (user_id, sitzungs_schluessel(ausser) if ausser else ''))
 
-@app.route('/erinnerung', methods=['POST'])
-@login_required
-def erinnerung_erstellen():
-    """Erinnerung für Protokoll erstellen"""
-    pruefungsdatum = request.form.get('pruefungsdatum')
 
-    if not pruefungsdatum:
-        flash('Prüfungsdatum ist erforderlich.', 'error')
-        return redirect(url_for('dashboard'))
+_sitzungs_aufraeumer_pid = None
+_sitzungs_aufraeumer_lock = threading.Lock()
 
-    # Erste Erinnerung in 2 Tagen
-    naechste_erinnerung = datetime.now() + timedelta(days=2)
 
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('''
-              INSERT INTO erinnerungen (user_id, pruefungsdatum, naechste_erinnerung)
-              VALUES (?, ?, ?)
-              ''', (session['user_id'], pruefungsdatum, naechste_erinnerung))
+def sitzungs_aufraeumer():
+    """Abgelaufene Sitzungen portionsweise löschen, damit die Schreibsperre nur kurz gehalten wird"""
+    conn = db_connect()
+    while True:
+        try:
+            while True:
+                geloescht = conn.execute('''
+                                         DELETE FROM sitzungen
+                                         WHERE schluessel IN (SELECT schluessel
+                                                              FROM sitzungen
+                                                              WHERE laeuft_ab < ?
+                                                              LIMIT ?)
+                                         ''', (time.time(), SITZUNG_AUFRAEUMEN_PORTION)).rowcount
+                conn.commit()
+                if geloescht < SITZUNG_AUFRAEUMEN_PORTION:
+                    break
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Sitzungs-Aufräumer Fehler: {e}")
+        time.sleep(SITZUNG_AUFRAEUMEN)
+
+
+def sitzungs_aufraeumer_starten():
+    """Aufräumer einmal pro Prozess starten (erst im Worker, nach dem Fork)"""
+    global _sitzungs_aufraeumer_pid
+    with _sitzungs_aufraeumer_lock:
+        if _sitzungs_aufraeumer_pid == os.getpid():
+            return
+        _sitzungs_aufraeumer_pid = os.getpid()
+    threading.Thread(target=im_app_kontext, args=(current_app._get_current_object(), sitzungs_aufraeumer),
+                     name='sitzungen-aufraeumen', daemon=True).start()
+
+
+# Abstände in Tagen: bis zur 1. Erinnerung, dann nach der 1., 2., ... Erinnerung
+ERINNERUNG_ABSTAENDE = [2, 7, 14, 28]
+ERINNERUNG_MAX = 4  # höchstens so viele Erinnerungen pro Prüfung
+ERINNERUNG_ABGLEICH = 900  # Sekunden; Erinnerungen anderer Prozesse spätestens dann einplanen
+ERINNERUNG_BATCH = 50  # Erinnerungen, die ein Prozess auf einmal übernimmt
+ERINNERUNG_LEASE = 60  # Sekunden, danach übernimmt ein anderer Prozess (z. B. nach einem Absturz)
+
+
+class ErinnerungsPlaner:
+    """Heap der nächsten Erinnerungszeitpunkte; weckt den Service genau zum fälligen Zeitpunkt"""
+
+    def __init__(self):
+        self.heap = []  # (zeitpunkt, erinnerung_id)
+        self.bedingung = threading.Condition()
+
+    def laden(self, conn):
+        """Heap aus der Datenbank neu aufbauen (von anderen Prozessen gehaltene erst nach Lease-Ende)"""
+        zeilen = conn.execute('''
+                              SELECT max(naechste_erinnerung, coalesce(lease_until, naechste_erinnerung)), id
+                              FROM erinnerungen
+                              WHERE protokoll_erstellt = FALSE
+                                AND anzahl_erinnerungen < ?
+                              ''', (ERINNERUNG_MAX,)).fetchall()
+        heap = [(datetime.fromisoformat(zeitpunkt), erinnerung_id) for zeitpunkt, erinnerung_id in zeilen]
+        heapq.heapify(heap)
+        with self.bedingung:
+            self.heap = heap
+
+    def einplanen(self, zeitpunkt, erinnerung_id):
+        """Erinnerung aufnehmen; liegt sie vor allen anderen, wacht der Service früher auf"""
+        with self.bedingung:
+            heapq.heappush(self.heap, (zeitpunkt, erinnerung_id))
+            if self.heap[0][1] == erinnerung_id:
+                self.bedingung.notify()
+
+    def warten(self, bis):
+        """Bis zur nächsten Fälligkeit (höchstens bis `bis`) schlafen
+
+        Gibt den Zeitpunkt der ältesten fälligen Erinnerung zurück (None, wenn nichts
+        fällig wurde); die fälligen Einträge werden entnommen, übernommen wird
+        anschließend aus der Datenbank.
+        """
+        with self.bedingung:
+            while True:
+                jetzt = datetime.now()
+                if self.heap and self.heap[0][0] <= jetzt:
+                    break
+                naechste = self.heap[0][0] if self.heap else bis
+                if min(naechste, bis) <= jetzt:
+                    return None
+                self.bedingung.wait((min(naechste, bis) - jetzt).total_seconds())
+
+            faellig = self.heap[0][0]
+            while self.heap and self.heap[0][0] <= jetzt:
+                heapq.heappop(self.heap)
+            return faellig
+
+
+erinnerungs_planer = ErinnerungsPlaner()
+
+
+def externe_url(endpoint, **values):
+    """Absolute URL außerhalb einer Anfrage (z. B. für Links in Hintergrund-E-Mails)"""
+    with current_app.test_request_context(base_url=current_app.config['BASIS_URL']):
+        return url_for(endpoint, _external=True, **values)
+
+
+def erinnerungen_uebernehmen(conn, inhaber, anzahl=ERINNERUNG_BATCH):
+    """Fällige Erinnerungen per Lease übernehmen (atomar, auch über Prozesse hinweg)"""
+    jetzt = datetime.now()
+    erinnerungen = conn.execute('''
+                                UPDATE erinnerungen
+                                SET leased_by   = ?,
+                                    lease_until = ?
+                                WHERE id IN (SELECT id
+                                             FROM erinnerungen
+                                             WHERE naechste_erinnerung <= ?
+                                               AND protokoll_erstellt = FALSE
+                                               AND anzahl_erinnerungen < ?
+                                               AND (lease_until IS NULL OR lease_until < ?)
+                                             ORDER BY naechste_erinnerung
+                                             LIMIT ?)
+                                RETURNING id
+                                ''', (inhaber, jetzt + timedelta(seconds=ERINNERUNG_LEASE), jetzt,
+                                      ERINNERUNG_MAX, jetzt, anzahl)).fetchall()
     conn.commit()
-    conn.close()
-
-    flash('Erinnerung wurde eingerichtet. Sie erhalten in 2 Tagen eine E-Mail.', 'success')
-    return redirect(url_for('dashboard'))
+    return [erinnerung[0] for erinnerung in erinnerungen]
 
 
-# Admin-Bereich
-@app.route('/admin')
-@admin_required
-def admin_dashboard():
-    """Erweitertes Admin-Dashboard"""
-    conn = sqlite3.connect(DATABASE)
+def erinnerung_senden(conn, erinnerung_id, link, inhaber):
+    """Eine übernommene Erinnerung einreihen und neu planen (eine Transaktion pro Erinnerung)"""
     c = conn.cursor()
 
-    # Nicht freigeschaltete Benutzer (wie bisher)
+    # Zuerst schreiben: sichert die Transaktion und prüft, dass die Lease noch uns gehört
     c.execute('''
-        SELECT id, name, email, ausbildungsjahr, created_at 
-        FROM users 
-        WHERE is_verified = TRUE AND is_approved = FALSE
-        ORDER BY created_at DESC
-        LIMIT 5
-    ''')
-    pending_users = c.fetchall()
-
-    # Statistiken
-    c.execute('SELECT COUNT(*) FROM users WHERE is_approved = TRUE')
-    aktive_benutzer = c.fetchone()[0]
-
-    c.execute('SELECT COUNT(*) FROM protokolle')
-    gesamt_protokolle = c.fetchone()[0]
-
-    c.execute('SELECT COUNT(*) FROM pruefer')
-    gesamt_pruefer = c.fetchone()[0]
-
-    c.execute('SELECT COUNT(*) FROM users WHERE is_admin = TRUE')
-    admin_count = c.fetchone()[0]
-
-    # Neueste Aktivitäten
-    c.execute('''
-        SELECT 'protokoll' as typ, u.name, p.datum, p.created_at
-        FROM protokolle p
-        JOIN users u ON p.user_id = u.id
-        ORDER BY p.created_at DESC
-        LIMIT 5
-    ''')
-    neueste_aktivitaeten = c.fetchall()
-
-    conn.close()
-
-    return render_template('admin/dashboard.html',
-                         pending_users=pending_users,
-                         aktive_benutzer=aktive_benutzer,
-                         gesamt_protokolle=gesamt_protokolle,
-                         gesamt_pruefer=gesamt_pruefer,
-                         admin_count=admin_count,
-                         neueste_aktivitaeten=neueste_aktivitaeten)
-
-@app.route('/admin/user/<int:user_id>/approve')
-@admin_required
-def approve_user(user_id):
-    """Benutzer freischalten"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+              UPDATE erinnerungen
+              SET anzahl_erinnerungen = anzahl_erinnerungen + 1,
+                  leased_by           = NULL,
+                  lease_until         = NULL
+              WHERE id = ?
+                AND leased_by = ?
+                AND protokoll_erstellt = FALSE
+              RETURNING anzahl_erinnerungen, user_id
+              ''', (erinnerung_id, inhaber))
+    erinnerung = c.fetchone()
+    if not erinnerung:
+        conn.rollback()
+        return  # inzwischen erledigt oder von einem anderen Prozess übernommen
 
+    anzahl, user_id = erinnerung
     c.execute('SELECT name, email FROM users WHERE id = ?', (user_id,))
-    user = c.fetchone()
-
-    if user:
-        c.execute('UPDATE users SET is_approved = TRUE WHERE id = ?', (user_id,))
-        conn.commit()
-
-        # Willkommens-E-Mail senden
-        subject = "Account freigeschaltet - Urologie Facharztprüfung"
-        body = f"""
-        <html>
-        <body>
-            <h2>Account freigeschaltet!</h2>
-            <p>Hallo {user[0]},</p>
-            <p>Ihr Account wurde erfolgreich freigeschaltet. Sie können sich jetzt anmelden und die Plattform nutzen.</p>
-            <p><a href="{url_for('login', _external=True)}" style="background-color: #007AFF; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Jetzt anmelden</a></p>
-            <p>Viel Erfolg bei der Prüfungsvorbereitung!</p>
-        </body>
-        </html>
-        """
-
-        send_email(user[1], subject, body)
-        flash(f'Benutzer {user[0]} wurde freigeschaltet.', 'success')
-    else:
-        flash('Benutzer nicht gefunden.', 'error')
-
-    conn.close()
-    return redirect(url_for('admin_dashboard'))
-
-
-@app.route('/admin/pruefer')
-@admin_required
-def admin_pruefer():
-    """Prüfer-Verwaltung"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT id, name, bundesland FROM pruefer ORDER BY bundesland, name')
-    alle_pruefer = c.fetchall()
-    conn.close()
-
-    return render_template('admin/pruefer.html',
-                           pruefer=alle_pruefer,
-                           bundeslaender=BUNDESLAENDER)
-
-
-@app.route('/admin/pruefer/neu', methods=['POST'])
-def neuer_pruefer():
-    """Neuen Prüfer hinzufügen"""
-    name = request.form.get('name')
-    bundesland = request.form.get('bundesland')
-
-    if not name or not bundesland:
-        flash('Name und Bundesland sind erforderlich.', 'error')
-        return redirect(url_for('admin_pruefer'))
+    name, email = c.fetchone()
+
+    subject = "Erinnerung: Prüfungsprotokoll erstellen"
+    body = f"""
+    <html>
+    <body>
+        <h2>Erinnerung: Prüfungsprotokoll</h2>
+        <p>Hallo {name},</p>
+        <p>Dies ist eine Erinnerung daran, Ihr Prüfungsprotokoll zu erstellen.</p>
+        <p>Ihre Erfahrungen helfen anderen Studierenden bei der Vorbereitung!</p>
+        <p><a href="{link}" style="background-color: #007AFF; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Protokoll erstellen</a></p>
+    </body>
+    </html>
+    """
+
+    if not send_email(email, subject, body, conn=conn):
+        conn.rollback()
+        return
 
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('INSERT INTO pruefer (name, bundesland) VALUES (?, ?)', (name, bundesland))
+    naechste_erinnerung = datetime.now() + timedelta(
+        days=ERINNERUNG_ABSTAENDE[min(anzahl, len(ERINNERUNG_ABSTAENDE) - 1)])
+    c.execute('UPDATE erinnerungen SET naechste_erinnerung = ? WHERE id = ?', (naechste_erinnerung, erinnerung_id))
     conn.commit()
-    conn.close()
 
-    flash(f'Prüfer {name} wurde hinzugefügt.', 'success')
-    return redirect(url_for('admin_pruefer'))
+    if anzahl < ERINNERUNG_MAX:
+        erinnerungs_planer.einplanen(naechste_erinnerung, erinnerung_id)
 
 
-@app.route('/admin/pruefer/<int:pruefer_id>/delete')
-@admin_required
-def delete_pruefer(pruefer_id):
-    """Prüfer löschen"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-
-    # Prüfen ob Prüfer in Protokollen verwendet wird
-    c.execute('''
-              SELECT COUNT(*)
-              FROM protokolle
-              WHERE pruefer1_id = ?
-                 OR pruefer2_id = ?
-                 OR pruefer3_id = ?
-              ''', (pruefer_id, pruefer_id, pruefer_id))
-
-    if c.fetchone()[0] > 0:
-        flash('Prüfer kann nicht gelöscht werden, da er in Protokollen verwendet wird.', 'error')
-    else:
-        c.execute('DELETE FROM pruefer WHERE id = ?', (pruefer_id,))
-        conn.commit()
-        flash('Prüfer wurde gelöscht.', 'success')
-
-    conn.close()
-    return redirect(url_for('admin_pruefer'))
+def erinnerungs_service():
+    """Service für automatische Erinnerungen (im App-Kontext)
 
+    Schläft bis zur nächsten fälligen Erinnerung. Die E-Mails gehen über die
+    Outbox, deren Worker sie gesammelt über offene SMTP-Verbindungen zustellen.
+    Mehrere Prozesse können den Service gleichzeitig ausführen.
+    """
+    conn = db_connect()
+    inhaber = lease_inhaber()
+    abgleich = datetime.min
 
-def erinnerungs_service():
-    """Service für automatische Erinnerungen"""
     while True:
         try:
-            conn = sqlite3.connect(DATABASE)
-            c = conn.cursor()
-
-            # Fällige Erinnerungen finden
-            jetzt = datetime.now()
-            c.execute('''
-                      SELECT e.id, e.user_id, e.anzahl_erinnerungen, u.name, u.email
-                      FROM erinnerungen e
-                               JOIN users u ON e.user_id = u.id
-                      WHERE e.naechste_erinnerung <= ?
-                        AND e.protokoll_erstellt = FALSE
-                      ''', (jetzt,))
-
-            faellige_erinnerungen = c.fetchall()
-
-            for erinnerung in faellige_erinnerungen:
-                erinnerung_id, user_id, anzahl, name, email = erinnerung
-
-                # E-Mail senden
-                subject = "Erinnerung: Prüfungsprotokoll erstellen"
-                body = f"""
-                <html>
-                <body>
-                    <h2>Erinnerung: Prüfungsprotokoll</h2>
-                    <p>Hallo {name},</p>
-                    <p>Dies ist eine Erinnerung daran, Ihr Prüfungsprotokoll zu erstellen.</p>
-                    <p>Ihre Erfahrungen helfen anderen Studierenden bei der Vorbereitung!</p>
-                    <p><a href="{url_for('neues_protokoll', _external=True)}" style="background-color: #007AFF; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Protokoll erstellen</a></p>
-                </body>
-                </html>
-                """
-
-                if send_email(email, subject, body):
-                    # Nächste Erinnerung planen (wöchentlich)
-                    naechste_erinnerung = jetzt + timedelta(weeks=1)
-                    anzahl += 1
-
-                    c.execute('''
-                              UPDATE erinnerungen
-                              SET naechste_erinnerung = ?,
-                                  anzahl_erinnerungen = ?
-                              WHERE id = ?
-                              ''', (naechste_erinnerung, anzahl, erinnerung_id))
-
-            conn.commit()
-            conn.close()
+            if datetime.now() >= abgleich:
+                erinnerungs_planer.laden(conn)
+                abgleich = datetime.now() + timedelta(seconds=ERINNERUNG_ABGLEICH)
+
+            faellig = erinnerungs_planer.warten(bis=abgleich)
+            if faellig is None:
+                continue
+            metriken.verzoegerung_beobachten((datetime.now() - faellig).total_seconds())
+
+            link = externe_url('protokolle.neues_protokoll')
+            while True:
+                faellige = erinnerungen_uebernehmen(conn, inhaber)
+                for erinnerung_id in faellige:
+                    try:
+                        erinnerung_senden(conn, erinnerung_id, link, inhaber)
+                    except Exception as e:
+                        conn.rollback()
+                        print(f"Erinnerung {erinnerung_id} Fehler: {e}")
+                if len(faellige) < ERINNERUNG_BATCH:
+                    break
+            email_worker_wecken()
+
+            # Von anderen Prozessen gehaltene Erinnerungen nach Ablauf ihrer Lease erneut einplanen
+            if not faellige:
+                erinnerungs_planer.laden(conn)
 
         except Exception as e:
+            conn.rollback()
             print(f"Erinnerungs-Service Fehler: {e}")
+            time.sleep(60)
 
-        # 1 Stunde warten
-        time.sleep(3600)
-
-
-@app.route('/datenschutz')
-def datenschutz():
-    """Datenschutzerklärung"""
-    return render_template('datenschutz.html')
 
+_hintergrund_pid = None
+_hintergrund_lock = threading.Lock()
 
-@app.route('/impressum')
-def impressum():
-    """Impressum"""
-    return render_template('impressum.html')
 
+def hintergrund_dienste_starten(app):
+    """E-Mail-Worker und Erinnerungs-Service einmal pro Prozess starten"""
+    global _hintergrund_pid
+    with _hintergrund_lock:
+        if _hintergrund_pid == os.getpid():
+            return
+        _hintergrund_pid = os.getpid()
 
-if __name__ == '__main__':
-    init_db()
+    email_worker_starten(app)
+    threading.Thread(target=im_app_kontext, args=(app, erinnerungs_service), name='erinnerungen',
+                     daemon=True).start()
 
-    # Erinnerungs-Service in separatem Thread starten
-    reminder_thread = threading.Thread(target=erinnerungs_service, daemon=True)
-    reminder_thread.start()
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
+def hintergrund_dienste_pruefen():
+    """Im Modus 'web' laufen die Hintergrund-Dienste in jedem Web-Prozess mit"""
+    if current_app.config['HINTERGRUND_DIENSTE'] == 'web':
+        hintergrund_dienste_starten(current_app._get_current_object())
 
 
-@app.route('/profil')
-@login_required
-def profil():
-    """Profil anzeigen"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
+@befehle.group('reminders')
+def reminders():
+    """Erinnerungen und E-Mail-Zustellung"""
 
-    # Benutzer-Informationen abrufen
-    c.execute('''
-              SELECT id, name, email, ausbildungsjahr, created_at, is_admin
-              FROM users
-              WHERE id = ?
-              ''', (session['user_id'],))
-    user_data = c.fetchone()
-
-    # Benutzer-Statistiken
-    c.execute('SELECT COUNT(*) FROM protokolle WHERE user_id = ?', (session['user_id'],))
-    anzahl_protokolle = c.fetchone()[0]
 
-    c.execute('''
-              SELECT p.datum, pr.name, p.hashtags
-              FROM protokolle p
-                       JOIN pruefer pr ON p.pruefer1_id = pr.id
-              WHERE p.user_id = ?
-              ORDER BY p.created_at DESC LIMIT 5
-              ''', (session['user_id'],))
-    letzte_protokolle = c.fetchall()
-
-    # Registrierungsdauer berechnen
-    if user_data[4]:  # created_at
-        try:
-            created_date = datetime.strptime(user_data[4], '%Y-%m-%d %H:%M:%S')
-            mitglied_seit = (datetime.now() - created_date).days
-        except:
-            mitglied_seit = 0
-    else:
-        mitglied_seit = 0
+@reminders.command('run')
+def reminders_run():
+    """Erinnerungen und E-Mail-Outbox in diesem Prozess abarbeiten (läuft bis Strg+C)"""
+    email_worker_starten(current_app._get_current_object())
+    print(f"Erinnerungs-Service läuft als {lease_inhaber()}")
+    erinnerungs_service()
 
-    conn.close()
 
-    user_info = {
-        'id': user_data[0],
-        'name': user_data[1],
-        'email': user_data[2],
-        'ausbildungsjahr': user_data[3],
-        'created_at': user_data[4],
-        'is_admin': user_data[5],
-        'anzahl_protokolle': anzahl_protokolle,
-        'mitglied_seit': mitglied_seit,
-        'letzte_protokolle': letzte_protokolle
-    }
+# Gestreamte Exporte (Profil und Protokoll-Korpus)
+EXPORT_BATCH = 500  # Zeilen pro fetchmany
+EXPORT_PUFFER = 64 * 1024  # Bytes pro gesendetem Block
 
-    return render_template('profil.html', user=user_info)
 
+def export_puffern(teile, komprimieren=False):
+    """Kleine Teile zu Blöcken zusammenfassen und optional als gzip-Strom kodieren"""
+    kompressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if komprimieren else None
+    puffer, groesse = [], 0
+    for teil in teile:
+        daten = teil.encode('utf-8')
+        puffer.append(daten)
+        groesse += len(daten)
+        if groesse >= EXPORT_PUFFER:
+            block = b''.join(puffer)
+            puffer, groesse = [], 0
+            block = kompressor.compress(block) if kompressor else block
+            if block:
+                yield block
+    block = b''.join(puffer)
+    if kompressor:
+        block = kompressor.compress(block) + kompressor.flush()
+    if block:
+        yield block
 
-@app.route('/profil/bearbeiten', methods=['GET', 'POST'])
-@login_required
-def profil_bearbeiten():
-    """Profil bearbeiten"""
-    if request.method == 'GET':
-        # Aktuelle Benutzerdaten laden
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-        c.execute('''
-                  SELECT name, email, ausbildungsjahr
-                  FROM users
-                  WHERE id = ?
-                  ''', (session['user_id'],))
-        user_data = c.fetchone()
-        conn.close()
-
-        if user_data:
-            user_info = {
-                'name': user_data[0],
-                'email': user_data[1],
-                'ausbildungsjahr': user_data[2]
-            }
-            return render_template('profil_bearbeiten.html', user=user_info)
-        else:
-            flash('Benutzer nicht gefunden.', 'error')
-            return redirect(url_for('dashboard'))
-
-    # POST Request - Profil aktualisieren
-    name = request.form.get('name', '').strip()
-    email = request.form.get('email', '').strip()
-    ausbildungsjahr = request.form.get('ausbildungsjahr', '').strip()
-    neues_passwort = request.form.get('neues_passwort', '').strip()
-    passwort_bestaetigung = request.form.get('passwort_bestaetigung', '').strip()
-    aktuelles_passwort = request.form.get('aktuelles_passwort', '').strip()
-
-    # Validierung
-    errors = []
-
-    if not name:
-        errors.append('Name ist erforderlich.')
-    elif len(name) < 2:
-        errors.append('Name muss mindestens 2 Zeichen lang sein.')
-
-    if not email:
-        errors.append('E-Mail ist erforderlich.')
-    elif not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
-        errors.append('Ungültige E-Mail-Adresse.')
-
-    if not ausbildungsjahr:
-        errors.append('Ausbildungsjahr ist erforderlich.')
-    else:
-        try:
-            ausbildungsjahr_int = int(ausbildungsjahr)
-            if ausbildungsjahr_int < 1 or ausbildungsjahr_int > 6:
-                errors.append('Ausbildungsjahr muss zwischen 1 und 6 liegen.')
-        except ValueError:
-            errors.append('Ungültiges Ausbildungsjahr.')
-
-    # Passwort-Validierung (nur wenn neues Passwort angegeben)
-    if neues_passwort:
-        if len(neues_passwort) < 6:
-            errors.append('Neues Passwort muss mindestens 6 Zeichen lang sein.')
-        elif neues_passwort != passwort_bestaetigung:
-            errors.append('Passwort-Bestätigung stimmt nicht überein.')
-
-        # Aktuelles Passwort prüfen
-        if not aktuelles_passwort:
-            errors.append('Aktuelles Passwort ist erforderlich um das Passwort zu ändern.')
-        else:
-            conn = sqlite3.connect(DATABASE)
-            c = conn.cursor()
-            c.execute('SELECT password_hash FROM users WHERE id = ?', (session['user_id'],))
-            current_hash = c.fetchone()
-            conn.close()
-
-            if not current_hash or not check_password_hash(current_hash[0], aktuelles_passwort):
-                errors.append('Aktuelles Passwort ist falsch.')
-
-    # E-Mail-Eindeutigkeit prüfen (außer eigene E-Mail)
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT COUNT(*) FROM users WHERE email = ? AND id != ?', (email, session['user_id']))
-    if c.fetchone()[0] > 0:
-        errors.append('Diese E-Mail-Adresse wird bereits verwendet.')
-    conn.close()
-
-    if errors:
-        for error in errors:
-            flash(error, 'error')
-        return render_template('profil_bearbeiten.html', user={
-            'name': name,
-            'email': email,
-            'ausbildungsjahr': ausbildungsjahr
-        })
-
-    # Daten aktualisieren
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-
-    try:
-        if neues_passwort:
-            # Mit Passwort-Update
-            password_hash = generate_password_hash(neues_passwort)
-            c.execute('''
-                      UPDATE users
-                      SET name            = ?,
-                          email           = ?,
-                          ausbildungsjahr = ?,
-                          password_hash   = ?
-                      WHERE id = ?
-                      ''', (name, email, int(ausbildungsjahr), password_hash, session['user_id']))
-            flash('Profil und Passwort erfolgreich aktualisiert!', 'success')
-        else:
-            # Ohne Passwort-Update
-            c.execute('''
-                      UPDATE users
-                      SET name            = ?,
-                          email           = ?,
-                          ausbildungsjahr = ?
-                      WHERE id = ?
-                      ''', (name, email, int(ausbildungsjahr), session['user_id']))
-            flash('Profil erfolgreich aktualisiert!', 'success')
-
-        # Session-Name aktualisieren
-        session['user_name'] = name
-
-        conn.commit()
-
-    except Exception as e:
-        conn.rollback()
-        flash('Fehler beim Aktualisieren des Profils.', 'error')
-        print(f"Profil-Update Fehler: {e}")
-
-    finally:
-        conn.close()
-
-    return redirect(url_for('profil'))
-
-
-@app.route('/profil/loeschen', methods=['GET', 'POST'])
-@login_required
-def profil_loeschen():
-    """Profil löschen"""
-    if request.method == 'GET':
-        # Bestätigungsseite anzeigen
-        return render_template('profil_loeschen.html')
-
-    # POST Request - Profil löschen
-    passwort = request.form.get('passwort', '').strip()
-    bestaetigung = request.form.get('bestaetigung', '').strip()
-
-    # Validierung
-    if not passwort:
-        flash('Passwort ist erforderlich.', 'error')
-        return render_template('profil_loeschen.html')
-
-    if bestaetigung != 'LÖSCHEN':
-        flash('Bitte geben Sie "LÖSCHEN" zur Bestätigung ein.', 'error')
-        return render_template('profil_loeschen.html')
-
-    # Passwort prüfen
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT password_hash, name FROM users WHERE id = ?', (session['user_id'],))
-    user_data = c.fetchone()
-
-    if not user_data or not check_password_hash(user_data[0], passwort):
-        flash('Falsches Passwort.', 'error')
-        conn.close()
-        return render_template('profil_loeschen.html')
-
-    username = user_data[1]
 
+def schema_aktuell(datenbank):
+    """True, wenn die Datenbank existiert und alle Migrationen angewendet sind (ein PRAGMA)"""
+    if not os.path.exists(datenbank):
+        return False
+    conn = sqlite3.connect(datenbank, timeout=5.0)
     try:
-        # Benutzer und zugehörige Daten löschen
-        # 1. Erinnerungen löschen
-        c.execute('DELETE FROM erinnerungen WHERE user_id = ?', (session['user_id'],))
-
-        # 2. Protokolle löschen
-        c.execute('DELETE FROM protokolle WHERE user_id = ?', (session['user_id'],))
-
-        # 3. Benutzer löschen
-        c.execute('DELETE FROM users WHERE id = ?', (session['user_id'],))
-
-        conn.commit()
-
-        # Session beenden
-        session.clear()
-
-        flash(f'Profil von {username} wurde erfolgreich gelöscht.', 'info')
-
-    except Exception as e:
-        conn.rollback()
-        flash('Fehler beim Löschen des Profils.', 'error')
-        print(f"Profil-Löschung Fehler: {e}")
-
+        return conn.execute('PRAGMA user_version').fetchone()[0] >= len(MIGRATIONS)
     finally:
         conn.close()
 
-    return redirect(url_for('index'))
-
 
-@app.route('/profil/export')
-@login_required
-def profil_export():
-    """Profil-Daten als JSON exportieren (DSGVO-Compliance)"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-
-    # Benutzer-Daten
-    c.execute('''
-              SELECT name, email, ausbildungsjahr, created_at, is_verified, is_approved
-              FROM users
-              WHERE id = ?
-              ''', (session['user_id'],))
-    user_data = c.fetchone()
-
-    # Protokolle des Benutzers
-    c.execute('''
-              SELECT p.datum,
-                     p.bundesland,
-                     pr1.name,
-                     pr2.name,
-                     pr3.name,
-                     p.inhalt,
-                     p.hashtags,
-                     p.kommentar,
-                     p.created_at
-              FROM protokolle p
-                       JOIN pruefer pr1 ON p.pruefer1_id = pr1.id
-                       JOIN pruefer pr2 ON p.pruefer2_id = pr2.id
-                       JOIN pruefer pr3 ON p.pruefer3_id = pr3.id
-              WHERE p.user_id = ?
-              ORDER BY p.created_at DESC
-              ''', (session['user_id'],))
-    protokolle_data = c.fetchall()
-
-    # Erinnerungen
-    c.execute('''
-              SELECT pruefungsdatum,
-                     naechste_erinnerung,
-                     anzahl_erinnerungen,
-                     protokoll_erstellt,
-                     created_at
-              FROM erinnerungen
-              WHERE user_id = ?
-              ''', (session['user_id'],))
-    erinnerungen_data = c.fetchall()
+def create_app(konfiguration=None):
+    """Anwendung erzeugen
+
+    Der Import des Moduls hat keine Nebenwirkungen; erst hier werden Blueprints,
+    Hooks und CLI-Befehle registriert. Die Datenbank wird nur angefasst, um
+    PRAGMA user_version zu lesen; init_db() läuft nur bei veraltetem Schema.
+    Hintergrund-Dienste starten erst mit der ersten Anfrage im Worker, so dass
+    gunicorn --preload die App vor dem Fork laden kann.
+    """
+    app = Flask(__name__)
+    app.config.update(STANDARD_KONFIGURATION)
+    app.config.update(konfiguration or {})
+    if not app.config['SECRET_KEY']:
+        app.config['SECRET_KEY'] = geheimen_schluessel_laden(
+            app.config['SECRET_KEY_DATEI'] or os.path.join(app.instance_path, 'secret_key'))
+    if app.config['SITZUNGEN'] == 'sqlite':
+        app.session_interface = SqliteSitzungen()
+    if app.config['PROXY_ANZAHL']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_ANZAHL'],
+                                x_proto=app.config['PROXY_ANZAHL'])
+
+    # Kompilierte Templates auf der Platte zwischenspeichern, damit neue Worker
+    # die großen Templates nicht erneut übersetzen müssen. Die Jinja-Umgebung
+    # selbst entsteht erst beim ersten Rendern.
+    template_cache = app.config['TEMPLATE_CACHE_VERZEICHNIS'] or os.path.join(app.instance_path, 'jinja_cache')
+    os.makedirs(template_cache, exist_ok=True)
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(template_cache),
+                             extensions=[FragmentCacheExtension])
+    app.add_template_filter(suchtreffer, 'suchtreffer')
+
+    # Die Bereiche importieren selbst aus diesem Modul, daher erst hier
+    from admin import admin_bp
+    from auth import auth_bp
+    from profil import profil_bp
+    from protokolle import protokolle_bp
+    from seiten import seiten_bp
+
+    for blueprint in (seiten_bp, auth_bp, protokolle_bp, admin_bp, profil_bp):
+        app.register_blueprint(blueprint)
+    app.view_functions['static'] = statische_datei
+    app.url_defaults(asset_fingerabdruck)
+    app.register_error_handler(PasswortDienstUeberlastet, passwort_dienst_ueberlastet)
+
+    app.before_request(anfrage_messung_starten)
+    app.before_request(hintergrund_dienste_pruefen)
+    # after_request-Funktionen laufen in umgekehrter Reihenfolge: die Messung zuletzt
+    app.after_request(antwort_messen)
+    app.after_request(antwort_komprimieren)
+    app.teardown_request(anfrage_messung_beenden)
+    app.teardown_appcontext(release_db)
+
+    for befehl in befehle.commands.values():
+        app.cli.add_command(befehl)
+
+    if app.config['SCHEMA_PRUEFEN'] and not schema_aktuell(app.config['DATABASE']):
+        with app.app_context():
+            init_db()
+
+    return app
 
-    conn.close()
-
-    # Export-Daten zusammenstellen
-    export_data = {
-        'export_info': {
-            'datum': datetime.now().isoformat(),
-            'typ': 'DSGVO-konformer Datenexport',
-            'benutzer_id': session['user_id']
-        },
-        'benutzer_daten': {
-            'name': user_data[0] if user_data else None,
-            'email': user_data[1] if user_data else None,
-            'ausbildungsjahr': user_data[2] if user_data else None,
-            'registriert_am': user_data[3] if user_data else None,
-            'email_verifiziert': user_data[4] if user_data else None,
-            'account_freigeschaltet': user_data[5] if user_data else None
-        },
-        'protokolle': [
-            {
-                'datum': protokoll[0],
-                'bundesland': protokoll[1],
-                'pruefer1': protokoll[2],
-                'pruefer2': protokoll[3],
-                'pruefer3': protokoll[4],
-                'inhalt': protokoll[5],
-                'hashtags': protokoll[6],
-                'kommentar': protokoll[7],
-                'erstellt_am': protokoll[8]
-            }
-            for protokoll in protokolle_data
-        ],
-        'erinnerungen': [
-            {
-                'pruefungsdatum': erinnerung[0],
-                'naechste_erinnerung': erinnerung[1],
-                'anzahl_erinnerungen': erinnerung[2],
-                'protokoll_erstellt': erinnerung[3],
-                'erstellt_am': erinnerung[4]
-            }
-            for erinnerung in erinnerungen_data
-        ]
-    }
 
-    # Als JSON-Response zurückgeben
-    response = app.response_class(
-        response=json.dumps(export_data, indent=2, ensure_ascii=False),
-        status=200,
-        mimetype='application/json'
-    )
-
-    # Download-Header setzen
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'urologie_profil_export_{timestamp}.json'
-    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+if __name__ == '__main__':
+    # Über den Modulnamen laden: sonst gäbe es app.py zweimal (__main__ und app),
+    # und die Bereiche sähen andere Pools und Caches als die Hooks
+    import app as anwendung
 
-    return response
+    app = anwendung.create_app()
 
+    # E-Mail-Worker und Erinnerungs-Service starten (Leases verhindern Doppelversand,
+    # auch wenn der Reloader einen zweiten Prozess startet)
+    if app.config['HINTERGRUND_DIENSTE'] == 'web':
+        anwendung.hintergrund_dienste_starten(app)
 
-# JSON Import für Flask Response
-import json
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
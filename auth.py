@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Registrierung, E-Mail-Bestätigung, Anmeldung (mit Drosselung) und Abmeldung
+"""
+
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+
+from app import PasswortDienstUeberlastet, get_db, passwort_dienst, send_email
+
+auth_bp = Blueprint('auth', __name__)
+
+
+# Drosselung der Anmeldung als Token-Bucket: (Kapazität, neue Versuche pro Sekunde)
+ANMELDE_LIMIT_IP = (30, 1 / 10)
+ANMELDE_LIMIT_KONTO = (5, 1 / 60)
+# 'speicher' = pro Prozess (Entwicklungsserver), 'sqlite' = über alle Prozesse in der
+# Datenbank geteilt (Standard unter gunicorn, siehe gunicorn.conf.py)
+ANMELDE_DROSSEL = os.environ.get('ANMELDE_DROSSEL', 'speicher')
+ANMELDE_DROSSEL_MAX = 100000  # Einträge im Speicher, darüber werden volle Buckets entfernt
+
+
+class SpeicherDrossel:
+    """Token-Buckets im Prozess: schluessel -> (Tokens, Zeitpunkt, wieder voll ab)"""
+
+    def __init__(self, max_eintraege):
+        self.max_eintraege = max_eintraege
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def nehmen(self, schluessel, kapazitaet, rate):
+        """Einen Versuch verbrauchen; False, wenn der Bucket leer ist"""
+        jetzt = time.time()
+        with self.lock:
+            tokens, stand, _ = self.buckets.get(schluessel, (kapazitaet, jetzt, jetzt))
+            tokens = min(kapazitaet, tokens + (jetzt - stand) * rate)
+            if tokens < 1:
+                return False
+            tokens -= 1
+            self.buckets[schluessel] = (tokens, jetzt, jetzt + (kapazitaet - tokens) / rate)
+            if len(self.buckets) > self.max_eintraege:
+                self.buckets = {k: v for k, v in self.buckets.items() if v[2] > jetzt}
+            return True
+
+    def zuruecksetzen(self, schluessel):
+        with self.lock:
+            self.buckets.pop(schluessel, None)
+
+
+class SqliteDrossel:
+    """Token-Buckets in der Tabelle anmelde_drossel, geteilt von allen Prozessen
+
+    Auffüllen und Verbrauchen passieren in einem einzigen Upsert; ist der Bucket
+    leer, greift die WHERE-Bedingung und RETURNING liefert keine Zeile.
+    """
+
+    def __init__(self):
+        self.aufrufe = 0
+
+    def nehmen(self, schluessel, kapazitaet, rate):
+        werte = {'schluessel': schluessel, 'kapazitaet': kapazitaet, 'rate': rate, 'jetzt': time.time()}
+        conn = get_db()
+        try:
+            zeile = conn.execute('''
+                                 INSERT INTO anmelde_drossel (schluessel, tokens, stand, voll_ab)
+                                 VALUES (:schluessel, :kapazitaet - 1, :jetzt, :jetzt + 1 / :rate)
+                                 ON CONFLICT (schluessel) DO UPDATE
+                                     SET tokens  = MIN(:kapazitaet, tokens + (:jetzt - stand) * :rate) - 1,
+                                         stand   = :jetzt,
+                                         voll_ab = :jetzt + (:kapazitaet + 1
+                                                   - MIN(:kapazitaet, tokens + (:jetzt - stand) * :rate)) / :rate
+                                 WHERE MIN(:kapazitaet, tokens + (:jetzt - stand) * :rate) >= 1
+                                 RETURNING tokens
+                                 ''', werte).fetchone()
+
+            self.aufrufe += 1
+            if self.aufrufe % 1000 == 0:
+                conn.execute('DELETE FROM anmelde_drossel WHERE voll_ab < ?', (werte['jetzt'],))
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Drossel-Fehler: {e}")
+            return True
+        return zeile is not None
+
+    def zuruecksetzen(self, schluessel):
+        conn = get_db()
+        conn.execute('DELETE FROM anmelde_drossel WHERE schluessel = ?', (schluessel,))
+        conn.commit()
+
+
+anmelde_drossel = SqliteDrossel() if ANMELDE_DROSSEL == 'sqlite' else SpeicherDrossel(ANMELDE_DROSSEL_MAX)
+
+
+@auth_bp.route('/register', methods=['GET', 'POST'])
+def register():
+    """Benutzerregistrierung"""
+    if request.method == 'POST':
+        name = request.form.get('name')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        ausbildungsjahr = request.form.get('ausbildungsjahr')
+
+        # Validierung
+        if not all([name, email, password, ausbildungsjahr]):
+            flash('Alle Felder sind erforderlich.', 'error')
+            return render_template('register.html')
+
+        if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
+            flash('Ungültige E-Mail-Adresse.', 'error')
+            return render_template('register.html')
+
+        try:
+            ausbildungsjahr = int(ausbildungsjahr)
+            if ausbildungsjahr < 1 or ausbildungsjahr > 6:
+                raise ValueError
+        except ValueError:
+            flash('Ausbildungsjahr muss zwischen 1 und 6 liegen.', 'error')
+            return render_template('register.html')
+
+        # Prüfen ob E-Mail bereits existiert
+        conn = get_db()
+        c = conn.cursor()
+        c.execute('SELECT COUNT(*) FROM users WHERE email = ?', (email,))
+        if c.fetchone()[0] > 0:
+            flash('E-Mail-Adresse bereits registriert.', 'error')
+            return render_template('register.html')
+
+        # Benutzer erstellen
+        password_hash = passwort_dienst.hashen(password)
+        verification_token = secrets.token_urlsafe(32)
+
+        c.execute('''
+                  INSERT INTO users (name, email, password_hash, ausbildungsjahr, verification_token)
+                  VALUES (?, ?, ?, ?, ?)
+                  ''', (name, email, password_hash, ausbildungsjahr, verification_token))
+
+        conn.commit()
+
+        # Verifizierungs-E-Mail senden
+        verification_link = url_for('auth.verify_email', token=verification_token, _external=True)
+        subject = "E-Mail-Verifizierung - Urologie Facharztprüfung"
+        body = f"""
+        <html>
+        <body>
+            <h2>Willkommen bei der Urologie Facharztprüfung Plattform!</h2>
+            <p>Hallo {name},</p>
+            <p>bitte klicken Sie auf den folgenden Link, um Ihre E-Mail-Adresse zu verifizieren:</p>
+            <p><a href="{verification_link}" style="background-color: #007AFF; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">E-Mail verifizieren</a></p>
+            <p>Nach der Verifizierung wird Ihr Account von einem Administrator geprüft und freigeschaltet.</p>
+            <p>Vielen Dank!</p>
+        </body>
+        </html>
+        """
+
+        if send_email(email, subject, body):
+            flash('Registrierung erfolgreich! Bitte prüfen Sie Ihre E-Mails zur Verifizierung.', 'success')
+        else:
+            flash('Registrierung erfolgreich, aber E-Mail konnte nicht gesendet werden.', 'warning')
+
+        return redirect(url_for('auth.login'))
+
+    return render_template('register.html')
+
+
+@auth_bp.route('/verify/<token>')
+def verify_email(token):
+    """E-Mail-Verifizierung"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('SELECT id, name FROM users WHERE verification_token = ? AND is_verified = FALSE', (token,))
+    user = c.fetchone()
+
+    if user:
+        c.execute('UPDATE users SET is_verified = TRUE, verification_token = NULL WHERE id = ?', (user[0],))
+        conn.commit()
+        flash('E-Mail erfolgreich verifiziert! Ihr Account wird nun von einem Administrator geprüft.', 'success')
+    else:
+        flash('Ungültiger oder bereits verwendeter Verifizierungslink.', 'error')
+
+    return redirect(url_for('auth.login'))
+
+
+@auth_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """Benutzeranmeldung"""
+    if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('password')
+
+        if not email or not password:
+            flash('E-Mail und Passwort sind erforderlich.', 'error')
+            return render_template('login.html')
+
+        # Erst drosseln, dann hashen: abgewiesene Versuche kosten keine PBKDF2-Runden
+        konto_schluessel = f'konto:{email.strip().lower()}'
+        if (not anmelde_drossel.nehmen(f'ip:{request.remote_addr}', *ANMELDE_LIMIT_IP)
+                or not anmelde_drossel.nehmen(konto_schluessel, *ANMELDE_LIMIT_KONTO)):
+            flash('Zu viele Anmeldeversuche. Bitte warten Sie einige Minuten.', 'error')
+            return render_template('login.html'), 429
+
+        conn = get_db()
+        c = conn.cursor()
+        c.execute('''
+                  SELECT id, name, password_hash, is_verified, is_approved, is_admin
+                  FROM users
+                  WHERE email = ?
+                  ''', (email,))
+        user = c.fetchone()
+
+        try:
+            passwort_ok = passwort_dienst.pruefen(user[2] if user else None, password)
+        except PasswortDienstUeberlastet:
+            flash('Der Anmeldedienst ist gerade ausgelastet. Bitte versuchen Sie es gleich noch einmal.', 'error')
+            return render_template('login.html'), 503
+
+        if passwort_ok:
+            anmelde_drossel.zuruecksetzen(konto_schluessel)
+
+            # Hash mit älterer Methode oder Rundenzahl beim Login auf die aktuelle umstellen
+            try:
+                if passwort_dienst.veraltet(user[2]):
+                    c.execute('UPDATE users SET password_hash = ? WHERE id = ?',
+                              (passwort_dienst.hashen(password), user[0]))
+                    conn.commit()
+            except PasswortDienstUeberlastet:
+                pass
+
+            if not user[3]:  # is_verified
+                flash('Bitte verifizieren Sie zuerst Ihre E-Mail-Adresse.', 'error')
+                return render_template('login.html')
+
+            if not user[4]:  # is_approved
+                flash('Ihr Account wurde noch nicht von einem Administrator freigeschaltet.', 'error')
+                return render_template('login.html')
+
+            session['user_id'] = user[0]
+            session['user_name'] = user[1]
+            session['is_admin'] = user[5]
+
+            flash(f'Willkommen zurück, {user[1]}!', 'success')
+            return redirect(url_for('protokolle.dashboard'))
+        else:
+            flash('Ungültige Anmeldedaten.', 'error')
+
+    return render_template('login.html')
+
+
+@auth_bp.route('/logout')
+def logout():
+    """Benutzerabmeldung"""
+    session.clear()
+    flash('Sie wurden erfolgreich abgemeldet.', 'info')
+    return redirect(url_for('seiten.index'))
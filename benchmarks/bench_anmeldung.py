@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Latenz normaler Seiten während einer Credential-Stuffing-Welle auf /login
+vorher (Hashing ohne Begrenzung in jedem Anfrage-Thread, keine Drosselung) und
+nachher (begrenzter Passwort-Pool mit Warteschlange, Token-Buckets pro IP und Konto).
+
+Wie bei gunicorn mit --threads bearbeitet eine feste Zahl von Anfrage-Threads alle
+Anfragen. Die Angreifer probieren wechselnde E-Mail-Adressen von einigen IP-Adressen aus,
+ein Besucher ruft währenddessen /impressum ab; gemessen wird seine Antwortzeit inklusive
+Wartezeit auf einen freien Anfrage-Thread.
+
+Aufruf:  python benchmarks/bench_anmeldung.py [--dauer 5] [--angreifer 16] [--ips 8] [--threads 8]
+"""
+
+import argparse
+import os
+import queue
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+import auth  # noqa: E402
+
+LIMITS = (auth.ANMELDE_LIMIT_IP, auth.ANMELDE_LIMIT_KONTO)
+
+
+def konfigurieren(modus):
+    app = app_module.create_app({'DATABASE': os.path.join(tempfile.mkdtemp(), f'bench_anmeldung_{modus}.db')})
+    auth.anmelde_drossel = auth.SpeicherDrossel(auth.ANMELDE_DROSSEL_MAX)
+
+    # Die Anmeldung liegt in auth.py und nutzt dessen Namen
+    if modus == 'vorher':
+        auth.passwort_dienst = app_module.PasswortDienst(256, 10 ** 6)
+        auth.ANMELDE_LIMIT_IP = auth.ANMELDE_LIMIT_KONTO = (10 ** 9, 10 ** 9)
+    else:
+        auth.passwort_dienst = app_module.PasswortDienst(app_module.PASSWORT_WORKER,
+                                                         app_module.PASSWORT_WARTESCHLANGE)
+        auth.ANMELDE_LIMIT_IP, auth.ANMELDE_LIMIT_KONTO = LIMITS
+    return app
+
+
+def run(modus, args):
+    app = konfigurieren(modus)
+    ende = time.perf_counter() + args.dauer
+    anfragen = queue.Queue()
+    antworten = {}
+    latenzen = []
+    lock = threading.Lock()
+
+    def anfrage_thread():
+        client = app.test_client()
+        while True:
+            auftrag = anfragen.get()
+            if auftrag is None:
+                return
+            methode, url, kwargs, fertig = auftrag
+            fertig.append(client.open(url, method=methode, **kwargs).status_code)
+            fertig[0].set()
+
+    def senden(methode, url, **kwargs):
+        """Anfrage einreihen und warten, bis ein Anfrage-Thread sie beantwortet hat"""
+        fertig = [threading.Event()]
+        anfragen.put((methode, url, kwargs, fertig))
+        fertig[0].wait()
+        return fertig[1]
+
+    def angreifer(nummer):
+        zufall = random.Random(nummer)
+        while time.perf_counter() < ende:
+            status = senden('POST', '/login',
+                            data={'email': f'opfer{zufall.randrange(10 ** 6)}@example.org',
+                                  'password': 'passwort123'},
+                            environ_base={'REMOTE_ADDR': f'203.0.113.{zufall.randrange(args.ips)}'})
+            with lock:
+                antworten[status] = antworten.get(status, 0) + 1
+
+    def besucher():
+        while time.perf_counter() < ende:
+            start = time.perf_counter()
+            status = senden('GET', '/impressum')
+            latenzen.append(time.perf_counter() - start)
+            assert status == 200
+            time.sleep(0.02)
+
+    server = [threading.Thread(target=anfrage_thread, daemon=True) for _ in range(args.threads)]
+    clients = [threading.Thread(target=angreifer, args=(nummer,)) for nummer in range(args.angreifer)]
+    clients.append(threading.Thread(target=besucher))
+    for t in server + clients:
+        t.start()
+    for t in clients:
+        t.join()
+    for _ in server:
+        anfragen.put(None)
+
+    latenzen.sort()
+    p95 = latenzen[int(len(latenzen) * 0.95)]
+    return statistics.median(latenzen), p95, antworten
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dauer', type=float, default=5)
+    parser.add_argument('--angreifer', type=int, default=16)
+    parser.add_argument('--ips', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    for modus in ('vorher', 'nachher'):
+        p50, p95, antworten = run(modus, args)
+        verteilung = ', '.join(f'{status}: {anzahl}' for status, anzahl in sorted(antworten.items()))
+        print(f'{modus:8} /impressum p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms   /login {verteilung}')
+
+
+if __name__ == '__main__':
+    main()
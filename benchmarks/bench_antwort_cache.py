@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: /protokolle mit wiederkehrenden Filtern
+ohne Antwort-Cache, mit LRU im Prozess und mit Redis-Backend
+(gegen den Redis-Ersatz aus tests/conftest.py, oder --redis redis://host:port für einen echten Server).
+
+Aufruf:  python benchmarks/bench_antwort_cache.py [--requests 500] [--protokolle 2000]
+         (Abhängigkeiten: pip install -r requirements-dev.txt)
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from tests.conftest import RedisErsatz  # noqa: E402
+
+FILTER = [
+    '',
+    '?bundesland=Bayern',
+    '?bundesland=Nordrhein-Westfalen',
+    '?hashtag=%23Onkologie',
+    '?hashtag=%23Niere&bundesland=Bayern',
+]
+
+
+def seed(anzahl_protokolle):
+    """Testdatenbank mit Protokollen in mehreren Bundesländern füllen"""
+    app = app_module.create_app({'DATABASE': os.path.join(tempfile.mkdtemp(), 'bench_cache.db')})
+    conn = app_module.db_connect(app.config['DATABASE'])
+    c = conn.cursor()
+    c.execute('SELECT id FROM users WHERE is_admin = TRUE')
+    user_id = c.fetchone()[0]
+    c.execute('SELECT id FROM pruefer ORDER BY id LIMIT 3')
+    p1, p2, p3 = [row[0] for row in c.fetchall()]
+    zufall = random.Random(1)
+    c.executemany('''
+                  INSERT INTO protokolle (user_id, datum, bundesland, pruefer1_id, pruefer2_id,
+                                          pruefer3_id, inhalt, hashtags, kommentar)
+                  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                  ''', [(user_id, f'2024-{zufall.randint(1, 12):02d}-01', zufall.choice(app_module.BUNDESLAENDER),
+                         p1, p2, p3, 'Prüfungsinhalt ' * 40, zufall.choice(['#Onkologie #Niere', '#Blase']), '')
+                        for _ in range(anzahl_protokolle)])
+    conn.commit()
+    conn.close()
+    return app, user_id
+
+
+def run(name, speicher, app, user_id, args):
+    app_module.antwort_cache_speicher = speicher
+    for zaehler in app_module.antwort_cache_zaehler:
+        app_module.antwort_cache_zaehler[zaehler] = 0
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['is_admin'] = True
+
+    start = time.perf_counter()
+    for nummer in range(args.requests):
+        response = client.get('/protokolle' + FILTER[nummer % len(FILTER)])
+        assert response.status_code == 200
+    dauer = time.perf_counter() - start
+
+    z = app_module.antwort_cache_zaehler
+    print(f'{name:10} {args.requests / dauer:8.1f} Anfragen/s   '
+          f'Treffer {z["treffer"]}, Fehlschläge {z["fehlschlaege"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--protokolle', type=int, default=2000)
+    parser.add_argument('--redis', help='URL eines echten Redis-Servers statt des Ersatzes')
+    args = parser.parse_args()
+
+    app, user_id = seed(args.protokolle)
+    redis_url = args.redis or RedisErsatz().starten().url
+
+    run('aus', None, app, user_id, args)
+    run('speicher', app_module.SpeicherCache(app_module.ANTWORT_CACHE_BYTES), app, user_id, args)
+    run('redis', app_module.RedisCache(redis_url, app_module.ANTWORT_CACHE_TTL), app, user_id, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: E-Mail-Durchsatz gegen einen lokalen SMTP-Ersatz
+vorher (eine neue SMTP-Verbindung pro E-Mail, synchron in der Anfrage) und
+nachher (Outbox mit Worker-Threads und offen gehaltenen Verbindungen).
+
+Der SMTP-Ersatz verzögert jeden Verbindungsaufbau (wie TLS-Handshake und Login)
+und jede Nachricht, damit der Unterschied wie mit einem echten Server sichtbar wird.
+
+Aufruf:  python benchmarks/bench_email_outbox.py [--mails 200] [--verbindung-ms 80] [--nachricht-ms 5]
+"""
+
+import argparse
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+
+class SmtpErsatz(socketserver.ThreadingTCPServer):
+    """Minimaler SMTP-Server ohne TLS, der Nachrichten nur zählt"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, verbindung_ms=80, nachricht_ms=5):
+        super().__init__(('127.0.0.1', 0), _SmtpHandler)
+        self.verbindung_ms = verbindung_ms
+        self.nachricht_ms = nachricht_ms
+        self.verbindungen = 0
+        self.nachrichten = []
+        self.abgelehnt = set()  # Empfänger, die mit 550 abgewiesen werden
+        self.voruebergehend = set()  # Empfänger, die mit 451 abgewiesen werden
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def starten(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+
+    def antworten(self, zeile):
+        self.wfile.write(zeile.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.verbindungen += 1
+        time.sleep(server.verbindung_ms / 1000)
+        self.antworten('220 localhost ESMTP')
+
+        empfaenger = None
+        while True:
+            zeile = self.rfile.readline()
+            if not zeile:
+                return
+            befehl = zeile.decode('utf-8', 'replace').strip()
+            wort = befehl.split(' ', 1)[0].upper()
+
+            if wort in ('EHLO', 'HELO'):
+                self.antworten('250 localhost')
+            elif wort == 'MAIL':
+                self.antworten('250 OK')
+            elif wort == 'RCPT':
+                empfaenger = befehl.split(':', 1)[1].strip().strip('<>')
+                if empfaenger in server.abgelehnt:
+                    self.antworten('550 Mailbox unavailable')
+                elif empfaenger in server.voruebergehend:
+                    self.antworten('451 Try again later')
+                else:
+                    self.antworten('250 OK')
+            elif wort == 'DATA':
+                self.antworten('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                time.sleep(server.nachricht_ms / 1000)
+                with server.lock:
+                    server.nachrichten.append(empfaenger)
+                self.antworten('250 OK')
+            elif wort in ('RSET', 'NOOP'):
+                self.antworten('250 OK')
+            elif wort == 'QUIT':
+                self.antworten('221 Bye')
+                return
+            else:
+                self.antworten('502 Command not implemented')
+
+
+def konfigurieren(smtp):
+    """App auf den SMTP-Ersatz und eine leere Datenbank umstellen"""
+    return app_module.create_app({
+        'MAIL_SERVER': '127.0.0.1', 'MAIL_PORT': smtp.port, 'MAIL_USE_TLS': False, 'MAIL_PASSWORD': '',
+        'DATABASE': os.path.join(tempfile.mkdtemp(), 'bench_email.db'),
+    })
+
+
+def vorher(args):
+    """Jede E-Mail mit eigener Verbindung, synchron (wie das frühere send_email)"""
+    smtp = SmtpErsatz(args.verbindung_ms, args.nachricht_ms).starten()
+    app = konfigurieren(smtp)
+
+    start = time.perf_counter()
+    for nummer in range(args.mails):
+        verbindung = app_module.SmtpVerbindung(app.config)
+        verbindung.senden(f'empfaenger{nummer}@example.org', 'Benchmark', '<p>Hallo</p>')
+        verbindung.schliessen()
+    dauer = time.perf_counter() - start
+
+    smtp.shutdown()
+    return dauer, dauer / args.mails, smtp.verbindungen
+
+
+def nachher(args):
+    """E-Mails nur einreihen, Worker stellen sie im Hintergrund zu"""
+    smtp = SmtpErsatz(args.verbindung_ms, args.nachricht_ms).starten()
+    app = konfigurieren(smtp)
+
+    start = time.perf_counter()
+    with app.app_context():
+        for nummer in range(args.mails):
+            app_module.send_email(f'empfaenger{nummer}@example.org', 'Benchmark', '<p>Hallo</p>')
+    einreihen = time.perf_counter() - start
+
+    while len(smtp.nachrichten) < args.mails:
+        time.sleep(0.01)
+    dauer = time.perf_counter() - start
+
+    smtp.shutdown()
+    return dauer, einreihen / args.mails, smtp.verbindungen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mails', type=int, default=200)
+    parser.add_argument('--verbindung-ms', type=float, default=80)
+    parser.add_argument('--nachricht-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    for name, messung in (('vorher', vorher), ('nachher', nachher)):
+        dauer, pro_anfrage, verbindungen = messung(args)
+        print(f'{name:8} {args.mails / dauer:8.1f} E-Mails/s   '
+              f'{pro_anfrage * 1000:7.2f} ms in der Anfrage   {verbindungen} SMTP-Verbindungen')
+
+
+if __name__ == '__main__':
+    main()
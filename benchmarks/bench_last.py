@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lasttest der wichtigsten Seiten gegen Testdaten in Produktionsgröße (benchmarks/testdaten.py),
+einmal über den Flask-Testclient und einmal über einen echten WSGI-Server mit HTTP.
+
+Je Szenario: p50/p95/p99-Latenz, Durchsatz und Fehler; dazu die Spitze des Arbeitsspeichers.
+Das Ergebnis wird als JSON geschrieben und kann mit --vergleich gegen einen früheren Lauf
+(z. B. vom vorherigen Commit) gestellt werden.
+
+Aufruf:  python benchmarks/bench_last.py [--benutzer 500] [--protokolle 20000] [--anfragen 300]
+                                        [--threads 4] [--transport testclient,wsgi]
+                                        [--ausgabe last.json] [--vergleich alt.json]
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+import testdaten  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+ADMIN = ('admin@urologie-app.de', 'admin123')
+
+
+def filter_url(pfad, zufall, **moegliche):
+    """Pfad mit zufälliger Teilmenge der möglichen Filter"""
+    parameter = {name: zufall.choice(werte) for name, werte in moegliche.items() if zufall.random() < 0.4}
+    return pfad + ('?' + urlencode(parameter) if parameter else '')
+
+
+def szenarien(daten):
+    """Name -> (Rolle, Funktion zufall -> (Methode, URL, Formular))"""
+    bundeslaender = app_module.BUNDESLAENDER
+    hashtags = app_module.PREDEFINED_HASHTAGS
+    suchbegriffe = ['Prostatakarzinom', 'Leitlinie', 'Sonographie', 'Hodentorsion', 'PSA']
+
+    def neues_protokoll(zufall):
+        bundesland = zufall.choice(bundeslaender)
+        p1, p2, p3 = zufall.sample(daten['pruefer'][bundesland], 3)
+        return 'POST', '/protokoll/neu', {
+            'datum': '2025-03-01', 'bundesland': bundesland,
+            'pruefer1': str(p1), 'pruefer2': str(p2), 'pruefer3': str(p3),
+            'inhalt': testdaten.inhalt_erzeugen(zufall), 'hashtags': ' '.join(zufall.sample(hashtags, 2)),
+        }
+
+    return {
+        'protokolle': ('benutzer', lambda z: ('GET', filter_url(
+            '/protokolle', z, bundesland=bundeslaender, hashtag=hashtags, q=suchbegriffe), None)),
+        'admin_protokolle': ('admin', lambda z: ('GET', filter_url(
+            '/admin/protokolle', z, bundesland=bundeslaender, hashtag=hashtags, q=suchbegriffe,
+            sort=['created_at', 'datum', 'bundesland']), None)),
+        'admin_benutzer': ('admin', lambda z: ('GET', filter_url(
+            '/admin/benutzer', z, status=['all', 'pending', 'approved'], search=['Müller', 'test1'],
+            sort=['name', 'email', 'created_at', 'protokolle_count'], order=['asc', 'desc']), None)),
+        'dashboard': ('benutzer', lambda z: ('GET', '/dashboard', None)),
+        'api_pruefer': ('benutzer', lambda z: ('GET', f'/api/pruefer/{quote(z.choice(bundeslaender))}', None)),
+        'neues_protokoll': ('benutzer', neues_protokoll),
+    }
+
+
+class TestclientTransport:
+    """Anfragen direkt an die App, Session wird im Client gesetzt"""
+
+    def __init__(self, daten):
+        self.daten = daten
+
+    def client(self, rolle):
+        client = self.daten['app'].test_client()
+        user_id = self.daten['admin_id'] if rolle == 'admin' else self.daten['benutzer_id']
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['is_admin'] = rolle == 'admin'
+        return client
+
+    def senden(self, client, methode, url, formular):
+        return client.open(url, method=methode, data=formular).status_code
+
+    def beenden(self):
+        pass
+
+
+class WsgiTransport:
+    """Echter HTTP-Server (werkzeug, ein Thread pro Verbindung), Anmeldung über /login"""
+
+    def __init__(self, daten):
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)  # kein Zugriffsprotokoll je Anfrage
+        self.server = make_server('127.0.0.1', 0, daten['app'], threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cookies = {
+            'admin': self.anmelden(*ADMIN),
+            'benutzer': self.anmelden(daten['benutzer_email'], testdaten.TESTPASSWORT),
+        }
+
+    def verbindung(self):
+        return http.client.HTTPConnection('127.0.0.1', self.server.server_port, timeout=60)
+
+    def anmelden(self, email, passwort):
+        verbindung = self.verbindung()
+        verbindung.request('POST', '/login', urlencode({'email': email, 'password': passwort}),
+                           {'Content-Type': 'application/x-www-form-urlencoded'})
+        antwort = verbindung.getresponse()
+        antwort.read()
+        verbindung.close()
+        assert antwort.status == 302, f'Anmeldung als {email} fehlgeschlagen ({antwort.status})'
+        return antwort.getheader('Set-Cookie').split(';', 1)[0]
+
+    def client(self, rolle):
+        return self.verbindung(), self.cookies[rolle]
+
+    def senden(self, client, methode, url, formular):
+        verbindung, cookie = client
+        kopf = {'Cookie': cookie, 'Accept-Encoding': 'gzip'}
+        koerper = None
+        if formular is not None:
+            koerper = urlencode(formular)
+            kopf['Content-Type'] = 'application/x-www-form-urlencoded'
+        verbindung.request(methode, url, koerper, kopf)
+        antwort = verbindung.getresponse()
+        antwort.read()
+        return antwort.status
+
+    def beenden(self):
+        self.server.shutdown()
+
+
+def perzentil(werte, anteil):
+    return werte[min(len(werte) - 1, int(len(werte) * anteil))]
+
+
+def messen(transport, rolle, erzeuger, args, seed):
+    """Ein Szenario mit args.threads parallelen Clients ausführen"""
+    pro_thread = max(1, args.anfragen // args.threads)
+    latenzen = []
+    fehler = []
+
+    def worker(nummer):
+        zufall = random.Random(seed * 1000 + nummer)
+        client = transport.client(rolle)
+        for _ in range(pro_thread):
+            methode, url, formular = erzeuger(zufall)
+            start = time.perf_counter()
+            status = transport.senden(client, methode, url, formular)
+            latenzen.append(time.perf_counter() - start)
+            if status >= 400:
+                fehler.append(status)
+
+    threads = [threading.Thread(target=worker, args=(nummer,)) for nummer in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    dauer = time.perf_counter() - start
+
+    latenzen.sort()
+    return {
+        'anfragen': len(latenzen),
+        'fehler': len(fehler),
+        'anfragen_pro_s': round(len(latenzen) / dauer, 1),
+        'p50_ms': round(perzentil(latenzen, 0.50) * 1000, 2),
+        'p95_ms': round(perzentil(latenzen, 0.95) * 1000, 2),
+        'p99_ms': round(perzentil(latenzen, 0.99) * 1000, 2),
+    }
+
+
+def daten_vorbereiten(args):
+    pfad = os.path.join(tempfile.mkdtemp(), 'bench_last.db')
+    bericht = testdaten.datenbank_erzeugen(pfad, benutzer=args.benutzer, protokolle=args.protokolle,
+                                           seed=args.seed)
+    # Erinnerungen und E-Mail-Worker würden die Messung verfälschen
+    app = app_module.create_app({'DATABASE': pfad, 'HINTERGRUND_DIENSTE': 'extern'})
+    conn = app_module.db_connect(pfad)
+    admin_id = conn.execute('SELECT id FROM users WHERE is_admin = TRUE ORDER BY id LIMIT 1').fetchone()[0]
+    benutzer_id, benutzer_email = conn.execute('''
+                                               SELECT id, email FROM users
+                                               WHERE is_approved = TRUE AND is_verified = TRUE AND is_admin = FALSE
+                                               ORDER BY id LIMIT 1
+                                               ''').fetchone()
+    pruefer = {}
+    for pruefer_id, bundesland in conn.execute('SELECT id, bundesland FROM pruefer ORDER BY id'):
+        pruefer.setdefault(bundesland, []).append(pruefer_id)
+    conn.close()
+    return {'app': app, 'admin_id': admin_id, 'benutzer_id': benutzer_id, 'benutzer_email': benutzer_email,
+            'pruefer': pruefer, 'bericht': bericht}
+
+
+def commit_kennung():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def vergleichen(alt, neu):
+    print(f"\nVergleich mit {alt.get('commit') or 'früherem Lauf'}:")
+    for transport, ergebnisse in neu['ergebnisse'].items():
+        for name, werte in ergebnisse.items():
+            vorher = alt.get('ergebnisse', {}).get(transport, {}).get(name)
+            if not vorher:
+                continue
+            print(f"  {transport:10} {name:18} p95 {vorher['p95_ms']:8.2f} -> {werte['p95_ms']:8.2f} ms   "
+                  f"{vorher['anfragen_pro_s']:7.1f} -> {werte['anfragen_pro_s']:7.1f} Anfragen/s")
+    print(f"  RSS-Spitze {alt['rss_spitze_mb']:.1f} -> {neu['rss_spitze_mb']:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benutzer', type=int, default=500)
+    parser.add_argument('--protokolle', type=int, default=20000)
+    parser.add_argument('--anfragen', type=int, default=300, help='Anfragen je Szenario und Transport')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--transport', default='testclient,wsgi')
+    parser.add_argument('--szenarien', help='Kommagetrennte Auswahl, Standard: alle')
+    parser.add_argument('--ausgabe', help='JSON-Datei für das Ergebnis')
+    parser.add_argument('--vergleich', help='JSON-Datei eines früheren Laufs')
+    args = parser.parse_args()
+
+    daten = daten_vorbereiten(args)
+    alle = szenarien(daten)
+    auswahl = args.szenarien.split(',') if args.szenarien else list(alle)
+
+    ergebnis = {
+        'commit': commit_kennung(),
+        'zeitpunkt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'cpus': os.cpu_count(),
+        'parameter': {k: v for k, v in vars(args).items() if k not in ('ausgabe', 'vergleich')},
+        'daten': {k: v for k, v in daten['bericht'].items() if k != 'dauer'},
+        'ergebnisse': {},
+    }
+
+    transporte = {'testclient': TestclientTransport, 'wsgi': WsgiTransport}
+    for transport_name in args.transport.split(','):
+        transport = transporte[transport_name](daten)
+        ergebnis['ergebnisse'][transport_name] = {}
+        for nummer, name in enumerate(auswahl):
+            rolle, erzeuger = alle[name]
+            werte = messen(transport, rolle, erzeuger, args, args.seed + nummer)
+            ergebnis['ergebnisse'][transport_name][name] = werte
+            print(f"{transport_name:10} {name:18} p50 {werte['p50_ms']:8.2f}  p95 {werte['p95_ms']:8.2f}  "
+                  f"p99 {werte['p99_ms']:8.2f} ms  {werte['anfragen_pro_s']:7.1f} Anfragen/s  "
+                  f"{werte['fehler']} Fehler")
+        transport.beenden()
+
+    # ru_maxrss ist unter Linux in KiB, unter macOS in Bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    ergebnis['rss_spitze_mb'] = round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    print(f"RSS-Spitze: {ergebnis['rss_spitze_mb']} MB")
+
+    if args.ausgabe:
+        with open(args.ausgabe, 'w', encoding='utf-8') as datei:
+            json.dump(ergebnis, datei, ensure_ascii=False, indent=2)
+    if args.vergleich:
+        with open(args.vergleich, encoding='utf-8') as datei:
+            vergleichen(json.load(datei), ergebnis)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Anfragen pro Sekunde auf /protokolle
+vorher (eine neue Verbindung pro Anfrage, Standard-Pragmas) und
+nachher (Verbindungs-Pool mit WAL und abgestimmten Pragmas).
+
+Aufruf:  python benchmarks/bench_protokolle.py [--requests 500] [--protokolle 500] [--threads 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+PRAGMAS = list(app_module.DB_PRAGMAS)
+
+
+def seed(datenbank, anzahl_protokolle):
+    """Testdatenbank mit Protokollen füllen"""
+    conn = app_module.db_connect(datenbank)
+    c = conn.cursor()
+    c.execute('SELECT id FROM users WHERE is_admin = TRUE')
+    user_id = c.fetchone()[0]
+    c.execute('SELECT id FROM pruefer ORDER BY id LIMIT 3')
+    p1, p2, p3 = [row[0] for row in c.fetchall()]
+    c.executemany('''
+                  INSERT INTO protokolle (user_id, datum, bundesland, pruefer1_id, pruefer2_id,
+                                          pruefer3_id, inhalt, hashtags, kommentar)
+                  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                  ''', [(user_id, '2024-05-01', 'Bayern', p1, p2, p3,
+                         'Prüfungsinhalt ' * 40, '#Onkologie #Niere', '') for _ in range(anzahl_protokolle)])
+    conn.commit()
+    conn.close()
+    return user_id
+
+
+def run(modus, args):
+    """Einen Durchlauf in einer eigenen Datenbank messen"""
+    if modus == 'vorher':
+        app_module.DB_POOL_SIZE = 0
+        app_module.DB_PRAGMAS = []
+    else:
+        app_module.DB_POOL_SIZE = 8
+        app_module.DB_PRAGMAS = list(PRAGMAS)
+
+    # Neue Datenbank und damit ein eigener Pool
+    app = app_module.create_app({'DATABASE': os.path.join(tempfile.mkdtemp(), f'bench_{modus}.db')})
+    user_id = seed(app.config['DATABASE'], args.protokolle)
+    pro_thread = args.requests // args.threads
+
+    def worker():
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['is_admin'] = True
+        for _ in range(pro_thread):
+            response = client.get('/protokolle')
+            assert response.status_code == 200
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    dauer = time.perf_counter() - start
+
+    return pro_thread * args.threads / dauer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--protokolle', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    vorher = run('vorher', args)
+    nachher = run('nachher', args)
+
+    print(f'/protokolle vorher:  {vorher:8.1f} Anfragen/s')
+    print(f'/protokolle nachher: {nachher:8.1f} Anfragen/s')
+    print(f'Faktor:              {nachher / vorher:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Durchsatz von gunicorn (gunicorn.conf.py) mit 1 bis N Workern
+
+Startet für jede Worker-Zahl einen echten gunicorn-Master gegen dieselbe Testdatenbank
+(benchmarks/testdaten.py), meldet einen Benutzer an und lässt mehrere Client-Prozesse
+über Keep-Alive-Verbindungen /protokolle (mit Filtern), /dashboard und /api/pruefer abrufen.
+Alle Worker müssen dieselbe Sitzung akzeptieren; Umleitungen auf /login zählen als Fehler.
+
+Mit --hup wird nach der halben Dauer ein SIGHUP an den Master geschickt (Worker werden
+ausgetauscht); abgebrochene Keep-Alive-Verbindungen baut der Client neu auf, wie ein Browser.
+
+Die Clients brauchen selbst CPU: für aussagekräftige Zahlen auf einer Maschine mit mehr
+Kernen messen, als Worker gestartet werden.
+
+Aufruf:  python benchmarks/bench_skalierung.py [--max-worker 4] [--dauer 10] [--clients 8]
+                                              [--sitzungen cookie,sqlite] [--hup]
+"""
+
+import argparse
+import http.client
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote, urlencode
+
+BAUM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BAUM)
+
+import app as app_module  # noqa: E402
+import testdaten  # noqa: E402
+
+SUCHBEGRIFFE = ['Prostatakarzinom', 'Leitlinie', 'Sonographie', 'Hodentorsion', 'PSA']
+
+
+def freier_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def gunicorn_starten(port, worker, sitzungen, datenbank, verzeichnis):
+    umgebung = dict(os.environ, BIND=f'127.0.0.1:{port}', WEB_CONCURRENCY=str(worker), DATABASE=datenbank,
+                    SITZUNGEN=sitzungen, HINTERGRUND_DIENSTE='extern', SECRET_KEY='bench-skalierung',
+                    PYTHONPATH=BAUM)
+    prozess = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', os.path.join(BAUM, 'gunicorn.conf.py'),
+                                '--access-logfile', '/dev/null'],
+                               cwd=verzeichnis, env=umgebung, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    ende = time.monotonic() + 60
+    while time.monotonic() < ende:
+        try:
+            verbindung = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            verbindung.request('GET', '/impressum')
+            if verbindung.getresponse().status == 200:
+                return prozess
+        except OSError:
+            time.sleep(0.1)
+    prozess.kill()
+    raise RuntimeError('gunicorn ist nicht gestartet')
+
+
+def anmelden(port, email, passwort):
+    verbindung = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    verbindung.request('POST', '/login', urlencode({'email': email, 'password': passwort}),
+                       {'Content-Type': 'application/x-www-form-urlencoded'})
+    antwort = verbindung.getresponse()
+    antwort.read()
+    assert antwort.status == 302, f'Anmeldung fehlgeschlagen ({antwort.status})'
+    cookie = antwort.getheader('Set-Cookie').split(';', 1)[0]
+
+    # Flash-Meldung der Anmeldung einmal abholen; sonst schickt der Client sie bei jeder
+    # Anfrage im Cookie mit und umgeht damit den Antwort-Cache
+    verbindung.request('GET', '/dashboard', headers={'Cookie': cookie})
+    antwort = verbindung.getresponse()
+    antwort.read()
+    neu = antwort.getheader('Set-Cookie')
+    return neu.split(';', 1)[0] if neu else cookie
+
+
+def url_erzeugen(zufall):
+    wahl = zufall.random()
+    if wahl < 0.5:
+        filter_ = {}
+        if zufall.random() < 0.4:
+            filter_['bundesland'] = zufall.choice(app_module.BUNDESLAENDER)
+        if zufall.random() < 0.3:
+            filter_['q'] = zufall.choice(SUCHBEGRIFFE)
+        return '/protokolle' + ('?' + urlencode(filter_) if filter_ else '')
+    if wahl < 0.8:
+        return '/dashboard'
+    return f'/api/pruefer/{quote(zufall.choice(app_module.BUNDESLAENDER))}'
+
+
+def last(port, cookie, ende, seed):
+    """In einem Client-Prozess: Anfragen bis zur Uhrzeit ende (time.time)"""
+    zufall = random.Random(seed)
+    kopf = {'Cookie': cookie, 'Accept-Encoding': 'gzip'}
+    verbindung = None
+    latenzen = []
+    fehler = 0
+    neu_verbunden = 0
+
+    while time.time() < ende:
+        url = url_erzeugen(zufall)
+        start = time.perf_counter()
+        for versuch in range(2):
+            if verbindung is None:
+                verbindung = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            try:
+                verbindung.request('GET', url, headers=kopf)
+                antwort = verbindung.getresponse()
+                antwort.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionError):
+                # Keep-Alive-Verbindung vom (ausgetauschten) Worker geschlossen
+                verbindung.close()
+                verbindung = None
+                neu_verbunden += 1
+        else:
+            fehler += 1
+            continue
+        latenzen.append(time.perf_counter() - start)
+        if antwort.status != 200:
+            fehler += 1
+    return latenzen, fehler, neu_verbunden
+
+
+def messen(port, cookie, args, gunicorn):
+    ende = time.time() + args.dauer
+    with ProcessPoolExecutor(args.clients) as pool:
+        auftraege = [pool.submit(last, port, cookie, ende, nummer) for nummer in range(args.clients)]
+        if args.hup:
+            time.sleep(args.dauer / 2)
+            gunicorn.send_signal(signal.SIGHUP)
+        ergebnisse = [auftrag.result() for auftrag in auftraege]
+
+    latenzen = sorted(latenz for teil, _, _ in ergebnisse for latenz in teil)
+    return {
+        'anfragen_pro_s': len(latenzen) / args.dauer,
+        'p50_ms': statistics.median(latenzen) * 1000,
+        'p95_ms': latenzen[int(len(latenzen) * 0.95)] * 1000,
+        'fehler': sum(f for _, f, _ in ergebnisse),
+        'neu_verbunden': sum(n for _, _, n in ergebnisse),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-worker', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--dauer', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=8, help='Client-Prozesse mit je einer Verbindung')
+    parser.add_argument('--sitzungen', default='cookie', help='cookie, sqlite oder beides (kommagetrennt)')
+    parser.add_argument('--hup', action='store_true', help='Nach der halben Dauer SIGHUP an den Master')
+    parser.add_argument('--benutzer', type=int, default=500)
+    parser.add_argument('--protokolle', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    verzeichnis = tempfile.mkdtemp()
+    datenbank = os.path.join(verzeichnis, 'bench_skalierung.db')
+    testdaten.datenbank_erzeugen(datenbank, benutzer=args.benutzer, protokolle=args.protokolle, seed=args.seed)
+    conn = app_module.db_connect(datenbank)
+    email = conn.execute('''
+                         SELECT email FROM users
+                         WHERE is_approved = TRUE AND is_verified = TRUE AND is_admin = FALSE
+                         ORDER BY id LIMIT 1
+                         ''').fetchone()[0]
+    conn.close()
+    print(f'{os.cpu_count()} CPUs, {args.clients} Clients, {args.dauer:.0f} s je Messung')
+
+    for sitzungen in args.sitzungen.split(','):
+        basis = None
+        for worker in range(1, args.max_worker + 1):
+            port = freier_port()
+            gunicorn = gunicorn_starten(port, worker, sitzungen, datenbank, verzeichnis)
+            try:
+                werte = messen(port, anmelden(port, email, testdaten.TESTPASSWORT), args, gunicorn)
+            finally:
+                gunicorn.send_signal(signal.SIGTERM)
+                gunicorn.wait()
+            basis = basis or werte['anfragen_pro_s']
+            print(f"{sitzungen:7} {worker:2} Worker  {werte['anfragen_pro_s']:8.1f} Anfragen/s "
+                  f"({werte['anfragen_pro_s'] / basis:4.2f}x)  p50 {werte['p50_ms']:7.1f} ms  "
+                  f"p95 {werte['p95_ms']:7.1f} ms  {werte['fehler']} Fehler"
+                  + (f", {werte['neu_verbunden']} neu verbunden" if args.hup else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Kaltstart und Fork eines Workers
+
+Jede Messung läuft in einem frischen Interpreter gegen eine Datenbank mit aktuellem Schema:
+  import      import app
+  app         create_app() (bzw. init_db() bei Ständen ohne Factory)
+  fork        wie gunicorn --preload: Fork nach dem Laden, Zeit bis zur ersten Antwort im Kind
+Dazu die Module, die beim Start unnötig mitgeladen werden (smtplib, email.mime, ...).
+
+Mit --vergleich wird derselbe Ablauf für einen anderen Git-Stand (in einem temporären
+Worktree) gemessen, z. B. --vergleich HEAD~1.
+
+Aufruf:  python benchmarks/bench_start.py [--wiederholungen 10] [--vergleich HEAD~1]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BAUM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BEOBACHTETE_MODULE = ('smtplib', 'email.mime.text', 'flask_mail', 'brotli')
+
+
+def messung(datenbank):
+    """Im Kindprozess: eine Messung ausgeben (JSON)"""
+    start = time.perf_counter()
+    import app as app_module
+    importiert = time.perf_counter()
+
+    if hasattr(app_module, 'create_app'):
+        app = app_module.create_app({'DATABASE': datenbank})
+    else:
+        app_module.DATABASE = datenbank
+        app_module.init_db()
+        app = app_module.app
+    erzeugt = time.perf_counter()
+    geladen = [name for name in BEOBACHTETE_MODULE if name in sys.modules]
+
+    lesen, schreiben = os.pipe()
+    fork_start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        status = app.test_client().get('/impressum').status_code
+        os.write(schreiben, json.dumps([time.perf_counter() - fork_start, status]).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    fork_dauer, status = json.loads(os.read(lesen, 1024))
+    assert status == 200, status
+
+    print(json.dumps({
+        'import_ms': (importiert - start) * 1000,
+        'app_ms': (erzeugt - importiert) * 1000,
+        'fork_ms': fork_dauer * 1000,
+        'module': geladen,
+    }))
+
+
+def baum_messen(baum, wiederholungen):
+    """Messungen für einen Quellbaum in frischen Interpretern, Median je Wert"""
+    datenbank = os.path.join(tempfile.mkdtemp(), 'bench_start.db')
+    umgebung = dict(os.environ, PYTHONPATH=baum, HINTERGRUND_DIENSTE='extern')
+    ergebnisse = []
+    # Erster Lauf legt Datenbank, .pyc-Dateien und Template-Cache an und zählt nicht
+    for _ in range(wiederholungen + 1):
+        ausgabe = subprocess.run([sys.executable, os.path.abspath(__file__), '--messung', datenbank],
+                                 cwd=baum, env=umgebung, capture_output=True, text=True, check=True).stdout
+        ergebnisse.append(json.loads(ausgabe.strip().splitlines()[-1]))
+    ergebnisse = ergebnisse[1:]
+    median = {schluessel: statistics.median(e[schluessel] for e in ergebnisse)
+              for schluessel in ('import_ms', 'app_ms', 'fork_ms')}
+    median['module'] = ergebnisse[-1]['module']
+    return median
+
+
+def ausgeben(name, werte):
+    print(f"{name:10} import {werte['import_ms']:7.1f} ms   app {werte['app_ms']:7.1f} ms   "
+          f"fork bis erste Antwort {werte['fork_ms']:7.1f} ms   "
+          f"geladen: {', '.join(werte['module']) or '–'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wiederholungen', type=int, default=10)
+    parser.add_argument('--vergleich', help='Git-Stand, der zusätzlich gemessen wird (z. B. HEAD~1)')
+    parser.add_argument('--messung', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.messung:
+        messung(args.messung)
+        return
+
+    if args.vergleich:
+        worktree = os.path.join(tempfile.mkdtemp(), 'vergleich')
+        subprocess.run(['git', 'worktree', 'add', '--detach', '-q', worktree, args.vergleich], cwd=BAUM, check=True)
+        try:
+            ausgeben(args.vergleich, baum_messen(worktree, args.wiederholungen))
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=BAUM, check=True)
+    ausgeben('aktuell', baum_messen(BAUM, args.wiederholungen))
+
+
+if __name__ == '__main__':
+    main()
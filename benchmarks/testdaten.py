@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Deterministische Testdaten in Produktionsgröße: Benutzer, Prüfer in allen 16 Bundesländern,
+Protokolle mit realistisch langen Inhalten und Hashtags aus PREDEFINED_HASHTAGS sowie
+Erinnerungen. Gleicher --seed ergibt dieselben Daten.
+
+Alle erzeugten Benutzer haben das Passwort TESTPASSWORT.
+
+Aufruf:  python benchmarks/testdaten.py DATENBANK [--benutzer 500] [--protokolle 20000] [--seed 1]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+TESTPASSWORT = 'testpasswort'
+STICHTAG = datetime(2025, 1, 1)  # feste Zeitachse, damit die Daten reproduzierbar bleiben
+BLOCK = 1000
+
+VORNAMEN = ['Anna', 'Ben', 'Clara', 'David', 'Elif', 'Felix', 'Greta', 'Hannes', 'Ida', 'Jonas', 'Katharina',
+            'Lukas', 'Marie', 'Niklas', 'Olga', 'Paul', 'Quirin', 'Rana', 'Sophie', 'Tobias', 'Ulrike',
+            'Viktor', 'Wiebke', 'Yusuf', 'Zoe']
+NACHNAMEN = ['Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Schulz',
+             'Hoffmann', 'Schäfer', 'Koch', 'Bauer', 'Richter', 'Klein', 'Wolf', 'Schröder', 'Neumann',
+             'Schwarz', 'Zimmermann', 'Braun', 'Krüger', 'Hofmann', 'Hartmann', 'Lange', 'Schmitt',
+             'Werner', 'Krause', 'Meier', 'Lehmann', 'Köhler', 'Huber', 'Kaiser', 'Fuchs', 'Peters', 'Jung']
+TITEL = ['Dr.', 'Dr.', 'PD Dr.', 'Prof. Dr.', 'Prof. Dr.']
+
+# Einwohner in Millionen, gewichtet die Bundesländer der Protokolle
+EINWOHNER = {
+    'Baden-Württemberg': 11.3, 'Bayern': 13.4, 'Berlin': 3.8, 'Brandenburg': 2.6, 'Bremen': 0.7,
+    'Hamburg': 1.9, 'Hessen': 6.4, 'Mecklenburg-Vorpommern': 1.6, 'Niedersachsen': 8.1,
+    'Nordrhein-Westfalen': 18.1, 'Rheinland-Pfalz': 4.2, 'Saarland': 1.0, 'Sachsen': 4.1,
+    'Sachsen-Anhalt': 2.2, 'Schleswig-Holstein': 2.9, 'Thüringen': 2.1,
+}
+
+THEMEN = ['Prostatakarzinom', 'Nierenzellkarzinom', 'Urothelkarzinom der Blase', 'Hodentumor',
+          'Urolithiasis', 'Harninkontinenz der Frau', 'neurogene Blase', 'Harnröhrenstriktur',
+          'Varikozele', 'Hydronephrose', 'Pyelonephritis', 'Hodentorsion', 'Peniskarzinom',
+          'vesikoureteraler Reflux', 'Nierentransplantation', 'benigne Prostatahyperplasie']
+SAETZE = [
+    'Zu Beginn wurde ich nach der Epidemiologie des {thema}s gefragt.',
+    'Der Prüfer wollte die Einteilung nach TNM und die Konsequenzen für die Therapie hören.',
+    'Danach ging es um die Bildgebung, insbesondere CT, MRT und die Rolle der Sonographie.',
+    'Es folgte ein Fall: {alter}-jähriger Patient mit {thema}, welche Diagnostik veranlassen Sie?',
+    'Wir haben ausführlich über die operative Therapie und ihre Komplikationen gesprochen.',
+    'Gefragt wurde auch nach der aktuellen S3-Leitlinie und den Nachsorgeintervallen.',
+    'Die Atmosphäre war freundlich, die Fragen kamen zügig hintereinander.',
+    'Zum Schluss kamen Fragen zur Pharmakologie, unter anderem Dosierung und Nebenwirkungen.',
+    'Ein Röntgenbild wurde gezeigt, ich sollte den Befund beschreiben und einordnen.',
+    'Der Vorsitzende fragte nach Differentialdiagnosen und dem weiteren Vorgehen in der Notaufnahme.',
+    'Laborwerte wie Kreatinin, PSA und das Urinsediment sollten interpretiert werden.',
+    'Wichtig war die Aufklärung des Patienten und die Dokumentation.',
+]
+KOMMENTARE = ['Gut vorbereitet mit den Leitlinien.', 'Fair, aber detailliert.', 'Viel Fallbezug.',
+              'Zeit war knapp.', 'Sehr angenehme Prüfung!']
+
+
+def gewichtet(zufall, werte, gewichte, anzahl=1):
+    return zufall.choices(werte, weights=gewichte, k=anzahl)
+
+
+def inhalt_erzeugen(zufall):
+    """Fließtext mit log-normal verteilter Länge (Median etwa 900 Zeichen)"""
+    ziel = min(8000, max(150, int(zufall.lognormvariate(math.log(900), 0.6))))
+    thema = zufall.choice(THEMEN)
+    teile = []
+    laenge = 0
+    while laenge < ziel:
+        satz = zufall.choice(SAETZE).format(thema=thema, alter=zufall.randint(18, 85))
+        teile.append(satz)
+        laenge += len(satz) + 1
+    return ' '.join(teile)
+
+
+def datum_erzeugen(zufall, tage):
+    return (STICHTAG - timedelta(days=zufall.randrange(tage), seconds=zufall.randrange(86400)))
+
+
+def erzeugen(conn, benutzer=500, protokolle=20000, pruefer_pro_land=25, erinnerungen=0.3, seed=1):
+    """Testdaten in eine bestehende (per init_db angelegte) Datenbank schreiben"""
+    zufall = random.Random(seed)
+    c = conn.cursor()
+    start = time.perf_counter()
+
+    # Ein einziger Hash für alle Benutzer, sonst dauert das Erzeugen länger als der Benchmark
+    passwort_hash = app_module.generate_password_hash(TESTPASSWORT, app_module.PASSWORT_HASH_METHODE)
+
+    conn.execute('BEGIN IMMEDIATE')
+    c.executemany('''
+                  INSERT INTO users (name, email, password_hash, ausbildungsjahr, is_verified,
+                                     is_approved, created_at)
+                  VALUES (?, ?, ?, ?, ?, ?, ?)
+                  ''', [(f'{zufall.choice(VORNAMEN)} {zufall.choice(NACHNAMEN)}', f'test{nummer}@example.org',
+                         passwort_hash, zufall.randint(1, 6), zufall.random() < 0.97, zufall.random() < 0.9,
+                         datum_erzeugen(zufall, 3 * 365))
+                        for nummer in range(benutzer)])
+    c.execute("SELECT id FROM users WHERE email LIKE 'test%@example.org' ORDER BY id")
+    user_ids = [row[0] for row in c.fetchall()]
+
+    # Prüfer: eindeutige Namen je Bundesland
+    neue_pruefer = []
+    for bundesland in app_module.BUNDESLAENDER:
+        namen = set()
+        while len(namen) < pruefer_pro_land:
+            namen.add(f'{zufall.choice(TITEL)} {zufall.choice(VORNAMEN)[0]}. {zufall.choice(NACHNAMEN)}')
+        neue_pruefer.extend((name, bundesland) for name in sorted(namen))
+    c.executemany('INSERT INTO pruefer (name, bundesland) VALUES (?, ?) ON CONFLICT (bundesland, name) DO NOTHING',
+                  neue_pruefer)
+    pruefer = {}
+    c.execute('SELECT id, bundesland FROM pruefer ORDER BY id')
+    for pruefer_id, bundesland in c.fetchall():
+        pruefer.setdefault(bundesland, []).append(pruefer_id)
+
+    # Hashtags: wenige sehr häufige, viele seltene (Zipf)
+    katalog = app_module.hashtags_nachschlagen(
+        c, app_module.hashtags_normalisieren(' '.join(app_module.PREDEFINED_HASHTAGS)))
+    hashtag_gewichte = [1 / (rang + 1) for rang in range(len(katalog))]
+    autor_gewichte = [1 / (rang + 1) ** 0.8 for rang in range(len(user_ids))]
+    bundeslaender = app_module.BUNDESLAENDER
+    land_gewichte = [EINWOHNER[bundesland] for bundesland in bundeslaender]
+    conn.commit()
+
+    for block_start in range(0, protokolle, BLOCK):
+        zeilen = []
+        zuordnungen = []
+        for _ in range(min(BLOCK, protokolle - block_start)):
+            bundesland = gewichtet(zufall, bundeslaender, land_gewichte)[0]
+            p1, p2, p3 = zufall.sample(pruefer[bundesland], 3)
+            tags = sorted(set(gewichtet(zufall, katalog, hashtag_gewichte, zufall.randint(1, 5))))
+            zeilen.append((gewichtet(zufall, user_ids, autor_gewichte)[0],
+                           datum_erzeugen(zufall, 4 * 365).date().isoformat(), bundesland, p1, p2, p3,
+                           inhalt_erzeugen(zufall), ' '.join(name for _, name in tags),
+                           zufall.choice(KOMMENTARE) if zufall.random() < 0.3 else '',
+                           datum_erzeugen(zufall, 3 * 365)))
+            zuordnungen.append([hashtag_id for hashtag_id, _ in tags])
+
+        conn.execute('BEGIN IMMEDIATE')
+        # Innerhalb der Schreibtransaktion vergibt AUTOINCREMENT fortlaufende IDs (wie beim Import)
+        c.execute("SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'protokolle'), 0)")
+        erste_id = c.fetchone()[0] + 1
+        c.executemany('''
+                      INSERT INTO protokolle (user_id, datum, bundesland, pruefer1_id, pruefer2_id,
+                                              pruefer3_id, inhalt, hashtags, kommentar, created_at)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                      ''', zeilen)
+        c.executemany('INSERT INTO protokoll_hashtags (protokoll_id, hashtag_id) VALUES (?, ?)',
+                      [(erste_id + nummer, hashtag_id)
+                       for nummer, hashtag_ids in enumerate(zuordnungen) for hashtag_id in hashtag_ids])
+        conn.commit()
+
+    # Erinnerungen: Prüfungen teils vorbei, teils noch bevorstehend
+    conn.execute('BEGIN IMMEDIATE')
+    zeilen = []
+    for user_id in user_ids:
+        if zufall.random() >= erinnerungen:
+            continue
+        pruefungsdatum = (STICHTAG + timedelta(days=zufall.randint(-120, 120))).date()
+        anzahl = zufall.randint(0, app_module.ERINNERUNG_MAX)
+        naechste = datetime.combine(pruefungsdatum, datetime.min.time()) + timedelta(
+            days=app_module.ERINNERUNG_ABSTAENDE[min(anzahl, len(app_module.ERINNERUNG_ABSTAENDE) - 1)])
+        zeilen.append((user_id, pruefungsdatum, naechste, anzahl, zufall.random() < 0.4))
+    c.executemany('''
+                  INSERT INTO erinnerungen (user_id, pruefungsdatum, naechste_erinnerung,
+                                            anzahl_erinnerungen, protokoll_erstellt)
+                  VALUES (?, ?, ?, ?, ?)
+                  ''', zeilen)
+    conn.commit()
+    app_module.pruefer_katalog_invalidieren()
+
+    return {
+        'benutzer': len(user_ids),
+        'pruefer': sum(len(ids) for ids in pruefer.values()),
+        'protokolle': protokolle,
+        'erinnerungen': len(zeilen),
+        'seed': seed,
+        'dauer': time.perf_counter() - start,
+    }
+
+
+def datenbank_erzeugen(pfad, **optionen):
+    """Neue Datenbank unter pfad anlegen und befüllen"""
+    # create_app legt das Schema an
+    app_module.create_app({'DATABASE': pfad, 'HINTERGRUND_DIENSTE': 'extern'})
+    conn = app_module.db_connect(pfad)
+    try:
+        return erzeugen(conn, **optionen)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('datenbank')
+    parser.add_argument('--benutzer', type=int, default=500)
+    parser.add_argument('--protokolle', type=int, default=20000)
+    parser.add_argument('--pruefer-pro-land', type=int, default=25)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if os.path.exists(args.datenbank):
+        parser.error(f'{args.datenbank} existiert bereits')
+    bericht = datenbank_erzeugen(args.datenbank, benutzer=args.benutzer, protokolle=args.protokolle,
+                                 pruefer_pro_land=args.pruefer_pro_land, seed=args.seed)
+    print(f"{bericht['benutzer']} Benutzer, {bericht['pruefer']} Prüfer, {bericht['protokolle']} Protokolle, "
+          f"{bericht['erinnerungen']} Erinnerungen in {bericht['dauer']:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
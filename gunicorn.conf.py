@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+gunicorn-Konfiguration für den Produktionsbetrieb
+
+    gunicorn -c gunicorn.conf.py
+
+Umgebungsvariablen: BIND, WEB_CONCURRENCY (Worker), GUNICORN_THREADS, GUNICORN_PIDFILE,
+dazu die der App (DATABASE, SECRET_KEY, SITZUNGEN, HINTERGRUND_DIENSTE, PROXY_ANZAHL, ...).
+
+/admin/metrics beantwortet jeweils der Worker, der die Anfrage annimmt, mit seinen
+eigenen Werten; Zähler verschiedener Abrufe stammen also aus verschiedenen Prozessen
+(erkennbar an facharzt_prozess_start_sekunden). Für lückenlose Zeitreihen mit
+WEB_CONCURRENCY=1 betreiben oder die Werte nur als Stichprobe lesen.
+
+Neu laden ohne Verbindungsabbruch:
+  kill -HUP <master>    neue Worker mit neuer Konfiguration; der Code bleibt wegen
+                        preload_app der alte
+  kill -USR2 <master>   neuer Master mit neuem Code neben dem alten; sobald er läuft,
+                        kill -WINCH <alter master> (Worker beenden laufende Anfragen)
+                        und kill -QUIT <alter master>
+"""
+
+import os
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+pidfile = os.environ.get('GUNICORN_PIDFILE')
+
+# App einmal im Master laden (Import, Routen, Schema-Prüfung, Schlüssel); die Worker
+# erben sie per Fork und starten Hintergrund-Threads erst mit der ersten Anfrage
+preload_app = True
+
+# Python-Code hält den GIL, also ein Prozess pro Kern. Einige Threads je Prozess überbrücken
+# Wartezeiten (Platte, busy_timeout, Passwort-Hashing außerhalb des GIL). SQLite im WAL-Modus
+# lässt beliebig viele Leser, aber nur einen Schreiber zu: mehr Threads erhöhen vor allem
+# die Konkurrenz um die Schreibsperre. threads sollte DB_POOL_SIZE nicht übersteigen.
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Länger als busy_timeout (5 s) plus langsamste Seite; beim Neuladen dürfen laufende
+# Anfragen und Exporte bis graceful_timeout zu Ende laufen
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+# Mehrere Worker: die Anmelde-Drosselung muss die Versuche über alle Prozesse zählen,
+# sonst vervielfacht jeder Worker die erlaubte Rate. Die Datei wird vor dem Import
+# der App gelesen, ANMELDE_DROSSEL=speicher in der Umgebung hat weiterhin Vorrang.
+os.environ.setdefault('ANMELDE_DROSSEL', 'sqlite')
+
+
+def pre_fork(server, worker):
+    """Keine SQLite-Verbindungen des Masters an die Worker vererben"""
+    import app
+    app.db_pool_leeren()
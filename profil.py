@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+Eigenes Profil anzeigen, bearbeiten, löschen und exportieren (DSGVO)
+"""
+
+import json
+import re
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+
+from app import EXPORT_BATCH, berechtigungen_invalidieren, db_connect, export_puffern, get_db, login_required, \
+    passwort_dienst, protokolle_von, sitzungen_beenden
+
+profil_bp = Blueprint('profil', __name__)
+
+
+@profil_bp.route('/profil')
+@login_required
+def profil():
+    """Profil anzeigen"""
+    conn = get_db()
+    c = conn.cursor()
+
+    # Benutzer-Informationen abrufen
+    c.execute('''
+              SELECT id, name, email, ausbildungsjahr, created_at, is_admin
+              FROM users
+              WHERE id = ?
+              ''', (session['user_id'],))
+    user_data = c.fetchone()
+
+    # Benutzer-Statistiken
+    anzahl_protokolle = protokolle_von(c, session['user_id'])
+
+    c.execute('''
+              SELECT p.datum, pr.name, p.hashtags
+              FROM protokolle p
+                       JOIN pruefer pr ON p.pruefer1_id = pr.id
+              WHERE p.user_id = ?
+              ORDER BY p.created_at DESC LIMIT 5
+              ''', (session['user_id'],))
+    letzte_protokolle = c.fetchall()
+
+    # Registrierungsdauer berechnen
+    if user_data[4]:  # created_at
+        try:
+            created_date = datetime.strptime(user_data[4], '%Y-%m-%d %H:%M:%S')
+            mitglied_seit = (datetime.now() - created_date).days
+        except:
+            mitglied_seit = 0
+    else:
+        mitglied_seit = 0
+
+    user_info = {
+        'id': user_data[0],
+        'name': user_data[1],
+        'email': user_data[2],
+        'ausbildungsjahr': user_data[3],
+        'created_at': user_data[4],
+        'is_admin': user_data[5],
+        'anzahl_protokolle': anzahl_protokolle,
+        'mitglied_seit': mitglied_seit,
+        'letzte_protokolle': letzte_protokolle
+    }
+
+    return render_template('profil.html', user=user_info)
+
+
+@profil_bp.route('/profil/bearbeiten', methods=['GET', 'POST'])
+@login_required
+def profil_bearbeiten():
+    """Profil bearbeiten"""
+    if request.method == 'GET':
+        # Aktuelle Benutzerdaten laden
+        conn = get_db()
+        c = conn.cursor()
+        c.execute('''
+                  SELECT name, email, ausbildungsjahr
+                  FROM users
+                  WHERE id = ?
+                  ''', (session['user_id'],))
+        user_data = c.fetchone()
+
+        if user_data:
+            user_info = {
+                'name': user_data[0],
+                'email': user_data[1],
+                'ausbildungsjahr': user_data[2]
+            }
+            return render_template('profil_bearbeiten.html', user=user_info)
+        else:
+            flash('Benutzer nicht gefunden.', 'error')
+            return redirect(url_for('protokolle.dashboard'))
+
+    # POST Request - Profil aktualisieren
+    name = request.form.get('name', '').strip()
+    email = request.form.get('email', '').strip()
+    ausbildungsjahr = request.form.get('ausbildungsjahr', '').strip()
+    neues_passwort = request.form.get('neues_passwort', '').strip()
+    passwort_bestaetigung = request.form.get('passwort_bestaetigung', '').strip()
+    aktuelles_passwort = request.form.get('aktuelles_passwort', '').strip()
+
+    # Validierung
+    errors = []
+
+    if not name:
+        errors.append('Name ist erforderlich.')
+    elif len(name) < 2:
+        errors.append('Name muss mindestens 2 Zeichen lang sein.')
+
+    if not email:
+        errors.append('E-Mail ist erforderlich.')
+    elif not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
+        errors.append('Ungültige E-Mail-Adresse.')
+
+    if not ausbildungsjahr:
+        errors.append('Ausbildungsjahr ist erforderlich.')
+    else:
+        try:
+            ausbildungsjahr_int = int(ausbildungsjahr)
+            if ausbildungsjahr_int < 1 or ausbildungsjahr_int > 6:
+                errors.append('Ausbildungsjahr muss zwischen 1 und 6 liegen.')
+        except ValueError:
+            errors.append('Ungültiges Ausbildungsjahr.')
+
+    # Passwort-Validierung (nur wenn neues Passwort angegeben)
+    if neues_passwort:
+        if len(neues_passwort) < 6:
+            errors.append('Neues Passwort muss mindestens 6 Zeichen lang sein.')
+        elif neues_passwort != passwort_bestaetigung:
+            errors.append('Passwort-Bestätigung stimmt nicht überein.')
+
+        # Aktuelles Passwort prüfen
+        if not aktuelles_passwort:
+            errors.append('Aktuelles Passwort ist erforderlich um das Passwort zu ändern.')
+        else:
+            conn = get_db()
+            c = conn.cursor()
+            c.execute('SELECT password_hash FROM users WHERE id = ?', (session['user_id'],))
+            current_hash = c.fetchone()
+
+            if not current_hash or not passwort_dienst.pruefen(current_hash[0], aktuelles_passwort):
+                errors.append('Aktuelles Passwort ist falsch.')
+
+    # E-Mail-Eindeutigkeit prüfen (außer eigene E-Mail)
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('SELECT COUNT(*) FROM users WHERE email = ? AND id != ?', (email, session['user_id']))
+    if c.fetchone()[0] > 0:
+        errors.append('Diese E-Mail-Adresse wird bereits verwendet.')
+
+    if errors:
+        for error in errors:
+            flash(error, 'error')
+        return render_template('profil_bearbeiten.html', user={
+            'name': name,
+            'email': email,
+            'ausbildungsjahr': ausbildungsjahr
+        })
+
+    # Daten aktualisieren
+    conn = get_db()
+    c = conn.cursor()
+
+    try:
+        if neues_passwort:
+            # Mit Passwort-Update
+            password_hash = passwort_dienst.hashen(neues_passwort)
+            c.execute('''
+                      UPDATE users
+                      SET name            = ?,
+                          email           = ?,
+                          ausbildungsjahr = ?,
+                          password_hash   = ?
+                      WHERE id = ?
+                      ''', (name, email, int(ausbildungsjahr), password_hash, session['user_id']))
+            # Andere Geräte abmelden, diese Sitzung bleibt bestehen
+            sitzungen_beenden(c, session['user_id'], ausser=getattr(session, 'sid', None))
+            flash('Profil und Passwort erfolgreich aktualisiert!', 'success')
+        else:
+            # Ohne Passwort-Update
+            c.execute('''
+                      UPDATE users
+                      SET name            = ?,
+                          email           = ?,
+                          ausbildungsjahr = ?
+                      WHERE id = ?
+                      ''', (name, email, int(ausbildungsjahr), session['user_id']))
+            flash('Profil erfolgreich aktualisiert!', 'success')
+
+        # Session-Name aktualisieren
+        session['user_name'] = name
+
+        conn.commit()
+
+    except Exception as e:
+        conn.rollback()
+        flash('Fehler beim Aktualisieren des Profils.', 'error')
+        print(f"Profil-Update Fehler: {e}")
+
+    return redirect(url_for('profil.profil'))
+
+
+@profil_bp.route('/profil/loeschen', methods=['GET', 'POST'])
+@login_required
+def profil_loeschen():
+    """Profil löschen"""
+    if request.method == 'GET':
+        # Bestätigungsseite anzeigen
+        return render_template('profil_loeschen.html')
+
+    # POST Request - Profil löschen
+    passwort = request.form.get('passwort', '').strip()
+    bestaetigung = request.form.get('bestaetigung', '').strip()
+
+    # Validierung
+    if not passwort:
+        flash('Passwort ist erforderlich.', 'error')
+        return render_template('profil_loeschen.html')
+
+    if bestaetigung != 'LÖSCHEN':
+        flash('Bitte geben Sie "LÖSCHEN" zur Bestätigung ein.', 'error')
+        return render_template('profil_loeschen.html')
+
+    # Passwort prüfen
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('SELECT password_hash, name FROM users WHERE id = ?', (session['user_id'],))
+    user_data = c.fetchone()
+
+    if not user_data or not passwort_dienst.pruefen(user_data[0], passwort):
+        flash('Falsches Passwort.', 'error')
+        return render_template('profil_loeschen.html')
+
+    username = user_data[1]
+
+    try:
+        # Benutzer und zugehörige Daten löschen
+        # 1. Erinnerungen löschen
+        c.execute('DELETE FROM erinnerungen WHERE user_id = ?', (session['user_id'],))
+
+        # 2. Protokolle löschen
+        c.execute('DELETE FROM protokolle WHERE user_id = ?', (session['user_id'],))
+
+        # 3. Benutzer löschen und auf allen Geräten abmelden
+        c.execute('DELETE FROM users WHERE id = ?', (session['user_id'],))
+        sitzungen_beenden(c, session['user_id'])
+
+        conn.commit()
+        berechtigungen_invalidieren()
+
+        # Session beenden
+        session.clear()
+
+        flash(f'Profil von {username} wurde erfolgreich gelöscht.', 'info')
+
+    except Exception as e:
+        conn.rollback()
+        flash('Fehler beim Löschen des Profils.', 'error')
+        print(f"Profil-Löschung Fehler: {e}")
+
+    return redirect(url_for('seiten.index'))
+
+
+def export_zeilen(c, abfrage, parameter, spalten):
+    """Zeilen blockweise aus dem Cursor lesen und als Dicts liefern"""
+    c.execute(abfrage, parameter)
+    while True:
+        zeilen = c.fetchmany(EXPORT_BATCH)
+        if not zeilen:
+            return
+        for zeile in zeilen:
+            yield dict(zip(spalten, zeile))
+
+
+def profil_export_abschnitte(c, user_id):
+    """Abschnitte des DSGVO-Exports; Listen werden erst beim Schreiben gelesen"""
+    c.execute('''
+              SELECT name, email, ausbildungsjahr, created_at, is_verified, is_approved
+              FROM users
+              WHERE id = ?
+              ''', (user_id,))
+    user_data = c.fetchone() or (None,) * 6
+
+    yield 'export_info', {
+        'datum': datetime.now().isoformat(),
+        'typ': 'DSGVO-konformer Datenexport',
+        'benutzer_id': user_id
+    }
+    yield 'benutzer_daten', dict(zip(('name', 'email', 'ausbildungsjahr', 'registriert_am',
+                                      'email_verifiziert', 'account_freigeschaltet'), user_data))
+    yield 'protokolle', export_zeilen(c, '''
+              SELECT p.datum,
+                     p.bundesland,
+                     pr1.name,
+                     pr2.name,
+                     pr3.name,
+                     p.inhalt,
+                     p.hashtags,
+                     p.kommentar,
+                     p.created_at
+              FROM protokolle p
+                       JOIN pruefer pr1 ON p.pruefer1_id = pr1.id
+                       JOIN pruefer pr2 ON p.pruefer2_id = pr2.id
+                       JOIN pruefer pr3 ON p.pruefer3_id = pr3.id
+              WHERE p.user_id = ?
+              ORDER BY p.created_at DESC
+              ''', (user_id,), ('datum', 'bundesland', 'pruefer1', 'pruefer2', 'pruefer3',
+                                'inhalt', 'hashtags', 'kommentar', 'erstellt_am'))
+    yield 'erinnerungen', export_zeilen(c, '''
+              SELECT pruefungsdatum,
+                     naechste_erinnerung,
+                     anzahl_erinnerungen,
+                     protokoll_erstellt,
+                     created_at
+              FROM erinnerungen
+              WHERE user_id = ?
+              ''', (user_id,), ('pruefungsdatum', 'naechste_erinnerung', 'anzahl_erinnerungen',
+                                'protokoll_erstellt', 'erstellt_am'))
+
+
+def export_als_json(abschnitte):
+    """Wie json.dumps(..., indent=2), aber Datensatz für Datensatz geschrieben"""
+    yield '{'
+    for nummer, (name, inhalt) in enumerate(abschnitte):
+        yield (',' if nummer else '') + '\n  ' + json.dumps(name) + ': '
+        if isinstance(inhalt, dict):
+            yield json.dumps(inhalt, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+            continue
+        trenner = '['
+        for datensatz in inhalt:
+            yield trenner + '\n    ' + json.dumps(datensatz, indent=2, ensure_ascii=False).replace('\n', '\n    ')
+            trenner = ','
+        yield '[]' if trenner == '[' else '\n  ]'
+    yield '\n}'
+
+
+def export_als_ndjson(abschnitte):
+    """Ein JSON-Objekt pro Zeile, der Abschnitt steht im Feld 'abschnitt'"""
+    for name, inhalt in abschnitte:
+        for datensatz in ([inhalt] if isinstance(inhalt, dict) else inhalt):
+            yield json.dumps({'abschnitt': name, **datensatz}, ensure_ascii=False) + '\n'
+
+
+@profil_bp.route('/profil/export')
+@login_required
+def profil_export():
+    """Profil-Daten exportieren (DSGVO-Compliance)
+
+    ?format=json (Standard) oder ndjson, ?gzip=1 für eine komprimierte Datei.
+    Die Antwort wird gestreamt, der Speicherbedarf hängt nicht von der Anzahl
+    der Protokolle ab.
+    """
+    format_ = request.args.get('format', 'json')
+    if format_ not in ('json', 'ndjson'):
+        format_ = 'json'
+    komprimieren = request.args.get('gzip') == '1'
+    user_id = session['user_id']
+    datenbank = current_app.config['DATABASE']
+
+    def erzeugen():
+        # Eigene Verbindung mit Lesetransaktion: konsistenter Stand über alle
+        # Abschnitte, unabhängig von der Verbindung der Anfrage (die zum
+        # Zeitpunkt des Streamens schon abgebaut ist)
+        conn = db_connect(datenbank)
+        try:
+            conn.execute('BEGIN')
+            abschnitte = profil_export_abschnitte(conn.cursor(), user_id)
+            teile = export_als_ndjson(abschnitte) if format_ == 'ndjson' else export_als_json(abschnitte)
+            yield from export_puffern(teile, komprimieren)
+        finally:
+            conn.rollback()
+            conn.close()
+
+    # Download-Header setzen
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f'urologie_profil_export_{timestamp}.{format_}'
+    if komprimieren:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    else:
+        mimetype = 'application/x-ndjson' if format_ == 'ndjson' else 'application/json'
+
+    response = current_app.response_class(erzeugen(), status=200, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
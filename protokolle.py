@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Dashboard, Protokoll-Liste, neue Protokolle und Erinnerungen
+"""
+
+from datetime import datetime, timedelta
+
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, session, url_for
+
+from app import BUNDESLAENDER, ERINNERUNG_ABSTAENDE, FTS_RANKING, antwort_cache, erinnerungs_planer, fts_abfrageteile, \
+    fts_ausdruck, get_db, hashtag_bedingung, hashtag_katalog, hashtags_nachschlagen, hashtags_normalisieren, \
+    inhalts_etag, keyset_seite, login_required, protokoll_hashtags_setzen, protokolle_von, pruefer_katalog, statistik
+
+protokolle_bp = Blueprint('protokolle', __name__)
+
+
+@protokolle_bp.route('/dashboard')
+@login_required
+def dashboard():
+    """Dashboard"""
+    conn = get_db()
+    c = conn.cursor()
+
+    # Statistiken abrufen
+    meine_protokolle = protokolle_von(c, session['user_id'])
+    zaehler = statistik(c)
+    gesamt_protokolle = zaehler['protokolle']
+    anzahl_pruefer = zaehler['pruefer']
+
+    # Neueste Protokolle
+    c.execute('''
+              SELECT p.datum, p.bundesland, pr1.name, p.hashtags, p.created_at
+              FROM protokolle p
+                       JOIN pruefer pr1 ON p.pruefer1_id = pr1.id
+              ORDER BY p.created_at DESC LIMIT 5
+              ''')
+    neueste_protokolle = c.fetchall()
+
+    return render_template('dashboard.html',
+                           meine_protokolle=meine_protokolle,
+                           gesamt_protokolle=gesamt_protokolle,
+                           anzahl_pruefer=anzahl_pruefer,
+                           neueste_protokolle=neueste_protokolle)
+
+
+@protokolle_bp.route('/protokolle')
+@login_required
+@antwort_cache
+def protokolle():
+    """Protokoll-Übersicht mit Admin-Features"""
+    bundesland_filter = request.args.get('bundesland', '')
+    pruefer_filter = request.args.get('pruefer', '')
+    hashtag_filter = request.args.get('hashtag', '')
+    hashtag_modus = request.args.get('hashtag_modus', 'alle')  # alle, eines
+    suchbegriff = request.args.get('q', '').strip()
+    suche = fts_ausdruck(suchbegriff)
+
+    conn = get_db()
+    c = conn.cursor()
+
+    treffer_spalte, fts_join, treffer_params = fts_abfrageteile(suche)
+
+    # Basis-Query
+    select = f'''
+            SELECT p.id, \
+                   p.datum, \
+                   p.bundesland, \
+                   pr1.name as pruefer1, \
+                   pr2.name as pruefer2,
+                   pr3.name as pruefer3, \
+                   p.hashtags, \
+                   p.inhalt_vorschau, \
+                   p.kommentar_vorschau, \
+                   u.name   as user_name,
+                   p.user_id,
+                   {treffer_spalte} as treffer,
+                   p.inhalt_laenge, \
+                   p.kommentar_laenge, \
+                   p.version \
+            '''
+
+    query = f'''
+            FROM protokolle p
+                     JOIN pruefer pr1 ON p.pruefer1_id = pr1.id
+                     JOIN pruefer pr2 ON p.pruefer2_id = pr2.id
+                     JOIN pruefer pr3 ON p.pruefer3_id = pr3.id
+                     JOIN users u ON p.user_id = u.id
+                     {fts_join}
+            WHERE 1 = 1 \
+            '''
+
+    params = []
+
+    if suche:
+        query += ' AND protokolle_fts MATCH ?'
+        params.append(suche)
+
+    if bundesland_filter:
+        query += ' AND p.bundesland = ?'
+        params.append(bundesland_filter)
+
+    if pruefer_filter:
+        query += ' AND (pr1.name LIKE ? OR pr2.name LIKE ? OR pr3.name LIKE ?)'
+        params.extend([f'%{pruefer_filter}%'] * 3)
+
+    if hashtag_filter:
+        bedingung, hashtag_params = hashtag_bedingung(hashtags_normalisieren(hashtag_filter), hashtag_modus)
+        query += bedingung
+        params.extend(hashtag_params)
+
+    # Bei einer Suche nach Relevanz sortieren (bm25: kleiner ist besser)
+    if suche:
+        seite = keyset_seite(c, select, treffer_params, query, params, FTS_RANKING, absteigend=False)
+    else:
+        seite = keyset_seite(c, select, treffer_params, query, params, 'p.created_at', absteigend=True)
+
+    # Prüfer für Filter laden
+    c.execute('SELECT DISTINCT name FROM pruefer ORDER BY name')
+    alle_pruefer = [row[0] for row in c.fetchall()]
+
+    # Prüfen ob aktueller Benutzer Admin ist
+    is_admin = session.get('is_admin', False)
+
+    return render_template('protokolle.html',
+                           protokolle=seite['eintraege'],
+                           seite=seite,
+                           bundeslaender=BUNDESLAENDER,
+                           alle_pruefer=alle_pruefer,
+                           predefined_hashtags=hashtag_katalog(c),
+                           bundesland_filter=bundesland_filter,
+                           pruefer_filter=pruefer_filter,
+                           hashtag_filter=hashtag_filter,
+                           hashtag_modus=hashtag_modus,
+                           suchbegriff=suchbegriff,
+                           is_admin=is_admin)
+
+
+@protokolle_bp.route('/api/protokoll/<int:protokoll_id>/inhalt')
+@login_required
+def api_protokoll_inhalt(protokoll_id):
+    """API: Vollständiger Inhalt und Kommentar eines Protokolls (für "Vollständig anzeigen")"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('SELECT inhalt, kommentar FROM protokolle WHERE id = ?', (protokoll_id,))
+    protokoll = c.fetchone()
+
+    if not protokoll:
+        return jsonify({'error': 'Protokoll nicht gefunden'}), 404
+
+    response = jsonify({'id': protokoll_id, 'inhalt': protokoll[0], 'kommentar': protokoll[1] or ''})
+
+    # Nur im Browser cachen (Login erforderlich); danach per ETag revalidieren
+    response.headers['Cache-Control'] = 'private, max-age=300'
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@protokolle_bp.route('/protokoll/neu', methods=['GET', 'POST'])
+@login_required
+def neues_protokoll():
+    """Neues Protokoll erstellen"""
+    if request.method == 'POST':
+        datum = request.form.get('datum')
+        bundesland = request.form.get('bundesland')
+        pruefer1_id = request.form.get('pruefer1')
+        pruefer2_id = request.form.get('pruefer2')
+        pruefer3_id = request.form.get('pruefer3')
+        inhalt = request.form.get('inhalt')
+        hashtags = request.form.get('hashtags')
+        kommentar = request.form.get('kommentar', '')
+
+        # Validierung
+        if not all([datum, bundesland, pruefer1_id, pruefer2_id, pruefer3_id, inhalt]):
+            flash('Alle Pflichtfelder müssen ausgefüllt werden.', 'error')
+            return redirect(url_for('protokolle.neues_protokoll'))
+
+        # Prüfen ob Prüfer existieren
+        conn = get_db()
+        c = conn.cursor()
+
+        for pruefer_id in [pruefer1_id, pruefer2_id, pruefer3_id]:
+            c.execute('SELECT COUNT(*) FROM pruefer WHERE id = ?', (pruefer_id,))
+            if c.fetchone()[0] == 0:
+                flash('Ungültiger Prüfer ausgewählt.', 'error')
+                return redirect(url_for('protokolle.neues_protokoll'))
+
+        # Hashtags im Katalog auflösen (Katalog-Schreibweise übernehmen)
+        hashtag_liste = hashtags_nachschlagen(c, hashtags_normalisieren(hashtags))
+        hashtags = ' '.join(name for _, name in hashtag_liste)
+
+        # Protokoll speichern
+        c.execute('''
+                  INSERT INTO protokolle (user_id, datum, bundesland, pruefer1_id, pruefer2_id,
+                                          pruefer3_id, inhalt, hashtags, kommentar)
+                  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                  ''', (session['user_id'], datum, bundesland, pruefer1_id, pruefer2_id,
+                        pruefer3_id, inhalt, hashtags, kommentar))
+        protokoll_hashtags_setzen(c, c.lastrowid, hashtag_liste)
+
+        # Erinnerung als erledigt markieren (falls vorhanden)
+        c.execute('''
+                  UPDATE erinnerungen
+                  SET protokoll_erstellt = TRUE
+                  WHERE user_id = ?
+                    AND protokoll_erstellt = FALSE
+                  ''', (session['user_id'],))
+
+        conn.commit()
+
+        flash('Protokoll erfolgreich erstellt!', 'success')
+        return redirect(url_for('protokolle.protokolle'))
+
+    # Prüfer lädt das Formular je Bundesland über /api/pruefer nach
+    conn = get_db()
+    c = conn.cursor()
+
+    return render_template('neues_protokoll.html',
+                           bundeslaender=BUNDESLAENDER,
+                           pruefer_version=pruefer_katalog()[0],
+                           predefined_hashtags=hashtag_katalog(c))
+
+
+@protokolle_bp.route('/api/pruefer/<bundesland>')
+@login_required
+def api_pruefer(bundesland):
+    """API: Prüfer nach Bundesland"""
+    version, katalog = pruefer_katalog()
+    pruefer, etag = katalog.get(bundesland, ([], inhalts_etag([])))
+
+    response = jsonify(pruefer)
+    response.set_etag(etag)
+
+    # Mit aktueller Katalog-Version (?v=) ändert sich die Antwort unter dieser URL nie mehr
+    if request.args.get('v') == version:
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+@protokolle_bp.route('/erinnerung', methods=['POST'])
+@login_required
+def erinnerung_erstellen():
+    """Erinnerung für Protokoll erstellen"""
+    pruefungsdatum = request.form.get('pruefungsdatum')
+
+    if not pruefungsdatum:
+        flash('Prüfungsdatum ist erforderlich.', 'error')
+        return redirect(url_for('protokolle.dashboard'))
+
+    # Erste Erinnerung nach dem ersten Abstand
+    tage = ERINNERUNG_ABSTAENDE[0]
+    naechste_erinnerung = datetime.now() + timedelta(days=tage)
+
+    conn = get_db()
+    c = conn.cursor()
+    c.execute('''
+              INSERT INTO erinnerungen (user_id, pruefungsdatum, naechste_erinnerung)
+              VALUES (?, ?, ?)
+              ''', (session['user_id'], pruefungsdatum, naechste_erinnerung))
+    conn.commit()
+    erinnerungs_planer.einplanen(naechste_erinnerung, c.lastrowid)
+
+    flash(f'Erinnerung wurde eingerichtet. Sie erhalten in {tage} Tagen eine E-Mail.', 'success')
+    return redirect(url_for('protokolle.dashboard'))
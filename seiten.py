@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Öffentliche Seiten: Startseite, Datenschutz und Impressum
+"""
+
+
+from flask import Blueprint, render_template
+
+seiten_bp = Blueprint('seiten', __name__)
+
+
+@seiten_bp.route('/')
+def index():
+    """Startseite"""
+    return render_template('index.html')
+
+
+@seiten_bp.route('/datenschutz')
+def datenschutz():
+    """Datenschutzerklärung"""
+    return render_template('datenschutz.html')
+
+
+@seiten_bp.route('/impressum')
+def impressum():
+    """Impressum"""
+    return render_template('impressum.html')
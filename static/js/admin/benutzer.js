@@ -0,0 +1,153 @@
+// Benutzerverwaltung JavaScript
+const reset_url = document.currentScript.dataset.resetUrl;
+
+let searchTimeout;
+
+function debounceSearch() {
+    clearTimeout(searchTimeout);
+    searchTimeout = setTimeout(() => {
+        document.getElementById('filterForm').submit();
+    }, 500);
+}
+
+function submitFilter() {
+    document.getElementById('filterForm').submit();
+}
+
+function toggleSortOrder() {
+    const orderField = document.querySelector('input[name="order"]');
+    orderField.value = orderField.value === 'asc' ? 'desc' : 'asc';
+    submitFilter();
+}
+
+function resetFilters() {
+    window.location.href = reset_url;
+}
+
+function toggleSelectAll() {
+    const selectAll = document.getElementById('selectAll');
+    const checkboxes = document.querySelectorAll('.user-checkbox');
+
+    checkboxes.forEach(checkbox => {
+        checkbox.checked = selectAll.checked;
+    });
+
+    updateBulkActions();
+}
+
+function updateBulkActions() {
+    const checkboxes = document.querySelectorAll('.user-checkbox:checked');
+    const bulkActions = document.querySelector('.bulk-actions');
+    const selectedCount = document.getElementById('selectedCount');
+
+    if (checkboxes.length > 0) {
+        bulkActions.style.display = 'flex';
+        if (selectedCount) selectedCount.textContent = checkboxes.length;
+    } else {
+        bulkActions.style.display = 'none';
+    }
+
+    // Update select all checkbox
+    const allCheckboxes = document.querySelectorAll('.user-checkbox');
+    const selectAll = document.getElementById('selectAll');
+    selectAll.checked = allCheckboxes.length > 0 && checkboxes.length === allCheckboxes.length;
+}
+
+// Bulk Actions Modal
+function showBulkActionModal() {
+    const selectedCheckboxes = document.querySelectorAll('.user-checkbox:checked');
+    const modal = document.getElementById('bulkActionModal');
+    const form = document.getElementById('bulkActionForm');
+
+    // Clear existing hidden inputs
+    const existingInputs = form.querySelectorAll('input[name="user_ids"]');
+    existingInputs.forEach(input => input.remove());
+
+    // Add selected user IDs as hidden inputs
+    selectedCheckboxes.forEach(checkbox => {
+        const input = document.createElement('input');
+        input.type = 'hidden';
+        input.name = 'user_ids';
+        input.value = checkbox.value;
+        form.appendChild(input);
+    });
+
+    document.getElementById('selectedCount').textContent = selectedCheckboxes.length;
+    modal.style.display = 'flex';
+}
+
+function hideBulkActionModal() {
+    document.getElementById('bulkActionModal').style.display = 'none';
+    document.getElementById('bulk_action').value = '';
+}
+
+// Suspend Modal
+function showSuspendModal(userId, userName) {
+    const modal = document.getElementById('suspendModal');
+    const form = document.getElementById('suspendForm');
+
+    document.getElementById('suspendUserName').textContent = userName;
+    form.action = `/admin/benutzer/${userId}/suspend`;
+    modal.style.display = 'flex';
+}
+
+function hideSuspendModal() {
+    document.getElementById('suspendModal').style.display = 'none';
+    document.getElementById('suspend_reason').value = '';
+}
+
+// Unsuspend Modal
+function showUnsuspendModal(userId, userName) {
+    const modal = document.getElementById('unsuspendModal');
+    const form = document.getElementById('unsuspendForm');
+
+    document.getElementById('unsuspendUserName').textContent = userName;
+    form.action = `/admin/benutzer/${userId}/suspend`;
+    modal.style.display = 'flex';
+}
+
+function hideUnsuspendModal() {
+    document.getElementById('unsuspendModal').style.display = 'none';
+}
+
+// Event Listeners
+document.addEventListener('DOMContentLoaded', function() {
+    // Close modals when clicking outside
+    window.addEventListener('click', function(event) {
+        const modals = document.querySelectorAll('.modal');
+        modals.forEach(modal => {
+            if (event.target === modal) {
+                modal.style.display = 'none';
+            }
+        });
+    });
+
+    // Initialize bulk actions state
+    updateBulkActions();
+
+    // Form submissions
+    document.getElementById('bulkActionForm').addEventListener('submit', function(e) {
+        const action = document.getElementById('bulk_action').value;
+        const count = document.querySelectorAll('.user-checkbox:checked').length;
+
+        let confirmMessage = '';
+        switch(action) {
+            case 'approve':
+                confirmMessage = `${count} Benutzer freischalten?`;
+                break;
+            case 'suspend':
+                confirmMessage = `${count} Benutzer sperren?`;
+                break;
+            case 'promote_admin':
+                confirmMessage = `${count} Benutzer zu Administratoren ernennen?`;
+                break;
+            case 'demote_admin':
+                confirmMessage = `${count} Administratoren degradieren?`;
+                break;
+        }
+
+        if (!confirm(confirmMessage)) {
+            e.preventDefault();
+        }
+    });
+});
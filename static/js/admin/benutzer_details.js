@@ -0,0 +1,68 @@
+// Benutzer Details JavaScript
+const userName = document.currentScript.dataset.userName;
+
+function toggleDropdown() {
+    const dropdown = document.getElementById('actionsDropdown');
+    dropdown.classList.toggle('show');
+}
+
+// Close dropdown when clicking outside
+window.addEventListener('click', function(event) {
+    if (!event.target.matches('.dropdown-toggle')) {
+        const dropdowns = document.getElementsByClassName('dropdown-menu');
+        for (let i = 0; i < dropdowns.length; i++) {
+            dropdowns[i].classList.remove('show');
+        }
+    }
+});
+
+// Suspend Modal
+function showSuspendModal() {
+    document.getElementById('suspendModal').style.display = 'flex';
+}
+
+function hideSuspendModal() {
+    document.getElementById('suspendModal').style.display = 'none';
+    document.getElementById('suspend_reason').value = '';
+}
+
+// Delete User Modal
+function showDeleteUserModal() {
+    document.getElementById('deleteUserModal').style.display = 'flex';
+}
+
+function hideDeleteUserModal() {
+    document.getElementById('deleteUserModal').style.display = 'none';
+    document.getElementById('delete_confirmation').value = '';
+    document.getElementById('deleteConfirmBtn').disabled = true;
+}
+
+function executeDeleteUser() {
+    const confirmation = document.getElementById('delete_confirmation').value;
+
+    if (confirmation === userName) {
+        // Hier würde der DELETE-Request gesendet werden
+        if (confirm('LETZTE WARNUNG: Account wird unwiderruflich gelöscht!')) {
+            // TODO: Implement delete user functionality
+            alert('Delete-Funktion muss noch implementiert werden');
+        }
+    }
+}
+
+// Delete confirmation validation
+document.getElementById('delete_confirmation').addEventListener('input', function(e) {
+    const confirmation = e.target.value;
+    const deleteBtn = document.getElementById('deleteConfirmBtn');
+
+    deleteBtn.disabled = confirmation !== userName;
+});
+
+// Close modals when clicking outside
+window.addEventListener('click', function(event) {
+    const modals = document.querySelectorAll('.modal');
+    modals.forEach(modal => {
+        if (event.target === modal) {
+            modal.style.display = 'none';
+        }
+    });
+});
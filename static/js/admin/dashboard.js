@@ -0,0 +1,6 @@
+function exportData() {
+    if (confirm('Möchten Sie alle Daten als CSV exportieren?')) {
+        // Hier könnte eine Export-Funktion implementiert werden
+        alert('Export-Funktion wird implementiert...');
+    }
+}
@@ -0,0 +1,140 @@
+// Admin Protokoll Bearbeitung JavaScript
+const daten = document.currentScript.dataset;
+const pruefer_version = daten.prueferVersion;
+const current_pruefer = {
+    pruefer1: daten.pruefer1,
+    pruefer2: daten.pruefer2,
+    pruefer3: daten.pruefer3
+};
+
+function loadPruefer() {
+    const bundesland = document.getElementById('bundesland').value;
+    const pruefer1 = document.getElementById('pruefer1');
+    const pruefer2 = document.getElementById('pruefer2');
+    const pruefer3 = document.getElementById('pruefer3');
+
+    // Reset Prüfer-Selects
+    [pruefer1, pruefer2, pruefer3].forEach(select => {
+        select.innerHTML = '<option value="">Lädt...</option>';
+    });
+
+    if (bundesland) {
+        fetch(`/api/pruefer/${encodeURIComponent(bundesland)}?v=${pruefer_version}`)
+            .then(response => response.json())
+            .then(data => {
+                const options = '<option value="">Bitte wählen...</option>' +
+                    data.map(pruefer =>
+                        `<option value="${pruefer.id}">${pruefer.name}</option>`
+                    ).join('');
+
+                [pruefer1, pruefer2, pruefer3].forEach(select => {
+                    select.innerHTML = options;
+                });
+
+                // Aktuelle Auswahl wiederherstellen
+                pruefer1.value = current_pruefer.pruefer1;
+                pruefer2.value = current_pruefer.pruefer2;
+                pruefer3.value = current_pruefer.pruefer3;
+            })
+            .catch(error => {
+                console.error('Fehler beim Laden der Prüfer:', error);
+                [pruefer1, pruefer2, pruefer3].forEach(select => {
+                    select.innerHTML = '<option value="">Fehler beim Laden</option>';
+                });
+            });
+    } else {
+        [pruefer1, pruefer2, pruefer3].forEach(select => {
+            select.innerHTML = '<option value="">Erst Bundesland wählen</option>';
+        });
+    }
+}
+
+// Character Counter
+document.getElementById('inhalt').addEventListener('input', function(e) {
+    const count = e.target.value.length;
+    document.getElementById('characterCount').textContent = count;
+
+    // Color coding
+    const counter = document.getElementById('characterCount');
+    if (count < 100) {
+        counter.style.color = '#FF3B30';
+    } else if (count < 300) {
+        counter.style.color = '#FF9500';
+    } else {
+        counter.style.color = 'var(--primary-green)';
+    }
+});
+
+// Form Validation
+document.getElementById('adminEditForm').addEventListener('submit', function(e) {
+    const pruefer1 = document.getElementById('pruefer1').value;
+    const pruefer2 = document.getElementById('pruefer2').value;
+    const pruefer3 = document.getElementById('pruefer3').value;
+    const inhalt = document.getElementById('inhalt').value.trim();
+
+    // Prüfer-Validierung
+    if (pruefer1 === pruefer2 || pruefer1 === pruefer3 || pruefer2 === pruefer3) {
+        e.preventDefault();
+        alert('Alle drei Prüfer müssen unterschiedlich sein.');
+        return false;
+    }
+
+    // Inhalt-Validierung
+    if (inhalt.length < 10) {
+        e.preventDefault();
+        alert('Der Prüfungsinhalt muss mindestens 10 Zeichen lang sein.');
+        return false;
+    }
+
+    // Bestätigung für Admin-Bearbeitung
+    const adminNotiz = document.getElementById('admin_notiz').value.trim();
+    let confirmMessage = 'Protokoll als Administrator bearbeiten?';
+
+    if (adminNotiz) {
+        confirmMessage += '\n\nDer Autor wird per E-Mail über die Änderungen benachrichtigt.';
+    }
+
+    return confirm(confirmMessage);
+});
+
+function previewChanges() {
+    // Hier könnte eine Vorschau-Funktion implementiert werden
+    alert('Vorschau-Funktion wird implementiert...');
+}
+
+// Auto-save Draft (optional)
+let autosaveTimer;
+function setupAutosave() {
+    const fields = ['datum', 'bundesland', 'pruefer1', 'pruefer2', 'pruefer3', 'hashtags', 'inhalt', 'kommentar', 'admin_notiz'];
+
+    fields.forEach(fieldId => {
+        const field = document.getElementById(fieldId);
+        if (field) {
+            field.addEventListener('input', function() {
+                clearTimeout(autosaveTimer);
+                autosaveTimer = setTimeout(() => {
+                    console.log('Auto-save triggered for:', fieldId);
+                    // Hier könnte ein AJAX-Call zum Auto-Save erfolgen
+                }, 5000);
+            });
+        }
+    });
+}
+
+// Hashtag Auto-Complete
+document.getElementById('hashtags').addEventListener('input', function(e) {
+    // Enhanced hashtag handling could be implemented here
+});
+
+// Initialize
+document.addEventListener('DOMContentLoaded', function() {
+    // Load Prüfer for current Bundesland
+    loadPruefer();
+
+    // Setup auto-save
+    setupAutosave();
+
+    // Set initial character count
+    const inhalt = document.getElementById('inhalt');
+    document.getElementById('characterCount').textContent = inhalt.value.length;
+});
@@ -0,0 +1,43 @@
+// Protokoll Details JavaScript
+const protokoll_id = document.currentScript.dataset.protokollId;
+
+function showDeleteModal() {
+    document.getElementById('deleteModal').style.display = 'flex';
+}
+
+function hideDeleteModal() {
+    document.getElementById('deleteModal').style.display = 'none';
+    document.getElementById('grund').value = '';
+}
+
+function generateReport() {
+    // Hier könnte eine Report-Generierung implementiert werden
+    alert('Report-Funktion wird implementiert...');
+}
+
+// Close modal when clicking outside
+window.addEventListener('click', function(event) {
+    const modal = document.getElementById('deleteModal');
+    if (event.target === modal) {
+        hideDeleteModal();
+    }
+});
+
+// Form validation
+document.querySelector('#deleteModal form').addEventListener('submit', function(e) {
+    const grund = document.getElementById('grund').value.trim();
+
+    if (!grund) {
+        e.preventDefault();
+        alert('Bitte geben Sie einen Grund für die Löschung an.');
+        return false;
+    }
+
+    if (grund.length < 10) {
+        e.preventDefault();
+        alert('Der Grund muss mindestens 10 Zeichen lang sein.');
+        return false;
+    }
+
+    return confirm(`Protokoll #${protokoll_id} wirklich unwiderruflich löschen?`);
+});
@@ -0,0 +1,165 @@
+// Admin Protokoll Liste JavaScript
+const reset_url = document.currentScript.dataset.resetUrl;
+
+let searchTimeout;
+
+function debounceSearch() {
+    clearTimeout(searchTimeout);
+    searchTimeout = setTimeout(() => {
+        document.getElementById('filterForm').submit();
+    }, 500);
+}
+
+function submitFilter() {
+    document.getElementById('filterForm').submit();
+}
+
+function toggleSortOrder() {
+    const orderField = document.querySelector('input[name="order"]');
+    orderField.value = orderField.value === 'asc' ? 'desc' : 'asc';
+    submitFilter();
+}
+
+function resetFilters() {
+    window.location.href = reset_url;
+}
+
+// Selection Management
+function updateBulkActions() {
+    const checkboxes = document.querySelectorAll('.protocol-checkbox:checked');
+    const bulkActions = document.querySelector('.bulk-actions');
+    const selectionCount = document.getElementById('selectionCount');
+
+    if (checkboxes.length > 0) {
+        bulkActions.style.display = 'flex';
+        selectionCount.textContent = `${checkboxes.length} ausgewählt`;
+
+        // Update selected visual state
+        document.querySelectorAll('.protocol-admin-item').forEach(item => {
+            const checkbox = item.querySelector('.protocol-checkbox');
+            if (checkbox.checked) {
+                item.classList.add('selected');
+            } else {
+                item.classList.remove('selected');
+            }
+        });
+    } else {
+        bulkActions.style.display = 'none';
+        selectionCount.textContent = '0 ausgewählt';
+
+        // Remove all selected states
+        document.querySelectorAll('.protocol-admin-item').forEach(item => {
+            item.classList.remove('selected');
+        });
+    }
+}
+
+function selectAll() {
+    document.querySelectorAll('.protocol-checkbox').forEach(checkbox => {
+        checkbox.checked = true;
+    });
+    updateBulkActions();
+}
+
+function selectNone() {
+    document.querySelectorAll('.protocol-checkbox').forEach(checkbox => {
+        checkbox.checked = false;
+    });
+    updateBulkActions();
+}
+
+// Bulk Delete Modal
+function showBulkActionModal() {
+    const selectedCheckboxes = document.querySelectorAll('.protocol-checkbox:checked');
+    document.getElementById('bulkDeleteCount').textContent = selectedCheckboxes.length;
+    document.getElementById('bulkDeleteModal').style.display = 'flex';
+}
+
+function hideBulkDeleteModal() {
+    document.getElementById('bulkDeleteModal').style.display = 'none';
+    document.getElementById('bulk_grund').value = '';
+}
+
+// Single Delete Modal
+function showDeleteModal(protocolId, datum, author) {
+    document.getElementById('deleteProtocolInfo').textContent = `#${protocolId} vom ${datum}`;
+    document.getElementById('deleteAuthor').textContent = author;
+    document.getElementById('deleteForm').action = `/admin/protokoll/${protocolId}/loeschen`;
+    document.getElementById('deleteModal').style.display = 'flex';
+}
+
+function hideDeleteModal() {
+    document.getElementById('deleteModal').style.display = 'none';
+    document.getElementById('delete_grund').value = '';
+}
+
+// Form Handlers
+document.getElementById('bulkDeleteForm').addEventListener('submit', function(e) {
+    e.preventDefault();
+
+    const grund = document.getElementById('bulk_grund').value.trim();
+    const selectedIds = Array.from(document.querySelectorAll('.protocol-checkbox:checked'))
+                            .map(cb => cb.value);
+
+    if (!grund) {
+        alert('Bitte geben Sie einen Grund für die Löschung an.');
+        return;
+    }
+
+    if (selectedIds.length === 0) {
+        alert('Keine Protokolle ausgewählt.');
+        return;
+    }
+
+    if (confirm(`${selectedIds.length} Protokoll(e) unwiderruflich löschen?`)) {
+        // Hier würde der AJAX-Call für Bulk-Delete erfolgen
+        // Für jetzt simulieren wir es mit einzelnen Löschungen
+
+        selectedIds.forEach(id => {
+            const form = document.createElement('form');
+            form.method = 'POST';
+            form.action = `/admin/protokoll/${id}/loeschen`;
+
+            const grundInput = document.createElement('input');
+            grundInput.type = 'hidden';
+            grundInput.name = 'grund';
+            grundInput.value = grund;
+            form.appendChild(grundInput);
+
+            document.body.appendChild(form);
+            form.submit();
+        });
+    }
+});
+
+// Event Listeners
+document.addEventListener('DOMContentLoaded', function() {
+    // Auto-submit on input for search fields
+    ['q', 'user', 'pruefer', 'hashtag'].forEach(fieldId => {
+        const field = document.getElementById(fieldId);
+        if (field) {
+            field.addEventListener('input', debounceSearch);
+        }
+    });
+
+    // Neue Suche: wieder nach Relevanz sortieren
+    const suchfeld = document.getElementById('q');
+    if (suchfeld) {
+        suchfeld.addEventListener('input', () => {
+            document.getElementById('sort').value = '';
+        });
+    }
+
+    // Close modals when clicking outside
+    window.addEventListener('click', function(event) {
+        const modals = document.querySelectorAll('.modal');
+        modals.forEach(modal => {
+            if (event.target === modal) {
+                modal.style.display = 'none';
+            }
+        });
+    });
+
+    // Initialize selection state
+    updateBulkActions();
+});
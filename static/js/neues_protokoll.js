@@ -0,0 +1,61 @@
+const pruefer_version = document.currentScript.dataset.prueferVersion;
+
+// Prüfer nach Bundesland laden
+function loadPruefer() {
+    const bundesland = document.getElementById('bundesland').value;
+    const pruefer1 = document.getElementById('pruefer1');
+    const pruefer2 = document.getElementById('pruefer2');
+    const pruefer3 = document.getElementById('pruefer3');
+
+    // Reset Prüfer-Selects
+    [pruefer1, pruefer2, pruefer3].forEach(select => {
+        select.innerHTML = '<option value="">Lädt...</option>';
+    });
+
+    if (bundesland) {
+        fetch(`/api/pruefer/${encodeURIComponent(bundesland)}?v=${pruefer_version}`)
+            .then(response => response.json())
+            .then(data => {
+                const options = '<option value="">Bitte wählen...</option>' +
+                    data.map(pruefer => `<option value="${pruefer.id}">${pruefer.name}</option>`).join('');
+
+                [pruefer1, pruefer2, pruefer3].forEach(select => {
+                    select.innerHTML = options;
+                });
+            })
+            .catch(error => {
+                console.error('Fehler beim Laden der Prüfer:', error);
+                [pruefer1, pruefer2, pruefer3].forEach(select => {
+                    select.innerHTML = '<option value="">Fehler beim Laden</option>';
+                });
+            });
+    } else {
+        [pruefer1, pruefer2, pruefer3].forEach(select => {
+            select.innerHTML = '<option value="">Erst Bundesland wählen</option>';
+        });
+    }
+}
+
+// Hashtag Auto-Complete
+document.getElementById('hashtags').addEventListener('input', function(e) {
+    const value = e.target.value;
+    const words = value.split(' ');
+    const currentWord = words[words.length - 1];
+
+    if (currentWord.startsWith('#') && currentWord.length > 1) {
+        // Hier könnte eine erweiterte Auto-Complete-Logik implementiert werden
+    }
+});
+
+// Form-Validierung
+document.querySelector('form').addEventListener('submit', function(e) {
+    const pruefer1 = document.getElementById('pruefer1').value;
+    const pruefer2 = document.getElementById('pruefer2').value;
+    const pruefer3 = document.getElementById('pruefer3').value;
+
+    if (pruefer1 === pruefer2 || pruefer1 === pruefer3 || pruefer2 === pruefer3) {
+        e.preventDefault();
+        alert('Bitte wählen Sie drei verschiedene Prüfer aus. Solltest du in deiner Prüfung weniger als 3 Prüfer gehabt haben, dann wähle bitte Unbekannt aus. Sollte dein Prüfer nicht dabei sein dann schreib uns eine Mail. Ein Link dazu findest du daneben.');
+        return false;
+    }
+});
@@ -0,0 +1,43 @@
+const inhalt_url = document.currentScript.dataset.inhaltUrl;
+
+// Vollständigen Inhalt erst beim ersten Aufklappen laden
+function toggleFullContent(id, button) {
+    const element = document.getElementById('full-content-' + id);
+
+    if (element.style.display !== 'none') {
+        element.style.display = 'none';
+        button.textContent = 'Vollständig anzeigen';
+        return;
+    }
+
+    if (element.dataset.loaded) {
+        element.style.display = 'block';
+        button.textContent = 'Weniger anzeigen';
+        return;
+    }
+
+    button.disabled = true;
+    fetch(inhalt_url.replace('/0/', '/' + id + '/'))
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.json();
+        })
+        .then(data => {
+            element.querySelector('.full-inhalt').textContent = data.inhalt;
+            if (data.kommentar) {
+                element.querySelector('.full-kommentar').textContent = data.kommentar;
+                element.querySelector('.full-kommentar-block').style.display = 'block';
+            }
+            element.dataset.loaded = '1';
+            element.style.display = 'block';
+            button.textContent = 'Weniger anzeigen';
+        })
+        .catch(() => {
+            button.textContent = 'Laden fehlgeschlagen – erneut versuchen';
+        })
+        .finally(() => {
+            button.disabled = false;
+        });
+}
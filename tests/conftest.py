@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Gemeinsame Fixtures: App auf einer temporären Datenbank, ein lokaler
+SMTP-Ersatz (aiosmtpd), der Nachrichten nur sammelt, und ein Redis-Ersatz
+für den Antwort-Cache (auch von benchmarks/bench_antwort_cache.py benutzt).
+
+Aufruf:  python -m pytest -q   (Abhängigkeiten: pip install -r requirements-dev.txt)
+"""
+
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+
+class SmtpErsatz:
+    """aiosmtpd-Handler: zählt Verbindungen und sammelt angenommene Nachrichten
+
+    Empfänger in `abgelehnt` werden bei RCPT endgültig abgewiesen (550),
+    Empfänger in `voruebergehend` bei DATA so oft vorübergehend (451), wie dort
+    angegeben (None = immer).
+    """
+
+    def __init__(self):
+        self.verbindungen = 0
+        self.nachrichten = []
+        self.abgelehnt = set()
+        self.voruebergehend = {}
+        self.lock = threading.Lock()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        # smtplib begrüßt einmal pro Verbindung (ohne STARTTLS)
+        with self.lock:
+            self.verbindungen += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.abgelehnt:
+            return '550 5.1.1 Empfaenger unbekannt'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            for empfaenger in envelope.rcpt_tos:
+                if empfaenger in self.voruebergehend:
+                    rest = self.voruebergehend[empfaenger]
+                    if rest is None or rest > 0:
+                        if rest is not None:
+                            self.voruebergehend[empfaenger] = rest - 1
+                        return '451 4.3.0 Bitte spaeter erneut versuchen'
+            for empfaenger in envelope.rcpt_tos:
+                self.nachrichten.append((empfaenger, envelope.content))
+        return '250 Message accepted for delivery'
+
+    def an(self, empfaenger):
+        with self.lock:
+            return [inhalt for an, inhalt in self.nachrichten if an == empfaenger]
+
+
+class RedisErsatz(socketserver.ThreadingTCPServer):
+    """Kleiner Server mit dem Redis-Protokoll (GET, SET ... EX, PING), Daten nur im Speicher"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _RedisHandler)
+        self.daten = {}
+        self.verbindungen = set()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'redis://127.0.0.1:{self.server_address[1]}/0'
+
+    def starten(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def verbindungen_trennen(self):
+        """Alle offenen Client-Verbindungen schließen, wie bei einem Neustart des Servers"""
+        with self.lock:
+            verbindungen, self.verbindungen = self.verbindungen, set()
+        for verbindung in verbindungen:
+            try:
+                verbindung.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _RedisHandler(socketserver.StreamRequestHandler):
+
+    def befehl_lesen(self):
+        zeile = self.rfile.readline()
+        if not zeile:
+            return None
+        anzahl = int(zeile[1:-2])
+        teile = []
+        for _ in range(anzahl):
+            laenge = int(self.rfile.readline()[1:-2])
+            teile.append(self.rfile.read(laenge + 2)[:-2])
+        return teile
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.verbindungen.add(self.connection)
+        while True:
+            try:
+                teile = self.befehl_lesen()
+            except (OSError, ValueError):
+                return
+            if teile is None:
+                return
+            befehl = teile[0].upper()
+            if befehl == b'GET':
+                with server.lock:
+                    wert, ablauf = server.daten.get(teile[1], (None, 0))
+                if wert is None or ablauf < time.time():
+                    self.wfile.write(b'$-1\r\n')
+                else:
+                    self.wfile.write(b'$%d\r\n%s\r\n' % (len(wert), wert))
+            elif befehl == b'SET':
+                ttl = int(teile[4]) if len(teile) > 4 else 10 ** 9
+                with server.lock:
+                    server.daten[teile[1]] = (teile[2], time.time() + ttl)
+                self.wfile.write(b'+OK\r\n')
+            elif befehl in (b'PING', b'SELECT', b'AUTH'):
+                self.wfile.write(b'+OK\r\n')
+            else:
+                self.wfile.write(b'-ERR unbekannter Befehl\r\n')
+
+
+def _freier_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_ersatz():
+    ersatz = SmtpErsatz()
+    controller = Controller(ersatz, hostname='127.0.0.1', port=_freier_port())
+    controller.start()
+    try:
+        yield ersatz, controller.port
+    finally:
+        controller.stop()
+
+
+@pytest.fixture
+def redis_ersatz():
+    ersatz = RedisErsatz().starten()
+    try:
+        yield ersatz
+    finally:
+        ersatz.shutdown()
+        ersatz.server_close()
+
+
+@pytest.fixture
+def app(tmp_path, smtp_ersatz, monkeypatch):
+    _, port = smtp_ersatz
+    # Caches im Prozess sind nach IDs und Versionen geschlüsselt, die jede neue
+    # Testdatenbank wieder vergibt: jeder Test beginnt mit leeren Caches
+    monkeypatch.setattr(app_module, 'fragment_cache', app_module.FragmentCache(app_module.FRAGMENT_CACHE_GROESSE))
+    monkeypatch.setattr(app_module, 'antwort_cache_speicher',
+                        app_module.antwort_cache_erstellen(app_module.ANTWORT_CACHE))
+    app_module.pruefer_katalog_invalidieren()
+    return app_module.create_app({
+        'DATABASE': str(tmp_path / 'test.db'),
+        'SECRET_KEY': 'test',
+        'TEMPLATE_CACHE_VERZEICHNIS': str(tmp_path / 'jinja_cache'),
+        # Worker und Erinnerungen starten die Tests selbst
+        'HINTERGRUND_DIENSTE': 'extern',
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': port,
+        'MAIL_USE_TLS': False,
+        'MAIL_PASSWORD': None,
+    })
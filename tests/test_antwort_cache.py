@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Antwort-Cache mit Redis-Backend gegen den lokalen Redis-Ersatz"""
+
+import pytest
+
+import app as app_module
+
+HTML = '<html><body>Prüfungsprotokoll\r\n</body></html>'.encode('utf-8') + bytes(range(256))
+
+
+@pytest.fixture
+def cache(redis_ersatz):
+    return app_module.RedisCache(redis_ersatz.url, ttl=60)
+
+
+@pytest.fixture
+def client(app, cache, monkeypatch):
+    monkeypatch.setattr(app_module, 'antwort_cache_speicher', cache)
+    with app.app_context():
+        admin_id = app_module.get_db().execute('SELECT id FROM users WHERE is_admin = TRUE').fetchone()[0]
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = admin_id
+        sess['is_admin'] = True
+    return client
+
+
+def _protokoll_anlegen(app, inhalt):
+    with app.app_context():
+        conn = app_module.get_db()
+        user_id = conn.execute('SELECT id FROM users WHERE is_admin = TRUE').fetchone()[0]
+        pruefer = [row[0] for row in conn.execute('SELECT id FROM pruefer ORDER BY id LIMIT 3')]
+        conn.execute('''
+                     INSERT INTO protokolle (user_id, datum, bundesland, pruefer1_id, pruefer2_id,
+                                             pruefer3_id, inhalt, hashtags, kommentar)
+                     VALUES (?, '2024-05-01', 'Bayern', ?, ?, ?, ?, '', '')
+                     ''', (user_id, *pruefer, inhalt))
+        conn.commit()
+
+
+def test_binaeres_html_unveraendert(cache):
+    cache.speichern('antwort:1:seite', HTML)
+    assert cache.holen('antwort:1:seite') == HTML
+
+
+def test_fehlschlag_ist_none(cache):
+    assert cache.holen('antwort:1:unbekannt') is None
+
+
+def test_neue_generation_verfehlt_alten_schluessel(app, client, redis_ersatz):
+    _protokoll_anlegen(app, 'Erstes Protokoll')
+    assert client.get('/protokolle').headers['X-Cache'] == 'MISS'
+    assert client.get('/protokolle').headers['X-Cache'] == 'HIT'
+    alte_schluessel = set(redis_ersatz.daten)
+
+    # Der Trigger erhöht die Datengeneration, der alte Eintrag wird nicht mehr gelesen
+    _protokoll_anlegen(app, 'Zweites Protokoll')
+    response = client.get('/protokolle')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Zweites Protokoll' in response.get_data(as_text=True)
+    assert alte_schluessel < set(redis_ersatz.daten)
+
+
+def test_getrennte_verbindung_wird_neu_aufgebaut(cache, redis_ersatz):
+    cache.speichern('antwort:1:seite', HTML)
+    redis_ersatz.verbindungen_trennen()
+    assert cache.holen('antwort:1:seite') == HTML
+
+    redis_ersatz.verbindungen_trennen()
+    cache.speichern('antwort:2:seite', b'neu')
+    assert redis_ersatz.daten[b'antwort:2:seite'][0] == b'neu'
+
+
+def test_ohne_server_wird_normal_gerendert(app, client, cache, redis_ersatz):
+    _protokoll_anlegen(app, 'Erstes Protokoll')
+    assert client.get('/protokolle').headers['X-Cache'] == 'MISS'
+
+    redis_ersatz.shutdown()
+    redis_ersatz.server_close()
+    redis_ersatz.verbindungen_trennen()
+
+    assert cache.holen('antwort:1:seite') is None
+    response = client.get('/protokolle')
+    assert response.status_code == 200
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Erstes Protokoll' in response.get_data(as_text=True)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""E-Mail-Outbox: Einreihen, Zustellung durch die Worker, Wiederholung und Abweisung"""
+
+import email
+import email.header
+import email.policy
+import threading
+import time
+from datetime import datetime
+
+import app as app_module
+
+
+def _outbox(conn):
+    return conn.execute('''
+                        SELECT empfaenger, status, versuche, naechster_versuch, letzter_fehler, leased_by
+                        FROM email_outbox
+                        ORDER BY id
+                        ''').fetchall()
+
+
+def _faellig_machen(conn):
+    """Backoff überspringen: alle wartenden E-Mails sofort fällig"""
+    conn.execute("UPDATE email_outbox SET naechster_versuch = ? WHERE status = 'wartend'", (datetime.now(),))
+    conn.commit()
+
+
+def _abarbeiten(app, inhaber='test'):
+    """Ein Durchlauf wie im email_worker: fällige E-Mails übernehmen und zustellen"""
+    with app.app_context():
+        conn = app_module.db_connect()
+        verbindung = app_module.SmtpVerbindung(app.config)
+        try:
+            mails = app_module.emails_uebernehmen(conn, inhaber)
+            for mail in mails:
+                app_module.email_zustellen(conn, verbindung, mail, inhaber)
+            return len(mails)
+        finally:
+            verbindung.schliessen()
+            conn.close()
+
+
+def test_einreihen_schreibt_nur_in_die_outbox(app, smtp_ersatz):
+    ersatz, _ = smtp_ersatz
+    with app.app_context():
+        assert app_module.send_email('a@example.org', 'Betreff', '<p>Hallo</p>')
+        zeilen = _outbox(app_module.get_db())
+
+    assert [(z[0], z[1], z[2]) for z in zeilen] == [('a@example.org', 'wartend', 0)]
+    assert ersatz.nachrichten == []
+
+
+def test_worker_stellt_ueber_eine_verbindung_zu(app, smtp_ersatz):
+    ersatz, _ = smtp_ersatz
+    empfaenger = [f'nutzer{i}@example.org' for i in range(5)]
+    with app.app_context():
+        conn = app_module.get_db()
+        for adresse in empfaenger:
+            app_module.send_email(adresse, 'Betreff', '<p>Hallo</p>', conn=conn)
+        conn.commit()
+
+    # Ein echter Worker-Thread; er bleibt als Daemon bis zum Ende des Testlaufs stehen
+    threading.Thread(target=app_module.im_app_kontext, args=(app, app_module.email_worker),
+                     name='test-email-worker', daemon=True).start()
+
+    frist = time.monotonic() + 10
+    while len(ersatz.nachrichten) < len(empfaenger) and time.monotonic() < frist:
+        time.sleep(0.05)
+
+    assert sorted(an for an, _ in ersatz.nachrichten) == sorted(empfaenger)
+    assert ersatz.verbindungen == 1
+    with app.app_context():
+        # Der Worker setzt den Status erst nach der Antwort des Servers
+        while time.monotonic() < frist:
+            zeilen = _outbox(app_module.get_db())
+            if all(z[1] == 'gesendet' for z in zeilen):
+                break
+            time.sleep(0.05)
+    assert all(z[1] == 'gesendet' and z[5] is None for z in zeilen)
+
+
+def test_voruebergehender_fehler_mit_backoff(app, smtp_ersatz):
+    ersatz, _ = smtp_ersatz
+    ersatz.voruebergehend['b@example.org'] = 2
+    with app.app_context():
+        app_module.send_email('b@example.org', 'Betreff', '<p>Hallo</p>')
+        conn = app_module.get_db()
+
+        vorher = datetime.now()
+        assert _abarbeiten(app) == 1
+        empfaenger, status, versuche, naechster, fehler, leased_by = _outbox(conn)[0]
+        assert (status, versuche, leased_by) == ('wartend', 1, None)
+        assert '451' in fehler
+        wartezeit = (datetime.fromisoformat(naechster) - vorher).total_seconds()
+        assert app_module.MAIL_BACKOFF_BASIS - 5 <= wartezeit <= app_module.MAIL_BACKOFF_BASIS + 5
+
+        # Vor Ablauf des Backoffs wird sie nicht erneut übernommen
+        assert _abarbeiten(app) == 0
+
+        # Der zweite Fehlschlag wartet doppelt so lange
+        _faellig_machen(conn)
+        vorher = datetime.now()
+        assert _abarbeiten(app) == 1
+        naechster = _outbox(conn)[0][3]
+        wartezeit = (datetime.fromisoformat(naechster) - vorher).total_seconds()
+        assert 2 * app_module.MAIL_BACKOFF_BASIS - 5 <= wartezeit <= 2 * app_module.MAIL_BACKOFF_BASIS + 5
+
+        _faellig_machen(conn)
+        assert _abarbeiten(app) == 1
+        empfaenger, status, versuche, naechster, fehler, leased_by = _outbox(conn)[0]
+        assert (status, versuche, fehler) == ('gesendet', 3, None)
+    assert len(ersatz.an('b@example.org')) == 1
+
+
+def test_nach_max_versuchen_fehlgeschlagen(app, smtp_ersatz):
+    ersatz, _ = smtp_ersatz
+    ersatz.voruebergehend['c@example.org'] = None
+    with app.app_context():
+        app_module.send_email('c@example.org', 'Betreff', '<p>Hallo</p>')
+        conn = app_module.get_db()
+
+        for versuch in range(1, app_module.MAIL_MAX_VERSUCHE + 1):
+            _faellig_machen(conn)
+            assert _abarbeiten(app) == 1
+            status, versuche = _outbox(conn)[0][1:3]
+            assert versuche == versuch
+            assert status == ('fehlgeschlagen' if versuch == app_module.MAIL_MAX_VERSUCHE else 'wartend')
+
+        # Fehlgeschlagene E-Mails bleiben liegen, bis ein Admin sie erneut sendet
+        _faellig_machen(conn)
+        assert _abarbeiten(app) == 0
+        assert '451' in _outbox(conn)[0][4]
+    assert ersatz.an('c@example.org') == []
+
+
+def test_abgewiesener_empfaenger_wird_nicht_wiederholt(app, smtp_ersatz):
+    ersatz, _ = smtp_ersatz
+    ersatz.abgelehnt.add('unbekannt@example.org')
+    with app.app_context():
+        app_module.send_email('unbekannt@example.org', 'Betreff', '<p>Hallo</p>')
+        app_module.send_email('d@example.org', 'Betreff', '<p>Hallo</p>')
+
+        assert _abarbeiten(app) == 2
+        zeilen = _outbox(app_module.get_db())
+
+    assert (zeilen[0][1], zeilen[0][2]) == ('fehlgeschlagen', 1)
+    assert '550' in zeilen[0][4]
+    # Die Verbindung bleibt nach der Abweisung nutzbar
+    assert zeilen[1][1] == 'gesendet'
+    assert ersatz.verbindungen == 1
+
+
+def test_betreff_nach_rfc_2047(app, smtp_ersatz):
+    ersatz, _ = smtp_ersatz
+    betreff = 'Erinnerung: Prüfungsprotokoll für Größe & Übung'
+    with app.app_context():
+        app_module.send_email('e@example.org', betreff, '<p>Grüße</p>')
+    assert _abarbeiten(app) == 1
+
+    roh = ersatz.an('e@example.org')[0]
+    kopf = roh.replace(b'\r\n', b'\n').split(b'\n\n', 1)[0]
+    kopf.decode('ascii')  # Kopfzeilen ohne 8-Bit-Zeichen
+    roher_betreff = email.message_from_bytes(roh)['Subject']
+    assert roher_betreff.lower().startswith('=?utf-8?')
+    assert str(email.header.make_header(email.header.decode_header(roher_betreff))) == betreff
+    assert email.message_from_bytes(roh, policy=email.policy.default)['Subject'] == betreff
+
+
+def test_lange_nachricht_mit_crlf(app, smtp_ersatz):
+    ersatz, _ = smtp_ersatz
+    inhalt = '<html><body>' + '<p>Grüße aus der Prüfung</p>\n' * 200 + '</body></html>'
+    with app.app_context():
+        app_module.send_email('f@example.org', 'Betreff', inhalt)
+    assert _abarbeiten(app) == 1
+
+    # aiosmtpd weist Zeilen über 1000 Zeichen ab, nacktes LF ergäbe eine einzige Zeile
+    roh = ersatz.an('f@example.org')[0]
+    nachricht = email.message_from_bytes(roh, policy=email.policy.default)
+    assert nachricht.get_body().get_content() == inhalt
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Mehrere Prozesse arbeiten dieselbe Datenbank ab: jede fällige Erinnerung und
+jede E-Mail der Outbox wird genau einmal zugestellt, auch solche, deren Lease
+ein abgestürzter Prozess hinterlassen hat.
+"""
+
+import multiprocessing
+from datetime import datetime, timedelta
+
+import app as app_module
+
+PROZESSE = 4
+ERINNERUNGEN = 40
+MAILS = 60
+ABGESTUERZT = 5  # davon jeweils mit abgelaufener Lease eines abgestürzten Prozesses
+
+
+def _prozess(konfiguration, start):
+    """Erinnerungen und Outbox abarbeiten wie erinnerungs_service und email_worker"""
+    app = app_module.create_app(dict(konfiguration, SCHEMA_PRUEFEN=False))
+    with app.app_context():
+        conn = app_module.db_connect()
+        verbindung = app_module.SmtpVerbindung(app.config)
+        inhaber = app_module.lease_inhaber()
+        start.wait()
+
+        # Kleine Batches, damit sich die Prozesse tatsächlich abwechseln
+        while True:
+            faellige = app_module.erinnerungen_uebernehmen(conn, inhaber, anzahl=3)
+            for erinnerung_id in faellige:
+                app_module.erinnerung_senden(conn, erinnerung_id, 'http://localhost/protokoll/neu', inhaber)
+            mails = app_module.emails_uebernehmen(conn, inhaber, anzahl=3)
+            for mail in mails:
+                app_module.email_zustellen(conn, verbindung, mail, inhaber)
+            if not faellige and not mails:
+                break
+
+        verbindung.schliessen()
+        conn.close()
+
+
+def _daten_anlegen(conn):
+    jetzt = datetime.now()
+    abgelaufen = jetzt - timedelta(seconds=1)
+
+    for nummer in range(ERINNERUNGEN):
+        user_id = conn.execute('''
+                               INSERT INTO users (name, email, password_hash, ausbildungsjahr, is_verified, is_approved)
+                               VALUES (?, ?, 'x', 5, TRUE, TRUE)
+                               ''', (f'Nutzer {nummer}', f'erinnerung{nummer}@example.org')).lastrowid
+        lease = ('abgestuerzt:1:erinnerungen', abgelaufen) if nummer < ABGESTUERZT else (None, None)
+        conn.execute('''
+                     INSERT INTO erinnerungen (user_id, pruefungsdatum, naechste_erinnerung, leased_by, lease_until)
+                     VALUES (?, ?, ?, ?, ?)
+                     ''', (user_id, (jetzt - timedelta(days=3)).date(), jetzt - timedelta(minutes=nummer), *lease))
+
+    for nummer in range(MAILS):
+        lease = ('abgestuerzt:1:email-worker-1', abgelaufen, 1) if nummer < ABGESTUERZT else (None, None, 0)
+        conn.execute('''
+                     INSERT INTO email_outbox (empfaenger, betreff, inhalt, naechster_versuch,
+                                               leased_by, lease_until, versuche)
+                     VALUES (?, 'Betreff', '<p>Hallo</p>', ?, ?, ?, ?)
+                     ''', (f'mail{nummer}@example.org', jetzt, *lease))
+    conn.commit()
+
+
+def test_genau_einmal_ueber_mehrere_prozesse(app, smtp_ersatz):
+    ersatz, _ = smtp_ersatz
+    with app.app_context():
+        conn = app_module.get_db()
+        _daten_anlegen(conn)
+
+    konfiguration = {schluessel: app.config[schluessel]
+                     for schluessel in ('DATABASE', 'SECRET_KEY', 'TEMPLATE_CACHE_VERZEICHNIS', 'HINTERGRUND_DIENSTE',
+                                        'MAIL_SERVER', 'MAIL_PORT', 'MAIL_USE_TLS', 'MAIL_PASSWORD')}
+    kontext = multiprocessing.get_context('spawn')
+    start = kontext.Barrier(PROZESSE)
+    prozesse = [kontext.Process(target=_prozess, args=(konfiguration, start)) for _ in range(PROZESSE)]
+    for prozess in prozesse:
+        prozess.start()
+    for prozess in prozesse:
+        prozess.join(120)
+    assert [prozess.exitcode for prozess in prozesse] == [0] * PROZESSE
+
+    empfaenger = sorted(an for an, _ in ersatz.nachrichten)
+    erwartet = sorted([f'erinnerung{nummer}@example.org' for nummer in range(ERINNERUNGEN)]
+                      + [f'mail{nummer}@example.org' for nummer in range(MAILS)])
+    assert empfaenger == erwartet
+
+    with app.app_context():
+        conn = app_module.get_db()
+        assert conn.execute('''
+                            SELECT status, COUNT(*), SUM(leased_by IS NOT NULL)
+                            FROM email_outbox
+                            GROUP BY status
+                            ''').fetchall() == [('gesendet', ERINNERUNGEN + MAILS, 0)]
+        assert conn.execute('''
+                            SELECT anzahl_erinnerungen, COUNT(*), SUM(leased_by IS NOT NULL), MIN(naechste_erinnerung) > ?
+                            FROM erinnerungen
+                            GROUP BY anzahl_erinnerungen
+                            ''', (datetime.now(),)).fetchall() == [(1, ERINNERUNGEN, 0, 1)]
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Protokoll-Import: Abbruch bei unlesbarer Datei, Schreibsperre nur für die INSERTs"""
+
+import gzip
+import io
+import secrets
+
+import pytest
+
+import admin
+import app as app_module
+
+BLOCK = 50
+ZEILEN = 300
+
+
+@pytest.fixture
+def kleine_bloecke(monkeypatch):
+    monkeypatch.setattr(admin, 'IMPORT_BATCH', BLOCK)
+
+
+def _admin_und_pruefer(app):
+    with app.app_context():
+        conn = app_module.get_db()
+        admin_id = conn.execute('SELECT id FROM users WHERE is_admin = TRUE').fetchone()[0]
+        bundesland, pruefer = 'Bayern', ['Dr. Import A', 'Dr. Import B', 'Dr. Import C']
+        conn.executemany('INSERT INTO pruefer (name, bundesland) VALUES (?, ?)',
+                         [(name, bundesland) for name in pruefer])
+        conn.commit()
+    return admin_id, bundesland, pruefer
+
+
+def _csv(bundesland, pruefer, zeilen=ZEILEN):
+    kopf = 'datum,bundesland,pruefer1,pruefer2,pruefer3,inhalt,hashtags,kommentar\n'
+    # Zufälliger Inhalt, damit auch die gzip-Datei groß genug für mehrere Lesevorgänge ist
+    return (kopf + ''.join(f"2024-05-01,{bundesland},{','.join(pruefer)},Inhalt {secrets.token_hex(40)},#Niere,\n"
+                           for _ in range(zeilen))).encode('utf-8')
+
+
+def _anzahl(app, sql):
+    with app.app_context():
+        return app_module.get_db().execute(sql).fetchone()[0]
+
+
+def test_lesefehler_nach_dem_ersten_block_wird_protokolliert(app, kleine_bloecke):
+    admin_id, bundesland, pruefer = _admin_und_pruefer(app)
+    # Ungültiges UTF-8 hinter mehreren Blöcken
+    daten = _csv(bundesland, pruefer) + b'2024-05-01,x,\xff\xfe,,,,,\n' + _csv(bundesland, pruefer, 10).split(b'\n', 1)[1]
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = admin_id
+        sess['is_admin'] = True
+    response = client.post('/admin/protokolle/import', data={'datei': (io.BytesIO(daten), 'import.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert 'abgebrochen' in response.get_data(as_text=True)
+
+    importiert = _anzahl(app, 'SELECT COUNT(*) FROM protokolle')
+    assert 0 < importiert <= ZEILEN
+    beschreibung = _anzahl(app, "SELECT description FROM admin_logs WHERE action_type = 'import'")
+    assert beschreibung.startswith(f'{importiert} Protokolle aus import.csv importiert (abgebrochen ab Zeile')
+
+
+def test_cli_meldet_abbruch_nach_geschriebenen_bloecken(app, kleine_bloecke, tmp_path):
+    _, bundesland, pruefer = _admin_und_pruefer(app)
+    pfad = tmp_path / 'import.csv.gz'
+    pfad.write_bytes(gzip.compress(_csv(bundesland, pruefer))[:-200])  # abgeschnittenes gzip
+
+    result = app.test_cli_runner().invoke(args=['protokolle-importieren', str(pfad),
+                                                '--autor', 'admin@urologie-app.de'])
+    importiert = _anzahl(app, 'SELECT COUNT(*) FROM protokolle')
+    assert result.exit_code == 1
+    assert 'Import abgebrochen' in result.output
+    assert 0 < importiert < ZEILEN
+    assert f'{importiert} von ' in result.output
+
+
+def _importieren(app, daten, **optionen):
+    with app.app_context():
+        conn = app_module.db_connect()
+        try:
+            admin_id = conn.execute('SELECT id FROM users WHERE is_admin = TRUE').fetchone()[0]
+            text, format_ = admin.import_datei_oeffnen(io.BytesIO(daten), 'import.csv')
+            return admin.ProtokollImport(conn, admin_id, **optionen).ausfuehren(admin.import_datensaetze(text, format_))
+        finally:
+            conn.close()
+
+
+def test_trockenlauf_ohne_schreibsperre(app, kleine_bloecke):
+    _, bundesland, pruefer = _admin_und_pruefer(app)
+    daten = _csv(bundesland, pruefer[:2] + ['Dr. Neu'])
+
+    # Ein anderer Schreiber hält die Sperre; der Trockenlauf darf nicht auf sie warten
+    with app.app_context():
+        schreiber = app_module.db_connect()
+    schreiber.execute('BEGIN IMMEDIATE')
+    try:
+        ergebnis = _importieren(app, daten, pruefer_anlegen=True, trockenlauf=True)
+    finally:
+        schreiber.rollback()
+        schreiber.close()
+
+    assert ergebnis['dauer'] < 1
+    assert (ergebnis['importiert'], ergebnis['fehler_anzahl']) == (ZEILEN, 0)
+    assert ergebnis['neue_pruefer'] == [('Dr. Neu', bundesland)]
+    assert _anzahl(app, "SELECT COUNT(*) FROM pruefer WHERE name = 'Dr. Neu'") == 0
+
+
+def test_neue_pruefer_werden_im_ersten_block_angelegt(app, kleine_bloecke):
+    _, bundesland, pruefer = _admin_und_pruefer(app)
+    ergebnis = _importieren(app, _csv(bundesland, pruefer[:2] + [' Dr. Neu ']), pruefer_anlegen=True)
+
+    assert (ergebnis['importiert'], ergebnis['fehler_anzahl']) == (ZEILEN, 0)
+    assert ergebnis['neue_pruefer'] == [('Dr. Neu', bundesland)]
+    neu_id = _anzahl(app, "SELECT id FROM pruefer WHERE name = 'Dr. Neu'")
+    assert _anzahl(app, f'SELECT COUNT(*) FROM protokolle WHERE pruefer3_id = {neu_id}') == ZEILEN
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Keyset-Seiten der Protokoll-Listen: ungültige Cursor führen zur ersten Seite"""
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def admin_client(app):
+    with app.app_context():
+        conn = app_module.get_db()
+        admin_id = conn.execute('SELECT id FROM users WHERE is_admin = TRUE').fetchone()[0]
+        pruefer = [row[0] for row in conn.execute('SELECT id FROM pruefer ORDER BY id LIMIT 3')]
+        conn.execute('''
+                     INSERT INTO protokolle (user_id, datum, bundesland, pruefer1_id, pruefer2_id,
+                                             pruefer3_id, inhalt, hashtags, kommentar)
+                     VALUES (?, '2024-05-01', 'Bayern', ?, ?, ?, 'Erste Seite', '', '')
+                     ''', (admin_id, *pruefer))
+        conn.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = admin_id
+        sess['is_admin'] = True
+    return client
+
+
+@pytest.mark.parametrize('werte', [
+    [1, [2]],
+    [{'a': 1}, 1],
+    [True, 1],
+    ['2024-05-01', None, 3],
+])
+@pytest.mark.parametrize('pfad', ['/protokolle', '/admin/protokolle'])
+def test_ungueltiger_cursor_zeigt_erste_seite(admin_client, pfad, werte):
+    erste_seite = admin_client.get(pfad)
+    assert erste_seite.status_code == 200
+
+    response = admin_client.get(pfad, query_string={'nach': app_module.cursor_kodieren(werte)})
+    assert response.status_code == 200
+    assert 'Erste Seite' in response.get_data(as_text=True)
+
+
+def test_cursor_dekodieren():
+    assert app_module.cursor_dekodieren(app_module.cursor_kodieren(['2024-05-01', 7])) == ['2024-05-01', 7]
+    assert app_module.cursor_dekodieren(app_module.cursor_kodieren([None, 7])) == [None, 7]
+    assert app_module.cursor_dekodieren(app_module.cursor_kodieren([1.5, 7])) == [1.5, 7]
+    assert app_module.cursor_dekodieren(app_module.cursor_kodieren([[1], 7])) is None
+    assert app_module.cursor_dekodieren(app_module.cursor_kodieren([False, 7])) is None
+    assert app_module.cursor_dekodieren('kein-base64!') is None